@@ -2,10 +2,16 @@
 Flask API for Prompt Objectivity Analyzer
 """
 
-from flask import Flask, request, jsonify
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+import json
 import sys
 import os
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,117 +20,614 @@ load_dotenv()
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.bias_detector import BiasDetector
-from models.prompt_rewriter import PromptRewriter
-from utils.domain_detector import DomainDetector
-from utils.gemini_client import GeminiClient
+from utils.batch_pool import BatchPool
+from utils.compact_format import FORMATS, JSON_MIMETYPE, RESPONSE_MIMETYPES, compact_results, pack
+from utils.metrics import metrics, record_analyze
+from utils.lexicon_store import LexiconStore
+from utils.model_registry import ModelRegistry
+from utils.nltk_resources import check_nltk_resources, download_nltk_resources
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend communication
 
-# Initialize models
-bias_detector = BiasDetector()
-prompt_rewriter = PromptRewriter()
-domain_detector = DomainDetector()
-gemini_client = GeminiClient()
+# SQLite file shared by every worker process for cached AI-mode results
+GEMINI_CACHE_DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'gemini_results.sqlite3'
+)
+EDIT_SESSION_DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'edit_sessions.sqlite3'
+)
+
+# 'eager' builds every model at import time; 'lazy' builds each one on first
+# use, or all of them when warm_up() is called by the serving process
+STARTUP_MODE = os.getenv('STARTUP_MODE', 'eager')
+
+# Published lexicon file (see publish_lexicon.py); when set, its word lists
+# replace the built-in ones and new versions are swapped in while running
+LEXICON_PATH = os.getenv('LEXICON_PATH')
+lexicon_store = LexiconStore(
+    LEXICON_PATH, check_interval=float(os.getenv('LEXICON_CHECK_INTERVAL', '2'))
+) if LEXICON_PATH else None
+
+# Models are created through factories so heavy imports (NLTK, NumPy,
+# requests) only happen when a model is actually needed
+def _create_lexicon():
+    return lexicon_store.load()
+
+def _create_bias_detector():
+    if lexicon_store is not None:
+        return registry.get('lexicon')['bias_detector']
+    from models.bias_detector import BiasDetector
+    return BiasDetector()
+
+def _create_prompt_rewriter():
+    if lexicon_store is not None:
+        return registry.get('lexicon')['prompt_rewriter']
+    from models.prompt_rewriter import PromptRewriter
+    return PromptRewriter()
+
+def _create_domain_detector():
+    if lexicon_store is not None:
+        return registry.get('lexicon')['domain_detector']
+    from utils.domain_detector import DomainDetector
+    return DomainDetector()
+
+def _create_gemini_cache():
+    from utils.result_cache import ResultCache
+    # An empty GEMINI_CACHE_PATH keeps the cache in memory only
+    return ResultCache(
+        path=os.getenv('GEMINI_CACHE_PATH', GEMINI_CACHE_DEFAULT_PATH) or None,
+        max_entries=int(os.getenv('GEMINI_CACHE_SIZE', '1024')),
+        ttl=float(os.getenv('GEMINI_CACHE_TTL', str(7 * 24 * 3600))),
+        max_disk_entries=int(os.getenv('GEMINI_CACHE_DISK_ENTRIES', '100000'))
+    )
+
+def single_flight_options():
+    """Shared settings for the sync and async single-flight layers"""
+    from utils.gemini_client import is_failed_result
+    timeout = os.getenv('SINGLE_FLIGHT_TIMEOUT')
+    return {
+        'share_errors': os.getenv('SINGLE_FLIGHT_SHARE_ERRORS', '1') == '1',
+        'follower_timeout': float(timeout) if timeout else None,
+        'on_timeout': os.getenv('SINGLE_FLIGHT_ON_TIMEOUT', 'raise'),
+        'is_error': is_failed_result
+    }
+
+def _create_gemini_single_flight():
+    from utils.single_flight import SingleFlight
+    return SingleFlight(**single_flight_options())
+
+def _create_gemini_client():
+    from utils.gemini_client import GeminiClient
+    single_flight = None
+    if os.getenv('GEMINI_SINGLE_FLIGHT', '1') == '1':
+        single_flight = registry.get('gemini_single_flight')
+    return GeminiClient(
+        cache=registry.get('gemini_cache'),
+        single_flight=single_flight,
+        pool_size=int(os.getenv('GEMINI_POOL_SIZE', '10')),
+        connect_timeout=float(os.getenv('GEMINI_CONNECT_TIMEOUT', '5')),
+        read_timeout=float(os.getenv('GEMINI_READ_TIMEOUT', '30')),
+        batch_max_items=int(os.getenv('GEMINI_BATCH_MAX_ITEMS', '20')),
+        batch_max_input_tokens=int(os.getenv('GEMINI_BATCH_MAX_INPUT_TOKENS', '30000')),
+        batch_max_output_tokens=int(os.getenv('GEMINI_BATCH_MAX_OUTPUT_TOKENS', '8192')),
+        micro_batch_wait=float(os.getenv('GEMINI_MICRO_BATCH_MS', '0')) / 1000,
+        structured_output=os.getenv('GEMINI_STRUCTURED_OUTPUT', '1') == '1',
+        hedge_percentile=float(os.getenv('GEMINI_HEDGE_PERCENTILE', '0'))
+    )
+
+def _create_nlp_cache():
+    from utils.result_cache import SizedLRUCache
+    return SizedLRUCache(max_bytes=int(os.getenv('NLP_CACHE_MAX_BYTES', str(64 * 1024 * 1024))))
+
+def _create_nlp_analyzer():
+    from models.analysis import NLPAnalyzer, analysis_limits
+    # NLP_CACHE_MAX_BYTES=0 disables the response cache
+    cache = registry.get('nlp_cache') if registry.get('nlp_cache').max_bytes > 0 else None
+    return NLPAnalyzer(
+        registry.get('bias_detector'),
+        registry.get('prompt_rewriter'),
+        registry.get('domain_detector'),
+        cache=cache,
+        **analysis_limits()
+    )
+
+def _create_hybrid_router():
+    from models.analysis import HybridRouter
+    return HybridRouter(
+        registry.get('nlp_analyzer'),
+        threshold=float(os.getenv('HYBRID_THRESHOLD', '10'))
+    )
+
+def _create_edit_sessions():
+    from models.analysis import analysis_limits
+    from models.edit_session import EditSessionStore
+    return EditSessionStore(
+        registry.get('bias_detector'),
+        registry.get('prompt_rewriter'),
+        max_sessions=int(os.getenv('EDIT_SESSION_MAX', '1000')),
+        ttl=float(os.getenv('EDIT_SESSION_TTL', '1800')),
+        max_sentence_chars=analysis_limits()['max_sentence_chars'],
+        # A file of their own, so every worker can serve every session; an
+        # empty EDIT_SESSION_PATH keeps them in memory
+        path=os.getenv('EDIT_SESSION_PATH', EDIT_SESSION_DEFAULT_PATH) or None,
+        snapshot_every=int(os.getenv('EDIT_SESSION_SNAPSHOT_EVERY', '200'))
+    )
+
+def _create_bias_classifier():
+    from models.bias_classifier import DEFAULT_MODEL_PATH, BiasClassifier, ModelNotAvailable
+    # Memory-mapped: preloaded server workers share the weights
+    try:
+        return BiasClassifier.load(os.getenv('ML_MODEL_PATH', DEFAULT_MODEL_PATH))
+    except ModelNotAvailable:
+        # ML mode answers 503 until a classifier is trained
+        return None
+
+registry = ModelRegistry()
+if lexicon_store is not None:
+    registry.register('lexicon', _create_lexicon)
+registry.register('bias_detector', _create_bias_detector)
+registry.register('prompt_rewriter', _create_prompt_rewriter)
+registry.register('domain_detector', _create_domain_detector)
+registry.register('gemini_cache', _create_gemini_cache)
+registry.register('gemini_single_flight', _create_gemini_single_flight)
+registry.register('gemini_client', _create_gemini_client)
+registry.register('nlp_cache', _create_nlp_cache)
+registry.register('nlp_analyzer', _create_nlp_analyzer)
+registry.register('hybrid_router', _create_hybrid_router)
+registry.register('edit_sessions', _create_edit_sessions)
+registry.register('bias_classifier', _create_bias_classifier)
+
+def refresh_lexicon():
+    """
+    Swap in a newly published lexicon, if there is one; requests already
+    running finish with the models they started with
+    """
+    if lexicon_store is None or not registry.is_loaded('lexicon'):
+        return
+    components = lexicon_store.check()
+    if components is None:
+        return
+
+    registry.replace('lexicon', components)
+    for name, component in components.items():
+        registry.replace(name, component)
+    if registry.is_loaded('nlp_analyzer'):
+        analyzer = registry.get('nlp_analyzer').with_components(**components)
+        registry.replace('nlp_analyzer', analyzer)
+        if registry.is_loaded('hybrid_router'):
+            registry.get('hybrid_router').nlp_analyzer = analyzer
+    if registry.is_loaded('edit_sessions'):
+        registry.get('edit_sessions').set_models(components['bias_detector'], components['prompt_rewriter'])
+    app.logger.info('Loaded lexicon version %s', lexicon_store.version)
+
+# Longest prompt any endpoint accepts, in characters; 0 disables the limit
+MAX_PROMPT_CHARS = int(os.getenv('MAX_PROMPT_CHARS', '1000000'))
+
+def prompt_too_long(prompt) -> bool:
+    return bool(MAX_PROMPT_CHARS) and isinstance(prompt, str) and len(prompt) > MAX_PROMPT_CHARS
+
+def _prompt_too_long_error() -> dict:
+    return {'error': f'Prompt too long (max {MAX_PROMPT_CHARS} characters)'}
+
+# Latency budget for the Gemini call in AI and hybrid mode (0: none); a
+# request can set its own with "budget_ms". With AI_FALLBACK, AI mode
+# answers with the NLP analysis when Gemini fails or runs out of time
+AI_BUDGET_MS = float(os.getenv('AI_BUDGET_MS', '0'))
+AI_FALLBACK = os.getenv('AI_FALLBACK', '1') == '1'
+
+def ai_request_options(data: dict) -> tuple:
+    """
+    (Deadline or None, whether to fall back) for an analyze request body
+    Raises ValueError for an invalid budget_ms or fallback
+    """
+    from utils.deadline import Deadline
+    budget_ms = data.get('budget_ms', AI_BUDGET_MS)
+    if isinstance(budget_ms, bool) or not isinstance(budget_ms, (int, float)) or budget_ms < 0:
+        raise ValueError('budget_ms must be a non-negative number of milliseconds')
+    fallback = data.get('fallback', AI_FALLBACK)
+    if not isinstance(fallback, bool):
+        raise ValueError('fallback must be true or false')
+    return Deadline.from_ms(budget_ms), fallback
+
+# Process pool for batch endpoints; workers load their models when warmed
+BATCH_MAX_PROMPTS = int(os.getenv('BATCH_MAX_PROMPTS', '1000'))
+batch_pool = BatchPool(
+    max_workers=int(os.getenv('BATCH_WORKERS', '0')) or None,
+    chunk_size=int(os.getenv('BATCH_CHUNK_SIZE', '16'))
+)
+
+startup_stats = {
+    'mode': STARTUP_MODE,
+    'import_seconds': None,
+    'warm_up_seconds': None,
+    'time_to_first_request_seconds': None,
+    'nltk_resources': None
+}
+_first_request_lock = threading.Lock()
+
+def warm_up(batch_workers: bool = True):
+    """
+    Build every model, start the batch workers and check NLTK data
+    Runs at import in eager mode; call it explicitly in lazy mode
+    batch_workers=False leaves the batch pool to start on first use, e.g.
+    in a server master process that is about to fork (see wsgi.py)
+    """
+    start = time.perf_counter()
+    registry.warm_up()
+    if batch_workers:
+        batch_pool.warm()
+
+    # Only local files are checked; downloading is opt-in
+    nltk_status = check_nltk_resources()
+    if not all(nltk_status.values()) and os.getenv('NLTK_AUTO_DOWNLOAD') == '1':
+        nltk_status = download_nltk_resources()
+    startup_stats['nltk_resources'] = nltk_status
+
+    startup_stats['warm_up_seconds'] = round(time.perf_counter() - start, 4)
+    return startup_stats['warm_up_seconds']
+
+@app.before_request
+def _check_lexicon():
+    refresh_lexicon()
+
+@app.after_request
+def _record_first_request(response):
+    """Record the time from module import until the first response is ready"""
+    if startup_stats['time_to_first_request_seconds'] is None:
+        with _first_request_lock:
+            if startup_stats['time_to_first_request_seconds'] is None:
+                elapsed = round(time.perf_counter() - _IMPORT_STARTED, 4)
+                startup_stats['time_to_first_request_seconds'] = elapsed
+                app.logger.info('Time to first request: %.3fs (%s startup)', elapsed, STARTUP_MODE)
+    return response
+
+if STARTUP_MODE != 'lazy':
+    warm_up()
+
+startup_stats['import_seconds'] = round(time.perf_counter() - _IMPORT_STARTED, 4)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'message': 'API is running'}), 200
+    return jsonify({
+        'status': 'healthy',
+        'message': 'API is running',
+        'startup': dict(startup_stats, models=registry.status())
+    }), 200
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss/eviction counters for the result caches and single flight"""
+    stats = {
+        'gemini': registry.get('gemini_cache').get_stats(),
+        'nlp': dict(registry.get('nlp_cache').get_stats(),
+                    fingerprint=registry.get('nlp_analyzer').fingerprint)
+    }
+    for name in ('gemini_single_flight', 'gemini_async_single_flight'):
+        if registry.is_loaded(name):
+            stats[name] = registry.get(name).get_stats()
+    return jsonify(stats), 200
+
+@app.route('/api/hybrid/stats', methods=['GET'])
+def hybrid_stats():
+    """Hybrid-mode escalation rate and NLP score distribution, for tuning HYBRID_THRESHOLD"""
+    return jsonify(registry.get('hybrid_router').get_stats()), 200
+
+@app.route('/api/lexicon', methods=['GET'])
+def lexicon_status():
+    """Version of the lexicon in use and its reload counters"""
+    if lexicon_store is None:
+        return jsonify({'source': 'built-in', 'fingerprint': registry.get('nlp_analyzer').fingerprint}), 200
+    return jsonify(dict(lexicon_store.get_stats(), source='file',
+                        fingerprint=registry.get('nlp_analyzer').fingerprint)), 200
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze_prompt():
     """
     Main endpoint to analyze and rewrite prompts
-    Expects JSON: { "prompt": "text", "mode": "nlp"|"ai" }
-    Supports both NLP and AI modes
+    Expects JSON: { "prompt": "text", "mode": "nlp"|"ai"|"hybrid"|"ml" }
+    Supports NLP and AI modes, hybrid mode which only asks Gemini about
+    prompts the NLP analysis finds biased, and ML mode which adds a local
+    classifier's bias probabilities to the NLP analysis
+    Optional for AI and hybrid mode: "budget_ms" (latency budget for the
+    Gemini call) and "fallback" (answer with the NLP analysis if it fails)
+    Send the header X-Debug-Timing: 1 to get a per-stage timing breakdown
+    """
+    started = time.perf_counter()
+    timing = metrics.start_request_timing() if request.headers.get('X-Debug-Timing') else None
+
+    response, status, mode = _run_analysis()
+
+    elapsed = time.perf_counter() - started
+    record_analyze(mode, response, status, elapsed)
+    if timing is not None:
+        # Copy: NLP responses may be shared cache entries
+        response = dict(response, timing={
+            'stages_ms': metrics.finish_request_timing(timing),
+            'total_ms': round(elapsed * 1000, 3)
+        })
+    return jsonify(response), status
+
+def _run_analysis():
+    """
+    Returns (response payload, status code, mode)
     """
+    mode = 'nlp'
     try:
         data = request.get_json()
 
         if not data or 'prompt' not in data:
-            return jsonify({'error': 'No prompt provided'}), 400
+            return {'error': 'No prompt provided'}, 400, mode
 
         prompt = data['prompt']
         mode = data.get('mode', 'nlp')  # Default to NLP mode
+        if prompt_too_long(prompt):
+            return _prompt_too_long_error(), 413, mode
 
-        # Automatically detect domain
-        domain_result = domain_detector.detect_domain(prompt)
-        domain = domain_result['domain']
+        if mode in ('ai', 'hybrid'):
+            try:
+                deadline, fallback = ai_request_options(data)
+            except ValueError as e:
+                return {'error': str(e)}, 400, mode
 
         if mode == 'ai':
+            # Automatically detect domain
+            with metrics.stage('domain_detection'):
+                domain_result = registry.get('domain_detector').detect_domain(prompt)
+            domain = domain_result['domain']
+
             # AI Mode: Use Gemini to analyze and rewrite
-            gemini_result = gemini_client.rewrite_prompt_objectively(prompt, domain)
+            gemini_result = registry.get('gemini_client').rewrite_prompt_objectively(
+                prompt, domain, deadline=deadline
+            )
 
             if gemini_result['success']:
-                gemini_data = gemini_result['data']
-
-                # Convert Gemini's bias format to match our format
-                biases_detected = {
-                    'subjective_language': [],
-                    'loaded_terms': [],
-                    'absolutist_language': [],
-                    'confirmation_bias': [],
-                    'leading_questions': [],
-                    'presumptive_language': []
-                }
-
-                for bias in gemini_data.get('biases_found', []):
-                    bias_type = bias.get('type', 'subjective_language')
-                    if bias_type in biases_detected:
-                        biases_detected[bias_type].append({
-                            'term': bias.get('example', ''),
-                            'position': 0,
-                            'length': len(bias.get('example', ''))
-                        })
-
-                response = {
-                    'original_prompt': prompt,
-                    'rewritten_prompt': gemini_data.get('rewritten_prompt', prompt),
-                    'bias_score': gemini_data.get('bias_score', 0),
-                    'biases_detected': biases_detected,
-                    'changes_made': gemini_data.get('changes_made', []),
-                    'alternative_suggestions': [],
-                    'domain': domain,
-                    'domain_confidence': domain_result['confidence'],
-                    'domain_scores': domain_result['scores'],
-                    'mode': 'ai',
-                    'ai_explanation': gemini_data.get('explanation', '')
-                }
+                from models.analysis import ai_analysis_response
+                response = ai_analysis_response(prompt, domain_result, gemini_result)
+            elif fallback:
+                from models.analysis import ai_fallback_response
+                response = ai_fallback_response(registry.get('nlp_analyzer').analyze(prompt), gemini_result)
             else:
-                return jsonify({'error': gemini_result.get('error', 'AI analysis failed')}), 500
+                from models.analysis import ai_failure_response
+                return ai_failure_response(gemini_result, domain) + (mode,)
+
+        elif mode == 'hybrid':
+            # Hybrid Mode: NLP pre-screen, Gemini only for biased-looking prompts
+            router = registry.get('hybrid_router')
+            nlp_response, escalate = router.screen(prompt)
+            gemini_result = None
+            if escalate:
+                gemini_result = registry.get('gemini_client').rewrite_prompt_objectively(
+                    prompt, nlp_response['domain'], deadline=deadline
+                )
+            response = router.respond(prompt, nlp_response, gemini_result)
+
+        elif mode == 'ml':
+            # ML Mode: NLP analysis scored by the locally trained classifier
+            return ml_response(registry.get('nlp_analyzer').analyze(prompt)) + (mode,)
 
         else:
-            # NLP Mode: Use rule-based analysis
-            # Detect biases
-            biases = bias_detector.detect_biases(prompt)
-            bias_score = bias_detector.get_bias_score(biases)
-
-            # Rewrite prompt
-            rewrite_result = prompt_rewriter.rewrite_prompt(prompt, biases)
-
-            # Get domain-specific alternatives
-            alternatives = prompt_rewriter.suggest_alternatives(prompt, domain)
-
-            # Prepare response
-            response = {
-                'original_prompt': prompt,
-                'rewritten_prompt': rewrite_result['rewritten'],
-                'bias_score': bias_score,
-                'biases_detected': biases,
-                'changes_made': rewrite_result['changes'],
-                'alternative_suggestions': alternatives,
-                'domain': domain,
-                'domain_confidence': domain_result['confidence'],
-                'domain_scores': domain_result['scores'],
-                'mode': 'nlp'
-            }
+            # NLP Mode: Use rule-based analysis (memoized per prompt)
+            response = registry.get('nlp_analyzer').analyze(prompt)
 
-        return jsonify(response), 200
+        return response, 200, mode
 
+    except TimeoutError as e:
+        # Long-document analysis ran past ANALYSIS_TIME_LIMIT
+        return {'error': str(e)}, 503, mode
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500, mode
+
+# Keep proxies from buffering the event stream
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def sse_event(event: str, data) -> str:
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_prompt_stream():
+    """
+    Streaming variant of /api/analyze, as server-sent events
+    Expects the same JSON; emits 'domain' (the detected domain), 'nlp' (the
+    NLP analysis), then in AI/hybrid mode 'ai_partial' events with Gemini's
+    output as it arrives and 'ai_field' events as each field of its
+    analysis completes, and finally 'result' with the /api/analyze
+    response (or 'error'); "budget_ms" and "fallback" apply as they do there
+    """
+    data = request.get_json(silent=True)
+    if not data or 'prompt' not in data:
+        return jsonify({'error': 'No prompt provided'}), 400
+    if prompt_too_long(data['prompt']):
+        return jsonify(_prompt_too_long_error()), 413
+
+    mode = data.get('mode', 'nlp')
+    deadline, fallback = None, AI_FALLBACK
+    if mode in ('ai', 'hybrid'):
+        try:
+            deadline, fallback = ai_request_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    events = _analysis_events(data['prompt'], mode, deadline, fallback)
+    return Response(stream_with_context(events), mimetype='text/event-stream', headers=STREAM_HEADERS)
+
+def _analysis_events(prompt: str, mode: str, deadline=None, fallback: bool = AI_FALLBACK):
+    started = time.perf_counter()
+    try:
+        nlp_response = None
+        for event, payload in registry.get('nlp_analyzer').analyze_progressively(prompt):
+            yield sse_event(event, payload)
+            nlp_response = payload
+
+        gemini_result = None
+        if mode == 'ai' or (mode == 'hybrid' and registry.get('hybrid_router').decide(nlp_response)):
+            for event, payload in registry.get('gemini_client').stream_rewrite(
+                    prompt, nlp_response['domain'], deadline=deadline):
+                if event == 'partial':
+                    yield sse_event('ai_partial', {'text': payload})
+                elif event == 'field':
+                    yield sse_event('ai_field', {'name': payload[0], 'value': payload[1]})
+                else:
+                    gemini_result = payload
+
+        response, status = stream_result(prompt, mode, nlp_response, gemini_result, fallback)
+    except TimeoutError as e:
+        response, status = {'error': str(e)}, 503
+    except Exception as e:
+        response, status = {'error': str(e)}, 500
+
+    record_analyze(mode, response, status, time.perf_counter() - started)
+    yield sse_event('result' if status == 200 else 'error', response)
+
+def ml_response(nlp_response: dict) -> tuple:
+    """
+    The ML-mode response for an NLP analysis
+    Returns (payload, status)
+    """
+    classifier = registry.get('bias_classifier')
+    if classifier is None:
+        return {'error': 'ML mode is unavailable: no trained bias classifier'}, 503
+    from models.analysis import ml_analysis_response
+    with metrics.stage('ml_classify'):
+        prediction = classifier.analyze([nlp_response['original_prompt']])[0]
+    return ml_analysis_response(nlp_response, prediction, classifier.version), 200
+
+def stream_result(prompt: str, mode: str, nlp_response, gemini_result,
+                  fallback: bool = AI_FALLBACK) -> tuple:
+    """
+    The final /api/analyze-shaped response of a stream; with fallback, a
+    failed AI-mode rewrite is answered with the NLP analysis
+    Returns (payload, status)
+    """
+    if mode == 'hybrid':
+        return registry.get('hybrid_router').respond(prompt, nlp_response, gemini_result), 200
+    if mode == 'ml':
+        return ml_response(nlp_response)
+    if mode != 'ai':
+        return nlp_response, 200
+    from models.analysis import ai_analysis_response, ai_failure_response, ai_fallback_response, domain_result_of
+    if not gemini_result['success']:
+        if fallback:
+            return ai_fallback_response(nlp_response, gemini_result), 200
+        return ai_failure_response(gemini_result, nlp_response['domain'])
+    return ai_analysis_response(prompt, domain_result_of(nlp_response), gemini_result), 200
+
+@app.route('/api/sessions', methods=['POST'])
+def create_session():
+    """
+    Start an incremental analysis session for live editing
+    Expects JSON: { "prompt": "text" }
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('prompt'), str):
+        return jsonify({'error': 'No prompt provided'}), 400
+    if prompt_too_long(data['prompt']):
+        return jsonify(_prompt_too_long_error()), 413
+
+    session_id, session = registry.get('edit_sessions').create(data['prompt'])
+    return jsonify(dict(session.snapshot(), session_id=session_id)), 201
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    """Full analysis of a session's current text"""
+    session = registry.get('edit_sessions').get(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired session'}), 404
+    with session.lock:
+        return jsonify(dict(session.snapshot(), session_id=session_id)), 200
+
+@app.route('/api/sessions/<session_id>', methods=['PATCH'])
+def edit_session(session_id):
+    """
+    Apply one edit and re-analyze only the sentences it touched
+    Expects JSON: { "start": int, "end": int, "text": "replacement", "version": int (optional) }
+    Returns the replaced range [start, old_end) -> [start, end) with the
+    bias spans and rewrites now inside it; spans after old_end move by delta
+    """
+    from models.edit_session import VersionConflict
+    data = request.get_json(silent=True)
+    if not data or 'start' not in data or 'end' not in data or 'text' not in data:
+        return jsonify({'error': 'Edit requires start, end and text'}), 400
+
+    store = registry.get('edit_sessions')
+    session = store.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired session'}), 404
+    try:
+        new_length = len(session.text) - (data['end'] - data['start']) + len(data['text'])
+    except TypeError:
+        return jsonify({'error': 'start and end must be integers and text a string'}), 400
+    if MAX_PROMPT_CHARS and new_length > MAX_PROMPT_CHARS:
+        return jsonify(_prompt_too_long_error()), 413
+
+    try:
+        result = store.apply(session_id, data['start'], data['end'], data['text'], data.get('version'))
+    except VersionConflict as e:
+        return jsonify({'error': str(e), 'version': session.version}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if result is None:
+        return jsonify({'error': 'Unknown or expired session'}), 404
+    return jsonify(dict(result, session_id=session_id)), 200
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    if not registry.get('edit_sessions').delete(session_id):
+        return jsonify({'error': 'Unknown or expired session'}), 404
+    return '', 204
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Counters and histograms in the Prometheus text format"""
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+def _collect_cache_metrics():
+    """Export the cache and single-flight counters alongside the request metrics"""
+    samples = []
+    for cache_name, registry_name in (('gemini', 'gemini_cache'), ('nlp', 'nlp_cache')):
+        if registry.is_loaded(registry_name):
+            for stat, value in registry.get(registry_name).get_stats().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    samples.append(({'cache': cache_name, 'stat': stat}, value))
+    yield 'cache_stat', 'gauge', 'Result cache counters and sizes', samples
+
+    samples = []
+    for registry_name in ('gemini_single_flight', 'gemini_async_single_flight'):
+        if registry.is_loaded(registry_name):
+            for stat, value in registry.get(registry_name).get_stats().items():
+                samples.append(({'layer': registry_name, 'stat': stat}, value))
+    yield 'single_flight_stat', 'gauge', 'Single-flight coalescing counters', samples
+
+    if registry.is_loaded('hybrid_router'):
+        stats = registry.get('hybrid_router').get_stats()
+        yield 'hybrid_stat', 'gauge', 'Hybrid-mode screening and escalation counters', [
+            ({'stat': stat}, stats[stat])
+            for stat in ('requests', 'escalated', 'escalation_failures', 'escalation_rate', 'threshold')
+        ]
+
+    if registry.is_loaded('edit_sessions'):
+        yield 'edit_session_stat', 'gauge', 'Incremental analysis session counters', [
+            ({'stat': stat}, value) for stat, value in registry.get('edit_sessions').get_stats().items()
+        ]
+
+    samples = []
+    for registry_name in ('gemini_client', 'async_gemini_client'):
+        if registry.is_loaded(registry_name):
+            stats = registry.get(registry_name).parse_stats.get_stats()
+            samples += [({'client': registry_name, 'stat': stat}, stats[stat])
+                        for stat in ('parsed', 'failed', 'failure_rate')]
+    yield 'gemini_parse_stat', 'gauge', 'Gemini replies parsed, failed and the failure rate', samples
+
+    if lexicon_store is not None:
+        stats = lexicon_store.get_stats()
+        yield 'lexicon_stat', 'gauge', 'Published lexicon version and reload counters', [
+            ({'stat': stat}, stats[stat])
+            for stat in ('version', 'reloads', 'reload_failures', 'last_reload_ms')
+            if stats[stat] is not None
+        ]
+
+metrics.register_collector(_collect_cache_metrics)
 
 @app.route('/api/detect', methods=['POST'])
 def detect_only():
@@ -139,19 +642,169 @@ def detect_only():
             return jsonify({'error': 'No prompt provided'}), 400
 
         prompt = data['prompt']
+        if prompt_too_long(prompt):
+            return jsonify(_prompt_too_long_error()), 413
 
-        # Detect biases
-        biases = bias_detector.detect_biases(prompt)
-        bias_score = bias_detector.get_bias_score(biases)
-
-        response = {
-            'prompt': prompt,
-            'bias_score': bias_score,
-            'biases_detected': biases
-        }
+        response = registry.get('nlp_analyzer').detect(prompt)
 
         return jsonify(response), 200
 
+    except TimeoutError as e:
+        # Long-document analysis ran past ANALYSIS_TIME_LIMIT
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _get_batch_prompts(data):
+    """
+    Validate a batch request body
+    Returns (prompts, error_response)
+    """
+    if not data or 'prompts' not in data:
+        return None, (jsonify({'error': 'No prompts provided'}), 400)
+
+    prompts = data['prompts']
+    if not isinstance(prompts, list):
+        return None, (jsonify({'error': 'prompts must be a list'}), 400)
+    if len(prompts) > BATCH_MAX_PROMPTS:
+        return None, (jsonify({'error': f'Too many prompts (max {BATCH_MAX_PROMPTS})'}), 413)
+    if any(prompt_too_long(prompt) for prompt in prompts):
+        return None, (jsonify(_prompt_too_long_error()), 413)
+
+    return prompts, None
+
+def _get_batch_format(data):
+    """
+    The requested result format: 'full' (default) or 'compact'
+    Returns (format, error_response)
+    """
+    output_format = data.get('format', 'full')
+    if output_format not in FORMATS:
+        return None, (jsonify({'error': f"format must be one of: {', '.join(FORMATS)}"}), 400)
+    return output_format, None
+
+def _batch_response(results, output_format='full'):
+    succeeded = sum(1 for result in results if result['success'])
+    response = {
+        'results': results,
+        'count': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded
+    }
+    if output_format == 'compact':
+        # Bias spans as columns of term ids into one shared term table
+        response['results'], response['terms'] = compact_results(results)
+        response['format'] = 'compact'
+    return response
+
+def _negotiated_response(payload, status=200):
+    """JSON, or MessagePack when the Accept header prefers it"""
+    mimetype = request.accept_mimetypes.best_match(RESPONSE_MIMETYPES, default=JSON_MIMETYPE)
+    if mimetype == JSON_MIMETYPE:
+        return jsonify(payload), status
+    return Response(pack(payload), status=status, mimetype=mimetype)
+
+@app.route('/api/detect/batch', methods=['POST'])
+def detect_batch():
+    """
+    Detect biases in many prompts at once
+    Expects JSON: { "prompts": ["text", ...], "format": "full" }
+    Results are returned in input order; failures are reported per item
+    """
+    try:
+        data = request.get_json()
+        prompts, error = _get_batch_prompts(data)
+        if error:
+            return error
+        output_format, error = _get_batch_format(data)
+        if error:
+            return error
+
+        results = batch_pool.map('detect', prompts)
+        return _negotiated_response(_batch_response(results, output_format))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _ai_batch(prompts: list) -> list:
+    """AI-mode results for a batch: one batched Gemini call per domain and size limit"""
+    from models.analysis import ai_analysis_response
+    results = [None] * len(prompts)
+    valid = []
+    for i, prompt in enumerate(prompts):
+        if not isinstance(prompt, str) or not prompt:
+            results[i] = {'success': False, 'error': 'No prompt provided'}
+        else:
+            valid.append(i)
+
+    with metrics.stage('domain_detection'):
+        domain_results = registry.get('domain_detector').detect_domains([prompts[i] for i in valid])
+    by_domain = {}
+    for i, domain_result in zip(valid, domain_results):
+        by_domain.setdefault(domain_result['domain'], []).append((i, domain_result))
+
+    for domain, items in by_domain.items():
+        gemini_results = registry.get('gemini_client').rewrite_prompts_batch(
+            [prompts[i] for i, _ in items], domain
+        )
+        for (i, domain_result), gemini_result in zip(items, gemini_results):
+            if gemini_result['success']:
+                results[i] = dict(ai_analysis_response(prompts[i], domain_result, gemini_result), success=True)
+            else:
+                results[i] = {'success': False, 'error': gemini_result.get('error', 'AI analysis failed'),
+                              'domain': domain}
+    # Same shape as BatchPool.map results
+    for index, result in enumerate(results):
+        result['index'] = index
+    return results
+
+def _ml_batch(prompts: list) -> list:
+    """ML-mode results for a batch: NLP analyses from the pool, classified in one pass"""
+    from models.analysis import ml_analysis_response
+    results = batch_pool.map('analyze', prompts)
+    analyzed = [i for i, result in enumerate(results) if result['success']]
+    if not analyzed:
+        return results
+
+    classifier = registry.get('bias_classifier')
+    with metrics.stage('ml_classify'):
+        predictions = classifier.analyze([prompts[i] for i in analyzed])
+    for i, prediction in zip(analyzed, predictions):
+        results[i] = ml_analysis_response(results[i], prediction, classifier.version)
+    return results
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Analyze and rewrite many prompts at once
+    Expects JSON: { "prompts": ["text", ...], "mode": "nlp"|"ai"|"ml", "format": "full" }
+    Results are returned in input order; failures are reported per item.
+    AI mode packs the prompts of each domain into batched Gemini requests;
+    ML mode classifies all the prompts at once
+    """
+    try:
+        data = request.get_json()
+        prompts, error = _get_batch_prompts(data)
+        if error:
+            return error
+        output_format, error = _get_batch_format(data)
+        if error:
+            return error
+
+        mode = data.get('mode', 'nlp')
+        if mode not in ('nlp', 'ai', 'ml'):
+            return jsonify({'error': "Batch analysis supports 'nlp', 'ai' and 'ml' modes only"}), 400
+        if mode == 'ml' and registry.get('bias_classifier') is None:
+            return jsonify({'error': 'ML mode is unavailable: no trained bias classifier'}), 503
+
+        if mode == 'ai':
+            results = _ai_batch(prompts)
+        elif mode == 'ml':
+            results = _ml_batch(prompts)
+        else:
+            results = batch_pool.map('analyze', prompts)
+        return _negotiated_response(_batch_response(results, output_format))
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -0,0 +1,367 @@
+"""
+ASGI entry point for the Prompt Objectivity Analyzer
+AI- and hybrid-mode /api/analyze requests are served natively on the event
+loop with AsyncGeminiClient, so a slow Gemini call only holds a coroutine; every
+other request is passed to the Flask app on a thread
+
+Run with:
+    uvicorn api.asgi:app --app-dir backend --port 5001
+"""
+
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.app import (
+    AI_FALLBACK, STREAM_HEADERS, ai_request_options, app as flask_app, prompt_too_long, refresh_lexicon, registry,
+    single_flight_options, sse_event, stream_result
+)
+from utils.metrics import metrics, record_analyze
+
+def _create_gemini_async_single_flight():
+    from utils.single_flight import AsyncSingleFlight
+    return AsyncSingleFlight(**single_flight_options())
+
+def _create_async_gemini_client():
+    from utils.async_gemini_client import AsyncGeminiClient
+    single_flight = None
+    if os.getenv('GEMINI_SINGLE_FLIGHT', '1') == '1':
+        single_flight = registry.get('gemini_async_single_flight')
+    return AsyncGeminiClient(
+        cache=registry.get('gemini_cache'),
+        single_flight=single_flight,
+        max_concurrency=int(os.getenv('GEMINI_MAX_CONCURRENCY', '256')),
+        pool_size=int(os.getenv('GEMINI_ASYNC_POOL_SIZE', '100')),
+        connect_timeout=float(os.getenv('GEMINI_CONNECT_TIMEOUT', '5')),
+        read_timeout=float(os.getenv('GEMINI_READ_TIMEOUT', '30')),
+        structured_output=os.getenv('GEMINI_STRUCTURED_OUTPUT', '1') == '1'
+    )
+
+registry.register('gemini_async_single_flight', _create_gemini_async_single_flight)
+registry.register('async_gemini_client', _create_async_gemini_client)
+
+# asgiref's WsgiToAsgi runs every WSGI call on one shared thread; a pool
+# lets slow sync requests (e.g. batches) run side by side
+_wsgi_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('ASGI_WSGI_THREADS', '32')),
+    thread_name_prefix='wsgi'
+)
+
+def _header(scope, name: bytes):
+    for key, value in scope.get('headers', ()):
+        if key.lower() == name:
+            return value
+    return None
+
+async def _read_body(receive) -> bytes:
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body += message.get('body', b'')
+        if not message.get('more_body', False):
+            break
+    return body
+
+def _wsgi_environ(scope, body: bytes) -> dict:
+    """The PEP 3333 environ for an ASGI HTTP scope and its request body"""
+    script_name = scope.get('root_path', '').encode('utf-8').decode('latin1')
+    path_info = scope['path'].encode('utf-8').decode('latin1')
+    if script_name and path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope.get('query_string', b'').decode('ascii'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        # The whole body is read already, so a chunked request reads to its end
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin1')
+        # Repeated headers are joined, as a WSGI server would
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+class PooledWsgiToAsgi:
+    """
+    Serves a WSGI app over ASGI, running each request on _wsgi_executor;
+    the response body is sent as the app yields it, so streamed responses
+    stay streamed
+    """
+
+    def __init__(self, wsgi_application):
+        self.wsgi_application = wsgi_application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError('WSGI app received a non-HTTP scope')
+        body = await _read_body(receive)
+        await sync_to_async(self._run, thread_sensitive=False, executor=_wsgi_executor)(
+            _wsgi_environ(scope, body), async_to_sync(send)
+        )
+
+    def _run(self, environ: dict, send):
+        response = {'start': None, 'sent': False}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info is not None and response['sent']:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+            }
+
+        def send_start():
+            if not response['sent']:
+                response['sent'] = True
+                send(response['start'])
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in result:
+                send_start()
+                if chunk:
+                    send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            send_start()
+            send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+wsgi_app = PooledWsgiToAsgi(flask_app)
+
+async def _read_json(receive) -> tuple:
+    """Returns (raw body, parsed JSON or None)"""
+    body = await _read_body(receive)
+    try:
+        return body, json.loads(body or b'null')
+    except ValueError:
+        return body, None
+
+def _replay_body(body: bytes, receive):
+    """A receive callable that yields an already-read body, then defers"""
+    sent = False
+
+    async def replay():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        return await receive()
+
+    return replay
+
+async def _send_json(send, payload, status: int = 200):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii')),
+            # Same policy flask_cors applies to the other endpoints
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def analyze_ai(prompt: str, deadline=None, fallback: bool = AI_FALLBACK) -> tuple:
+    """
+    AI-mode analysis without blocking the event loop
+    Returns (payload, status)
+    """
+    from models.analysis import ai_analysis_response, ai_failure_response, ai_fallback_response
+
+    # On the WSGI threads: keyword scoring of a long prompt would stall the event loop
+    with metrics.stage('domain_detection'):
+        domain_result = await sync_to_async(
+            registry.get('domain_detector').detect_domain, thread_sensitive=False, executor=_wsgi_executor
+        )(prompt)
+    gemini_result = await registry.get('async_gemini_client').rewrite_prompt_objectively_async(
+        prompt, domain_result['domain'], deadline=deadline
+    )
+
+    if gemini_result['success']:
+        return ai_analysis_response(prompt, domain_result, gemini_result), 200
+    if fallback:
+        nlp_response = await sync_to_async(
+            registry.get('nlp_analyzer').analyze, thread_sensitive=False, executor=_wsgi_executor
+        )(prompt)
+        return ai_fallback_response(nlp_response, gemini_result), 200
+    return ai_failure_response(gemini_result, domain_result['domain'])
+
+async def analyze_hybrid(prompt: str, deadline=None, fallback: bool = AI_FALLBACK) -> tuple:
+    """
+    Hybrid-mode analysis; the NLP pre-screen runs on the WSGI threads so
+    long prompts don't stall the event loop, escalations await Gemini
+    Returns (payload, status)
+    """
+    router = registry.get('hybrid_router')
+    nlp_response, escalate = await sync_to_async(
+        router.screen, thread_sensitive=False, executor=_wsgi_executor
+    )(prompt)
+    gemini_result = None
+    if escalate:
+        gemini_result = await registry.get('async_gemini_client').rewrite_prompt_objectively_async(
+            prompt, nlp_response['domain'], deadline=deadline
+        )
+    return router.respond(prompt, nlp_response, gemini_result), 200
+
+async def stream_analysis(send, prompt: str, mode: str, deadline=None, fallback: bool = AI_FALLBACK):
+    """
+    /api/analyze/stream for AI and hybrid mode: the same events as the
+    Flask route, with Gemini's output streamed without holding a thread
+    """
+    headers = [(b'content-type', b'text/event-stream'), (b'access-control-allow-origin', b'*')]
+    headers += [(name.lower().encode('ascii'), value.encode('ascii')) for name, value in STREAM_HEADERS.items()]
+    await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+
+    async def emit(event, data):
+        await send({'type': 'http.response.body', 'body': sse_event(event, data).encode('utf-8'), 'more_body': True})
+
+    started = time.perf_counter()
+    try:
+        # NLP steps run on the WSGI threads; the domain is sent before the bias analysis finishes
+        progress = registry.get('nlp_analyzer').analyze_progressively(prompt)
+        step = sync_to_async(next, thread_sensitive=False, executor=_wsgi_executor)
+        nlp_response = None
+        while True:
+            item = await step(progress, None)
+            if item is None:
+                break
+            event, nlp_response = item
+            await emit(event, nlp_response)
+
+        gemini_result = None
+        if mode == 'ai' or registry.get('hybrid_router').decide(nlp_response):
+            client = registry.get('async_gemini_client')
+            async for event, payload in client.stream_rewrite_async(prompt, nlp_response['domain'],
+                                                                    deadline=deadline):
+                if event == 'partial':
+                    await emit('ai_partial', {'text': payload})
+                elif event == 'field':
+                    await emit('ai_field', {'name': payload[0], 'value': payload[1]})
+                else:
+                    gemini_result = payload
+
+        payload, status = stream_result(prompt, mode, nlp_response, gemini_result, fallback)
+    except TimeoutError as e:
+        payload, status = {'error': str(e)}, 503
+    except Exception as e:
+        payload, status = {'error': str(e)}, 500
+
+    record_analyze(mode, payload, status, time.perf_counter() - started)
+    await send({
+        'type': 'http.response.body',
+        'body': sse_event('result' if status == 200 else 'error', payload).encode('utf-8'),
+        'more_body': False
+    })
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if registry.is_loaded('async_gemini_client'):
+                await registry.get('async_gemini_client').aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+# /api/analyze modes served on the event loop; the rest go to Flask
+NATIVE_MODES = {
+    'ai': analyze_ai,
+    'hybrid': analyze_hybrid
+}
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+
+    if scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] == '/api/analyze/stream':
+        body, data = await _read_json(receive)
+
+        options = None
+        if isinstance(data, dict) and data.get('mode') in NATIVE_MODES and 'prompt' in data \
+                and not prompt_too_long(data['prompt']):
+            try:
+                options = ai_request_options(data)
+            except ValueError:
+                pass
+
+        if options is not None:
+            refresh_lexicon()
+            await stream_analysis(send, data['prompt'], data['mode'], *options)
+            return
+
+        # NLP mode and invalid bodies are streamed by Flask
+        receive = _replay_body(body, receive)
+
+    elif scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] == '/api/analyze':
+        body, data = await _read_json(receive)
+
+        options = None
+        if isinstance(data, dict) and data.get('mode') in NATIVE_MODES and 'prompt' in data \
+                and not prompt_too_long(data['prompt']):
+            try:
+                options = ai_request_options(data)
+            except ValueError:
+                pass
+
+        if options is not None:
+            refresh_lexicon()
+            started = time.perf_counter()
+            timing = metrics.start_request_timing() if _header(scope, b'x-debug-timing') else None
+            try:
+                payload, status = await NATIVE_MODES[data['mode']](data['prompt'], *options)
+            except TimeoutError as e:
+                payload, status = {'error': str(e)}, 503
+            except Exception as e:
+                payload, status = {'error': str(e)}, 500
+
+            elapsed = time.perf_counter() - started
+            record_analyze(data['mode'], payload, status, elapsed)
+            if timing is not None:
+                payload = dict(payload, timing={
+                    'stages_ms': metrics.finish_request_timing(timing),
+                    'total_ms': round(elapsed * 1000, 3)
+                })
+            await _send_json(send, payload, status)
+            return
+
+        # NLP mode, invalid bodies and options, and oversized prompts keep Flask's behaviour exactly
+        receive = _replay_body(body, receive)
+
+    await wsgi_app(scope, receive, send)
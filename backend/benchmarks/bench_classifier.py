@@ -0,0 +1,73 @@
+"""
+ML-Mode Classifier Benchmark
+Trains the bias classifier on synthetic prompts, then compares its latency
+per prompt and its throughput on batches with the rule-based NLP analysis,
+and times loading the artifact with and without memory mapping
+
+Usage:
+    python benchmarks/bench_classifier.py --train 5000 --prompts 2000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.analysis import NLPAnalyzer
+from models.bias_classifier import BiasClassifier, train_classifier
+from train_classifier import synthetic_prompts
+
+
+def per_prompt_ms(fn, prompts):
+    latencies = []
+    for prompt in prompts:
+        started = time.perf_counter()
+        fn(prompt)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(0.99 * (len(latencies) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ML-mode bias classifier')
+    parser.add_argument('--train', type=int, default=5000, help='synthetic training prompts (default: 5000)')
+    parser.add_argument('--prompts', type=int, default=2000, help='prompts to time (default: 2000)')
+    parser.add_argument('--batch-size', type=int, default=256, help='prompts per batch (default: 256)')
+    args = parser.parse_args()
+
+    classifier = train_classifier(synthetic_prompts(args.train, seed=1))
+    evaluation = classifier.info['evaluation']
+    print(f"Trained on {classifier.info['samples']} prompts in {classifier.info['training_seconds']}s; "
+          f"held-out recall vs BiasDetector labels {evaluation['overall_recall']:.1%}\n")
+
+    prompts = synthetic_prompts(args.prompts, seed=2)
+    analyzer = NLPAnalyzer()
+    nlp = per_prompt_ms(analyzer.analyze, prompts)
+    ml = per_prompt_ms(lambda prompt: classifier.analyze([prompt]), prompts)
+
+    started = time.perf_counter()
+    for i in range(0, len(prompts), args.batch_size):
+        classifier.analyze(prompts[i:i + args.batch_size])
+    batched = len(prompts) / (time.perf_counter() - started)
+
+    print(f"{'step':<28} {'p50 ms':>8} {'p99 ms':>8} {'prompts/s':>10}")
+    print(f"{'NLP analysis':<28} {nlp[0]:>8.3f} {nlp[1]:>8.3f} {1000 / nlp[0]:>10.0f}")
+    print(f"{'classifier, one prompt':<28} {ml[0]:>8.3f} {ml[1]:>8.3f} {1000 / ml[0]:>10.0f}")
+    print(f"{f'classifier, batches of {args.batch_size}':<28} {'':>8} {'':>8} {batched:>10.0f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bias_classifier.joblib')
+        classifier.save(path)
+        print(f'\nartifact: {os.path.getsize(path) / 1e6:.1f} MB')
+        for mmap in (True, False):
+            started = time.perf_counter()
+            BiasClassifier.load(path, mmap=mmap)
+            print(f"load {'memory-mapped' if mmap else 'into memory':<14} {(time.perf_counter() - started) * 1000:>8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
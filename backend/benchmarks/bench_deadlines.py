@@ -0,0 +1,87 @@
+"""
+AI-Mode Tail Latency Benchmark
+Sends AI-mode /api/analyze requests through the Flask app while the mock
+Gemini server answers with heavy-tailed (lognormal) latency, with no
+budget, with a latency budget and NLP fallback, and with hedged requests
+as well; reports the latency percentiles, how often the NLP analysis
+stood in and how many requests reached Gemini
+
+Usage:
+    python benchmarks/bench_deadlines.py --requests 400 --budget-ms 300
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('STARTUP_MODE', 'lazy')
+
+from api.app import app, registry
+from benchmarks.mock_gemini import MockBehavior, start_server
+from utils.gemini_client import GeminiClient
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(base_url: str, total: int, concurrency: int, budget_ms: float, hedge_percentile: float):
+    client = GeminiClient(api_key='bench', base_url=base_url, pool_size=concurrency,
+                          hedge_percentile=hedge_percentile)
+    registry._instances['gemini_client'] = client
+    test_client = app.test_client()
+    body = {'mode': 'ai', 'budget_ms': budget_ms}
+
+    def call(i):
+        start = time.perf_counter()
+        response = test_client.post('/api/analyze', json=dict(body, prompt=f'Is option {i} obviously the best?'))
+        return time.perf_counter() - start, response.get_json().get('fallback')
+
+    try:
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(call, range(total)))
+    finally:
+        client.close()
+    latencies = sorted(latency for latency, _ in results)
+    fallbacks = sum(1 for _, fallback in results if fallback)
+    return latencies, fallbacks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark AI-mode tail latency with deadlines and hedging')
+    parser.add_argument('--requests', type=int, default=400, help='requests per configuration (default: 400)')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent requests (default: 8)')
+    parser.add_argument('--latency', type=float, default=0.05, help='median Gemini latency in seconds')
+    parser.add_argument('--sigma', type=float, default=1.0, help='lognormal sigma (default: 1.0)')
+    parser.add_argument('--budget-ms', type=float, default=300, help='latency budget (default: 300)')
+    args = parser.parse_args()
+
+    configurations = [
+        ('no budget', 0, 0.0),
+        (f'budget {args.budget_ms:g}ms', args.budget_ms, 0.0),
+        ('budget + hedge p95', args.budget_ms, 0.95)
+    ]
+    print(f'{args.requests} requests per run, Gemini latency lognormal '
+          f'(median {args.latency * 1000:g}ms, sigma {args.sigma})\n')
+    print(f"{'configuration':<20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'fallback':>9} {'upstream':>9}")
+    for name, budget_ms, hedge_percentile in configurations:
+        server, base_url = start_server(behavior=MockBehavior(
+            latency=args.latency, latency_dist='lognormal', latency_spread=args.sigma, seed=11
+        ))
+        try:
+            latencies, fallbacks = run(base_url, args.requests, args.concurrency, budget_ms, hedge_percentile)
+        finally:
+            server.shutdown()
+        print(f"{name:<20} {percentile(latencies, 0.50) * 1000:>8.1f} {percentile(latencies, 0.95) * 1000:>8.1f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.1f} {latencies[-1] * 1000:>8.1f} "
+              f"{fallbacks / len(latencies):>9.1%} {server.stats['requests']:>9}")
+
+
+if __name__ == '__main__':
+    main()
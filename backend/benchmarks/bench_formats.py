@@ -0,0 +1,130 @@
+"""
+Bulk Response Format Benchmark
+Compares the size and serialization time of batch detection results in
+the full JSON format against the compact columnar format, each encoded
+as JSON and as MessagePack
+
+Usage:
+    python benchmarks/bench_formats.py --prompts 1000 --words 100
+    python benchmarks/bench_formats.py --density 0.2 -o formats.json
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_nlp import bias_vocabulary, make_corpus
+from models.bias_detector import BiasDetector
+from utils.compact_format import compact_results, pack
+
+
+def batch_results(prompts: List[str], detector: BiasDetector) -> List[Dict]:
+    """The results list of a /api/detect/batch response"""
+    results = []
+    for index, prompt in enumerate(prompts):
+        biases = detector.detect_biases(prompt)
+        results.append({
+            'prompt': prompt,
+            'bias_score': detector.get_bias_score(biases),
+            'biases_detected': biases,
+            'success': True,
+            'index': index
+        })
+    return results
+
+
+def to_json(payload) -> bytes:
+    # Flask's jsonify settings outside debug mode
+    return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()
+
+
+def full_payload(results: List[Dict]) -> Dict:
+    return {'results': results, 'count': len(results)}
+
+
+def compact_payload(results: List[Dict]) -> Dict:
+    compacted, terms = compact_results(results)
+    return {'results': compacted, 'terms': terms, 'count': len(results), 'format': 'compact'}
+
+
+ENCODINGS = {
+    'full/json': lambda results: to_json(full_payload(results)),
+    'full/msgpack': lambda results: pack(full_payload(results)),
+    'compact/json': lambda results: to_json(compact_payload(results)),
+    'compact/msgpack': lambda results: pack(compact_payload(results))
+}
+
+
+def best_time(fn: Callable, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(prompts: int, words: int, density: float, repeats: int, log=print) -> Dict:
+    detector = BiasDetector()
+    corpus = make_corpus(words, density, prompts, bias_vocabulary(detector))
+    results = batch_results(corpus, detector)
+    # Prompt text is the same in every format; report sizes with and without it
+    without_prompts = [{key: value for key, value in result.items() if key != 'prompt'} for result in results]
+
+    rows = []
+    baseline = None
+    for name, encode in ENCODINGS.items():
+        body = encode(results)
+        row = {
+            'encoding': name,
+            'bytes': len(body),
+            'gzip_bytes': len(gzip.compress(body, 6)),
+            'bytes_without_prompts': len(encode(without_prompts)),
+            'serialize_ms': round(best_time(lambda: encode(results), repeats) * 1000, 3)
+        }
+        if baseline is None:
+            baseline = row
+        row['size_ratio'] = round(row['bytes_without_prompts'] / baseline['bytes_without_prompts'], 3)
+        row['time_ratio'] = round(row['serialize_ms'] / baseline['serialize_ms'], 3)
+        rows.append(row)
+        log(f"{name:<16} {row['bytes']:>10} B  gzip {row['gzip_bytes']:>9} B  "
+            f"spans only {row['bytes_without_prompts']:>9} B ({row['size_ratio']:.2f}x)  "
+            f"{row['serialize_ms']:>8.2f} ms ({row['time_ratio']:.2f}x)")
+
+    return {
+        'meta': {'prompts': prompts, 'words': words, 'density': density, 'repeats': repeats},
+        'results': rows
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the full and compact batch response formats')
+    parser.add_argument('--prompts', type=int, default=1000, help='prompts in the batch (default: 1000)')
+    parser.add_argument('--words', type=int, default=100, help='words per prompt (default: 100)')
+    parser.add_argument('--density', type=float, default=0.05,
+                        help='fraction of biased words (default: 0.05)')
+    parser.add_argument('--repeats', type=int, default=5,
+                        help='timed runs per encoding; the best is kept (default: 5)')
+    parser.add_argument('-o', '--output', help='write results as JSON to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = run_benchmark(args.prompts, args.words, args.density, args.repeats)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nResults written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Gemini Batching Benchmark
+Rewrites the same prompts three ways against the local mock Gemini server:
+one request per prompt, batched requests (request_rewrites) and concurrent
+single-prompt calls gathered by the micro-batcher. Reports requests sent,
+estimated input tokens and wall time
+
+Usage:
+    python benchmarks/bench_gemini_batching.py --prompts 200 --latency 0.3 --concurrency 16
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_gemini import MockBehavior, start_server
+from utils.gemini_client import GeminiClient, estimate_tokens
+
+
+class CountingSession:
+    """Wraps a session to count requests and the prompt text they carry"""
+
+    def __init__(self, session):
+        self.session = session
+        self.requests = 0
+        self.input_tokens = 0
+
+    def post(self, url, json=None, **kwargs):
+        self.requests += 1
+        self.input_tokens += estimate_tokens(json['contents'][0]['parts'][0]['text'])
+        return self.session.post(url, json=json, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def make_prompts(count: int):
+    return [f'Why is policy number {i} obviously a terrible idea that everyone hates?' for i in range(count)]
+
+
+def run(mode: str, base_url: str, prompts, concurrency: int, micro_batch_wait: float):
+    client = GeminiClient(api_key='benchmark', base_url=base_url, pool_size=concurrency,
+                          micro_batch_wait=micro_batch_wait if mode == 'micro' else 0)
+    counter = client.session = CountingSession(client.session)
+    started = time.perf_counter()
+    try:
+        if mode == 'batched':
+            results = client.request_rewrites(prompts, 'political')
+        else:
+            with ThreadPoolExecutor(concurrency) as executor:
+                results = list(executor.map(lambda prompt: client.rewrite_prompt_objectively(prompt, 'political'),
+                                            prompts))
+    finally:
+        client.close()
+    return {
+        'seconds': time.perf_counter() - started,
+        'requests': counter.requests,
+        'input_tokens': counter.input_tokens,
+        'failed': sum(1 for result in results if not result['success'])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched vs single-prompt Gemini requests')
+    parser.add_argument('--prompts', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.2, help='mock seconds per call (default: 0.2)')
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='concurrent callers for the single and micro modes (default: 16)')
+    parser.add_argument('--micro-batch-ms', type=float, default=5.0,
+                        help='micro-batcher gathering window (default: 5)')
+    args = parser.parse_args()
+
+    prompts = make_prompts(args.prompts)
+    server, base_url = start_server(behavior=MockBehavior(latency=args.latency))
+    try:
+        print(f'{args.prompts} prompts, mock latency {args.latency}s, concurrency {args.concurrency}\n')
+        print(f"{'mode':<10} {'requests':>9} {'input tokens':>13} {'tokens/prompt':>14} {'seconds':>8} {'failed':>7}")
+        for mode in ('single', 'batched', 'micro'):
+            row = run(mode, base_url, prompts, args.concurrency, args.micro_batch_ms / 1000)
+            print(f"{mode:<10} {row['requests']:>9} {row['input_tokens']:>13} "
+                  f"{row['input_tokens'] / args.prompts:>14.1f} {row['seconds']:>8.2f} {row['failed']:>7}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
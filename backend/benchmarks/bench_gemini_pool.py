@@ -0,0 +1,128 @@
+"""
+GeminiClient Connection Pooling Benchmark
+Compares request latency with the pooled keep-alive session against a new
+connection per request (the old requests.post behaviour), using the local
+mock Gemini server
+
+Usage:
+    python benchmarks/bench_gemini_pool.py --requests 500 --concurrency 8 --tls
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from benchmarks.mock_gemini import start_server
+from utils.gemini_client import GeminiClient
+
+
+class UnpooledSession:
+    """Opens a new connection for every request, like module-level requests.post"""
+
+    def __init__(self, verify=True):
+        self.verify = verify
+        self.trust_env = True
+
+    def post(self, url, **kwargs):
+        return requests.post(url, verify=self.verify, **kwargs)
+
+    def close(self):
+        pass
+
+
+def make_self_signed_cert(directory: str):
+    """Create a throwaway certificate for 127.0.0.1 with the openssl CLI"""
+    certfile = os.path.join(directory, 'cert.pem')
+    keyfile = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1', '-keyout', keyfile, '-out', certfile],
+        check=True, capture_output=True
+    )
+    return certfile, keyfile
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(client: GeminiClient, total: int, concurrency: int):
+    def timed_call(i):
+        start = time.perf_counter()
+        result = client._request_rewrite(f'Is option {i} obviously better?', 'general')
+        return time.perf_counter() - start, result['success']
+
+    # Warm-up request so both modes start with an imported, resolved stack
+    timed_call(-1)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(timed_call, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency * 1000 for latency, _ in samples)
+    return {
+        'requests': total,
+        'failed': sum(1 for _, success in samples if not success),
+        'throughput_rps': round(total / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(statistics.mean(latencies), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pooled vs unpooled Gemini HTTP calls')
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--tls', action='store_true',
+                        help='serve the mock over HTTPS so TLS handshakes are included')
+    args = parser.parse_args()
+
+    cert_dir = tempfile.mkdtemp() if args.tls else None
+    try:
+        certfile = keyfile = None
+        if args.tls:
+            certfile, keyfile = make_self_signed_cert(cert_dir)
+        server, base_url = start_server(certfile=certfile, keyfile=keyfile)
+
+        print(f'Mock Gemini at {base_url}: {args.requests} requests, concurrency {args.concurrency}\n')
+        print(f"{'mode':<10} {'conns':>6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'failed':>7}")
+
+        for mode in ('unpooled', 'pooled'):
+            client = GeminiClient(api_key='benchmark', base_url=base_url, pool_size=args.pool_size)
+            if mode == 'unpooled':
+                client.session = UnpooledSession()
+            # Trust the throwaway certificate so TLS is verified as in production
+            # (REQUESTS_CA_BUNDLE would otherwise override a session's verify)
+            client.session.verify = certfile or True
+            client.session.trust_env = False
+
+            connections_before = server.stats['connections']
+            stats = run(client, args.requests, args.concurrency)
+            connections = server.stats['connections'] - connections_before
+            client.close()
+
+            print(f"{mode:<10} {connections:>6} {stats['throughput_rps']:>9} {stats['p50_ms']:>9} "
+                  f"{stats['p99_ms']:>9} {stats['mean_ms']:>9} {stats['failed']:>7}")
+
+        server.shutdown()
+    finally:
+        if cert_dir:
+            shutil.rmtree(cert_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
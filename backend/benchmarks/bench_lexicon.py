@@ -0,0 +1,110 @@
+"""
+Lexicon Reload Benchmark
+Measures how long publishing a lexicon and swapping it into a running
+process take, and the memory each worker spends on the built models
+next to the size of the lexicon file
+
+Usage:
+    python benchmarks/bench_lexicon.py
+    python benchmarks/bench_lexicon.py --repeats 50 -o lexicon_bench.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.lexicon_store import LexiconStore, build_components, export_lexicon, publish_lexicon
+
+
+def default_source() -> Dict[str, Dict]:
+    return {type(component).__name__: export_lexicon(component) for component in build_components().values()}
+
+
+def _summary_ms(samples) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        'mean_ms': round(statistics.mean(samples) * 1000, 3),
+        'p50_ms': round(samples[len(samples) // 2] * 1000, 3),
+        'max_ms': round(samples[-1] * 1000, 3)
+    }
+
+
+def run_benchmark(repeats: int, log=print) -> Dict:
+    source = default_source()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'lexicon.json')
+        publish_lexicon(path, source)
+        store = LexiconStore(path, check_interval=0)
+        store.load()
+
+        publish_times, reload_times = [], []
+        for _ in range(repeats):
+            # A changed word list each time, as an edit would publish
+            source['BiasDetector']['loaded_terms'].append(f'term{len(publish_times)}')
+            start = time.perf_counter()
+            publish_lexicon(path, source)
+            publish_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            components = store.check()
+            reload_times.append(time.perf_counter() - start)
+            assert components is not None
+
+        file_bytes = os.path.getsize(path)
+
+        # Heap a worker holds for its models; the file's bytes are parsed
+        # and dropped, so only the built models stay
+        # Empty the re module's cache so every regex is really compiled
+        re.purge()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        components = store.load()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        model_bytes = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+    report = {
+        'repeats': repeats,
+        'publish': _summary_ms(publish_times),
+        'reload': _summary_ms(reload_times),
+        'file_bytes': file_bytes,
+        'worker_model_bytes': model_bytes,
+        'version': store.version
+    }
+    log(f"publish   mean {report['publish']['mean_ms']:>8.2f} ms  p50 {report['publish']['p50_ms']:>8.2f} ms  "
+        f"max {report['publish']['max_ms']:>8.2f} ms")
+    log(f"reload    mean {report['reload']['mean_ms']:>8.2f} ms  p50 {report['reload']['p50_ms']:>8.2f} ms  "
+        f"max {report['reload']['max_ms']:>8.2f} ms")
+    log(f"lexicon file {file_bytes} B (read and dropped)  built models {model_bytes} B per worker")
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark lexicon publishing and hot reloads')
+    parser.add_argument('--repeats', type=int, default=20, help='publish/reload cycles (default: 20)')
+    parser.add_argument('-o', '--output', help='write results as JSON to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = run_benchmark(args.repeats)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nResults written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
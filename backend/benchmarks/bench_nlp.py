@@ -0,0 +1,224 @@
+"""
+NLP Pipeline Micro-Benchmarks
+Measures throughput and per-call latency of BiasDetector.detect_biases,
+PromptRewriter.rewrite_prompt and DomainDetector.detect_domain on
+synthetic prompts of controlled length and bias density
+
+Usage:
+    python benchmarks/bench_nlp.py -o bench_results.json
+    python benchmarks/bench_nlp.py --quick --compare bench_baseline.json --threshold 0.15
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.bias_detector import BiasDetector
+from models.prompt_rewriter import PromptRewriter
+from utils.domain_detector import DomainDetector
+
+LENGTHS = [10, 100, 1000, 10000, 50000]
+QUICK_LENGTHS = [10, 100, 1000]
+DENSITIES = [0.0, 0.05, 0.2]
+
+NEUTRAL_WORDS = (
+    'the a of and to in is that for on with as by at from this report study '
+    'people market water city policy data result system group model process '
+    'question answer change level number history area language value rate '
+    'between during about after before under while because which where when '
+    'describe compare measure consider review explain summarize list'
+).split()
+
+STAGES = ['detect_biases', 'rewrite_prompt', 'detect_domain']
+
+
+def bias_vocabulary(detector: BiasDetector) -> List[str]:
+    """Literal biased terms and phrases the detector knows about"""
+    vocabulary = set(detector.subjective_words) | set(detector.loaded_terms)
+    vocabulary |= set(detector.confirmation_phrases)
+    vocabulary |= {
+        pattern.strip('\\b') for pattern in detector.absolutist_patterns
+        if pattern.strip('\\b').isalpha()
+    }
+    return sorted(vocabulary)
+
+
+def make_prompt(rng: random.Random, words: int, density: float, biased: List[str]) -> str:
+    """A prompt of the given length where ~density of the words are biased terms"""
+    tokens = []
+    for _ in range(words):
+        tokens.append(rng.choice(biased) if rng.random() < density else rng.choice(NEUTRAL_WORDS))
+    text = ' '.join(tokens)
+    # Sentence structure so question/presumption patterns see realistic text
+    return text[:1].upper() + text[1:] + '?'
+
+
+def make_corpus(words: int, density: float, count: int, biased: List[str], seed: int = 1234) -> List[str]:
+    rng = random.Random(f'{seed}:{words}:{density}')
+    return [make_prompt(rng, words, density, biased) for _ in range(count)]
+
+
+def corpus_size(words: int) -> int:
+    """Fewer distinct prompts for long texts so a run stays short"""
+    return max(2, min(200, 20000 // words))
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(fn: Callable, inputs: List, min_time: float, min_calls: int) -> Dict[str, float]:
+    """Call fn over the inputs repeatedly and summarize per-call latency"""
+    # Warm-up pass (regex caches, lazily built tables)
+    fn(inputs[0])
+
+    latencies = []
+    total_words = 0
+    started = time.perf_counter()
+    while len(latencies) < min_calls or time.perf_counter() - started < min_time:
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            latencies.append(time.perf_counter() - start)
+            total_words += len(item[0].split()) if isinstance(item, tuple) else len(item.split())
+    elapsed = sum(latencies)
+
+    latencies.sort()
+    return {
+        'calls': len(latencies),
+        'throughput_per_s': round(len(latencies) / elapsed, 2),
+        'words_per_s': round(total_words / elapsed, 1),
+        'mean_us': round(statistics.mean(latencies) * 1e6, 2),
+        'p50_us': round(percentile(latencies, 0.50) * 1e6, 2),
+        'p95_us': round(percentile(latencies, 0.95) * 1e6, 2),
+        'p99_us': round(percentile(latencies, 0.99) * 1e6, 2)
+    }
+
+
+def run_benchmarks(lengths: List[int], densities: List[float], min_time: float,
+                   min_calls: int, stages: List[str] = STAGES, log=print) -> Dict:
+    detector = BiasDetector()
+    rewriter = PromptRewriter()
+    domain_detector = DomainDetector()
+    biased = bias_vocabulary(detector)
+
+    results = []
+    for words in lengths:
+        for density in densities:
+            corpus = make_corpus(words, density, corpus_size(words), biased)
+            cases = {
+                'detect_biases': (detector.detect_biases, corpus),
+                # Rewriting is timed on its own, with biases found up front
+                'rewrite_prompt': (lambda item: rewriter.rewrite_prompt(*item),
+                                   [(prompt, detector.detect_biases(prompt)) for prompt in corpus]),
+                'detect_domain': (domain_detector.detect_domain, corpus)
+            }
+            for stage in stages:
+                fn, inputs = cases[stage]
+                stats = measure(fn, inputs, min_time, min_calls)
+                result = dict(stage=stage, words=words, density=density, **stats)
+                results.append(result)
+                log(f"{stage:<15} {words:>6} words  density {density:<5} "
+                    f"{stats['throughput_per_s']:>11.1f}/s  p50 {stats['p50_us']:>11.1f}us  "
+                    f"p99 {stats['p99_us']:>11.1f}us")
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'min_time': min_time,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+
+
+def _case_key(result: Dict) -> tuple:
+    return result['stage'], result['words'], result['density']
+
+
+def compare(baseline: Dict, current: Dict, threshold: float, metric: str = 'p50_us') -> List[Dict]:
+    """
+    Compare two runs case by case
+    Returns the cases whose latency metric grew by more than threshold
+    (e.g. 0.15 = 15% slower)
+    """
+    baseline_cases = {_case_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = baseline_cases.get(_case_key(result))
+        if before is None or not before[metric]:
+            continue
+        change = result[metric] / before[metric] - 1
+        if change > threshold:
+            regressions.append({
+                'stage': result['stage'],
+                'words': result['words'],
+                'density': result['density'],
+                'baseline': before[metric],
+                'current': result[metric],
+                'change': round(change, 4)
+            })
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the NLP detection and rewriting stages')
+    parser.add_argument('-o', '--output', help='write results as JSON to this file')
+    parser.add_argument('--quick', action='store_true',
+                        help=f'only prompts of {QUICK_LENGTHS} words')
+    parser.add_argument('--lengths', type=int, nargs='+', help=f'prompt lengths in words (default: {LENGTHS})')
+    parser.add_argument('--densities', type=float, nargs='+', help=f'bias densities (default: {DENSITIES})')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--min-time', type=float, default=0.5,
+                        help='seconds to spend on each case (default: 0.5)')
+    parser.add_argument('--min-calls', type=int, default=5,
+                        help='minimum calls per case (default: 5)')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='baseline JSON to compare against; exits 1 on regression')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='allowed p50 slowdown before a case counts as a regression (default: 0.15)')
+    parser.add_argument('--metric', default='p50_us', choices=['mean_us', 'p50_us', 'p95_us', 'p99_us'],
+                        help='latency metric used by --compare (default: p50_us)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    lengths = args.lengths or (QUICK_LENGTHS if args.quick else LENGTHS)
+    densities = args.densities or DENSITIES
+
+    report = run_benchmarks(lengths, densities, args.min_time, args.min_calls, args.stages)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nResults written to {args.output}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold, args.metric)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) beyond {args.threshold:.0%} ({args.metric}):')
+            for regression in regressions:
+                print(f"  {regression['stage']:<15} {regression['words']:>6} words  "
+                      f"density {regression['density']:<5} {regression['baseline']:>11.1f}us -> "
+                      f"{regression['current']:>11.1f}us  (+{regression['change']:.0%})")
+            return 1
+        print(f'\nNo regressions beyond {args.threshold:.0%} against {args.compare}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Gemini Response Parser Benchmark
+Runs the recorded replies in recorded_responses.jsonl through the previous
+regex-and-json.loads extraction and through utils.response_parser, whole
+and streamed in small pieces, and reports how many each one gets right and
+how long long replies take to parse
+
+Usage:
+    python benchmarks/bench_response_parser.py --repeat 200
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.response_parser import IncrementalParser, parse_rewrite
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recorded_responses.jsonl')
+
+
+def load_corpus(path: str = CORPUS_PATH):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def legacy_parse(text: str):
+    """The greedy regex extraction GeminiClient used before"""
+    match = re.search(r'\{[\s\S]*\}', text)
+    if not match:
+        raise ValueError('no JSON')
+    return json.loads(match.group())
+
+
+def streamed_parse(text: str, piece: int = 64):
+    parser = IncrementalParser()
+    for i in range(0, len(text), piece):
+        parser.feed(text[i:i + piece])
+    return parser.result()
+
+
+PARSERS = {'legacy': legacy_parse, 'parser': parse_rewrite, 'streamed': streamed_parse}
+
+
+def outcome(parse, entry) -> bool:
+    """Whether the parser accepts exactly the replies that hold a usable analysis"""
+    try:
+        data = parse(entry['text'])
+    except ValueError:
+        # ResponseParseError, or json.loads failing in the legacy parser
+        return entry['expect'] != 'ok'
+    if entry['expect'] != 'ok':
+        return False
+    return isinstance(data, dict) and data.get('rewritten_prompt') == entry['rewritten_prompt']
+
+
+def time_parse(parse, text: str, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        try:
+            parse(text)
+        except ValueError:
+            pass
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Gemini response parsing')
+    parser.add_argument('--repeat', type=int, default=200, help='parses per timing (default: 200)')
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    long_reply = next(entry for entry in corpus if entry['name'] == 'long_explanation')['text']
+    trailing = next(entry for entry in corpus if entry['name'] == 'trailing_braces_and_prose')['text']
+
+    print(f'{len(corpus)} recorded replies; long reply is {len(long_reply)} characters\n')
+    print(f"{'parser':<10} {'correct':>8} {'long reply us':>14} {'trailing braces us':>19}")
+    for name, parse in PARSERS.items():
+        correct = sum(outcome(parse, entry) for entry in corpus)
+        print(f"{name:<10} {correct:>5}/{len(corpus):<2} {time_parse(parse, long_reply, args.repeat):>14.1f} "
+              f"{time_parse(parse, trailing, args.repeat):>19.1f}")
+
+
+if __name__ == '__main__':
+    main()
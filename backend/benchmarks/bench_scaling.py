@@ -0,0 +1,140 @@
+"""
+Multi-Worker Scaling Benchmark
+Launches the production Gunicorn server (gunicorn.conf.py, wsgi.py) with
+increasing worker counts, drives NLP-mode /api/analyze with the load
+tester and reports throughput per worker and how much of each worker's
+memory is shared with the preloaded master
+
+Usage:
+    python benchmarks/bench_scaling.py --workers 1 2 4 8 --duration 20
+    python benchmarks/bench_scaling.py -o scaling.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load_test import launch, load_prompts, run_load
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def _memory_kb(pid: int) -> Dict[str, int]:
+    """Pss, shared and private memory of a process (Linux only)"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'pss_kb': fields.get('Pss', 0),
+        'shared_kb': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private_kb': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+def server_memory(master_pid: int) -> Optional[Dict[str, int]]:
+    """Total Pss of the master and its workers, and each worker's average split"""
+    try:
+        master = _memory_kb(master_pid)
+        workers = [_memory_kb(pid) for pid in _children(master_pid)]
+    except OSError:
+        return None
+    if not workers:
+        return None
+    return {
+        'total_pss_kb': master['pss_kb'] + sum(worker['pss_kb'] for worker in workers),
+        'worker_shared_kb': sum(worker['shared_kb'] for worker in workers) // len(workers),
+        'worker_private_kb': sum(worker['private_kb'] for worker in workers) // len(workers)
+    }
+
+
+def run_benchmark(worker_counts: List[int], duration: float, concurrency_per_worker: int,
+                  words: int, log=print) -> Dict:
+    prompts = load_prompts(distinct=1000, words=words)
+    rows = []
+    for workers in worker_counts:
+        processes, url, _ = launch('gunicorn', [], no_cache=True, workers=workers)
+        try:
+            # A short warm-up so every worker has served requests
+            asyncio.run(run_load(url, prompts, concurrency=workers * concurrency_per_worker, duration=1))
+            summary = asyncio.run(run_load(
+                url, prompts, concurrency=workers * concurrency_per_worker, duration=duration
+            ))
+            memory = server_memory(processes[0].pid)
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+
+        stats = summary['modes']['nlp']
+        row = {
+            'workers': workers,
+            'throughput_rps': stats['throughput_rps'],
+            'p50_ms': stats['p50_ms'],
+            'p99_ms': stats['p99_ms'],
+            'error_rate': stats['error_rate'],
+            'memory': memory
+        }
+        base = rows[0] if rows else row
+        row['rps_per_worker'] = round(row['throughput_rps'] / workers, 1)
+        row['scaling_efficiency'] = round(row['throughput_rps'] / (base['throughput_rps'] / base['workers'] * workers), 3)
+        rows.append(row)
+
+        shared = ''
+        if memory:
+            shared = (f"  worker memory shared {memory['worker_shared_kb'] / 1024:.1f} MB / "
+                      f"private {memory['worker_private_kb'] / 1024:.1f} MB")
+        log(f"{workers:>3} workers  {row['throughput_rps']:>9.1f} req/s  ({row['rps_per_worker']:.1f}/worker, "
+            f"{row['scaling_efficiency']:.0%} of linear)  p50 {row['p50_ms']} ms  p99 {row['p99_ms']} ms{shared}")
+
+    return {
+        'meta': {'cpu_count': os.cpu_count(), 'duration': duration,
+                 'concurrency_per_worker': concurrency_per_worker, 'words': words},
+        'results': rows
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Measure throughput scaling of the Gunicorn server')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        help='worker counts to try (default: 1, 2, 4, ... up to the CPU count)')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per run (default: 10)')
+    parser.add_argument('--concurrency-per-worker', type=int, default=4,
+                        help='requests kept in flight per worker (default: 4)')
+    parser.add_argument('--words', type=int, default=20, help='words per prompt (default: 20)')
+    parser.add_argument('-o', '--output', help='write results as JSON to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    worker_counts = args.workers
+    if not worker_counts:
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= (os.cpu_count() or 1):
+            worker_counts.append(worker_counts[-1] * 2)
+
+    report = run_benchmark(worker_counts, args.duration, args.concurrency_per_worker, args.words)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nResults written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
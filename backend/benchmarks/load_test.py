@@ -0,0 +1,343 @@
+"""
+End-to-End Load Test
+Drives /api/analyze in NLP and/or AI mode at a target request rate (open
+loop) or concurrency (closed loop) and reports latency percentiles,
+throughput and an error breakdown per mode
+
+Against a running server:
+    python benchmarks/load_test.py --url http://127.0.0.1:5001 --mode both --qps 100 --duration 30
+
+Or launch the API (Flask, ASGI or Gunicorn) wired to a local mock Gemini server:
+    python benchmarks/load_test.py --launch asgi --mode ai --concurrency 200 --requests 5000 \\
+        --latency 0.8 --latency-dist lognormal --latency-spread 0.4 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import aiohttp
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from benchmarks.bench_nlp import NEUTRAL_WORDS, bias_vocabulary, make_prompt
+from benchmarks.mock_gemini import add_behavior_arguments
+from models.bias_detector import BiasDetector
+
+
+def load_prompts(path: str = None, distinct: int = 1000, words: int = 20, seed: int = 1234) -> List[str]:
+    """Prompts from a text/JSONL file, or synthetic ones of the given length"""
+    if path:
+        prompts = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith('{'):
+                    line = json.loads(line).get('prompt', '')
+                prompts.append(line)
+        return prompts
+
+    rng = random.Random(seed)
+    biased = bias_vocabulary(BiasDetector())
+    return [make_prompt(rng, words, 0.1, biased) for _ in range(distinct)]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+FALLBACK_FLAG = re.compile(rb'"fallback":\s*true')
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+        self.started = None
+        self.finished = None
+
+    def record(self, mode: str, latency: float, outcome: str):
+        self.latencies[mode].append(latency)
+        self.outcomes[mode][outcome] += 1
+
+    def summary(self) -> Dict:
+        elapsed = self.finished - self.started
+        modes = {}
+        for mode, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            outcomes = self.outcomes[mode]
+            ok = outcomes.get('ok', 0)
+            modes[mode] = {
+                'requests': len(latencies),
+                'ok': ok,
+                'errors': {outcome: count for outcome, count in sorted(outcomes.items()) if outcome != 'ok'},
+                'error_rate': round(1 - ok / len(latencies), 4),
+                'throughput_rps': round(len(latencies) / elapsed, 2),
+                'goodput_rps': round(ok / elapsed, 2),
+                'mean_ms': round(statistics.mean(latencies) * 1000, 2),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                'max_ms': round(latencies[-1] * 1000, 2)
+            }
+        return {'elapsed_seconds': round(elapsed, 3), 'modes': modes}
+
+
+async def send_one(session, url: str, prompt: str, mode: str, recorder: Recorder, scheduled: float):
+    """One /api/analyze call; latency is measured from its scheduled start"""
+    try:
+        async with session.post(url, json={'prompt': prompt, 'mode': mode}) as response:
+            body = await response.read()
+            if response.status == 200:
+                # AI-mode answers that fell back to the NLP analysis aren't goodput
+                outcome = 'fallback' if FALLBACK_FLAG.search(body) else 'ok'
+            else:
+                outcome = f'http_{response.status}'
+                try:
+                    error = json.loads(body).get('error', '')
+                    if error:
+                        # Group upstream failures by their cause, not the full text
+                        outcome += ': ' + error.split(':')[0][:60]
+                except (ValueError, AttributeError):
+                    pass
+    except asyncio.TimeoutError:
+        outcome = 'timeout'
+    except aiohttp.ClientError as e:
+        outcome = type(e).__name__
+    recorder.record(mode, time.perf_counter() - scheduled, outcome)
+
+
+def choose_mode(rng: random.Random, mode: str, ai_fraction: float) -> str:
+    if mode != 'both':
+        return mode
+    return 'ai' if rng.random() < ai_fraction else 'nlp'
+
+
+async def run_load(url: str, prompts: List[str], mode: str = 'nlp', ai_fraction: float = 0.5,
+                   qps: float = None, concurrency: int = 10, requests: int = None,
+                   duration: float = None, timeout: float = 60.0, poisson: bool = False,
+                   seed: int = 1234) -> Dict:
+    """
+    Open loop when qps is given (requests start on schedule regardless of
+    how long earlier ones take); closed loop with `concurrency` workers
+    otherwise. Stops after `requests` requests or `duration` seconds.
+    """
+    rng = random.Random(seed)
+    recorder = Recorder()
+    analyze_url = url.rstrip('/') + '/api/analyze'
+    connector = aiohttp.TCPConnector(limit=0 if qps else concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    def should_stop(sent: int) -> bool:
+        if requests is not None and sent >= requests:
+            return True
+        return duration is not None and time.perf_counter() - recorder.started >= duration
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        recorder.started = time.perf_counter()
+
+        if qps:
+            tasks = []
+            next_start = recorder.started
+            sent = 0
+            while not should_stop(sent):
+                delay = next_start - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.ensure_future(send_one(
+                    session, analyze_url, rng.choice(prompts),
+                    choose_mode(rng, mode, ai_fraction), recorder, next_start
+                )))
+                sent += 1
+                next_start += rng.expovariate(qps) if poisson else 1 / qps
+            await asyncio.gather(*tasks)
+        else:
+            sent = 0
+
+            async def worker():
+                nonlocal sent
+                while not should_stop(sent):
+                    sent += 1
+                    await send_one(session, analyze_url, rng.choice(prompts),
+                                   choose_mode(rng, mode, ai_fraction), recorder, time.perf_counter())
+
+            await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+        recorder.finished = time.perf_counter()
+
+    return recorder.summary()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'{url} did not come up within {timeout}s')
+
+
+def launch(server: str, mock_args: List[str], no_cache: bool, workers: int = None):
+    """
+    Start the mock Gemini server and the API wired to it; workers is the
+    number of Gunicorn worker processes (default: its configured count)
+    Returns (processes, api_url, mock_url)
+    """
+    mock_port, api_port = _free_port(), _free_port()
+    mock = subprocess.Popen(
+        [sys.executable, 'benchmarks/mock_gemini.py', '--port', str(mock_port)] + mock_args,
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL
+    )
+
+    env = dict(os.environ, GEMINI_BASE_URL=f'http://127.0.0.1:{mock_port}/v1beta/models',
+               GEMINI_API_KEY=os.getenv('GEMINI_API_KEY', 'load-test'))
+    if no_cache:
+        env.update(GEMINI_CACHE_PATH='', GEMINI_CACHE_SIZE='0', NLP_CACHE_MAX_BYTES='0',
+                   GEMINI_SINGLE_FLIGHT='0')
+
+    if server == 'asgi':
+        command = [sys.executable, '-m', 'uvicorn', 'api.asgi:app', '--port', str(api_port),
+                   '--log-level', 'warning']
+    elif server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                   '--bind', f'127.0.0.1:{api_port}', '--log-level', 'warning']
+        if workers:
+            command += ['--workers', str(workers)]
+        command.append('wsgi:app')
+    else:
+        command = [sys.executable, '-m', 'flask', '--app', 'api.app', 'run', '--port', str(api_port)]
+    api = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    api_url = f'http://127.0.0.1:{api_port}'
+    mock_url = f'http://127.0.0.1:{mock_port}'
+    try:
+        _wait_for(mock_url + '/stats')
+        _wait_for(api_url + '/api/health', timeout=120)
+    except RuntimeError:
+        for process in (api, mock):
+            process.terminate()
+        raise
+    return [api, mock], api_url, mock_url
+
+
+def print_summary(summary: Dict):
+    print(f"\n{'mode':<6} {'reqs':>7} {'req/s':>9} {'ok/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9} {'errors':>7}")
+    for mode, stats in summary['modes'].items():
+        print(f"{mode:<6} {stats['requests']:>7} {stats['throughput_rps']:>9} {stats['goodput_rps']:>9} "
+              f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats['max_ms']:>9} "
+              f"{stats['error_rate']:>7.1%}")
+    for mode, stats in summary['modes'].items():
+        for outcome, count in stats['errors'].items():
+            print(f'  {mode} {outcome}: {count}')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the /api/analyze endpoint')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='base URL of a running API server')
+    target.add_argument('--launch', choices=['flask', 'asgi', 'gunicorn'],
+                        help='start the API and a mock Gemini server for this run')
+    parser.add_argument('--workers', type=int,
+                        help='with --launch gunicorn: worker processes (default: GUNICORN_WORKERS or CPU count)')
+
+    parser.add_argument('--mode', choices=['nlp', 'ai', 'hybrid', 'both'], default='nlp')
+    parser.add_argument('--ai-fraction', type=float, default=0.5,
+                        help="share of AI-mode requests with --mode both (default: 0.5)")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument('--qps', type=float, help='open loop: target requests per second')
+    load.add_argument('--concurrency', type=int, default=10,
+                      help='closed loop: requests kept in flight (default: 10)')
+    parser.add_argument('--poisson', action='store_true', help='Poisson arrivals with --qps')
+    parser.add_argument('--requests', type=int, help='stop after this many requests')
+    parser.add_argument('--duration', type=float, help='stop after this many seconds')
+    parser.add_argument('--timeout', type=float, default=60.0, help='per-request timeout (default: 60)')
+    parser.add_argument('--prompts', help='text or JSONL file of prompts (default: synthetic)')
+    parser.add_argument('--distinct', type=int, default=1000,
+                        help='number of distinct synthetic prompts (default: 1000)')
+    parser.add_argument('--words', type=int, default=20, help='words per synthetic prompt (default: 20)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='with --launch: disable result caches and single flight')
+    parser.add_argument('-o', '--output', help='write the summary as JSON to this file')
+
+    mock = parser.add_argument_group('mock Gemini (with --launch)')
+    add_behavior_arguments(mock)
+
+    args = parser.parse_args(argv)
+    if args.requests is None and args.duration is None:
+        args.requests = 1000
+    return args
+
+
+def _mock_args(args) -> List[str]:
+    mock_args = ['--latency', str(args.latency), '--latency-dist', args.latency_dist,
+                 '--latency-spread', str(args.latency_spread), '--error-rate', str(args.error_rate),
+                 '--malformed-rate', str(args.malformed_rate),
+                 '--error-statuses'] + [str(status) for status in args.error_statuses]
+    if args.seed is not None:
+        mock_args += ['--seed', str(args.seed)]
+    return mock_args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    prompts = load_prompts(args.prompts, args.distinct, args.words)
+
+    processes, url, mock_url = [], args.url, None
+    if args.launch:
+        processes, url, mock_url = launch(args.launch, _mock_args(args), args.no_cache, args.workers)
+
+    try:
+        load = f'{args.qps} req/s' if args.qps else f'concurrency {args.concurrency}'
+        print(f'Load test: {url}/api/analyze, mode {args.mode}, {load}')
+        summary = asyncio.run(run_load(
+            url, prompts, mode=args.mode, ai_fraction=args.ai_fraction,
+            qps=args.qps, concurrency=args.concurrency, requests=args.requests,
+            duration=args.duration, timeout=args.timeout, poisson=args.poisson
+        ))
+        if mock_url:
+            with urllib.request.urlopen(mock_url + '/stats', timeout=5) as response:
+                summary['mock_gemini'] = json.load(response)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    print_summary(summary)
+    if 'mock_gemini' in summary:
+        stats = summary['mock_gemini']
+        print(f"\nmock Gemini: {stats['requests']} calls, {stats['error']} errors, "
+              f"{stats['malformed']} malformed, peak concurrency {stats['max_in_flight']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,353 @@
+"""
+Mock Gemini Server
+Local stand-in for the generateContent and streamGenerateContent endpoints, used by the benchmarks,
+load tests and tests so no API key, network access or quota is needed.
+Latency, error rate and malformed replies are configurable. Batched
+requests (several numbered prompts in one call) get one result per prompt,
+cut off at the request's maxOutputTokens like the real API.
+
+Usage:
+    python benchmarks/mock_gemini.py --port 8099 --latency 0.8 --latency-dist lognormal \
+        --latency-spread 0.5 --error-rate 0.02 --malformed-rate 0.01
+    GEMINI_BASE_URL=http://127.0.0.1:8099/v1beta/models python api/app.py
+
+GET /stats on the mock returns its request counters.
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+CANNED_RESULT = {
+    'original_prompt': '',
+    'rewritten_prompt': 'What evidence exists about this topic?',
+    'biases_found': [
+        {'type': 'subjective_language', 'example': 'obviously'}
+    ],
+    'changes_made': ["Removed subjective qualifier 'obviously'"],
+    'bias_score': 40,
+    'explanation': 'The prompt presumes its conclusion.'
+}
+
+
+def gemini_response(text: str) -> Dict:
+    """Wrap model output text the way generateContent does"""
+    return {
+        'candidates': [{
+            'content': {'parts': [{'text': text}], 'role': 'model'},
+            'finishReason': 'STOP'
+        }]
+    }
+
+
+LATENCY_DISTRIBUTIONS = ['fixed', 'uniform', 'normal', 'lognormal', 'exponential']
+
+# Output pieces per streamGenerateContent reply
+STREAM_CHUNKS = 4
+
+# Ways a reply can be unusable even though the call succeeded
+MALFORMED_KINDS = ['prose', 'truncated', 'invalid_json', 'no_candidates']
+
+# Marks a request packing several prompts, one "[index] JSON string" per line
+BATCH_PROMPTS_HEADER = 'Prompts to analyze and rewrite, one per line:'
+BATCH_PROMPT_LINE = re.compile(r'^\[(\d+)\] (".*")$', re.MULTILINE)
+# Characters per output token, for applying maxOutputTokens
+CHARS_PER_TOKEN = 4
+
+
+class MockBehavior:
+    def __init__(self, latency: float = 0.0, latency_dist: str = 'fixed',
+                 latency_spread: float = 0.0, error_rate: float = 0.0,
+                 error_statuses: List[int] = (500, 503, 429),
+                 malformed_rate: float = 0.0, item_drop_rate: float = 0.0, seed: int = None):
+        """
+        latency: typical seconds per call (the median for lognormal, the
+            mean otherwise)
+        latency_spread: +/- range (uniform), standard deviation (normal) or
+            sigma of the underlying normal (lognormal)
+        error_rate / malformed_rate: fraction of calls answered with an
+            HTTP error from error_statuses / an unparseable reply
+        item_drop_rate: fraction of prompts left out of batched replies
+        """
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f'latency_dist must be one of {LATENCY_DISTRIBUTIONS}')
+        self.latency = latency
+        self.latency_dist = latency_dist
+        self.latency_spread = latency_spread
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.malformed_rate = malformed_rate
+        self.item_drop_rate = item_drop_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        if not self.latency:
+            return 0.0
+        with self._lock:
+            if self.latency_dist == 'uniform':
+                value = self._rng.uniform(self.latency - self.latency_spread, self.latency + self.latency_spread)
+            elif self.latency_dist == 'normal':
+                value = self._rng.gauss(self.latency, self.latency_spread)
+            elif self.latency_dist == 'lognormal':
+                value = self.latency * math.exp(self._rng.gauss(0, self.latency_spread))
+            elif self.latency_dist == 'exponential':
+                value = self._rng.expovariate(1 / self.latency)
+            else:
+                value = self.latency
+        return max(0.0, value)
+
+    def sample_outcome(self) -> Tuple[str, object]:
+        """
+        Returns ('ok', None), ('error', status) or ('malformed', kind)
+        """
+        with self._lock:
+            roll = self._rng.random()
+            if roll < self.error_rate:
+                return 'error', self._rng.choice(self.error_statuses)
+            if roll < self.error_rate + self.malformed_rate:
+                return 'malformed', self._rng.choice(MALFORMED_KINDS)
+        return 'ok', None
+
+    def drop_item(self) -> bool:
+        if not self.item_drop_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.item_drop_rate
+
+
+def batch_response(text: str, generation_config: Dict, behavior: MockBehavior) -> Tuple[Dict, int]:
+    """
+    Answer a batched request with {"results": [...]}, one entry per numbered
+    prompt except the dropped ones
+    Returns (reply, number of prompts in the request)
+    """
+    prompts = [json.loads(prompt) for _, prompt in
+               BATCH_PROMPT_LINE.findall(text.split(BATCH_PROMPTS_HEADER, 1)[1])]
+    results = [dict(CANNED_RESULT, index=index, original_prompt=prompt)
+               for index, prompt in enumerate(prompts) if not behavior.drop_item()]
+    reply = json.dumps({'results': results})
+
+    max_chars = generation_config.get('maxOutputTokens', 0) * CHARS_PER_TOKEN
+    if max_chars and len(reply) > max_chars:
+        payload = gemini_response(reply[:max_chars])
+        payload['candidates'][0]['finishReason'] = 'MAX_TOKENS'
+        return payload, len(prompts)
+    return gemini_response(reply), len(prompts)
+
+
+def malformed_response(kind: str, text: str) -> Dict:
+    """A 200 reply the client can't turn into an analysis"""
+    if kind == 'prose':
+        return gemini_response('I cannot analyze this prompt in JSON right now.')
+    if kind == 'truncated':
+        return gemini_response(text[:len(text) // 2])
+    if kind == 'invalid_json':
+        return gemini_response('```json\n{"rewritten_prompt": "unterminated, "bias_score": }\n```')
+    return {'candidates': [], 'promptFeedback': {'blockReason': 'OTHER'}}
+
+
+class MockGeminiHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this, Nagle's
+    # algorithm delays every response on a reused connection by ~40ms
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.stats['connections'] += 1
+
+    def do_GET(self):
+        if self.path == '/stats':
+            with self.server.stats_lock:
+                self._send(200, dict(self.server.stats))
+            return
+        self._send(404, {'error': {'code': 404, 'message': 'Not found'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+
+        streaming = ':streamGenerateContent' in self.path
+        if ':generateContent' not in self.path and not streaming:
+            self._send(404, {'error': {'code': 404, 'message': 'Not found'}})
+            return
+
+        try:
+            request_body = json.loads(body)
+            prompt = request_body['contents'][0]['parts'][0]['text']
+        except (ValueError, KeyError, IndexError):
+            self._send(400, {'error': {'code': 400, 'message': 'Invalid request'}})
+            return
+
+        behavior = self.server.behavior
+        outcome, detail = behavior.sample_outcome()
+
+        stats = self.server.stats
+        with self.server.stats_lock:
+            stats['requests'] += 1
+            stats[outcome] += 1
+            stats['in_flight'] += 1
+            stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+        try:
+            latency = behavior.sample_latency()
+            if outcome == 'error':
+                time.sleep(latency)
+                self._send(detail, {'error': {'code': detail, 'message': 'Injected failure'}})
+                return
+
+            if BATCH_PROMPTS_HEADER in prompt:
+                payload, items = batch_response(prompt, request_body.get('generationConfig', {}), behavior)
+                text = payload['candidates'][0]['content']['parts'][0]['text']
+                with self.server.stats_lock:
+                    stats['batch_requests'] += 1
+                    stats['batch_items'] += items
+            else:
+                result = dict(CANNED_RESULT, original_prompt=prompt.rsplit('\n', 1)[-1].strip('"'))
+                text = json.dumps(result)
+                payload = gemini_response(text)
+            if outcome == 'malformed':
+                payload = malformed_response(detail, text)
+            if streaming:
+                self._send_stream(payload, latency)
+            else:
+                time.sleep(latency)
+                self._send(200, payload)
+        finally:
+            with self.server.stats_lock:
+                stats['in_flight'] -= 1
+
+    def _send(self, status: int, payload: Dict):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, payload: Dict, latency: float):
+        """
+        Reply as streamGenerateContent?alt=sse does: the output text split
+        over several SSE events, with the latency spread between them
+        """
+        try:
+            text = payload['candidates'][0]['content']['parts'][0]['text']
+            size = max(1, -(-len(text) // STREAM_CHUNKS))
+            chunks = [gemini_response(text[i:i + size]) for i in range(0, len(text), size)]
+        except (KeyError, IndexError):
+            chunks = [payload]
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for chunk in chunks:
+            time.sleep(latency / len(chunks))
+            event = f'data: {json.dumps(chunk)}\r\n\r\n'.encode('utf-8')
+            self.wfile.write(f'{len(event):x}\r\n'.encode('ascii') + event + b'\r\n')
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+
+class MockGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Accept bursts of concurrent connections from the load tests
+    request_queue_size = 1024
+
+
+def start_server(host: str = '127.0.0.1', port: int = 0,
+                 certfile: str = None, keyfile: str = None,
+                 latency: float = 0.0, behavior: MockBehavior = None) -> Tuple[MockGeminiServer, str]:
+    """
+    Start the mock server on a background thread
+    latency: fixed seconds per call (shorthand when behavior is not given)
+    behavior: latency distribution and failure injection
+    Returns (server, base_url); pass base_url to GeminiClient
+    """
+    server = MockGeminiServer((host, port), MockGeminiHandler)
+    server.behavior = behavior or MockBehavior(latency=latency)
+    server.stats = {
+        'connections': 0, 'requests': 0, 'in_flight': 0, 'max_in_flight': 0,
+        'ok': 0, 'error': 0, 'malformed': 0, 'batch_requests': 0, 'batch_items': 0
+    }
+    server.stats_lock = threading.Lock()
+
+    scheme = 'http'
+    if certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = 'https'
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    address, bound_port = server.server_address[:2]
+    return server, f'{scheme}://{address}:{bound_port}/v1beta/models'
+
+
+def add_behavior_arguments(parser: argparse.ArgumentParser):
+    """Mock behaviour options, shared with the load-test harness"""
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='typical seconds per generateContent call (default: 0)')
+    parser.add_argument('--latency-dist', choices=LATENCY_DISTRIBUTIONS, default='fixed',
+                        help='latency distribution (default: fixed)')
+    parser.add_argument('--latency-spread', type=float, default=0.0,
+                        help='uniform range, normal std dev or lognormal sigma (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of calls answered with an HTTP error (default: 0)')
+    parser.add_argument('--error-statuses', type=int, nargs='+', default=[500, 503, 429],
+                        help='HTTP statuses used for injected errors (default: 500 503 429)')
+    parser.add_argument('--malformed-rate', type=float, default=0.0,
+                        help='fraction of calls answered with an unparseable reply (default: 0)')
+    parser.add_argument('--item-drop-rate', type=float, default=0.0,
+                        help='fraction of prompts left out of batched replies (default: 0)')
+    parser.add_argument('--seed', type=int, help='random seed for reproducible runs')
+
+
+def behavior_from_args(args) -> MockBehavior:
+    return MockBehavior(
+        latency=args.latency,
+        latency_dist=args.latency_dist,
+        latency_spread=args.latency_spread,
+        error_rate=args.error_rate,
+        error_statuses=args.error_statuses,
+        malformed_rate=args.malformed_rate,
+        item_drop_rate=args.item_drop_rate,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local mock of the Gemini generateContent API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--certfile', help='serve HTTPS with this certificate')
+    parser.add_argument('--keyfile', help='private key for --certfile')
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.host, args.port, args.certfile, args.keyfile,
+                                    behavior=behavior_from_args(args))
+    print(f'Mock Gemini listening at {base_url}', flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
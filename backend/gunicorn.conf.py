@@ -0,0 +1,45 @@
+"""
+Gunicorn Settings for Production Serving
+The app is preloaded in the master process (see wsgi.py) and worker
+processes are forked from it, sharing the loaded models copy-on-write
+
+Usage:
+    cd backend
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Rolling restart: `kill -HUP <master pid>` forks a fresh set of workers
+from the preloaded master and lets the old ones finish their requests
+(up to GUNICORN_GRACEFUL_TIMEOUT seconds). To deploy new code, start a new
+master with `kill -USR2 <master pid>`, then stop the old one with
+`kill -QUIT <old master pid>` once the new workers are serving.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.getenv('GUNICORN_WORKERS', '0')) or multiprocessing.cpu_count()
+# Threads per worker; AI-mode requests spend most of their time waiting on Gemini
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = 'gthread'
+
+preload_app = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle each worker after this many requests (0: never); the jitter keeps
+# workers from restarting all at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', str(max_requests // 10)))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def worker_exit(server, worker):
+    """Stop the worker's batch processes, if it started any"""
+    from api.app import batch_pool
+    batch_pool.shutdown(wait=False)
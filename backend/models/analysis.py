@@ -0,0 +1,393 @@
+"""
+NLP Analysis Pipeline
+Combines domain detection, bias detection and rule-based rewriting into the
+response payloads served by the API
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Tuple
+
+from models.bias_detector import BiasDetector
+from models.prompt_rewriter import PromptRewriter
+from utils.domain_detector import DomainDetector
+from utils.metrics import metrics
+from utils.result_cache import SizedLRUCache
+from utils.text_segmenter import segment_sentences
+
+BIAS_TYPES = [
+    'subjective_language', 'loaded_terms', 'absolutist_language',
+    'confirmation_bias', 'leading_questions', 'presumptive_language'
+]
+
+# Bump when analysis logic changes in a way the lexicon fingerprint can't
+# see (e.g. code paths or the hard-coded alternative suggestions)
+ANALYSIS_VERSION = 2
+
+
+class AnalysisTimeout(TimeoutError):
+    """A long-document analysis ran past its time limit"""
+
+
+def analysis_limits() -> Dict[str, any]:
+    """NLPAnalyzer long-document settings from the environment"""
+    time_limit = os.getenv('ANALYSIS_TIME_LIMIT', '10')
+    return {
+        'long_document_chars': int(os.getenv('LONG_DOCUMENT_CHARS', '5000')),
+        'max_sentence_chars': int(os.getenv('MAX_SENTENCE_CHARS', '1000')),
+        'time_limit': float(time_limit) if float(time_limit) > 0 else None
+    }
+
+
+def lexicon_fingerprint(*components) -> str:
+    """
+    Hash the public word lists and patterns of the given components
+    Any change to a lexicon yields a different fingerprint
+    """
+    lexicons = []
+    for component in components:
+        public = {
+            name: sorted(value) if isinstance(value, (set, frozenset)) else value
+            for name, value in sorted(vars(component).items())
+            if not name.startswith('_')
+        }
+        lexicons.append([type(component).__name__, public])
+
+    payload = json.dumps([ANALYSIS_VERSION, lexicons], sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class NLPAnalyzer:
+    def __init__(self, bias_detector: BiasDetector = None,
+                 prompt_rewriter: PromptRewriter = None,
+                 domain_detector: DomainDetector = None,
+                 cache: SizedLRUCache = None,
+                 long_document_chars: int = 5000,
+                 max_sentence_chars: int = 1000,
+                 time_limit: float = None):
+        """
+        cache: memoizes full analyze() payloads, keyed on the prompt and
+        the lexicon fingerprint
+        long_document_chars: longer prompts are analyzed sentence by
+        sentence, at most max_sentence_chars at a time, so the pattern
+        matching cost grows linearly with the length of the prompt
+        time_limit: seconds a long-document analysis may take before
+        AnalysisTimeout is raised (None: no limit)
+        """
+        self.bias_detector = bias_detector or BiasDetector()
+        self.prompt_rewriter = prompt_rewriter or PromptRewriter()
+        self.domain_detector = domain_detector or DomainDetector()
+        self.cache = cache
+        self.long_document_chars = long_document_chars
+        self.max_sentence_chars = max_sentence_chars
+        self.time_limit = time_limit
+        self.refresh_fingerprint()
+
+    def refresh_fingerprint(self) -> str:
+        """Recompute the lexicon fingerprint after changing a word list"""
+        self.fingerprint = lexicon_fingerprint(
+            self.bias_detector, self.prompt_rewriter, self.domain_detector
+        )
+        return self.fingerprint
+
+    def with_components(self, bias_detector: BiasDetector, prompt_rewriter: PromptRewriter,
+                        domain_detector: DomainDetector) -> 'NLPAnalyzer':
+        """
+        A copy of this analyzer using other components (e.g. built from a
+        new lexicon); it shares the cache, whose keys include the fingerprint
+        """
+        return NLPAnalyzer(
+            bias_detector, prompt_rewriter, domain_detector,
+            cache=self.cache,
+            long_document_chars=self.long_document_chars,
+            max_sentence_chars=self.max_sentence_chars,
+            time_limit=self.time_limit
+        )
+
+    def detect(self, prompt: str) -> Dict[str, any]:
+        """
+        Detect biases without rewriting
+        Returns the /api/detect response payload
+        """
+        if len(prompt) > self.long_document_chars:
+            biases = self._detect_segmented(prompt, self._deadline())[0]
+        else:
+            biases = self.bias_detector.detect_biases(prompt)
+        bias_score = self.bias_detector.get_bias_score(biases)
+
+        return {
+            'prompt': prompt,
+            'bias_score': bias_score,
+            'biases_detected': biases
+        }
+
+    def analyze(self, prompt: str, domain_result: Dict = None) -> Dict[str, any]:
+        """
+        Run the full rule-based analysis of a prompt
+        Returns the NLP-mode /api/analyze response payload; without a
+        precomputed domain_result it is served from the cache when possible
+        """
+        if self.cache is None or domain_result is not None:
+            return self._analyze(prompt, domain_result)
+
+        key = (self.fingerprint, prompt)
+        response = self.cache.get(key)
+        if response is None:
+            response = self._analyze(prompt)
+            self.cache.set(key, response)
+        return response
+
+    def analyze_progressively(self, prompt: str) -> Iterator[Tuple[str, Dict]]:
+        """
+        Yields ('domain', detect_domain result) and then ('nlp', analyze()
+        response), so the domain can be shown before the bias analysis is
+        done; shares analyze()'s cache
+        """
+        key = (self.fingerprint, prompt)
+        response = self.cache.get(key) if self.cache is not None else None
+        if response is not None:
+            yield 'domain', domain_result_of(response)
+            yield 'nlp', response
+            return
+
+        with metrics.stage('domain_detection'):
+            domain_result = self.domain_detector.detect_domain(prompt)
+        yield 'domain', domain_result
+
+        response = self._analyze(prompt, domain_result)
+        if self.cache is not None:
+            self.cache.set(key, response)
+        yield 'nlp', response
+
+    def _analyze(self, prompt: str, domain_result: Dict = None) -> Dict[str, any]:
+        if domain_result is None:
+            with metrics.stage('domain_detection'):
+                domain_result = self.domain_detector.detect_domain(prompt)
+        domain = domain_result['domain']
+
+        if len(prompt) > self.long_document_chars:
+            biases, bias_score, rewrite_result = self._analyze_segmented(prompt)
+        else:
+            # Detect biases
+            with metrics.stage('bias_detection'):
+                biases = self.bias_detector.detect_biases(prompt)
+                bias_score = self.bias_detector.get_bias_score(biases)
+
+            # Rewrite prompt
+            with metrics.stage('rewrite'):
+                rewrite_result = self.prompt_rewriter.rewrite_prompt(prompt, biases)
+
+        # Get domain-specific alternatives
+        with metrics.stage('alternatives'):
+            alternatives = self.prompt_rewriter.suggest_alternatives(prompt, domain)
+
+        return {
+            'original_prompt': prompt,
+            'rewritten_prompt': rewrite_result['rewritten'],
+            'bias_score': bias_score,
+            'biases_detected': biases,
+            'changes_made': rewrite_result['changes'],
+            'alternative_suggestions': alternatives,
+            'domain': domain,
+            'domain_confidence': domain_result['confidence'],
+            'domain_scores': domain_result['scores'],
+            'mode': 'nlp'
+        }
+
+
+    def _deadline(self):
+        return time.monotonic() + self.time_limit if self.time_limit is not None else None
+
+    def _detect_segmented(self, prompt: str, deadline) -> Tuple[Dict, List]:
+        """
+        Detect biases one sentence at a time, with positions relative to
+        the whole prompt
+        Returns (biases, [(sentence start, sentence biases), ...])
+        """
+        biases = {kind: [] for kind in BIAS_TYPES}
+        sentences = []
+        for start, end in segment_sentences(prompt, self.max_sentence_chars):
+            if deadline is not None and time.monotonic() > deadline:
+                raise AnalysisTimeout(f'Analysis exceeded {self.time_limit}s time limit')
+            sentence_biases = self.bias_detector.detect_biases(prompt[start:end])
+            for kind, spans in sentence_biases.items():
+                biases[kind].extend(dict(span, position=span['position'] + start) for span in spans)
+            sentences.append((start, end, sentence_biases))
+        return biases, sentences
+
+    def _analyze_segmented(self, prompt: str) -> Tuple[Dict, float, Dict]:
+        """
+        Long-document analysis: detection and rewriting run per sentence
+        Returns (biases, bias score, rewrite result)
+        """
+        deadline = self._deadline()
+        with metrics.stage('bias_detection'):
+            biases, sentences = self._detect_segmented(prompt, deadline)
+            bias_score = self.bias_detector.get_bias_score(biases)
+
+        with metrics.stage('rewrite'):
+            rewritten = []
+            changes = {}
+            for start, end, sentence_biases in sentences:
+                if deadline is not None and time.monotonic() > deadline:
+                    raise AnalysisTimeout(f'Analysis exceeded {self.time_limit}s time limit')
+                result = self.prompt_rewriter.rewrite_prompt(prompt[start:end], sentence_biases)
+                if result['rewritten']:
+                    rewritten.append(result['rewritten'])
+                # Each kind of change is listed once, in first-seen order
+                changes.update(dict.fromkeys(result['changes']))
+
+        rewrite_result = {
+            'original': prompt,
+            'rewritten': ' '.join(rewritten),
+            'changes': list(changes)
+        }
+        return biases, bias_score, rewrite_result
+
+
+def ai_analysis_response(prompt: str, domain_result: Dict, gemini_result: Dict) -> Dict[str, any]:
+    """
+    Convert a successful GeminiClient result into the AI-mode /api/analyze
+    response payload, using the same bias format as NLP mode
+    """
+    gemini_data = gemini_result['data']
+
+    biases_detected = {
+        'subjective_language': [],
+        'loaded_terms': [],
+        'absolutist_language': [],
+        'confirmation_bias': [],
+        'leading_questions': [],
+        'presumptive_language': []
+    }
+
+    for bias in gemini_data.get('biases_found', []):
+        bias_type = bias.get('type', 'subjective_language')
+        if bias_type in biases_detected:
+            biases_detected[bias_type].append({
+                'term': bias.get('example', ''),
+                'position': 0,
+                'length': len(bias.get('example', ''))
+            })
+
+    return {
+        'original_prompt': prompt,
+        'rewritten_prompt': gemini_data.get('rewritten_prompt', prompt),
+        'bias_score': gemini_data.get('bias_score', 0),
+        'biases_detected': biases_detected,
+        'changes_made': gemini_data.get('changes_made', []),
+        'alternative_suggestions': [],
+        'domain': domain_result['domain'],
+        'domain_confidence': domain_result['confidence'],
+        'domain_scores': domain_result['scores'],
+        'mode': 'ai',
+        'ai_explanation': gemini_data.get('explanation', ''),
+        'cached': gemini_result.get('cached', False),
+        'coalesced': gemini_result.get('coalesced', False),
+        'fallback': False
+    }
+
+
+def ai_failure_response(gemini_result: Dict, domain: str) -> Tuple[Dict, int]:
+    """
+    The error payload and status for a failed GeminiClient result: 502 when
+    Gemini answered with something unusable, 500 for other failures
+    """
+    status = 502 if gemini_result.get('error_type') == 'parse' else 500
+    return {'error': gemini_result.get('error', 'AI analysis failed'), 'domain': domain}, status
+
+
+def ai_fallback_response(nlp_response: Dict, gemini_result: Dict) -> Dict[str, any]:
+    """
+    The AI-mode response for a failed GeminiClient result when falling
+    back is allowed: the NLP analysis, flagged with why Gemini's is missing
+    ('deadline' when the latency budget ran out)
+    """
+    return dict(nlp_response, mode='ai', answered_by='nlp', fallback=True,
+                fallback_reason=gemini_result.get('error_type', 'error'),
+                ai_error=gemini_result.get('error', 'AI analysis failed'))
+
+
+def ml_analysis_response(nlp_response: Dict, prediction: Dict, model_version: str) -> Dict[str, any]:
+    """
+    The ML-mode /api/analyze response: the NLP analysis (spans, rule-based
+    rewrite, alternatives) with a BiasClassifier prediction, whose score
+    replaces the rule-based one
+    """
+    return dict(nlp_response, mode='ml', nlp_bias_score=nlp_response['bias_score'],
+                model_version=model_version, **prediction)
+
+
+def domain_result_of(response: Dict) -> Dict:
+    """The detect_domain() result embedded in an analyze response"""
+    return {
+        'domain': response['domain'],
+        'confidence': response['domain_confidence'],
+        'scores': response['domain_scores']
+    }
+
+
+class HybridRouter:
+    def __init__(self, nlp_analyzer: NLPAnalyzer, threshold: float = 10):
+        """
+        Pre-screens prompts with the rule-based analysis; only prompts
+        scoring at least threshold are escalated to Gemini
+        """
+        self.nlp_analyzer = nlp_analyzer
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'escalated': 0,
+            'escalation_failures': 0
+        }
+        # NLP bias score -> prompts screened, to pick a threshold from
+        self._scores = Counter()
+
+    def screen(self, prompt: str) -> Tuple[Dict, bool]:
+        """
+        Run the (memoized) NLP analysis
+        Returns (NLP response, whether to escalate to Gemini)
+        """
+        nlp_response = self.nlp_analyzer.analyze(prompt)
+        return nlp_response, self.decide(nlp_response)
+
+    def decide(self, nlp_response: Dict) -> bool:
+        """Whether an NLP response should be escalated; counted in the stats"""
+        escalate = nlp_response['bias_score'] >= self.threshold
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['escalated'] += escalate
+            self._scores[nlp_response['bias_score']] += 1
+        return escalate
+
+    def respond(self, prompt: str, nlp_response: Dict, gemini_result: Dict = None) -> Dict:
+        """
+        Build the hybrid-mode response, answered by Gemini when a result
+        is given; a failed escalation falls back to the NLP answer
+        """
+        if gemini_result is None:
+            return dict(nlp_response, mode='hybrid', answered_by='nlp', escalated=False)
+
+        if not gemini_result['success']:
+            with self._lock:
+                self._stats['escalation_failures'] += 1
+            return dict(nlp_response, mode='hybrid', answered_by='nlp', escalated=True,
+                        escalation_error=gemini_result.get('error', 'AI analysis failed'))
+
+        response = ai_analysis_response(prompt, domain_result_of(nlp_response), gemini_result)
+        return dict(response, mode='hybrid', answered_by='ai', escalated=True,
+                    nlp_bias_score=nlp_response['bias_score'])
+
+    def get_stats(self) -> Dict[str, any]:
+        with self._lock:
+            stats = dict(self._stats)
+            scores = dict(self._scores)
+        stats['threshold'] = self.threshold
+        stats['escalation_rate'] = round(stats['escalated'] / stats['requests'], 4) if stats['requests'] else 0.0
+        stats['score_distribution'] = {str(score): scores[score] for score in sorted(scores)}
+        return stats
@@ -0,0 +1,276 @@
+"""
+Bias Classifier
+A linear model per bias category over hashed word n-grams, trained offline
+on prompts labelled by BiasDetector and by cached Gemini analyses, and
+served locally without a network call
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from typing import Dict, Iterable, List, Sequence
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from models.analysis import BIAS_TYPES
+from models.bias_detector import BiasDetector
+from utils.result_cache import ResultCache, normalize_prompt
+
+ARTIFACT_FORMAT = 1
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artifacts', 'bias_classifier.joblib')
+
+# Word unigrams and bigrams, keeping '?' and '!' as tokens since leading
+# questions and loaded statements often hinge on them. Hashing needs no
+# vocabulary, so the artifact is just the weight matrix.
+DEFAULT_FEATURES = {
+    'n_features': 2 ** 18,
+    'ngram_range': (1, 2),
+    'token_pattern': r"(?u)\b\w+\b|[?!]"
+}
+
+# Decision thresholds tried when tuning each category on held-out prompts
+THRESHOLD_GRID = np.round(np.arange(0.05, 0.96, 0.05), 2)
+
+
+class ModelNotAvailable(FileNotFoundError):
+    """No trained classifier at the configured path"""
+
+
+def make_vectorizer(features: Dict) -> HashingVectorizer:
+    return HashingVectorizer(
+        n_features=features['n_features'],
+        ngram_range=tuple(features['ngram_range']),
+        token_pattern=features['token_pattern'],
+        alternate_sign=False,
+        dtype=np.float32
+    )
+
+
+class BiasClassifier:
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray, thresholds: np.ndarray = None,
+                 features: Dict = None, categories: Sequence[str] = BIAS_TYPES, info: Dict = None):
+        """
+        coef: (n_features, categories) weights; may be a read-only memory map
+        intercept / thresholds: one per category (thresholds default to 0.5)
+        features: HashingVectorizer settings the weights were trained with
+        info: training details kept in the artifact (sizes, scores, time)
+        """
+        self.features = dict(DEFAULT_FEATURES, **(features or {}))
+        self.vectorizer = make_vectorizer(self.features)
+        self.categories = list(categories)
+        self.coef = coef
+        self.intercept = np.asarray(intercept, dtype=np.float32)
+        self.thresholds = np.full(len(self.categories), 0.5, dtype=np.float32) if thresholds is None \
+            else np.asarray(thresholds, dtype=np.float32)
+        self.info = info or {}
+        self.version = self.info.get('version') or _weights_version(coef, self.intercept, self.thresholds)
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: np.ndarray, features: Dict = None,
+              regularization: float = 4.0) -> 'BiasClassifier':
+        """
+        Fit one logistic regression per category
+        labels: (prompts, categories) booleans. Classes are weighted so the
+        rarer one counts as much as the other, which favours recall.
+        """
+        features = dict(DEFAULT_FEATURES, **(features or {}))
+        X = make_vectorizer(features).transform(texts)
+        labels = np.asarray(labels, dtype=bool)
+        coef = np.zeros((features['n_features'], labels.shape[1]), dtype=np.float32)
+        intercept = np.zeros(labels.shape[1], dtype=np.float32)
+        for k in range(labels.shape[1]):
+            column = labels[:, k]
+            if column.all() or not column.any():
+                # One class only: a constant prediction of it
+                intercept[k] = 8.0 if column.any() else -8.0
+                continue
+            model = LogisticRegression(C=regularization, solver='liblinear', class_weight='balanced')
+            model.fit(X, column)
+            coef[:, k] = model.coef_[0]
+            intercept[k] = model.intercept_[0]
+        return cls(coef, intercept, features=features, info={'samples': len(texts)})
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'BiasClassifier':
+        """
+        Load a saved classifier; with mmap the weights are memory-mapped, so
+        processes serving the same file share one copy in the page cache
+        """
+        if not os.path.exists(path):
+            raise ModelNotAvailable(f'No bias classifier at {path}; train one with train_classifier.py')
+        artifact = joblib.load(path, mmap_mode='r' if mmap else None)
+        if artifact.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported bias classifier format: {artifact.get('format')}")
+        return cls(artifact['coef'], artifact['intercept'], artifact['thresholds'],
+                   features=artifact['features'], categories=artifact['categories'], info=artifact['info'])
+
+    def save(self, path: str):
+        """
+        Write the classifier to path, replacing it atomically; a process
+        that has the old file mapped keeps reading the old weights
+        """
+        artifact = {
+            'format': ARTIFACT_FORMAT,
+            'categories': self.categories,
+            'features': self.features,
+            'coef': np.ascontiguousarray(self.coef, dtype=np.float32),
+            'intercept': self.intercept,
+            'thresholds': self.thresholds,
+            'info': dict(self.info, version=self.version)
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.bias-classifier-', suffix='.tmp')
+        os.close(fd)
+        try:
+            # Uncompressed, so the arrays can be memory-mapped on load
+            joblib.dump(artifact, temp_path)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """(prompts, categories) probabilities, for the whole batch at once"""
+        X = self.vectorizer.transform(texts)
+        scores = np.asarray(X @ self.coef) + self.intercept
+        return 1 / (1 + np.exp(-scores))
+
+    def predict(self, texts: Sequence[str]) -> np.ndarray:
+        return self.predict_proba(texts) >= self.thresholds
+
+    def tune_thresholds(self, texts: Sequence[str], labels: np.ndarray):
+        """Pick each category's threshold for the best F1 on held-out prompts"""
+        probabilities = self.predict_proba(texts)
+        labels = np.asarray(labels, dtype=bool)
+        for k in range(len(self.categories)):
+            if not labels[:, k].any():
+                continue
+            scores = [_f1(probabilities[:, k] >= threshold, labels[:, k]) for threshold in THRESHOLD_GRID]
+            self.thresholds[k] = THRESHOLD_GRID[int(np.argmax(scores))]
+        self.version = _weights_version(self.coef, self.intercept, self.thresholds)
+
+    def analyze(self, texts: Sequence[str]) -> List[Dict[str, any]]:
+        """Per-prompt probabilities, predicted categories and overall score"""
+        probabilities = self.predict_proba(texts)
+        results = []
+        for row in probabilities:
+            predicted = row >= self.thresholds
+            results.append({
+                'bias_probabilities': {
+                    category: round(float(p), 4) for category, p in zip(self.categories, row)
+                },
+                'biases_predicted': [category for category, hit in zip(self.categories, predicted) if hit],
+                # Chance that at least one kind of bias is present
+                'bias_score': round(100 * (1 - float(np.prod(1 - row))))
+            })
+        return results
+
+
+def _weights_version(coef: np.ndarray, *vectors: np.ndarray) -> str:
+    digest = hashlib.sha256(np.ascontiguousarray(coef).tobytes())
+    for vector in vectors:
+        digest.update(np.asarray(vector, dtype=np.float32).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _f1(predicted: np.ndarray, actual: np.ndarray) -> float:
+    true_positives = np.sum(predicted & actual)
+    if not true_positives:
+        return 0.0
+    return 2 * true_positives / (np.sum(predicted) + np.sum(actual))
+
+
+def evaluate(predicted: np.ndarray, labels: np.ndarray, categories: Sequence[str] = BIAS_TYPES) -> Dict:
+    """Precision, recall and F1 per category, and recall over all categories"""
+    predicted = np.asarray(predicted, dtype=bool)
+    labels = np.asarray(labels, dtype=bool)
+    report = {}
+    for k, category in enumerate(categories):
+        hits = int(np.sum(predicted[:, k] & labels[:, k]))
+        report[category] = {
+            'support': int(np.sum(labels[:, k])),
+            'precision': round(hits / max(1, int(np.sum(predicted[:, k]))), 4),
+            'recall': round(hits / max(1, int(np.sum(labels[:, k]))), 4),
+            'f1': round(float(_f1(predicted[:, k], labels[:, k])), 4)
+        }
+    report['overall_recall'] = round(int(np.sum(predicted & labels)) / max(1, int(np.sum(labels))), 4)
+    return report
+
+
+def detector_labels(texts: Iterable[str], detector: BiasDetector = None) -> np.ndarray:
+    """(prompts, categories) booleans: whether BiasDetector finds each kind"""
+    detector = detector or BiasDetector()
+    rows = []
+    for text in texts:
+        biases = detector.detect_biases(text)
+        rows.append([bool(biases.get(category)) for category in BIAS_TYPES])
+    return np.array(rows, dtype=bool).reshape(-1, len(BIAS_TYPES))
+
+
+def gemini_labels(cache: ResultCache) -> Dict[str, List[str]]:
+    """
+    Bias categories Gemini found, by normalized prompt, from the successful
+    analyses in a result cache
+    """
+    labels = {}
+    for result in cache.values():
+        data = result.get('data') if isinstance(result, dict) and result.get('success') else None
+        prompt = data.get('original_prompt') if isinstance(data, dict) else None
+        if not isinstance(prompt, str) or not prompt:
+            continue
+        labels[normalize_prompt(prompt)] = sorted({
+            bias['type'] for bias in data.get('biases_found', [])
+            if isinstance(bias, dict) and bias.get('type') in BIAS_TYPES
+        })
+    return labels
+
+
+def label_prompts(texts: Sequence[str], gemini: Dict[str, List[str]] = None,
+                  detector: BiasDetector = None) -> np.ndarray:
+    """
+    Training labels: a category is present if BiasDetector finds it or
+    Gemini's cached analysis of the prompt lists it
+    """
+    labels = detector_labels(texts, detector)
+    for i, text in enumerate(texts):
+        for category in (gemini or {}).get(normalize_prompt(text), ()):
+            labels[i, BIAS_TYPES.index(category)] = True
+    return labels
+
+
+def train_classifier(texts: Sequence[str], gemini: Dict[str, List[str]] = None,
+                     test_fraction: float = 0.2, seed: int = 1234, features: Dict = None,
+                     regularization: float = 4.0, detector: BiasDetector = None) -> BiasClassifier:
+    """
+    Label, split, train and tune a classifier; prompts that only appear
+    in the Gemini labels are trained on too. The held-out scores are kept
+    in info['evaluation'].
+    """
+    texts = list(dict.fromkeys(texts))
+    seen = {normalize_prompt(text) for text in texts}
+    texts += [prompt for prompt in (gemini or {}) if prompt not in seen]
+    labels = label_prompts(texts, gemini, detector)
+
+    order = np.random.default_rng(seed).permutation(len(texts))
+    held_out = int(len(texts) * test_fraction)
+    test, train = order[:held_out], order[held_out:]
+
+    started = time.perf_counter()
+    classifier = BiasClassifier.train([texts[i] for i in train], labels[train], features, regularization)
+    if held_out:
+        test_texts = [texts[i] for i in test]
+        classifier.tune_thresholds(test_texts, labels[test])
+        classifier.info['evaluation'] = evaluate(classifier.predict(test_texts), labels[test])
+    classifier.info.update(
+        samples=len(train), held_out=held_out, gemini_labelled=len(gemini or {}),
+        trained_at=time.time(), training_seconds=round(time.perf_counter() - started, 3)
+    )
+    return classifier
@@ -4,32 +4,48 @@ Uses NLP techniques to identify subjective language and biases in prompts
 """
 
 import re
-from typing import List, Dict, Tuple
-import nltk
-import ssl
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.tag import pos_tag
+from typing import List, Dict
+
+from utils.lexicon_store import apply_lexicon
+from utils.pattern_matcher import PatternMatcher, is_word_boundary, is_word_char, literal_prefix
+from utils.spans import Span
+
+
+def _is_token_boundary(text: str, start: int, end: int, length: int) -> bool:
+    """
+    Whether text[start:end] would come out of NLTK's word tokenizer as a
+    whole token: hyphenated words and mid-word periods stay joined
+    """
+    if start > 0:
+        before = text[start - 1]
+        if is_word_char(before) or before == '-':
+            return False
+    if end < length:
+        after = text[end]
+        if is_word_char(after) or after == '-':
+            return False
+        if after == '.' and end + 1 < length and is_word_char(text[end + 1]):
+            return False
+    return True
+
+
+def _anchored_matches(regex, text: str, starts: List[int]):
+    """
+    Same matches as regex.finditer(text), trying the regex only at the
+    given candidate start positions
+    """
+    last_end = 0
+    for start in starts:
+        if start < last_end:
+            continue
+        match = regex.match(text, start)
+        if match:
+            last_end = match.end()
+            yield match
 
-class BiasDetector:
-    def __init__(self):
-        # Fix SSL certificate issue for NLTK downloads
-        try:
-            _create_unverified_https_context = ssl._create_unverified_context
-        except AttributeError:
-            pass
-        else:
-            ssl._create_default_https_context = _create_unverified_https_context
-
-        # Download required NLTK data
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        try:
-            nltk.data.find('taggers/averaged_perceptron_tagger')
-        except LookupError:
-            nltk.download('averaged_perceptron_tagger')
 
+class BiasDetector:
+    def __init__(self, lexicon: Dict = None):
         # Subjective language indicators
         self.subjective_words = {
             'obviously', 'clearly', 'everyone knows', 'it is obvious',
@@ -69,11 +85,74 @@ class BiasDetector:
             r'show (.+?) is real'
         ]
 
+        # Phrases that, together with a question mark, mark a leading question
+        self.leading_question_cues = [
+            'why is', 'why are', "isn't it", "aren't they", "don't you think"
+        ]
+
+        # Lexicon fields loaded from a published lexicon file replace the defaults
+        if lexicon:
+            apply_lexicon(self, lexicon)
+
+        self._compile_matcher()
+
+    def _compile_matcher(self):
+        """
+        Compile every lexicon into one PatternMatcher plus a dispatch table
+        mapping each literal term to the bias checks it takes part in
+        """
+        self._term_handlers = {}
+
+        def register(term, kind, index=None):
+            self._term_handlers.setdefault(term, []).append((kind, index))
+
+        for word in self.subjective_words:
+            register(word, 'subjective_language')
+        for term in self.loaded_terms:
+            register(term, 'loaded_terms')
+        for phrase in self.confirmation_phrases:
+            register(phrase, 'confirmation_bias')
+        for cue in self.leading_question_cues:
+            register(cue, 'leading_questions')
+
+        # Absolutist patterns of the form \bword\b are matched as literals
+        # with a word-boundary check; anything else keeps its own regex
+        self._absolutist_regexes = []
+        for pattern in self.absolutist_patterns:
+            literal = re.fullmatch(r'\\b(\w(?:[\w ]*\w)?)\\b', pattern)
+            if literal:
+                register(literal.group(1), 'absolutist_language')
+            else:
+                self._absolutist_regexes.append(re.compile(pattern))
+
+        # Presumption regexes only run where their literal prefix occurs
+        self._presumption_regexes = []
+        self._unanchored_presumptions = []
+        for index, pattern in enumerate(self.presumption_patterns):
+            self._presumption_regexes.append(re.compile(pattern))
+            prefix = literal_prefix(pattern)
+            if prefix:
+                register(prefix, 'presumptive_language', index)
+            else:
+                self._unanchored_presumptions.append(index)
+
+        self._matcher = PatternMatcher(self._term_handlers)
+
     def detect_biases(self, text: str) -> Dict[str, List[Dict]]:
         """
         Analyze text for various types of biases
         Returns dict with bias types and their locations
         """
+        return {
+            kind: [span.as_dict() for span in spans]
+            for kind, spans in self.detect_spans(text).items()
+        }
+
+    def detect_spans(self, text: str) -> Dict[str, List[Span]]:
+        """
+        Same detection as detect_biases, with each location as a Span
+        object instead of a dict
+        """
         biases = {
             'subjective_language': [],
             'loaded_terms': [],
@@ -84,65 +163,51 @@ class BiasDetector:
         }
 
         text_lower = text.lower()
-
-        # Detect subjective language
-        for word in self.subjective_words:
-            if word in text_lower:
-                start = text_lower.find(word)
-                biases['subjective_language'].append({
-                    'term': word,
-                    'position': start,
-                    'length': len(word)
-                })
-
-        # Detect loaded terms
-        tokens = word_tokenize(text_lower)
-        for token in tokens:
-            if token in self.loaded_terms:
-                start = text_lower.find(token)
-                biases['loaded_terms'].append({
-                    'term': token,
-                    'position': start,
-                    'length': len(token)
-                })
-
-        # Detect absolutist language
-        for pattern in self.absolutist_patterns:
-            matches = re.finditer(pattern, text_lower)
-            for match in matches:
-                biases['absolutist_language'].append({
-                    'term': match.group(),
-                    'position': match.start(),
-                    'length': len(match.group())
-                })
-
-        # Detect confirmation bias phrases
-        for phrase in self.confirmation_phrases:
-            if phrase in text_lower:
-                start = text_lower.find(phrase)
-                biases['confirmation_bias'].append({
-                    'term': phrase,
-                    'position': start,
-                    'length': len(phrase)
-                })
+        text_length = len(text_lower)
+        presumption_starts = [[] for _ in self.presumption_patterns]
+        leading_cue_found = False
+
+        # Single pass over the text: every occurrence of every literal term
+        for start, term in self._matcher.finditer(text_lower):
+            end = start + len(term)
+            for kind, index in self._term_handlers[term]:
+                if kind == 'absolutist_language':
+                    if not is_word_boundary(text_lower, start, end):
+                        continue
+                elif kind == 'loaded_terms':
+                    if not _is_token_boundary(text_lower, start, end, text_length):
+                        continue
+                elif kind == 'leading_questions':
+                    leading_cue_found = True
+                    continue
+                elif kind == 'presumptive_language':
+                    presumption_starts[index].append(start)
+                    continue
+
+                biases[kind].append(Span(term, start, len(term)))
+
+        for regex in self._absolutist_regexes:
+            for match in regex.finditer(text_lower):
+                biases['absolutist_language'].append(Span(match.group(), match.start(), len(match.group())))
+        if self._absolutist_regexes:
+            biases['absolutist_language'].sort(key=lambda span: span.position)
 
         # Detect leading questions
-        if '?' in text and any(q in text_lower for q in ['why is', 'why are', "isn't it", "aren't they", "don't you think"]):
-            biases['leading_questions'].append({
-                'term': 'Leading question detected',
-                'position': 0,
-                'length': len(text)
-            })
+        if leading_cue_found and '?' in text:
+            biases['leading_questions'].append(Span('Leading question detected', 0, len(text)))
 
         # Detect presumptive language (assumes unproven facts)
-        for pattern in self.presumption_patterns:
-            matches = re.finditer(pattern, text_lower)
+        for index in self._unanchored_presumptions:
+            presumption_starts[index] = None
+        for index, regex in enumerate(self._presumption_regexes):
+            starts = presumption_starts[index]
+            if starts is None:
+                matches = regex.finditer(text_lower)
+            else:
+                matches = _anchored_matches(regex, text_lower, starts)
             for match in matches:
-                biases['presumptive_language'].append({
-                    'term': match.group(),
-                    'position': match.start(),
-                    'length': len(match.group())
-                })
+                biases['presumptive_language'].append(Span(match.group(), match.start(), len(match.group())))
+        biases['presumptive_language'].sort(key=lambda span: span.position)
 
         return biases
 
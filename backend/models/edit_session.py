@@ -0,0 +1,511 @@
+"""
+Incremental Analysis Sessions
+Keeps the sentence-by-sentence analysis of a prompt that is being edited,
+so each edit only re-runs bias detection and rewriting on the sentences
+it touched; the spans of the other sentences are shifted, not recomputed
+"""
+
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models.analysis import BIAS_TYPES
+from models.bias_detector import BiasDetector
+from models.prompt_rewriter import PromptRewriter
+from utils.text_segmenter import segment_range
+
+
+class VersionConflict(Exception):
+    """An edit was made against an older version of the session text"""
+
+
+class _Sentence:
+    __slots__ = ('start', 'end', 'continued', 'text', 'biases', 'rewritten', 'changes')
+
+    def __init__(self, start: int, end: int, continued: bool, text: str):
+        self.start = start
+        self.end = end
+        self.continued = continued
+        self.text = text
+        # Analysis results, with positions relative to the sentence
+        self.biases = None
+        self.rewritten = None
+        self.changes = None
+
+
+class EditSession:
+    def __init__(self, text: str, bias_detector: BiasDetector, prompt_rewriter: PromptRewriter,
+                 max_sentence_chars: int = 1000):
+        self.bias_detector = bias_detector
+        self.prompt_rewriter = prompt_rewriter
+        self.max_sentence_chars = max_sentence_chars
+        self.text = text
+        self.version = 0
+        # Version of the last full copy an EditSessionStore wrote to its file
+        self.saved_version = 0
+        self.lock = threading.Lock()
+        self.last_used = time.time()
+
+        self._bias_counts = Counter()
+        self._change_counts = Counter()
+        self.sentences = []
+        self.sentences = self._analyze_range(0, len(text), {})
+
+    @classmethod
+    def from_state(cls, state: Dict, bias_detector: BiasDetector, prompt_rewriter: PromptRewriter,
+                   max_sentence_chars: int = 1000) -> 'EditSession':
+        """Rebuild a session saved with to_state, without analyzing it again"""
+        session = cls('', bias_detector, prompt_rewriter, max_sentence_chars)
+        session.text = state['text']
+        session.version = session.saved_version = state['version']
+        for start, end, continued, biases, rewritten, changes in state['sentences']:
+            sentence = _Sentence(start, end, continued, session.text[start:end])
+            sentence.biases = biases
+            sentence.rewritten = rewritten
+            sentence.changes = changes
+            session._count(sentence, 1)
+            session.sentences.append(sentence)
+        return session
+
+    def to_state(self) -> Dict[str, any]:
+        """The text and per-sentence analysis, as JSON-serializable data"""
+        return {
+            'text': self.text,
+            'version': self.version,
+            'sentences': [
+                [sentence.start, sentence.end, sentence.continued,
+                 sentence.biases, sentence.rewritten, sentence.changes]
+                for sentence in self.sentences
+            ]
+        }
+
+    def apply(self, start: int, end: int, replacement: str, base_version: int = None) -> Dict[str, any]:
+        """
+        Replace text[start:end] with replacement and re-analyze only the
+        affected sentences
+        Returns the replaced character range, with the bias spans and
+        rewrites of the sentences now in it
+        """
+        if base_version is not None and base_version != self.version:
+            raise VersionConflict(f'Session is at version {self.version}, not {base_version}')
+        if not (isinstance(start, int) and isinstance(end, int) and 0 <= start <= end <= len(self.text)):
+            raise ValueError(f'Edit range must satisfy 0 <= start <= end <= {len(self.text)}')
+        if not isinstance(replacement, str):
+            raise ValueError('Edit text must be a string')
+
+        first, last = self._affected(start, end)
+        region_start = self.sentences[first].start if first > 0 else 0
+        region_end = self.sentences[last].end if last < len(self.sentences) else len(self.text)
+        delta = len(replacement) - (end - start)
+
+        # Old results, reusable for sentences the edit left as they were
+        previous = {}
+        for sentence in self.sentences[first:last + 1]:
+            previous.setdefault(sentence.text, sentence)
+            self._count(sentence, -1)
+
+        self.text = self.text[:start] + replacement + self.text[end:]
+        analyzed = self._analyze_range(region_start, region_end + delta, previous)
+
+        for sentence in self.sentences[last + 1:]:
+            sentence.start += delta
+            sentence.end += delta
+        self.sentences[first:last + 1] = analyzed
+        self.version += 1
+
+        return {
+            'version': self.version,
+            'replaced': {'start': region_start, 'old_end': region_end, 'end': region_end + delta},
+            'delta': delta,
+            'biases_detected': self._spans(analyzed),
+            'rewritten_sentences': [
+                {'position': sentence.start, 'length': sentence.end - sentence.start,
+                 'rewritten': sentence.rewritten}
+                for sentence in analyzed
+            ],
+            'sentences_analyzed': sum(1 for sentence in analyzed if sentence.text not in previous),
+            'bias_score': self.bias_score(),
+            'changes_made': self.changes_made()
+        }
+
+    def _affected(self, start: int, end: int) -> Tuple[int, int]:
+        """
+        Indices of the first and last sentence to re-segment: one sentence
+        either side of the edit (a boundary there may appear or vanish),
+        widened to whole sentences when those were cut at max_chars
+        """
+        sentences = self.sentences
+        first = max(bisect.bisect_left(sentences, start, key=lambda sentence: sentence.end) - 1, 0)
+        while first > 0 and sentences[first - 1].continued:
+            first -= 1
+
+        # The first sentence starting after the edit
+        last = bisect.bisect_right(sentences, end, lo=first, key=lambda sentence: sentence.start)
+        while last < len(sentences) and sentences[last].continued:
+            last += 1
+        return first, last
+
+    def _analyze_range(self, start: int, end: int, previous: Dict[str, _Sentence]) -> List[_Sentence]:
+        analyzed = []
+        for sentence_start, sentence_end, continued in segment_range(self.text, start, end, self.max_sentence_chars):
+            sentence = _Sentence(sentence_start, sentence_end, continued, self.text[sentence_start:sentence_end])
+            reusable = previous.get(sentence.text)
+            if reusable is not None:
+                sentence.biases = reusable.biases
+                sentence.rewritten = reusable.rewritten
+                sentence.changes = reusable.changes
+            else:
+                sentence.biases = self.bias_detector.detect_biases(sentence.text)
+                result = self.prompt_rewriter.rewrite_prompt(sentence.text, sentence.biases)
+                sentence.rewritten = result['rewritten']
+                sentence.changes = result['changes']
+            self._count(sentence, 1)
+            analyzed.append(sentence)
+        return analyzed
+
+    def _count(self, sentence: _Sentence, sign: int):
+        for kind, spans in sentence.biases.items():
+            self._bias_counts[kind] += sign * len(spans)
+        for change in sentence.changes:
+            self._change_counts[change] += sign
+            if not self._change_counts[change]:
+                del self._change_counts[change]
+
+    @staticmethod
+    def _spans(sentences: List[_Sentence]) -> Dict[str, List[Dict]]:
+        """Bias spans of the given sentences, positioned in the whole text"""
+        biases = {kind: [] for kind in BIAS_TYPES}
+        for sentence in sentences:
+            for kind, spans in sentence.biases.items():
+                biases[kind].extend(dict(span, position=span['position'] + sentence.start) for span in spans)
+        return biases
+
+    def bias_score(self) -> float:
+        # get_bias_score only needs the number of spans of each type
+        return self.bias_detector.get_bias_score({kind: range(self._bias_counts[kind]) for kind in BIAS_TYPES})
+
+    def changes_made(self) -> List[str]:
+        """Each kind of change made anywhere in the text, listed once"""
+        return list(self._change_counts)
+
+    def snapshot(self) -> Dict[str, any]:
+        """The full analysis of the current text"""
+        return {
+            'version': self.version,
+            'text': self.text,
+            'biases_detected': self._spans(self.sentences),
+            'bias_score': self.bias_score(),
+            'rewritten_prompt': ' '.join(sentence.rewritten for sentence in self.sentences if sentence.rewritten),
+            'changes_made': self.changes_made()
+        }
+
+
+class EditSessionStore:
+    def __init__(self, bias_detector: BiasDetector, prompt_rewriter: PromptRewriter,
+                 max_sessions: int = 1000, ttl: float = 1800, max_sentence_chars: int = 1000,
+                 path: Optional[str] = None, snapshot_every: int = 200,
+                 clock: Callable[[], float] = time.time):
+        """
+        path: SQLite file holding the sessions, so any worker process on the
+            host can serve any session; None keeps them in this process only
+        max_sessions: sessions held in memory; the least recently used are
+            dropped (with a path they are read back from the file when needed)
+        ttl: seconds an idle session is kept
+        snapshot_every: with a path, each edit is stored as a small row and
+            other processes replay it; the full analysis is written again
+            after this many edits, or one per sentence if there are more, so
+            its cost per edit stays the same however long the text
+        """
+        self.bias_detector = bias_detector
+        self.prompt_rewriter = prompt_rewriter
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_sentence_chars = max_sentence_chars
+        self.path = path
+        self.snapshot_every = max(1, snapshot_every)
+        self._clock = clock
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        # SQLite connections can't be shared across threads or a fork
+        self._local = threading.local()
+        self._stats = {'created': 0, 'edits': 0, 'evicted': 0, 'expired': 0, 'loaded': 0,
+                       'replayed': 0, 'snapshots': 0, 'conflicts': 0}
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._connection()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        # A session is its last snapshot plus the edits made since, in order.
+        # The snapshot has a table of its own, so the small rows read and
+        # written on every request never touch it.
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'id TEXT PRIMARY KEY, version INTEGER NOT NULL, last_used REAL NOT NULL)'
+        )
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS snapshots (session_id TEXT PRIMARY KEY, state TEXT NOT NULL)'
+        )
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS edits ('
+            'session_id TEXT NOT NULL, version INTEGER NOT NULL, start INTEGER NOT NULL, '
+            '"end" INTEGER NOT NULL, replacement TEXT NOT NULL, PRIMARY KEY (session_id, version))'
+        )
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def set_models(self, bias_detector: BiasDetector, prompt_rewriter: PromptRewriter):
+        """
+        Use new models for sessions created from now on; existing sessions
+        keep the ones they were analyzed with
+        """
+        with self._lock:
+            self.bias_detector = bias_detector
+            self.prompt_rewriter = prompt_rewriter
+
+    def create(self, text: str) -> Tuple[str, EditSession]:
+        with self._lock:
+            bias_detector, prompt_rewriter = self.bias_detector, self.prompt_rewriter
+        session = EditSession(text, bias_detector, prompt_rewriter, self.max_sentence_chars)
+        session_id = uuid.uuid4().hex
+        now = self._clock()
+        session.last_used = now
+
+        connection = self._connection()
+        if connection is not None:
+            self._purge_expired(connection, now)
+            connection.execute(
+                'INSERT INTO snapshots (session_id, state) VALUES (?, ?)',
+                (session_id, json.dumps(session.to_state(), ensure_ascii=False))
+            )
+            connection.execute(
+                'INSERT INTO sessions (id, version, last_used) VALUES (?, ?, ?)', (session_id, session.version, now)
+            )
+
+        with self._lock:
+            self._remember(session_id, session)
+            self._stats['created'] += 1
+        return session_id, session
+
+    def _purge_expired(self, connection: sqlite3.Connection, now: float):
+        expired = [row[0] for row in connection.execute(
+            'SELECT id FROM sessions WHERE last_used < ?', (now - self.ttl,)
+        )]
+        for session_id in expired:
+            self._delete_rows(connection, session_id)
+        with self._lock:
+            self._stats['expired'] += len(expired)
+
+    @staticmethod
+    def _delete_rows(connection: sqlite3.Connection, session_id: str) -> bool:
+        deleted = connection.execute('DELETE FROM sessions WHERE id = ?', (session_id,)).rowcount > 0
+        connection.execute('DELETE FROM snapshots WHERE session_id = ?', (session_id,))
+        connection.execute('DELETE FROM edits WHERE session_id = ?', (session_id,))
+        return deleted
+
+    def _remember(self, session_id: str, session: EditSession):
+        """Keep a session in memory, dropping the least recently used; holds _lock"""
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self._stats['evicted'] += 1
+
+    def _forget(self, session_id: str, session: EditSession = None):
+        """Drop the in-memory copy (only if it is still session, when given)"""
+        with self._lock:
+            if session is None or self._sessions.get(session_id) is session:
+                self._sessions.pop(session_id, None)
+
+    def get(self, session_id: str) -> Optional[EditSession]:
+        now = self._clock()
+        connection = self._connection()
+        if connection is None:
+            with self._lock:
+                session = self._sessions.get(session_id)
+                if session is None:
+                    return None
+                if now - session.last_used > self.ttl:
+                    del self._sessions[session_id]
+                    self._stats['expired'] += 1
+                    return None
+                session.last_used = now
+                self._sessions.move_to_end(session_id)
+                return session
+
+        row = connection.execute('SELECT version, last_used FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        if row is not None and now - row[1] > self.ttl:
+            self._delete_rows(connection, session_id)
+            with self._lock:
+                self._stats['expired'] += 1
+            row = None
+        if row is None:
+            self._forget(session_id)
+            return None
+
+        connection.execute('UPDATE sessions SET last_used = ? WHERE id = ?', (now, session_id))
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+        if session is not None and session.version < row[0]:
+            # Behind the snapshot, whose edits are gone
+            self._forget(session_id, session)
+            session = None
+        elif session is not None:
+            session.saved_version = max(session.saved_version, row[0])
+        session = self._catch_up(connection, session_id, session)
+        if session is not None:
+            session.last_used = now
+        return session
+
+    def _catch_up(self, connection: sqlite3.Connection, session_id: str,
+                  session: Optional[EditSession]) -> Optional[EditSession]:
+        """
+        Bring a session up to date with the edits other processes stored,
+        replaying them (cheap, like the edits themselves); the snapshot is
+        read only for a session unknown here or too far behind it
+        """
+        for _ in range(3):
+            if session is None:
+                session = self._load(connection, session_id)
+                if session is None:
+                    return None
+            with session.lock:
+                edits = connection.execute(
+                    'SELECT version, start, "end", replacement FROM edits '
+                    'WHERE session_id = ? AND version > ? ORDER BY version',
+                    (session_id, session.version)
+                ).fetchall()
+                # The edits right after this copy were folded into a newer snapshot
+                if edits and edits[0][0] != session.version + 1:
+                    self._forget(session_id, session)
+                    session = None
+                    continue
+                for _, start, end, replacement in edits:
+                    session.apply(start, end, replacement)
+            if edits:
+                with self._lock:
+                    self._stats['replayed'] += len(edits)
+            return session
+        return session
+
+    def _load(self, connection: sqlite3.Connection, session_id: str) -> Optional[EditSession]:
+        row = connection.execute('SELECT state FROM snapshots WHERE session_id = ?', (session_id,)).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            bias_detector, prompt_rewriter = self.bias_detector, self.prompt_rewriter
+        session = EditSession.from_state(json.loads(row[0]), bias_detector, prompt_rewriter,
+                                         self.max_sentence_chars)
+        session.last_used = self._clock()
+        with self._lock:
+            self._remember(session_id, session)
+            self._stats['loaded'] += 1
+        return session
+
+    def apply(self, session_id: str, start: int, end: int, replacement: str,
+              base_version: int = None) -> Optional[Dict[str, any]]:
+        """Apply one edit; None if the session does not exist"""
+        session = self.get(session_id)
+        if session is None:
+            return None
+
+        connection = self._connection()
+        if connection is None:
+            with session.lock:
+                result = session.apply(start, end, replacement, base_version)
+        else:
+            result = self._apply_shared(connection, session_id, session, start, end, replacement, base_version)
+            if result is None:
+                return None
+
+        with self._lock:
+            self._stats['edits'] += 1
+        return result
+
+    def _apply_shared(self, connection: sqlite3.Connection, session_id: str, session: EditSession,
+                      start: int, end: int, replacement: str, base_version: int = None) -> Optional[Dict]:
+        """
+        Apply an edit and store it as one row; the primary key on (session,
+        version) lets only one process write each version, without a lock
+        held across the analysis
+        """
+        while True:
+            with session.lock:
+                result = session.apply(start, end, replacement, base_version)
+                try:
+                    connection.execute(
+                        'INSERT INTO edits (session_id, version, start, "end", replacement) VALUES (?, ?, ?, ?, ?)',
+                        (session_id, session.version, start, end, replacement)
+                    )
+                    state = None
+                    if session.version - session.saved_version >= max(self.snapshot_every, len(session.sentences)):
+                        state = json.dumps(session.to_state(), ensure_ascii=False)
+                        session.saved_version = session.version
+                except sqlite3.IntegrityError:
+                    state = False
+                except sqlite3.Error:
+                    # Not stored, so this copy is ahead of every other one
+                    self._forget(session_id, session)
+                    raise
+            if state is not False:
+                break
+
+            # Another process stored this version first: this copy is wrong now
+            self._forget(session_id, session)
+            with self._lock:
+                self._stats['conflicts'] += 1
+            session = self.get(session_id)
+            if session is None:
+                return None
+            if base_version is not None:
+                raise VersionConflict(f'Session is at version {session.version}, not {base_version}')
+
+        if state is not None:
+            # Fold the edits into a new snapshot, then drop them; a reader in
+            # between loads the old snapshot and replays the edits still there
+            updated = connection.execute(
+                'UPDATE sessions SET version = ? WHERE id = ? AND version < ?',
+                (result['version'], session_id, result['version'])
+            ).rowcount
+            if updated:
+                connection.execute('UPDATE snapshots SET state = ? WHERE session_id = ?', (state, session_id))
+                connection.execute('DELETE FROM edits WHERE session_id = ? AND version <= ?',
+                                   (session_id, result['version']))
+                with self._lock:
+                    self._stats['snapshots'] += 1
+        return result
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            deleted = self._sessions.pop(session_id, None) is not None
+        connection = self._connection()
+        if connection is None:
+            return deleted
+        return self._delete_rows(connection, session_id)
+
+    def get_stats(self) -> Dict[str, any]:
+        with self._lock:
+            stats = dict(self._stats, sessions=len(self._sessions))
+        connection = self._connection()
+        if connection is not None:
+            stats['sessions'] = connection.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        return stats
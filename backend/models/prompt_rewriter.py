@@ -3,11 +3,19 @@ Prompt Rewriter Module
 Uses transformer models to rewrite prompts in a more objective manner
 """
 
-from typing import Dict, List
+from typing import Dict, List, Tuple
 import re
 
+from utils.lexicon_store import apply_lexicon
+from utils.pattern_matcher import literal_prefix, trie_pattern
+
+# Lexicon terms the single-pass replacement can handle: lowercase words
+# separated by single spaces
+_SIMPLE_TERM = re.compile(r'[a-z]+(?: [a-z]+)*')
+
+
 class PromptRewriter:
-    def __init__(self):
+    def __init__(self, lexicon: Dict = None):
         # Mapping of biased terms to neutral alternatives
         self.neutral_replacements = {
             'obviously': '',
@@ -56,45 +64,141 @@ class PromptRewriter:
             (r"show (.+?) is real", r"what evidence exists for \1"),
         ]
 
+        # Absolutist terms and the qualifiers that replace them
+        self.absolutist_replacements = {
+            'all': 'many',
+            'every': 'most',
+            'none': 'few'
+        }
+
+        # Lexicon fields loaded from a published lexicon file replace the defaults
+        if lexicon:
+            apply_lexicon(self, lexicon)
+
+        self._compile_patterns()
+
+    def _compile_patterns(self):
+        """
+        Compile every rewrite pattern once, so rewrite_prompt never builds
+        a regex or re-lowercases the prompt per term
+        """
+        self._term_replacements = {
+            term.lower(): replacement
+            for term, replacement in self.neutral_replacements.items()
+        }
+        self._term_regexes = [
+            (term, replacement, re.compile(re.escape(term), re.IGNORECASE))
+            for term, replacement in self.neutral_replacements.items()
+        ]
+        # Matched against the lowercased prompt, so no IGNORECASE needed
+        self._term_regex = re.compile(trie_pattern(self._term_replacements))
+
+        # Offsets inside each term where another term could start, i.e. where
+        # a match found by the combined regex may hide an overlapping term
+        self._overlap_offsets = {}
+        for term in self._term_replacements:
+            self._overlap_offsets[term] = [
+                offset for offset in range(1, len(term))
+                if any(
+                    other.startswith(term[offset:]) or term[offset:].startswith(other)
+                    for other in self._term_replacements
+                )
+            ]
+        self._single_pass_safe = self._check_single_pass_safe()
+
+        # Each regex is paired with the literal text a match must start
+        # with, so it is only run on prompts that contain that text
+        self._presumption_regexes = [
+            (re.compile(pattern, re.IGNORECASE), literal_prefix(pattern).lower(), replacement)
+            for pattern, replacement in self.presumption_patterns
+        ]
+        self._question_regexes = [
+            (re.compile(pattern, re.IGNORECASE), literal_prefix(pattern).lower(), replacement)
+            for pattern, replacement in self.question_patterns
+        ]
+        self._absolutist_regex = re.compile(
+            r'\b(' + '|'.join(map(re.escape, self.absolutist_replacements)) + r')\b',
+            re.IGNORECASE
+        )
+
+        self._leading_starter_regex = re.compile(
+            r"^(isn't it|aren't they|don't you think)\s+(that\s+)?", re.IGNORECASE
+        )
+        self._leading_why_regex = re.compile(
+            r"why (is|are) (.+?) (so )?(bad|good|terrible|great)\??", re.IGNORECASE
+        )
+        self._whitespace_regex = re.compile(r'\s+')
+
+    def _check_single_pass_safe(self) -> bool:
+        """
+        Whether replacing all terms in one pass can differ from replacing
+        them term by term. Replacing disjoint, letter-delimited terms can
+        only diverge if a replacement contains a term or can complete a
+        multi-word term across a space; rule that out up front.
+        """
+        terms = list(self._term_replacements)
+        for term in terms:
+            if not _SIMPLE_TERM.fullmatch(term):
+                return False
+            # A term containing another would match at the same position
+            if any(other != term and other in term for other in terms):
+                return False
+
+        replacements = [r.lower() for r in self._term_replacements.values() if r]
+        for replacement in replacements:
+            if not _SIMPLE_TERM.fullmatch(replacement):
+                return False
+            if any(term in replacement for term in terms):
+                return False
+
+        for term in terms:
+            for i, char in enumerate(term):
+                if char != ' ':
+                    continue
+                left, right = term[:i], term[i + 1:]
+                for replacement in replacements:
+                    if left.endswith(replacement) or replacement.endswith(left):
+                        return False
+                    if right.startswith(replacement) or replacement.startswith(right):
+                        return False
+        return True
+
     def rewrite_prompt(self, text: str, biases: Dict[str, List[Dict]]) -> Dict[str, str]:
         """
         Rewrite prompt to be more objective
         Returns original and rewritten versions
         """
-        rewritten = text
-        changes_made = []
+        # Literal prefilters are only exact when lowercasing maps 1:1 onto
+        # the re module's case-insensitive matching
+        prefilter = text.isascii()
 
         # Replace biased terms with neutral alternatives
-        for term, replacement in self.neutral_replacements.items():
-            if term.lower() in rewritten.lower():
-                # Case-insensitive replacement
-                pattern = re.compile(re.escape(term), re.IGNORECASE)
-                if replacement:
-                    rewritten = pattern.sub(replacement, rewritten)
-                    changes_made.append(f"Replaced '{term}' with '{replacement}'")
-                else:
-                    rewritten = pattern.sub('', rewritten)
-                    changes_made.append(f"Removed '{term}'")
+        rewritten, changes_made = self._replace_terms(text)
+        rewritten_lower = rewritten.lower()
 
         # Apply presumptive language reformulation (do this first - highest priority)
-        for pattern, replacement in self.presumption_patterns:
-            match = re.search(pattern, rewritten, re.IGNORECASE)
-            if match:
-                rewritten = re.sub(pattern, replacement, rewritten, flags=re.IGNORECASE)
+        for regex, prefix, replacement in self._presumption_regexes:
+            if prefilter and prefix not in rewritten_lower:
+                continue
+            rewritten, count = regex.subn(replacement, rewritten)
+            if count:
+                rewritten_lower = rewritten.lower()
                 changes_made.append(f"Removed presumption about unproven facts")
                 break  # Only apply one presumption fix
 
         # Apply question reformulation patterns
-        for pattern, replacement in self.question_patterns:
-            match = re.search(pattern, rewritten, re.IGNORECASE)
-            if match:
-                rewritten = re.sub(pattern, replacement, rewritten, flags=re.IGNORECASE)
+        for regex, prefix, replacement in self._question_regexes:
+            if prefilter and prefix not in rewritten_lower:
+                continue
+            rewritten, count = regex.subn(replacement, rewritten)
+            if count:
+                rewritten_lower = rewritten.lower()
                 changes_made.append(f"Reformulated question structure")
 
         # Remove absolutist language by adding qualifiers
-        rewritten = re.sub(r'\ball\b', 'many', rewritten, flags=re.IGNORECASE)
-        rewritten = re.sub(r'\bevery\b', 'most', rewritten, flags=re.IGNORECASE)
-        rewritten = re.sub(r'\bnone\b', 'few', rewritten, flags=re.IGNORECASE)
+        rewritten = self._absolutist_regex.sub(
+            lambda match: self.absolutist_replacements[match.group(1).lower()], rewritten
+        )
 
         # Convert leading questions to neutral queries
         if 'leading_questions' in biases and biases['leading_questions']:
@@ -102,7 +206,7 @@ class PromptRewriter:
             changes_made.append("Converted leading question to neutral query")
 
         # Clean up extra spaces
-        rewritten = re.sub(r'\s+', ' ', rewritten).strip()
+        rewritten = self._whitespace_regex.sub(' ', rewritten).strip()
 
         # Capitalize first letter
         if rewritten:
@@ -114,17 +218,71 @@ class PromptRewriter:
             'changes': changes_made
         }
 
+    def _replace_terms(self, text: str) -> Tuple[str, List[str]]:
+        """
+        Replace every neutral_replacements term in one regex pass
+        Falls back to term-by-term replacement when terms overlap or are
+        embedded in longer words, where the order of replacement matters
+        """
+        if not self._single_pass_safe or not text.isascii():
+            return self._replace_terms_sequential(text)
+
+        text_lower = text.lower()
+        term_regex = self._term_regex
+        length = len(text)
+        pieces = []
+        found = set()
+        last_end = 0
+
+        for match in term_regex.finditer(text_lower):
+            start, end = match.span()
+            term = match.group()
+            if (start > 0 and text[start - 1].isalpha()) or (end < length and text[end].isalpha()):
+                return self._replace_terms_sequential(text)
+            for offset in self._overlap_offsets[term]:
+                if term_regex.match(text_lower, start + offset):
+                    return self._replace_terms_sequential(text)
+
+            pieces.append(text[last_end:start])
+            pieces.append(self._term_replacements[term])
+            found.add(term)
+            last_end = end
+
+        if not found:
+            return text, []
+        pieces.append(text[last_end:])
+
+        changes_made = []
+        for term, replacement in self.neutral_replacements.items():
+            if term.lower() in found:
+                changes_made.append(self._describe_replacement(term, replacement))
+        return ''.join(pieces), changes_made
+
+    def _replace_terms_sequential(self, text: str) -> Tuple[str, List[str]]:
+        """Replace terms one at a time, in neutral_replacements order"""
+        rewritten = text
+        changes_made = []
+        for term, replacement, regex in self._term_regexes:
+            if term.lower() in rewritten.lower():
+                rewritten = regex.sub(replacement, rewritten)
+                changes_made.append(self._describe_replacement(term, replacement))
+        return rewritten, changes_made
+
+    @staticmethod
+    def _describe_replacement(term: str, replacement: str) -> str:
+        if replacement:
+            return f"Replaced '{term}' with '{replacement}'"
+        return f"Removed '{term}'"
+
     def _neutralize_leading_question(self, text: str) -> str:
         """
         Convert leading questions to neutral information requests
         """
         # Remove common leading question starters
-        text = re.sub(r"^(isn't it|aren't they|don't you think)\s+(that\s+)?",
-                     "what information exists about ", text, flags=re.IGNORECASE)
+        text = self._leading_starter_regex.sub("what information exists about ", text)
 
         # Convert "why is X bad/good" to "what are the characteristics of X"
-        text = re.sub(r"why (is|are) (.+?) (so )?(bad|good|terrible|great)\??",
-                     r"what are the characteristics of \2?", text, flags=re.IGNORECASE)
+        text = self._leading_why_regex.sub(r"what are the characteristics of \2?", text)
 
         return text
 
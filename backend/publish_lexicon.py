@@ -0,0 +1,70 @@
+"""
+Lexicon Publishing CLI
+Compiles an edited lexicon into the versioned file servers load from
+LEXICON_PATH, replacing it atomically; running servers and batch workers
+switch to the new version on their next check
+
+Usage:
+    python publish_lexicon.py --export-defaults > lexicon_source.json
+    python publish_lexicon.py lexicon_source.json -o /srv/lexicon.json
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Make backend packages importable regardless of the working directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lexicon_store import LexiconError, build_components, export_lexicon, publish_lexicon
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Compile and publish a bias lexicon file')
+    parser.add_argument('source', nargs='?', default='-',
+                        help="source lexicon JSON, or '-' for stdin (default)")
+    parser.add_argument('-o', '--output', default=os.getenv('LEXICON_PATH'),
+                        help='published lexicon file (default: $LEXICON_PATH)')
+    parser.add_argument('--version', type=int,
+                        help='version to publish (default: one past the published version)')
+    parser.add_argument('--export-defaults', action='store_true',
+                        help='print the built-in lexicon as a source file to edit, and exit')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.export_defaults:
+        defaults = {
+            type(component).__name__: export_lexicon(component)
+            for component in build_components().values()
+        }
+        json.dump(defaults, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+        return 0
+
+    if not args.output:
+        print('No output file: pass -o or set LEXICON_PATH', file=sys.stderr)
+        return 2
+
+    if args.source == '-':
+        source = json.load(sys.stdin)
+    else:
+        with open(args.source, encoding='utf-8') as f:
+            source = json.load(f)
+
+    try:
+        document = publish_lexicon(args.output, source, version=args.version)
+    except LexiconError as e:
+        print(f'Not published: {e}', file=sys.stderr)
+        return 1
+
+    print(f"Published lexicon version {document['version']} ({document['checksum']}) to {args.output}",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Corpus Scoring CLI
+Streams JSONL or CSV prompts through the NLP pipeline and writes JSONL results
+
+Usage:
+    python score_corpus.py prompts.jsonl -o scores.jsonl --workers 4 --rewrite
+    cat prompts.csv | python score_corpus.py --format csv --field text
+    python score_corpus.py prompts.jsonl -o scores.jsonl --workers 4 --unordered --resume
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Set, Tuple
+
+# Make backend packages importable regardless of the working directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.analysis import NLPAnalyzer
+from utils.batch_pool import BatchPool
+from utils.corpus_pipeline import read_csv, read_jsonl, score_parallel, score_records
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Score a corpus of prompts for bias without running the API server'
+    )
+    parser.add_argument('input', nargs='?', default='-',
+                        help="input file, or '-' for stdin (default)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="output JSONL file, or '-' for stdout (default)")
+    parser.add_argument('--format', choices=['jsonl', 'csv'],
+                        help='input format (default: from file extension, else jsonl)')
+    parser.add_argument('--field', default='prompt',
+                        help='JSON key or CSV column holding the prompt (default: prompt)')
+    parser.add_argument('--id-field', default='id',
+                        help='JSON key or CSV column copied to the output as "id" (default: id)')
+    parser.add_argument('--rewrite', action='store_true',
+                        help='also produce the rule-based rewrite of each prompt')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes (default: 1, no pool)')
+    parser.add_argument('--chunk-size', type=int, default=256,
+                        help='records sent to a worker at a time (default: 256)')
+    parser.add_argument('--unordered', action='store_true',
+                        help='emit results as chunks finish instead of in input order')
+    parser.add_argument('--skip', type=int, default=0,
+                        help='resume offset: number of input records to skip (ordered output only)')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue an interrupted run, skipping the records already in the output file')
+    args = parser.parse_args(argv)
+
+    if args.skip and args.unordered:
+        # Results written out of order don't cover a prefix of the input
+        parser.error('--skip needs ordered output; use --resume with --unordered')
+    if args.resume and (args.skip or args.output == '-'):
+        parser.error('--resume reads the output file to find the records to skip; '
+                     'give -o and leave out --skip')
+    return args
+
+
+def _open_input(path: str):
+    if path == '-':
+        return sys.stdin
+    return open(path, newline='', encoding='utf-8')
+
+
+def _open_output(path: str):
+    if path == '-':
+        return sys.stdout
+    # Append when resuming so earlier results are kept
+    return open(path, 'a', encoding='utf-8')
+
+
+def completed_records(path: str) -> Tuple[int, Set[int]]:
+    """
+    Input indices of the results already in an output file, as the length
+    of the prefix of the input fully written plus the indices written past
+    it; a last line left half-written by an interrupted run is cut off
+    """
+    if not os.path.exists(path):
+        return 0, set()
+
+    written = set()
+    with open(path, 'rb+') as f:
+        complete = 0
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            complete += len(line)
+            try:
+                written.add(json.loads(line)['index'])
+            except (ValueError, KeyError, TypeError):
+                continue
+        f.truncate(complete)
+
+    prefix = 0
+    while prefix in written:
+        prefix += 1
+    return prefix, {index for index in written if index > prefix}
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    input_format = args.format
+    if input_format is None:
+        input_format = 'csv' if args.input.lower().endswith('.csv') else 'jsonl'
+    reader = read_csv if input_format == 'csv' else read_jsonl
+
+    skip, done = args.skip, set()
+    if args.resume:
+        skip, done = completed_records(args.output)
+
+    source = _open_input(args.input)
+    sink = _open_output(args.output)
+    pool = None
+    failed = 0
+
+    try:
+        records = reader(source, field=args.field, id_field=args.id_field, skip=skip)
+        if done:
+            records = (record for record in records if record['index'] not in done)
+
+        if args.workers > 1:
+            pool = BatchPool(max_workers=args.workers)
+            results = score_parallel(
+                pool, records,
+                with_rewrite=args.rewrite,
+                chunk_size=args.chunk_size,
+                ordered=not args.unordered
+            )
+        else:
+            results = score_records(NLPAnalyzer(), records, with_rewrite=args.rewrite)
+
+        for record in results:
+            if 'error' in record:
+                failed += 1
+            sink.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        sink.flush()
+        if pool is not None:
+            pool.shutdown(wait=False)
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    if failed:
+        print(f'{failed} record(s) failed', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
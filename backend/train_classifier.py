@@ -0,0 +1,116 @@
+"""
+Bias Classifier Training CLI
+Labels prompts with BiasDetector and any cached Gemini analyses, trains the
+linear classifier behind ML mode and writes the artifact servers load from
+ML_MODEL_PATH, replacing it atomically
+
+Usage:
+    python train_classifier.py prompts.jsonl more_prompts.csv -o models/artifacts/bias_classifier.joblib
+    python train_classifier.py --synthetic 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+# Make backend packages importable regardless of the working directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.bias_classifier import DEFAULT_FEATURES, DEFAULT_MODEL_PATH, gemini_labels, train_classifier
+from utils.corpus_pipeline import read_csv, read_jsonl
+from utils.result_cache import ResultCache
+
+GEMINI_CACHE_DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'cache', 'gemini_results.sqlite3'
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Train the ML-mode bias classifier')
+    parser.add_argument('inputs', nargs='*',
+                        help='JSONL or CSV files of prompts (format from the file extension)')
+    parser.add_argument('--field', default='prompt',
+                        help='JSON key or CSV column holding the prompt (default: prompt)')
+    parser.add_argument('-o', '--output', default=os.getenv('ML_MODEL_PATH', DEFAULT_MODEL_PATH),
+                        help='classifier artifact to write (default: $ML_MODEL_PATH or models/artifacts/)')
+    parser.add_argument('--gemini-cache', default=os.getenv('GEMINI_CACHE_PATH', GEMINI_CACHE_DEFAULT_PATH),
+                        help='SQLite Gemini result cache to take labels from; empty for none')
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help='also train on this many synthetic prompts built from the lexicon')
+    parser.add_argument('--test-fraction', type=float, default=0.2,
+                        help='prompts held out to tune thresholds and report scores (default: 0.2)')
+    parser.add_argument('--n-features', type=int, default=DEFAULT_FEATURES['n_features'],
+                        help=f"hashed feature dimensions (default: {DEFAULT_FEATURES['n_features']})")
+    parser.add_argument('-C', '--regularization', type=float, default=4.0,
+                        help='inverse regularization strength (default: 4.0)')
+    parser.add_argument('--seed', type=int, default=1234)
+    return parser.parse_args(argv)
+
+
+def read_prompts(path: str, field: str):
+    reader = read_csv if path.lower().endswith('.csv') else read_jsonl
+    with open(path, newline='', encoding='utf-8') as f:
+        return [record['prompt'] for record in reader(f, field=field)
+                if isinstance(record.get('prompt'), str) and record['prompt'].strip()]
+
+
+# Question frames, so leading and presumptive phrasings occur too
+SYNTHETIC_FRAMES = [
+    '{}?', 'Tell me about {}.', 'What do we know about {}?', 'Why is {}?', "Isn't it true that {}?",
+    "Don't you think {}?", 'Explain why {} exist.', 'When did {} happen?', 'How does {} work?'
+]
+
+
+def synthetic_prompts(count: int, seed: int):
+    """Lexicon-based prompts at a spread of lengths, bias densities and framings"""
+    from benchmarks.bench_nlp import bias_vocabulary, make_corpus
+    from models.bias_detector import BiasDetector
+    rng = random.Random(seed)
+    biased = bias_vocabulary(BiasDetector())
+    settings = [(words, density) for words in (8, 15, 30) for density in (0.0, 0.05, 0.15, 0.3)]
+    prompts = []
+    for i, (words, density) in enumerate(settings):
+        share = count // len(settings) + (i < count % len(settings))
+        for prompt in make_corpus(words, density, share, biased, seed=seed):
+            body = prompt[:1].lower() + prompt[1:].rstrip('?')
+            prompts.append(rng.choice(SYNTHETIC_FRAMES).format(body))
+    return prompts
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    prompts = []
+    for path in args.inputs:
+        prompts += read_prompts(path, args.field)
+    if args.synthetic:
+        prompts += synthetic_prompts(args.synthetic, args.seed)
+
+    gemini = {}
+    if args.gemini_cache and os.path.exists(args.gemini_cache):
+        gemini = gemini_labels(ResultCache(path=args.gemini_cache, max_entries=0))
+
+    if len(prompts) + len(gemini) < 10:
+        print('Not enough prompts to train on: pass prompt files, --synthetic or a Gemini cache',
+              file=sys.stderr)
+        return 2
+
+    classifier = train_classifier(
+        prompts, gemini, test_fraction=args.test_fraction, seed=args.seed,
+        features={'n_features': args.n_features}, regularization=args.regularization
+    )
+    classifier.save(args.output)
+
+    info = classifier.info
+    print(f"Trained on {info['samples']} prompts ({info['gemini_labelled']} labelled by Gemini) "
+          f"in {info['training_seconds']}s; wrote version {classifier.version} to {args.output}",
+          file=sys.stderr)
+    if 'evaluation' in info:
+        print(json.dumps(info['evaluation'], indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
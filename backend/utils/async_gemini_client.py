@@ -0,0 +1,220 @@
+"""
+Async Gemini API Client
+asyncio counterpart of GeminiClient: same request, parsing and cache, but
+the HTTP call is made with aiohttp so one event loop can keep hundreds of
+AI-mode requests in flight without tying up a thread per request
+"""
+
+import asyncio
+from typing import AsyncIterator, Dict, Tuple
+
+import aiohttp
+
+from utils.deadline import Deadline
+from utils.gemini_client import GeminiClient
+from utils.metrics import metrics
+from utils.response_parser import IncrementalParser, ResponseParseError
+from utils.result_cache import ResultCache
+from utils.single_flight import AsyncSingleFlight, SingleFlightTimeout
+
+
+class AsyncGeminiClient(GeminiClient):
+    def __init__(self, api_key: str = None, cache: ResultCache = None,
+                 max_concurrency: int = 256, pool_size: int = 100,
+                 connect_timeout: float = 5.0, read_timeout: float = 30.0,
+                 base_url: str = None, single_flight: AsyncSingleFlight = None,
+                 structured_output: bool = True):
+        """
+        max_concurrency: Gemini calls allowed in flight at once; further
+        callers wait on a semaphore
+        pool_size: keep-alive connections kept open to the API host
+        single_flight: coalesces concurrent calls for the same prompt/domain
+        """
+        super().__init__(api_key=api_key, cache=cache, pool_size=pool_size,
+                         connect_timeout=connect_timeout, read_timeout=read_timeout,
+                         base_url=base_url, structured_output=structured_output)
+        self.async_single_flight = single_flight
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+
+        # aiohttp sessions and semaphores belong to the loop that created them
+        self._loop = None
+        self._http = None
+        self._semaphore = None
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._http is not None and not self._http.closed:
+            return
+
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        connect_timeout, read_timeout = self.timeout
+        self._http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.pool_size),
+            timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+            headers={"Content-Type": "application/json"}
+        )
+
+    async def aclose(self):
+        """Close the aiohttp session (and the inherited sync session)"""
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
+        self.close()
+
+    async def rewrite_prompt_objectively_async(self, prompt: str, domain: str = 'general',
+                                               deadline: Deadline = None) -> Dict[str, any]:
+        """
+        Use Gemini AI to rewrite a prompt to be more objective
+        Same result as rewrite_prompt_objectively, without blocking the loop
+        deadline: stop waiting when it passes; the request itself carries on
+        so its result is still cached (requests are not hedged here)
+        """
+        if deadline is not None:
+            try:
+                return await asyncio.wait_for(
+                    asyncio.shield(self.rewrite_prompt_objectively_async(prompt, domain)), deadline.remaining()
+                )
+            except asyncio.TimeoutError:
+                return self._deadline_exceeded()
+
+        if self.cache is None and self.async_single_flight is None:
+            return await self._request_rewrite_async(prompt, domain)
+
+        key = self.cache_key(prompt, domain)
+        if self.cache is not None:
+            cached = await self._cache_get(key)
+            if cached is not None:
+                return dict(cached, cached=True, coalesced=False)
+
+        if self.async_single_flight is None:
+            return dict(await self._fetch_async(key, prompt, domain), cached=False, coalesced=False)
+
+        try:
+            result, shared = await self.async_single_flight.do(key, self._fetch_async, key, prompt, domain)
+        except SingleFlightTimeout as e:
+            return {'success': False, 'error': str(e)}
+        return dict(result, cached=False, coalesced=shared)
+
+    async def _cache_get(self, key: str):
+        """Cache lookup; a shared SQLite tier is read on a thread, off the loop"""
+        if not self.cache.path:
+            return self.cache.get(key)
+        return await asyncio.to_thread(self.cache.get, key)
+
+    async def _cache_set(self, key: str, result: Dict[str, any]):
+        if not self.cache.path:
+            self.cache.set(key, result)
+        else:
+            await asyncio.to_thread(self.cache.set, key, result)
+
+    async def _fetch_async(self, key: str, prompt: str, domain: str) -> Dict[str, any]:
+        """Request a rewrite and cache it if it succeeded"""
+        result = await self._request_rewrite_async(prompt, domain)
+        if result['success'] and self.cache is not None:
+            await self._cache_set(key, result)
+        return result
+
+    async def _request_rewrite_async(self, prompt: str, domain: str) -> Dict[str, any]:
+        """Call the Gemini API and parse its JSON answer"""
+        self._bind_loop()
+        data = self._build_request(prompt, domain)
+
+        try:
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    # Only this task's context sees the timing, so concurrent
+                    # requests don't mix their breakdowns
+                    with metrics.stage('gemini_request'):
+                        async with self._http.post(self._request_url(), json=data) as response:
+                            response.raise_for_status()
+                            result = await response.json(content_type=None)
+                finally:
+                    self.in_flight -= 1
+
+            with metrics.stage('gemini_parse'):
+                return self._parse_result(result)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return {
+                'success': False,
+                'error': f'API request failed: {str(e) or type(e).__name__}',
+                'error_type': 'request',
+                'status_code': getattr(e, 'status', None)
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Unexpected error: {str(e)}'
+            }
+
+    async def stream_rewrite_async(self, prompt: str, domain: str = 'general',
+                                   deadline: Deadline = None) -> AsyncIterator[Tuple[str, any]]:
+        """
+        Async counterpart of stream_rewrite: yields ('partial', text) as
+        output arrives and ('field', (name, value)) as fields complete, then
+        ('result', result)
+        deadline: stop reading when it passes, with error_type 'deadline'
+        """
+        key = self.cache_key(prompt, domain)
+        if self.cache is not None:
+            cached = await self._cache_get(key)
+            if cached is not None:
+                yield 'result', dict(cached, cached=True, coalesced=False)
+                return
+
+        self._bind_loop()
+        timeout = None
+        if deadline is not None:
+            if deadline.expired():
+                yield 'result', dict(self._deadline_exceeded(), cached=False, coalesced=False)
+                return
+            # Bounds the whole exchange, reading the reply included
+            timeout = aiohttp.ClientTimeout(total=deadline.remaining(), sock_connect=self.timeout[0],
+                                            sock_read=self.timeout[1])
+        parts = []
+        parser = IncrementalParser()
+        try:
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    with metrics.stage('gemini_request'):
+                        async with self._http.post(self._stream_url(), json=self._build_request(prompt, domain),
+                                                   timeout=timeout or self._http.timeout) as response:
+                            response.raise_for_status()
+                            async for line in response.content:
+                                text = self._stream_chunk_text(line.rstrip(b'\r\n'))
+                                if text:
+                                    parts.append(text)
+                                    yield 'partial', text
+                                    for field in parser.feed(text):
+                                        yield 'field', field
+                finally:
+                    self.in_flight -= 1
+
+            with metrics.stage('gemini_parse'):
+                result = self._parse_streamed(parser, parts)
+
+        except ResponseParseError as e:
+            result = self._parse_failure(e, ''.join(parts))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if deadline is not None and deadline.expired():
+                result = self._deadline_exceeded()
+            else:
+                result = {
+                    'success': False,
+                    'error': f'API request failed: {str(e) or type(e).__name__}',
+                    'error_type': 'request',
+                    'status_code': getattr(e, 'status', None)
+                }
+        except Exception as e:
+            result = {
+                'success': False,
+                'error': f'Unexpected error: {str(e)}'
+            }
+
+        if result['success'] and self.cache is not None:
+            await self._cache_set(key, result)
+        yield 'result', dict(result, cached=False, coalesced=False)
@@ -0,0 +1,186 @@
+"""
+Batch Processing Pool
+Fans NLP analysis of many prompts out across a pool of worker processes,
+each holding its own warmed-up models
+"""
+
+import concurrent.futures
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List
+
+# Per-process analyzer, built once by the pool initializer
+_analyzer = None
+# Watches LEXICON_PATH, when set, so workers pick up new lexicon versions
+_lexicon_store = None
+
+
+def _init_worker():
+    """Build the models once per worker process"""
+    global _analyzer, _lexicon_store
+    from models.analysis import NLPAnalyzer, analysis_limits
+    components = {}
+    if os.getenv('LEXICON_PATH'):
+        from utils.lexicon_store import LexiconStore
+        _lexicon_store = LexiconStore(
+            os.getenv('LEXICON_PATH'), check_interval=float(os.getenv('LEXICON_CHECK_INTERVAL', '2'))
+        )
+        components = _lexicon_store.load()
+    _analyzer = NLPAnalyzer(**components, **analysis_limits())
+
+
+def _current_analyzer():
+    """The worker's analyzer, rebuilt first if a new lexicon was published"""
+    global _analyzer
+    if _lexicon_store is not None:
+        components = _lexicon_store.check()
+        if components is not None:
+            _analyzer = _analyzer.with_components(**components)
+    return _analyzer
+
+
+def _warm(_) -> int:
+    """No-op task used to force worker start-up"""
+    return os.getpid()
+
+
+def run_task(analyzer, task: str, prompt) -> Dict[str, any]:
+    """
+    Run a single task, reporting failures in the result instead of raising
+    """
+    if not isinstance(prompt, str) or not prompt:
+        return {'success': False, 'error': 'No prompt provided'}
+
+    try:
+        if task == 'detect':
+            result = analyzer.detect(prompt)
+        elif task == 'analyze':
+            result = analyzer.analyze(prompt)
+        else:
+            return {'success': False, 'error': f'Unknown task: {task}'}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+    result['success'] = True
+    return result
+
+
+def _run_chunk(task: str, prompts: List) -> List[Dict]:
+    analyzer = _current_analyzer()
+    return [run_task(analyzer, task, prompt) for prompt in prompts]
+
+
+def _failed_chunk(prompts: List, error: Exception) -> List[Dict]:
+    return [{'success': False, 'error': f'Worker failed: {str(error)}'} for _ in prompts]
+
+
+def _call_with_analyzer(fn, args):
+    return fn(_current_analyzer(), *args)
+
+
+class BatchPool:
+    def __init__(self, max_workers: int = None, chunk_size: int = 16):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """Drop a pool broken by a dead worker; the next call starts a new one"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _submit(self, fn, *args):
+        executor = self._get_executor()
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard(executor)
+            return self._get_executor().submit(fn, *args)
+
+    def warm(self):
+        """
+        Start every worker process up front so model initialization
+        happens at startup rather than on the first batch
+        """
+        executor = self._get_executor()
+        # Submitting one task per worker at once forces all of them to start
+        concurrent.futures.wait([executor.submit(_warm, i) for i in range(self.max_workers)])
+
+    def submit_chunk(self, task: str, prompts: List):
+        """Schedule one chunk of prompts; returns a future of its results"""
+        return self._submit(_run_chunk, task, list(prompts))
+
+    def submit(self, fn, *args):
+        """
+        Schedule fn(analyzer, *args) on a worker, where analyzer is the
+        worker's NLPAnalyzer; fn must be a module-level function
+        """
+        return self._submit(_call_with_analyzer, fn, args)
+
+    def map(self, task: str, prompts: List) -> List[Dict]:
+        """
+        Run a task over all prompts in parallel
+        Results come back in input order, with per-item success flags
+        """
+        chunks = [
+            prompts[i:i + self.chunk_size]
+            for i in range(0, len(prompts), self.chunk_size)
+        ]
+        chunk_results = [None] * len(chunks)
+
+        # A dead worker breaks the whole pool and every chunk still in it.
+        # Those chunks are rerun one at a time in a fresh pool, so a chunk
+        # that kills its worker again fails only its own items.
+        broken = self._run_chunks(task, chunks, range(len(chunks)), chunk_results)
+        for i in sorted(broken):
+            for j, error in self._run_chunks(task, chunks, [i], chunk_results).items():
+                chunk_results[j] = _failed_chunk(chunks[j], error)
+
+        results = [result for chunk in chunk_results for result in chunk]
+        for index, result in enumerate(results):
+            result['index'] = index
+        return results
+
+    def _run_chunks(self, task: str, chunks: List[List], indices, results: List) -> Dict[int, Exception]:
+        """
+        Run the chunks at indices, storing each one's results in results
+        Returns the chunks lost to a broken pool, which is discarded
+        """
+        executor = self._get_executor()
+        futures, broken = [], {}
+        for i in indices:
+            try:
+                futures.append((i, executor.submit(_run_chunk, task, list(chunks[i]))))
+            except BrokenProcessPool as e:
+                broken[i] = e
+
+        for i, future in futures:
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool as e:
+                broken[i] = e
+            except Exception as e:
+                results[i] = _failed_chunk(chunks[i], e)
+
+        if broken:
+            self._discard(executor)
+        return broken
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,94 @@
+"""
+Compact Result Format
+Columnar encoding of bias spans for bulk results: each category becomes
+parallel term-id/position/length arrays, empty categories are left out,
+and term strings are stored once in a table shared by the whole response
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+import msgpack
+
+from utils.spans import Span
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+# Both spellings are in use; responses are sent as the one that was asked for
+RESPONSE_MIMETYPES = [JSON_MIMETYPE, MSGPACK_MIMETYPE, 'application/x-msgpack']
+
+FORMATS = ('full', 'compact')
+
+
+class TermTable:
+    """Interns term strings, giving each distinct term a small integer id"""
+
+    def __init__(self):
+        self._ids = {}
+
+    def intern(self, term: str) -> int:
+        return self._ids.setdefault(term, len(self._ids))
+
+    @property
+    def terms(self) -> List[str]:
+        """Every interned term, indexed by its id"""
+        return list(self._ids)
+
+
+def compact_biases(biases: Dict[str, List], table: TermTable) -> Dict[str, Dict[str, List[int]]]:
+    """
+    Columnar form of a biases_detected dict, whose spans may be dicts or
+    Span objects; categories without spans are omitted
+    """
+    intern = table.intern
+    compact = {}
+    for kind, spans in biases.items():
+        if not spans:
+            continue
+        if isinstance(spans[0], Span):
+            compact[kind] = {
+                'term': [intern(span.term) for span in spans],
+                'position': [span.position for span in spans],
+                'length': [span.length for span in spans]
+            }
+        else:
+            compact[kind] = {
+                'term': [intern(span['term']) for span in spans],
+                'position': [span['position'] for span in spans],
+                'length': [span['length'] for span in spans]
+            }
+    return compact
+
+
+def expand_biases(compact: Dict[str, Dict[str, List[int]]], terms: List[str],
+                  kinds: Iterable[str]) -> Dict[str, List[Dict]]:
+    """Rebuild the full biases_detected dict, with every kind in kinds"""
+    biases = {kind: [] for kind in kinds}
+    for kind, columns in compact.items():
+        biases[kind] = [
+            {'term': terms[term_id], 'position': position, 'length': length}
+            for term_id, position, length in zip(columns['term'], columns['position'], columns['length'])
+        ]
+    return biases
+
+
+def compact_results(results: List[Dict]) -> Tuple[List[Dict], List[str]]:
+    """
+    Compact the biases of every result against one shared term table
+    Returns (results, terms); the input results are left unchanged
+    """
+    table = TermTable()
+    compacted = []
+    for result in results:
+        if 'biases_detected' in result:
+            result = dict(result, biases_detected=compact_biases(result['biases_detected'], table))
+        compacted.append(result)
+    return compacted, table.terms
+
+
+def pack(payload) -> bytes:
+    """MessagePack encoding of a response payload"""
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def unpack(data: bytes):
+    return msgpack.unpackb(data, raw=False)
@@ -0,0 +1,171 @@
+"""
+Corpus Scoring Pipeline
+Generator stages that stream prompt records through domain detection,
+bias detection, scoring and optional rewriting without buffering the corpus
+"""
+
+import csv
+import json
+from concurrent.futures import FIRST_COMPLETED, wait
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, TextIO
+
+from models.analysis import NLPAnalyzer
+
+
+def read_jsonl(stream: TextIO, field: str = 'prompt', id_field: str = 'id',
+               skip: int = 0) -> Iterator[Dict]:
+    """
+    Yield one record per JSONL line, starting after the first `skip` lines
+    A line may be a JSON object holding the prompt in `field`, or a bare JSON string
+    """
+    for index, line in enumerate(islice(stream, skip, None), skip):
+        line = line.strip()
+        if not line:
+            continue
+        record = {'index': index}
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            record['error'] = f'Invalid JSON: {str(e)}'
+            yield record
+            continue
+
+        if isinstance(value, dict):
+            record['prompt'] = value.get(field)
+            if id_field in value:
+                record['id'] = value[id_field]
+        else:
+            record['prompt'] = value
+        yield record
+
+
+def read_csv(stream: TextIO, field: str = 'prompt', id_field: str = 'id',
+             skip: int = 0) -> Iterator[Dict]:
+    """
+    Yield one record per CSV row, starting after the first `skip` rows
+    The prompt is read from column `field`
+    """
+    for index, row in enumerate(islice(csv.DictReader(stream), skip, None), skip):
+        record = {'index': index, 'prompt': row.get(field)}
+        if id_field in row:
+            record['id'] = row[id_field]
+        yield record
+
+
+def _stage(records: Iterable[Dict], step) -> Iterator[Dict]:
+    """
+    Apply one pipeline step to every record that has not failed yet
+    A failing record is tagged with its error and passed along
+    """
+    for record in records:
+        if 'error' not in record:
+            try:
+                step(record)
+            except Exception as e:
+                record['error'] = str(e)
+        yield record
+
+
+def validate(records: Iterable[Dict]) -> Iterator[Dict]:
+    def step(record):
+        if not isinstance(record.get('prompt'), str) or not record['prompt']:
+            raise ValueError('No prompt provided')
+
+    return _stage(records, step)
+
+
+def detect_domains(records: Iterable[Dict], analyzer: NLPAnalyzer) -> Iterator[Dict]:
+    def step(record):
+        domain_result = analyzer.domain_detector.detect_domain(record['prompt'])
+        record['domain'] = domain_result['domain']
+        record['domain_confidence'] = domain_result['confidence']
+
+    return _stage(records, step)
+
+
+def detect_biases(records: Iterable[Dict], analyzer: NLPAnalyzer) -> Iterator[Dict]:
+    def step(record):
+        record['biases_detected'] = analyzer.bias_detector.detect_biases(record['prompt'])
+
+    return _stage(records, step)
+
+
+def score(records: Iterable[Dict], analyzer: NLPAnalyzer) -> Iterator[Dict]:
+    def step(record):
+        record['bias_score'] = analyzer.bias_detector.get_bias_score(record['biases_detected'])
+
+    return _stage(records, step)
+
+
+def rewrite(records: Iterable[Dict], analyzer: NLPAnalyzer) -> Iterator[Dict]:
+    def step(record):
+        result = analyzer.prompt_rewriter.rewrite_prompt(record['prompt'], record['biases_detected'])
+        record['rewritten_prompt'] = result['rewritten']
+        record['changes_made'] = result['changes']
+
+    return _stage(records, step)
+
+
+def score_records(analyzer: NLPAnalyzer, records: Iterable[Dict],
+                  with_rewrite: bool = False) -> Iterator[Dict]:
+    """
+    Chain the pipeline stages lazily over a stream of records
+    Failures are reported on the record instead of stopping the stream
+    """
+    stream = detect_domains(validate(records), analyzer)
+    stream = score(detect_biases(stream, analyzer), analyzer)
+    if with_rewrite:
+        stream = rewrite(stream, analyzer)
+    return stream
+
+
+def score_chunk(analyzer: NLPAnalyzer, records: List[Dict], with_rewrite: bool) -> List[Dict]:
+    """Score one chunk of records; runs inside a batch pool worker"""
+    return list(score_records(analyzer, records, with_rewrite))
+
+
+def chunked(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def score_parallel(pool, records: Iterable[Dict], with_rewrite: bool = False,
+                   chunk_size: int = 256, ordered: bool = True,
+                   max_in_flight: int = None) -> Iterator[Dict]:
+    """
+    Score records on a BatchPool, keeping at most `max_in_flight` chunks
+    queued so memory stays bounded regardless of corpus size
+    """
+    max_in_flight = max_in_flight or pool.max_workers * 2
+    pending = {}
+
+    def collect(future) -> List[Dict]:
+        chunk = pending.pop(future)
+        try:
+            return future.result()
+        except Exception as e:
+            # A crashed worker fails only the records of its chunk
+            for record in chunk:
+                record['error'] = f'Worker failed: {str(e)}'
+            return chunk
+
+    def drain(block_all: bool) -> Iterator[Dict]:
+        while pending and (block_all or len(pending) >= max_in_flight):
+            if ordered:
+                # Dicts keep insertion order, so the first key is the oldest chunk
+                done = [next(iter(pending))]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from collect(future)
+
+    for chunk in chunked(records, chunk_size):
+        pending[pool.submit(score_chunk, chunk, with_rewrite)] = chunk
+        yield from drain(block_all=False)
+
+    yield from drain(block_all=True)
@@ -0,0 +1,62 @@
+"""
+Request Deadlines
+A per-request latency budget passed down to upstream calls, and the
+recent-latency tracker that decides when a hedged request is sent
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class Deadline:
+    """The time by which a request must be answered"""
+
+    def __init__(self, budget: float, clock=time.monotonic):
+        """budget: seconds from now"""
+        self.budget = budget
+        self._clock = clock
+        self.expires_at = clock() + budget
+
+    @classmethod
+    def from_ms(cls, budget_ms) -> Optional['Deadline']:
+        """A deadline budget_ms from now, or None for no budget (0 or None)"""
+        if budget_ms is None or budget_ms == 0:
+            return None
+        return cls(float(budget_ms) / 1000)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self._clock() >= self.expires_at
+
+    def limit(self, seconds: float) -> float:
+        """seconds, cut down to the time remaining"""
+        return min(seconds, self.remaining())
+
+
+class LatencyTracker:
+    """
+    Latencies of recent successful calls; the hedging delay is a high
+    percentile of them, so only the slowest calls get a duplicate
+    """
+
+    def __init__(self, percentile: float = 0.95, window: int = 256, min_samples: int = 20):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self) -> Optional[float]:
+        """The tracked percentile, or None until there are enough samples"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(self.percentile * len(samples)))]
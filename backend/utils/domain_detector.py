@@ -4,10 +4,26 @@ Automatically detects the domain/category of a prompt
 """
 
 import re
-from typing import Dict
+from typing import Dict, List
+
+import numpy as np
+
+from utils.lexicon_store import apply_lexicon
+from utils.pattern_matcher import PatternMatcher, is_word_boundary
+
+# \b(?:word|two words|...)\b patterns, which can be matched as literals
+_LITERAL_ALTERNATION = re.compile(r"\\b\(\?:([\w' |-]+)\)\\b")
+_LITERAL_ALTERNATIVE = re.compile(r"\w(?:[\w' -]*\w)?")
+
+# Constructs whose meaning changes when prompts are joined into one string
+_CONTEXT_SENSITIVE = re.compile(r'\^|\$|\\[AZ]|\(\?<?[=!]')
+
+# Separator between prompts in a batch; '.' never matches it
+_SEPARATOR = '\n'
+
 
 class DomainDetector:
-    def __init__(self):
+    def __init__(self, lexicon: Dict = None):
         # Keywords for different domains
         self.domain_keywords = {
             'political': {
@@ -54,55 +70,211 @@ class DomainDetector:
             }
         }
 
+        # Lexicon fields loaded from a published lexicon file replace the defaults
+        if lexicon:
+            apply_lexicon(self, lexicon)
+
+        self._build_index()
+
+    def _build_index(self):
+        """
+        Compile keywords and literal patterns into a single matcher, with a
+        keyword x domain weight matrix for batch scoring; patterns that are
+        not plain word alternations keep their own regex
+        """
+        self.domains = list(self.domain_keywords) + ['general']
+        self._term_handlers = {}
+
+        def register(term, handler):
+            self._term_handlers.setdefault(term, []).append(handler)
+
+        # Keywords are compared against lowercased text, so ones containing
+        # uppercase letters can never match and are left out of the index
+        keyword_columns = {}
+        for column, data in enumerate(self.domain_keywords.values()):
+            for keyword in data['keywords']:
+                if keyword == keyword.lower():
+                    keyword_columns.setdefault(keyword, []).append(column)
+
+        self._keyword_columns = list(keyword_columns.values())
+        self._keyword_weights = np.zeros((len(keyword_columns), len(self.domains)), dtype=np.int64)
+        for keyword_id, (keyword, columns) in enumerate(keyword_columns.items()):
+            register(keyword, ('keyword', keyword_id, None))
+            for column in columns:
+                self._keyword_weights[keyword_id, column] += 1
+
+        # (column, regex, batchable, literal index) per pattern
+        self._pattern_regexes = []
+        literal_count = 0
+        for column, data in enumerate(self.domain_keywords.values()):
+            for pattern in data['patterns']:
+                regex = re.compile(pattern, re.IGNORECASE)
+                batchable = not _CONTEXT_SENSITIVE.search(pattern)
+                alternatives = _literal_alternatives(pattern)
+                if alternatives:
+                    for alternative_index, alternative in enumerate(alternatives):
+                        register(alternative, ('pattern', literal_count, alternative_index))
+                    self._pattern_regexes.append((column, regex, batchable, literal_count))
+                    literal_count += 1
+                else:
+                    self._pattern_regexes.append((column, regex, batchable, None))
+        self._literal_pattern_count = literal_count
+
+        self._matcher = PatternMatcher(self._term_handlers)
+
+    def _scan(self, text: str):
+        """
+        One matcher pass over lowercased text
+        Returns (position, keyword id) hits and, per literal pattern, the
+        start positions of the matches re.findall would return
+        """
+        keyword_hits = []
+        candidates = [[] for _ in range(self._literal_pattern_count)]
+
+        for start, term in self._matcher.finditer(text):
+            end = start + len(term)
+            for kind, index, alternative_index in self._term_handlers[term]:
+                if kind == 'keyword':
+                    keyword_hits.append((start, index))
+                elif is_word_boundary(text, start, end):
+                    candidates[index].append((start, alternative_index, end))
+
+        # The regex takes the leftmost match, preferring earlier alternatives
+        # at the same position, and never reports overlapping matches
+        pattern_starts = []
+        for pattern_candidates in candidates:
+            starts = []
+            last_end = -1
+            for start, _, end in sorted(pattern_candidates):
+                if start >= last_end:
+                    starts.append(start)
+                    last_end = end
+            pattern_starts.append(starts)
+
+        return keyword_hits, pattern_starts
+
     def detect_domain(self, text: str) -> Dict[str, any]:
         """
         Detect the domain of the given text
         Returns the domain name and confidence score
         """
         text_lower = text.lower()
-        scores = {
-            'political': 0,
-            'science': 0,
-            'medical': 0,
-            'general': 0
-        }
+        scores = np.zeros((1, len(self.domains)), dtype=np.int64)
+        keyword_hits, pattern_starts = self._scan(text_lower)
 
         # Score each domain based on keyword matches
-        for domain, data in self.domain_keywords.items():
-            # Check keywords
-            for keyword in data['keywords']:
-                if keyword in text_lower:
-                    scores[domain] += 1
+        for keyword_id in set(keyword_id for _, keyword_id in keyword_hits):
+            scores[0] += self._keyword_weights[keyword_id]
 
-            # Check regex patterns (worth more points)
-            for pattern in data['patterns']:
-                matches = re.findall(pattern, text_lower, re.IGNORECASE)
-                scores[domain] += len(matches) * 2
-
-        # Determine the domain with highest score
-        max_score = max(scores.values())
-
-        if max_score == 0:
-            detected_domain = 'general'
-            confidence = 'high'
-        else:
-            detected_domain = max(scores, key=scores.get)
-
-            # Calculate confidence based on score difference
-            sorted_scores = sorted(scores.values(), reverse=True)
-            if len(sorted_scores) > 1:
-                score_diff = sorted_scores[0] - sorted_scores[1]
-                if score_diff >= 3:
-                    confidence = 'high'
-                elif score_diff >= 1:
-                    confidence = 'medium'
-                else:
-                    confidence = 'low'
+        # Check regex patterns (worth more points)
+        literals_usable = text_lower.isascii()
+        for column, regex, _, literal_index in self._pattern_regexes:
+            if literal_index is not None and literals_usable:
+                count = len(pattern_starts[literal_index])
             else:
-                confidence = 'high'
+                count = len(regex.findall(text_lower))
+            scores[0, column] += count * 2
 
-        return {
-            'domain': detected_domain,
-            'confidence': confidence,
-            'scores': scores
-        }
+        return self._classify(scores)[0]
+
+    def detect_domains(self, texts: List[str], batch_size: int = 4096) -> List[Dict[str, any]]:
+        """
+        Detect the domains of many texts at once
+        Returns one detect_domain-style result per text, in order
+        """
+        results = []
+        for i in range(0, len(texts), batch_size):
+            scores = self._score_batch(texts[i:i + batch_size])
+            results.extend(self._classify(scores))
+        return results
+
+    def _score_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Build the prompt x domain score matrix for a batch of texts
+        The batch is joined into a single string and scanned once; match
+        positions are mapped back to prompt rows
+        """
+        lowered = [text.lower() for text in texts]
+        corpus = _SEPARATOR.join(lowered)
+        lengths = np.fromiter((len(text) for text in lowered), dtype=np.int64, count=len(lowered))
+        starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+
+        def rows_of(positions):
+            return np.searchsorted(starts, np.asarray(positions, dtype=np.int64), side='right') - 1
+
+        keyword_hits, pattern_starts = self._scan(corpus)
+
+        # Keyword presence (each keyword counts once per prompt, like `in`)
+        presence = np.zeros((len(texts), len(self._keyword_columns)), dtype=np.int64)
+        if keyword_hits:
+            positions, keyword_ids = zip(*keyword_hits)
+            presence[rows_of(positions), list(keyword_ids)] = 1
+        scores = presence @ self._keyword_weights
+
+        # Regex patterns are worth two points per match
+        literals_usable = corpus.isascii()
+        for column, regex, batchable, literal_index in self._pattern_regexes:
+            if literal_index is not None and literals_usable:
+                # Literal alternatives cannot contain the separator
+                scores[:, column] += 2 * np.bincount(rows_of(pattern_starts[literal_index]), minlength=len(texts))
+            elif batchable:
+                scores[:, column] += 2 * self._count_across(regex, corpus, lowered, starts, lengths, rows_of)
+            else:
+                counts = [len(regex.findall(text)) for text in lowered]
+                scores[:, column] += 2 * np.array(counts, dtype=np.int64)
+
+        return scores
+
+    @staticmethod
+    def _count_across(regex, corpus, lowered, starts, lengths, rows_of) -> np.ndarray:
+        """Count the matches of a regex in every prompt of a joined batch"""
+        spans = np.array([match.span() for match in regex.finditer(corpus)], dtype=np.int64).reshape(-1, 2)
+        rows = rows_of(spans[:, 0])
+        counts = np.bincount(rows, minlength=len(lowered))
+
+        # A match running across the separator belongs to no prompt;
+        # recount the prompts it touches on their own
+        crossing = spans[:, 1] > starts[rows] + lengths[rows]
+        for first, last in zip(rows[crossing].tolist(), rows_of(spans[crossing, 1]).tolist()):
+            for row in range(first, last + 1):
+                counts[row] = len(regex.findall(lowered[row]))
+
+        return counts
+
+    def _classify(self, scores: np.ndarray) -> List[Dict[str, any]]:
+        """
+        Pick the top domain of every row and derive confidence from the
+        difference between the two highest scores
+        """
+        best = scores.argmax(axis=1)  # first maximum, like max() over the dict
+        top_two = np.sort(scores, axis=1)[:, -2:]
+        max_scores = top_two[:, 1]
+        score_diff = top_two[:, 1] - top_two[:, 0]
+
+        confidence = np.where(score_diff >= 3, 'high', np.where(score_diff >= 1, 'medium', 'low'))
+        no_match = max_scores == 0
+        confidence[no_match] = 'high'
+        best[no_match] = self.domains.index('general')
+
+        return [
+            {
+                'domain': self.domains[domain_index],
+                'confidence': level,
+                'scores': dict(zip(self.domains, row))
+            }
+            for domain_index, level, row in zip(best.tolist(), confidence.tolist(), scores.tolist())
+        ]
+
+
+def _literal_alternatives(pattern: str) -> List[str]:
+    """
+    Split a \\b(?:a|b c)\\b pattern into its lowercased alternatives
+    Returns an empty list for any other kind of pattern
+    """
+    match = _LITERAL_ALTERNATION.fullmatch(pattern)
+    if not match:
+        return []
+    alternatives = [alternative.lower() for alternative in match.group(1).split('|')]
+    if not all(alternative.isascii() and _LITERAL_ALTERNATIVE.fullmatch(alternative) for alternative in alternatives):
+        return []
+    return alternatives
@@ -3,25 +3,464 @@ Gemini API Client
 Integrates with Google Gemini AI for LLM-powered prompt rewriting
 """
 
-import requests
+import json
 import os
-from typing import Dict, List
+import queue
+import re
+import requests
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Iterator, List, Tuple
+
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+from urllib3.util.timeout import Timeout
+
+from utils.deadline import Deadline, LatencyTracker
+from utils.metrics import metrics
+from utils.micro_batcher import MicroBatcher
+from utils.response_parser import (
+    BATCH_SCHEMA, REWRITE_SCHEMA, IncrementalParser, ParseStats, ResponseParseError,
+    parse_rewrite, validate_rewrite
+)
+from utils.result_cache import ResultCache, make_key, normalize_prompt
+from utils.single_flight import SingleFlight, SingleFlightTimeout
+
+# Bump whenever the instruction text or generation settings change, so
+# cached results from the old prompt are no longer served
+PROMPT_VERSION = 2
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+# Rough characters per token, for sizing batches before sending them
+CHARS_PER_TOKEN = 4
+# Output tokens one batched rewrite needs besides echoing its prompt twice
+# (bias list, changes made, explanation)
+ITEM_OUTPUT_TOKENS = 400
+
+BATCH_PROMPTS_HEADER = "Prompts to analyze and rewrite, one per line:"
+
+MISSING_FROM_BATCH = 'Missing from batched Gemini response'
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def is_failed_result(result: Dict) -> bool:
+    """Error predicate for single flight: rewrite failures are returned, not raised"""
+    return not result.get('success')
+
+def is_retryable(result: Dict) -> bool:
+    """
+    Whether a failed rewrite is worth sending again: rate limited (429), a
+    server (5xx) or network error, or left out of a batched reply
+    """
+    if result.get('error_type') == 'request':
+        status = result.get('status_code')
+        return status is None or status == 429 or status >= 500
+    return result.get('error') == MISSING_FROM_BATCH
+
+def request_failure(error: requests.exceptions.RequestException) -> Dict[str, any]:
+    """The result of a failed API request; status_code is None for network errors"""
+    return {
+        'success': False,
+        'error': f'API request failed: {str(error)}',
+        'error_type': 'request',
+        'status_code': error.response.status_code if error.response is not None else None
+    }
+
+class _PoolTimeoutMixin:
+    """
+    Connection pool that waits for a free connection no longer than the
+    request's connect timeout (already cut to any deadline), then raises
+    ConnectTimeout; requests passes no pool timeout, so it waits forever
+    """
+
+    def urlopen(self, method, url, *args, **kwargs):
+        timeout = kwargs.get('timeout')
+        if kwargs.get('pool_timeout') is None and isinstance(timeout, Timeout):
+            connect = timeout.connect_timeout
+            kwargs['pool_timeout'] = connect if isinstance(connect, (int, float)) else None
+        try:
+            return super().urlopen(method, url, *args, **kwargs)
+        except EmptyPoolError as e:
+            raise requests.exceptions.ConnectTimeout(f'No free connection in the pool: {e}')
+
+class _TimedHTTPConnectionPool(_PoolTimeoutMixin, HTTPConnectionPool):
+    pass
+
+class _TimedHTTPSConnectionPool(_PoolTimeoutMixin, HTTPSConnectionPool):
+    pass
+
+class PoolTimeoutAdapter(HTTPAdapter):
+    """HTTPAdapter whose blocking pools give up after the connect timeout"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
 
 class GeminiClient:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, cache: ResultCache = None,
+                 pool_size: int = 10, connect_timeout: float = 5.0,
+                 read_timeout: float = 30.0, base_url: str = None,
+                 single_flight: SingleFlight = None, batch_max_items: int = 20,
+                 batch_max_input_tokens: int = 30000, batch_max_output_tokens: int = 8192,
+                 micro_batch_wait: float = 0.0, structured_output: bool = True,
+                 hedge_percentile: float = 0.0):
+        """
+        pool_size: keep-alive connections kept per host; it also caps the
+        number of concurrent requests, which wait for a free connection
+        connect_timeout / read_timeout: seconds to establish the connection
+        and to wait for the response
+        single_flight: coalesces concurrent calls for the same prompt/domain
+        batch_max_items / batch_max_input_tokens / batch_max_output_tokens:
+        limits for one batched request; the item limit is halved when a
+        reply comes back truncated and grows back as batches succeed
+        micro_batch_wait: seconds rewrite_prompt_objectively waits to send
+        concurrent calls as one batched request (0 sends each on its own)
+        structured_output: ask for a JSON reply matching a response schema
+        instead of JSON described in the instruction text only
+        hedge_percentile: send a second, identical request when the first
+        has taken longer than this percentile (e.g. 0.95) of recent
+        latencies, and use whichever answers first (0 never hedges)
+        """
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
         self.model = "gemini-2.5-flash"
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models"
+        self.base_url = base_url or os.getenv('GEMINI_BASE_URL') or DEFAULT_BASE_URL
+        self.cache = cache
+        self.single_flight = single_flight
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.session = self._create_session(pool_size)
+        self.structured_output = structured_output
+        self.parse_stats = ParseStats()
+        self.hedge_percentile = hedge_percentile
+        self.latency = LatencyTracker(percentile=hedge_percentile or 0.95)
+        self._attempts_lock = threading.Lock()
+        self._attempts_pid = None
+
+        self.batch_max_items = max(1, batch_max_items)
+        self.batch_max_input_tokens = batch_max_input_tokens
+        self.batch_max_output_tokens = batch_max_output_tokens
+        self.batch_items = self.batch_max_items
+        self._batch_lock = threading.Lock()
+        self.micro_batcher = None
+        if micro_batch_wait > 0:
+            self.micro_batcher = MicroBatcher(self.request_rewrites, max_wait=micro_batch_wait,
+                                              max_batch=self.batch_max_items, max_concurrency=pool_size)
+
+    @staticmethod
+    def _create_session(pool_size: int) -> requests.Session:
+        """A session that reuses TCP/TLS connections across requests"""
+        session = requests.Session()
+        adapter = PoolTimeoutAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({"Content-Type": "application/json"})
+        return session
+
+    def close(self):
+        """Close the pooled connections"""
+        if self.micro_batcher is not None:
+            self.micro_batcher.close()
+        with self._attempts_lock:
+            if self._attempts_pid == os.getpid():
+                self._attempts.shutdown(wait=False)
+            self._attempts_pid = None
+        self.session.close()
 
-    def rewrite_prompt_objectively(self, prompt: str, domain: str = 'general') -> Dict[str, any]:
+    def cache_key(self, prompt: str, domain: str = 'general') -> str:
+        """Key for everything that determines a rewrite result"""
+        return make_key(normalize_prompt(prompt), domain, self.model, PROMPT_VERSION)
+
+    def rewrite_prompt_objectively(self, prompt: str, domain: str = 'general',
+                                   deadline: Deadline = None) -> Dict[str, any]:
         """
         Use Gemini AI to rewrite a prompt to be more objective
+        Successful results are served from the cache when one is configured,
+        and identical concurrent calls share one request with single flight
+        deadline: give up when it passes, with error_type 'deadline'. A call
+        coalesced onto another call's request waits only until its own
+        deadline, and retries if that request ran out of the other's budget
+        """
+        if self.cache is None and self.single_flight is None:
+            return self._send(prompt, domain, deadline)
+
+        key = self.cache_key(prompt, domain)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return dict(cached, cached=True, coalesced=False)
+
+        if self.single_flight is None:
+            return dict(self._fetch(key, prompt, domain, deadline), cached=False, coalesced=False)
+
+        while True:
+            try:
+                if deadline is None:
+                    result, shared = self.single_flight.do(key, self._fetch, key, prompt, domain, deadline)
+                else:
+                    result, shared = self.single_flight.do_within(
+                        deadline.remaining(), key, self._fetch, key, prompt, domain, deadline
+                    )
+            except SingleFlightTimeout as e:
+                if deadline is not None and deadline.expired():
+                    return self._deadline_exceeded()
+                return {'success': False, 'error': str(e)}
+
+            # The leader's deadline says nothing about this call's own budget
+            if shared and result.get('error_type') == 'deadline' and not (deadline and deadline.expired()):
+                continue
+            return dict(result, cached=False, coalesced=shared)
+
+    def rewrite_prompts_batch(self, prompts: List[str], domain: str = 'general') -> List[Dict[str, any]]:
+        """
+        Rewrite many prompts of one domain in as few requests as possible
+        Returns what rewrite_prompt_objectively would for each prompt, in
+        order; cached prompts are not sent and repeated ones are sent once
         """
+        results = [None] * len(prompts)
+        pending = {}
+        for i, prompt in enumerate(prompts):
+            key = self.cache_key(prompt, domain)
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                results[i] = dict(cached, cached=True, coalesced=False)
+            else:
+                pending.setdefault(key, []).append(i)
+
+        keys = list(pending)
+        fetched = self.request_rewrites([prompts[pending[key][0]] for key in keys], domain)
+        for key, result in zip(keys, fetched):
+            if result['success'] and self.cache is not None:
+                self.cache.set(key, result)
+            first, *repeats = pending[key]
+            results[first] = dict(result, cached=False, coalesced=False)
+            for i in repeats:
+                results[i] = dict(result, cached=False, coalesced=True)
+        return results
+
+    def request_rewrites(self, prompts: List[str], domain: str = 'general',
+                         max_retries: int = 2) -> List[Dict[str, any]]:
+        """
+        Rewrite prompts with batched generateContent calls, bypassing the cache
+        Prompts are packed into batches that fit the size limits, and the
+        batches are sent concurrently; prompts that failed with a 429, 5xx
+        or network error, or were missing from the reply, are sent again in
+        new batches, up to max_retries times. Other failures (a rejected
+        request, a blocked or invalid answer) would only fail again.
+        """
+        results = [None] * len(prompts)
+        pending = list(range(len(prompts)))
+        for attempt in range(max_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                metrics.inc('gemini_batch_retries_total', len(pending))
+
+            batches = [[pending[j] for j in batch]
+                       for batch in self._pack_batches([prompts[i] for i in pending], domain)]
+
+            def send(batch):
+                return self._request_batch([prompts[i] for i in batch], domain)
+
+            if len(batches) == 1:
+                replies = [send(batches[0])]
+            else:
+                with ThreadPoolExecutor(min(self.pool_size, len(batches))) as executor:
+                    replies = list(executor.map(send, batches))
+
+            pending = []
+            for batch, reply in zip(batches, replies):
+                for i, result in zip(batch, reply):
+                    results[i] = result
+                    if not result['success'] and is_retryable(result):
+                        pending.append(i)
+        return results
+
+    def stream_rewrite(self, prompt: str, domain: str = 'general',
+                       deadline: Deadline = None) -> Iterator[Tuple[str, any]]:
+        """
+        Rewrite a prompt with streamGenerateContent
+        Yields ('partial', text) for each piece of model output as it
+        arrives and ('field', (name, value)) for each field of the analysis
+        once it is complete and valid, then ('result', result) with what
+        rewrite_prompt_objectively would return; cached results are yielded
+        straight away
+        deadline: stop reading when it passes, with error_type 'deadline'
+        """
+        key = self.cache_key(prompt, domain)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield 'result', dict(cached, cached=True, coalesced=False)
+                return
+
+        timeout = self.timeout
+        if deadline is not None:
+            if deadline.expired():
+                yield 'result', dict(self._deadline_exceeded(), cached=False, coalesced=False)
+                return
+            # requests rejects a zero timeout
+            timeout = tuple(max(0.001, deadline.limit(seconds)) for seconds in self.timeout)
+
+        parts = []
+        parser = IncrementalParser()
+        try:
+            with metrics.stage('gemini_request'):
+                response = self.session.post(self._stream_url(), json=self._build_request(prompt, domain),
+                                             timeout=timeout, stream=True)
+                with response:
+                    response.raise_for_status()
+                    for line in self._stream_lines(response, deadline):
+                        text = self._stream_chunk_text(line)
+                        if text:
+                            parts.append(text)
+                            yield 'partial', text
+                            for field in parser.feed(text):
+                                yield 'field', field
+
+            with metrics.stage('gemini_parse'):
+                result = self._parse_streamed(parser, parts)
+
+        except ResponseParseError as e:
+            # A field failed validation; stop reading the rest of the reply
+            result = self._parse_failure(e, ''.join(parts))
+        except FutureTimeout:
+            result = self._deadline_exceeded()
+        except requests.exceptions.RequestException as e:
+            if deadline is not None and deadline.expired():
+                result = self._deadline_exceeded()
+            else:
+                result = request_failure(e)
+        except Exception as e:
+            result = {
+                'success': False,
+                'error': f'Unexpected error: {str(e)}'
+            }
+
+        if result['success'] and self.cache is not None:
+            self.cache.set(key, result)
+        yield 'result', dict(result, cached=False, coalesced=False)
+
+    def _stream_lines(self, response: requests.Response, deadline: Deadline = None) -> Iterator[bytes]:
+        """
+        The lines of a streamed reply; with a deadline they are read on an
+        attempt thread, so a reply that stalls between chunks raises
+        FutureTimeout when the deadline passes instead of holding the caller
+        """
+        if deadline is None:
+            yield from response.iter_lines()
+            return
+
+        lines = queue.Queue()
+
+        def read():
+            try:
+                for line in response.iter_lines():
+                    lines.put(('line', line))
+                lines.put(('end', None))
+            except Exception as e:
+                # Also how the reader ends when the caller closes the response
+                lines.put(('error', e))
+
+        self._attempt_executor().submit(read)
+        while True:
+            try:
+                kind, value = lines.get(timeout=deadline.remaining())
+            except queue.Empty:
+                raise FutureTimeout()
+            if kind == 'end':
+                return
+            if kind == 'error':
+                raise value
+            yield value
+
+    def _fetch(self, key: str, prompt: str, domain: str, deadline: Deadline = None) -> Dict[str, any]:
+        """Request a rewrite and cache it if it succeeded"""
+        result = self._send(prompt, domain, deadline)
+        if result['success'] and self.cache is not None:
+            self.cache.set(key, result)
+        return result
+
+    def _send(self, prompt: str, domain: str, deadline: Deadline = None) -> Dict[str, any]:
+        """
+        Request a rewrite: in a micro-batch when micro-batching is on,
+        otherwise hedged when hedging is on or there is a deadline to keep
+        """
+        if self.micro_batcher is not None:
+            try:
+                return self.micro_batcher.submit(prompt, domain,
+                                                 timeout=deadline.remaining() if deadline else None)
+            except FutureTimeout:
+                return self._deadline_exceeded()
+        if deadline is None and not self.hedge_percentile:
+            return self._request_rewrite(prompt, domain)
+        return self._send_hedged(prompt, domain, deadline)
+
+    def _send_hedged(self, prompt: str, domain: str, deadline: Deadline = None) -> Dict[str, any]:
+        """
+        Send the request, and a duplicate once the first has been slower
+        than the hedge percentile of recent calls; the first success wins
+        With a deadline, stop waiting when it passes. The requests' own
+        timeouts are cut to the deadline too, so they end soon after.
+        """
+        executor = self._attempt_executor()
+        attempts = {executor.submit(self._request_rewrite, prompt, domain, deadline)}
+        hedge_delay = self.latency.quantile() if self.hedge_percentile else None
+        hedge = None
+        result = None
+        while attempts:
+            timeout = deadline.remaining() if deadline else None
+            if hedge is None and hedge_delay is not None:
+                timeout = hedge_delay if timeout is None else min(timeout, hedge_delay)
+            done, attempts = wait(attempts, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                result = future.result()
+                if result['success']:
+                    if future is hedge:
+                        metrics.inc('gemini_hedge_wins_total')
+                    return result
+
+            if deadline is not None and deadline.expired():
+                return self._deadline_exceeded()
+            if not done and hedge is None and hedge_delay is not None:
+                metrics.inc('gemini_hedges_total')
+                hedge = executor.submit(self._request_rewrite, prompt, domain, deadline)
+                attempts.add(hedge)
+                # Only one duplicate per call, to bound the extra load
+                hedge_delay = None
+        return result
+
+    def _attempt_executor(self) -> ThreadPoolExecutor:
+        """Threads for hedged attempts, created again in a forked child"""
+        with self._attempts_lock:
+            if self._attempts_pid != os.getpid():
+                self._attempts_pid = os.getpid()
+                self._attempts = ThreadPoolExecutor(self.pool_size * 2, thread_name_prefix='gemini-attempt')
+            return self._attempts
+
+    def _deadline_exceeded(self) -> Dict[str, any]:
+        metrics.inc('gemini_deadline_exceeded_total')
+        return {
+            'success': False,
+            'error': 'Deadline exceeded before Gemini answered',
+            'error_type': 'deadline'
+        }
+
+    def _system_instruction(self, domain: str) -> str:
+        """The task description and output format, shared by single and batched requests"""
 
         # Craft system instruction based on domain
         domain_context = self._get_domain_context(domain)
 
-        system_instruction = f"""You are an AI assistant specialized in transforming biased, subjective prompts into objective, neutral inquiries.
+        return f"""You are an AI assistant specialized in transforming biased, subjective prompts into objective, neutral inquiries.
 
 Your task:
 1. Analyze the given prompt for bias, loaded language, presumptions, and subjective framing
@@ -59,65 +498,273 @@ Return your analysis in this exact JSON format:
   "explanation": "brief explanation of the main bias issues"
 }}"""
 
-        # Make API request
-        url = f"{self.base_url}/{self.model}:generateContent?key={self.api_key}"
+    def _build_request(self, prompt: str, domain: str) -> Dict[str, any]:
+        """Build the generateContent request body for a prompt"""
+        system_instruction = self._system_instruction(domain)
 
-        headers = {
-            "Content-Type": "application/json"
+        return {
+            "contents": [{
+                "parts": [{
+                    "text": f"{system_instruction}\n\nPrompt to analyze and rewrite:\n\"{prompt}\""
+                }]
+            }],
+            "generationConfig": self._generation_config(REWRITE_SCHEMA)
         }
 
-        data = {
+    def _build_batch_request(self, prompts: List[str], domain: str) -> Dict[str, any]:
+        """Build one generateContent request body for several prompts"""
+        system_instruction = self._system_instruction(domain)
+        numbered = '\n'.join(f'[{i}] {json.dumps(prompt)}' for i, prompt in enumerate(prompts))
+
+        batch_instruction = f"""You will receive {len(prompts)} prompts, numbered [0] to [{len(prompts) - 1}], each written as a JSON string.
+Analyze and rewrite each prompt independently of the others.
+Return a single JSON object of the form {{"results": [...]}} with one entry per prompt, in the exact JSON format above plus an "index" field holding the prompt's number."""
+
+        return {
             "contents": [{
                 "parts": [{
-                    "text": f"{system_instruction}\n\nPrompt to analyze and rewrite:\n\"{prompt}\""
+                    "text": f"{system_instruction}\n\n{batch_instruction}\n\n{BATCH_PROMPTS_HEADER}\n{numbered}"
                 }]
             }],
-            "generationConfig": {
-                "temperature": 0.3,  # Lower temperature for more consistent results
-                "topP": 0.8,
-                "topK": 40
-            }
+            "generationConfig": dict(self._generation_config(BATCH_SCHEMA),
+                                     maxOutputTokens=self.batch_max_output_tokens)
         }
 
+    def _generation_config(self, schema: Dict) -> Dict[str, any]:
+        config = {
+            "temperature": 0.3,  # Lower temperature for more consistent results
+            "topP": 0.8,
+            "topK": 40
+        }
+        if self.structured_output:
+            config["responseMimeType"] = "application/json"
+            config["responseSchema"] = schema
+        return config
+
+    def _pack_batches(self, prompts: List[str], domain: str) -> List[List[int]]:
+        """
+        Group prompt positions into batches within the item and estimated
+        token limits; a prompt too large for any batch is sent on its own
+        """
+        with self._batch_lock:
+            max_items = self.batch_items
+        overhead = estimate_tokens(self._system_instruction(domain)) + 100
+
+        batches, batch = [], []
+        input_tokens, output_tokens = overhead, 0
+        for i, prompt in enumerate(prompts):
+            tokens = estimate_tokens(prompt)
+            # The reply repeats the prompt and adds its rewrite
+            item_input, item_output = tokens + 4, 2 * tokens + ITEM_OUTPUT_TOKENS
+            if batch and (len(batch) >= max_items
+                          or input_tokens + item_input > self.batch_max_input_tokens
+                          or output_tokens + item_output > self.batch_max_output_tokens):
+                batches.append(batch)
+                batch, input_tokens, output_tokens = [], overhead, 0
+            batch.append(i)
+            input_tokens += item_input
+            output_tokens += item_output
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _adapt_batch_size(self, size: int, truncated: bool):
+        """Halve the item limit after a truncated reply, grow it after a full one"""
+        with self._batch_lock:
+            if truncated:
+                self.batch_items = max(1, min(self.batch_items, size) // 2)
+            elif size >= self.batch_items:
+                self.batch_items = min(self.batch_max_items, self.batch_items + 1)
+
+    def _request_batch(self, prompts: List[str], domain: str) -> List[Dict[str, any]]:
+        """One generateContent call for several prompts; returns a result per prompt"""
+        if len(prompts) == 1:
+            return [self._request_rewrite(prompts[0], domain)]
+
+        data = self._build_batch_request(prompts, domain)
+
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=30)
-            response.raise_for_status()
-
-            result = response.json()
-            gemini_response = result['candidates'][0]['content']['parts'][0]['text']
-
-            # Parse the JSON response from Gemini
-            import json
-            import re
-
-            # Extract JSON from response (sometimes Gemini wraps it in markdown)
-            json_match = re.search(r'\{[\s\S]*\}', gemini_response)
-            if json_match:
-                parsed_result = json.loads(json_match.group())
-                return {
-                    'success': True,
-                    'data': parsed_result,
-                    'raw_response': gemini_response
-                }
-            else:
-                # Fallback if JSON parsing fails
-                return {
-                    'success': False,
-                    'error': 'Could not parse Gemini response',
-                    'raw_response': gemini_response
-                }
+            with metrics.stage('gemini_request'):
+                response = self.session.post(self._request_url(), json=data, timeout=self.timeout)
+                response.raise_for_status()
+                result = response.json()
+
+            with metrics.stage('gemini_parse'):
+                results, truncated = self._parse_batch_result(result, len(prompts))
 
+        except ResponseParseError as e:
+            return [self._parse_failure(e, '') for _ in prompts]
         except requests.exceptions.RequestException as e:
-            return {
-                'success': False,
-                'error': f'API request failed: {str(e)}'
-            }
+            return [request_failure(e) for _ in prompts]
+        except Exception as e:
+            return [{'success': False, 'error': f'Unexpected error: {str(e)}'} for _ in prompts]
+
+        self._adapt_batch_size(len(prompts), truncated)
+        succeeded = sum(1 for item in results if item['success'])
+        metrics.inc('gemini_batch_requests_total')
+        metrics.inc('gemini_batch_items_total', succeeded, outcome='ok')
+        metrics.inc('gemini_batch_items_total', len(results) - succeeded, outcome='failed')
+        return results
+
+    def _request_rewrite(self, prompt: str, domain: str, deadline: Deadline = None) -> Dict[str, any]:
+        """Call the Gemini API and parse its JSON answer"""
+
+        # Make API request over a pooled keep-alive connection
+        url = self._request_url()
+
+        data = self._build_request(prompt, domain)
+
+        timeout = self.timeout
+        if deadline is not None:
+            if deadline.expired():
+                return self._deadline_exceeded()
+            # requests rejects a zero timeout
+            timeout = tuple(max(0.001, deadline.limit(seconds)) for seconds in self.timeout)
+
+        try:
+            started = time.perf_counter()
+            with metrics.stage('gemini_request'):
+                response = self.session.post(url, json=data, timeout=timeout)
+                response.raise_for_status()
+                result = response.json()
+            self.latency.record(time.perf_counter() - started)
+
+            with metrics.stage('gemini_parse'):
+                return self._parse_result(result)
+
+        except requests.exceptions.RequestException as e:
+            if deadline is not None and deadline.expired():
+                return self._deadline_exceeded()
+            return request_failure(e)
         except Exception as e:
             return {
                 'success': False,
                 'error': f'Unexpected error: {str(e)}'
             }
 
+    def _request_url(self) -> str:
+        return f"{self.base_url}/{self.model}:generateContent?key={self.api_key}"
+
+    def _stream_url(self) -> str:
+        return f"{self.base_url}/{self.model}:streamGenerateContent?alt=sse&key={self.api_key}"
+
+    @staticmethod
+    def _stream_chunk_text(line: bytes) -> str:
+        """Model output text in one line of a streamGenerateContent SSE reply"""
+        if not line.startswith(b'data:'):
+            return ''
+        chunk = json.loads(line[5:])
+        candidates = chunk.get('candidates') or [{}]
+        parts = candidates[0].get('content', {}).get('parts') or []
+        return ''.join(part.get('text', '') for part in parts)
+
+    def _parse_streamed(self, parser: IncrementalParser, parts: List[str]) -> Dict[str, any]:
+        """The result of a streamed reply, once all of it has been fed to parser"""
+        gemini_response = ''.join(parts)
+        try:
+            return self._parsed(parser.result(), gemini_response)
+        except ResponseParseError as e:
+            return self._parse_failure(e, gemini_response)
+
+    def _parse_result(self, result: Dict) -> Dict[str, any]:
+        """Extract the validated JSON analysis from a generateContent response body"""
+        gemini_response = ''
+        try:
+            _, gemini_response = self._candidate_text(result)
+            # Also handles replies wrapped in markdown or followed by prose
+            return self._parsed(parse_rewrite(gemini_response), gemini_response)
+        except ResponseParseError as e:
+            return self._parse_failure(e, gemini_response)
+
+    @staticmethod
+    def _candidate_text(result: Dict) -> Tuple[Dict, str]:
+        """
+        The first candidate of a generateContent response body and its text
+        Raises ResponseParseError when there is none (e.g. a blocked prompt)
+        """
+        candidates = result.get('candidates') or [{}]
+        parts = candidates[0].get('content', {}).get('parts') or []
+        if not parts:
+            reason = result.get('promptFeedback', {}).get('blockReason')
+            raise ResponseParseError('no_candidates', 'Gemini returned no candidates'
+                                     + (f' (blocked: {reason})' if reason else ''))
+        return candidates[0], ''.join(part.get('text', '') for part in parts)
+
+    def _parsed(self, data: Dict, raw_response: str) -> Dict[str, any]:
+        self.parse_stats.record()
+        return {
+            'success': True,
+            'data': data,
+            'raw_response': raw_response
+        }
+
+    def _parse_failure(self, error: ResponseParseError, raw_response: str) -> Dict[str, any]:
+        self.parse_stats.record(error.kind)
+        return {
+            'success': False,
+            'error': f'Could not parse Gemini response: {error}',
+            'error_type': 'parse',
+            'raw_response': raw_response
+        }
+
+    def _parse_batch_result(self, result: Dict, count: int) -> Tuple[List[Dict[str, any]], bool]:
+        """
+        Split a batched generateContent response into one result per prompt
+        Returns (results, truncated); prompts the reply left out or answered
+        with an invalid entry get a failed result
+        Raises ResponseParseError when the reply has no candidates
+        """
+        candidate, text = self._candidate_text(result)
+        items, complete = self._split_batch_items(text)
+
+        results = [None] * count
+        for item in items:
+            index = item.get('index') if isinstance(item, dict) else None
+            if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < count:
+                continue
+            if results[index] is not None and results[index]['success']:
+                continue
+            data = {key: value for key, value in item.items() if key != 'index'}
+            try:
+                results[index] = self._parsed(validate_rewrite(data), json.dumps(data))
+            except ResponseParseError as e:
+                results[index] = self._parse_failure(e, json.dumps(item))
+                results[index]['error'] = f'Invalid entry in batched Gemini response: {e}'
+
+        truncated = candidate.get('finishReason') == 'MAX_TOKENS' or not complete
+        for index in range(count):
+            if results[index] is None:
+                self.parse_stats.record('truncated' if truncated else 'missing_field')
+                results[index] = {'success': False, 'error': MISSING_FROM_BATCH, 'error_type': 'parse'}
+        return results, truncated
+
+    @staticmethod
+    def _split_batch_items(text: str) -> Tuple[List, bool]:
+        """
+        Decode the entries of the results array in a batched reply one at a
+        time, so the complete ones survive a reply that was cut off
+        Returns (entries, whether the array was closed)
+        """
+        match = re.search(r'"results"\s*:\s*\[', text)
+        position = match.end() if match else text.find('[') + 1
+        if not position:
+            return [], False
+
+        decoder = json.JSONDecoder()
+        items = []
+        while True:
+            while position < len(text) and text[position] in ' \t\r\n,':
+                position += 1
+            if position >= len(text):
+                return items, False
+            if text[position] == ']':
+                return items, True
+            try:
+                item, position = decoder.raw_decode(text, position)
+            except ValueError:
+                return items, False
+            items.append(item)
+
     def _get_domain_context(self, domain: str) -> str:
         """Get domain-specific context for the AI"""
 
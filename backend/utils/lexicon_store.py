@@ -0,0 +1,229 @@
+"""
+Lexicon Store
+Keeps the word lists, replacement maps and domain keywords of the NLP
+components in one versioned file, so they can be changed without a
+redeploy; processes watch the file and swap in newly published versions
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+# Bump when the file layout changes
+LEXICON_FORMAT = 1
+
+# The public attributes of each component that make up its lexicon
+LEXICON_FIELDS = {
+    'BiasDetector': [
+        'subjective_words', 'loaded_terms', 'absolutist_patterns',
+        'confirmation_phrases', 'presumption_patterns', 'leading_question_cues'
+    ],
+    'PromptRewriter': [
+        'neutral_replacements', 'question_patterns', 'presumption_patterns',
+        'absolutist_replacements'
+    ],
+    'DomainDetector': ['domain_keywords']
+}
+
+
+class LexiconError(ValueError):
+    """A lexicon file or source that cannot be used"""
+
+
+def apply_lexicon(component, lexicon: Dict[str, any]):
+    """
+    Overwrite a component's built-in lexicon fields before it compiles
+    them; fields missing from lexicon keep their defaults
+    """
+    name = type(component).__name__
+    for field, value in lexicon.items():
+        if field not in LEXICON_FIELDS[name]:
+            raise LexiconError(f'{name} has no lexicon field {field!r}')
+        default = getattr(component, field)
+        # JSON has no sets or tuples
+        if isinstance(default, set):
+            value = set(value)
+        elif isinstance(default, list) and default and isinstance(default[0], tuple):
+            value = [tuple(item) for item in value]
+        setattr(component, field, value)
+
+
+def export_lexicon(component) -> Dict[str, any]:
+    """A component's lexicon fields in JSON-ready form (sets sorted, tuples as lists)"""
+    lexicon = {}
+    for field in LEXICON_FIELDS[type(component).__name__]:
+        value = getattr(component, field)
+        if isinstance(value, set):
+            value = sorted(value)
+        elif isinstance(value, list):
+            value = [list(item) if isinstance(item, tuple) else item for item in value]
+        lexicon[field] = value
+    return lexicon
+
+
+def build_components(lexicons: Dict[str, Dict] = None) -> Dict[str, any]:
+    """
+    Build the NLP components from a file's lexicons (built-in defaults
+    when None), as NLPAnalyzer keyword arguments
+    """
+    from models.bias_detector import BiasDetector
+    from models.prompt_rewriter import PromptRewriter
+    from utils.domain_detector import DomainDetector
+
+    lexicons = lexicons or {}
+    unknown = set(lexicons) - set(LEXICON_FIELDS)
+    if unknown:
+        raise LexiconError(f'Unknown lexicon component(s): {", ".join(sorted(unknown))}')
+    return {
+        'bias_detector': BiasDetector(lexicons.get('BiasDetector')),
+        'prompt_rewriter': PromptRewriter(lexicons.get('PromptRewriter')),
+        'domain_detector': DomainDetector(lexicons.get('DomainDetector'))
+    }
+
+
+def compile_lexicon(source: Dict[str, Dict], version: int) -> Dict[str, any]:
+    """
+    Validate a source lexicon by building every component from it (which
+    compiles each regex) and return the complete, normalized document to
+    publish, with every field filled in and a checksum of the lexicons
+    """
+    try:
+        components = build_components(source)
+    except LexiconError:
+        raise
+    except Exception as e:
+        raise LexiconError(f'Invalid lexicon: {e}') from e
+
+    lexicons = {type(component).__name__: export_lexicon(component) for component in components.values()}
+    payload = json.dumps(lexicons, sort_keys=True)
+    return {
+        'format': LEXICON_FORMAT,
+        'version': version,
+        'checksum': hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16],
+        'lexicons': lexicons
+    }
+
+
+def read_lexicon(path: str) -> Dict[str, any]:
+    """Read and check a published lexicon file"""
+    with open(path, 'rb') as f:
+        try:
+            document = json.loads(f.read())
+        except ValueError as e:
+            raise LexiconError(f'{path} is not a lexicon file: {e}') from e
+
+    if not isinstance(document, dict) or document.get('format') != LEXICON_FORMAT:
+        raise LexiconError(f'{path} is not a format {LEXICON_FORMAT} lexicon file')
+    payload = json.dumps(document['lexicons'], sort_keys=True)
+    if hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16] != document.get('checksum'):
+        raise LexiconError(f'{path} failed its checksum')
+    return document
+
+
+def publish_lexicon(path: str, source: Dict[str, Dict], version: int = None) -> Dict[str, any]:
+    """
+    Compile a source lexicon and atomically replace the file at path
+    with it; the version defaults to one past the published one
+    Returns the published document
+    """
+    if version is None:
+        try:
+            version = read_lexicon(path)['version'] + 1
+        except (OSError, LexiconError):
+            version = 1
+    document = compile_lexicon(source, version)
+
+    # Readers see either the old file or the new one, never a partial write
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.lexicon-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(document, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file readable by its owner only
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return document
+
+
+class LexiconStore:
+    def __init__(self, path: str, check_interval: float = 2.0):
+        """
+        Watches a published lexicon file; check() looks at the file at
+        most once per check_interval seconds
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.version = None
+        self.checksum = None
+        self._signature = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'reloads': 0, 'reload_failures': 0, 'last_reload_ms': None, 'last_error': None}
+
+    def _file_signature(self):
+        stat = os.stat(self.path)
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def load(self) -> Dict[str, any]:
+        """
+        Build components from the current file
+        Returns NLPAnalyzer keyword arguments
+        """
+        with self._lock:
+            return self._load(self._file_signature())
+
+    def _load(self, signature) -> Dict[str, any]:
+        start = time.perf_counter()
+        document = read_lexicon(self.path)
+        components = build_components(document['lexicons'])
+        self._signature = signature
+        self.version = document['version']
+        self.checksum = document['checksum']
+        self._stats['last_reload_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        return components
+
+    def check(self) -> Optional[Dict[str, any]]:
+        """
+        Components built from a newly published file, or None when the
+        file is unchanged (or was checked too recently); a file that can't
+        be loaded is skipped and the current components stay in use
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return None
+        # Only one caller checks; the others go on with the current version
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            self._next_check = now + self.check_interval
+            try:
+                signature = self._file_signature()
+            except OSError:
+                return None
+            if signature == self._signature:
+                return None
+            try:
+                components = self._load(signature)
+            except Exception as e:
+                # Don't retry the same broken file on every check
+                self._signature = signature
+                self._stats['reload_failures'] += 1
+                self._stats['last_error'] = str(e)
+                return None
+            self._stats['reloads'] += 1
+            return components
+        finally:
+            self._lock.release()
+
+    def get_stats(self) -> Dict[str, any]:
+        return dict(self._stats, version=self.version, checksum=self.checksum, path=self.path)
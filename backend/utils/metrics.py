@@ -0,0 +1,214 @@
+"""
+Metrics Module
+Per-stage timers, request/error counters and latency histograms for the
+analyze pipeline, exported in the Prometheus text format. A per-request
+timing breakdown can be collected for debugging.
+
+When disabled, stage() hands back a shared no-op context manager, so the
+instrumented code pays one method call per stage.
+"""
+
+import bisect
+import contextvars
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; spans sub-millisecond NLP stages up to slow Gemini calls
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+# Stage timings of the current request, when a breakdown was requested
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'stage', 'timings', 'start')
+
+    def __init__(self, metrics, stage: str, timings: Optional[Dict]):
+        self.metrics = metrics
+        self.stage = stage
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if self.metrics.enabled:
+            self.metrics.observe('analyze_stage_seconds', elapsed, stage=self.stage)
+        if self.timings is not None:
+            self.timings[self.stage] = self.timings.get(self.stage, 0.0) + elapsed
+        return False
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self, enabled: bool = True, prefix: str = 'prompt_analyzer'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        # name -> {label tuple: value}
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def stage(self, name: str):
+        """Context manager timing one pipeline stage"""
+        timings = _request_timings.get()
+        if not self.enabled and timings is None:
+            return _NULL_TIMER
+        return _StageTimer(self, name, timings)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List]]]):
+        """
+        Add a callback run at export time, returning
+        (name, type, help, [(labels dict, value), ...]) tuples
+        (e.g. cache counters that live elsewhere)
+        """
+        self._collectors.append(collector)
+
+    def start_request_timing(self):
+        """Collect a per-stage breakdown for the current request"""
+        return _request_timings.set({})
+
+    def finish_request_timing(self, token) -> Dict[str, float]:
+        """Stop collecting and return the breakdown in milliseconds"""
+        timings = _request_timings.get() or {}
+        _request_timings.reset(token)
+        return {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {key: (h.buckets, list(h.counts), h.sum, h.count) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+
+        for name, series in sorted(counters.items()):
+            full_name = f'{self.prefix}_{name}'
+            self._header(lines, full_name, name, 'counter')
+            for key, value in sorted(series.items()):
+                lines.append(f'{full_name}{_labels(dict(key))} {_number(value)}')
+
+        for name, series in sorted(histograms.items()):
+            full_name = f'{self.prefix}_{name}'
+            self._header(lines, full_name, name, 'histogram')
+            for key, (buckets, counts, total, count) in sorted(series.items()):
+                labels = dict(key)
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{full_name}_bucket{_labels(dict(labels, le=_number(bound)))} {cumulative}')
+                lines.append(f'{full_name}_bucket{_labels(dict(labels, le="+Inf"))} {count}')
+                lines.append(f'{full_name}_sum{_labels(labels)} {_number(total)}')
+                lines.append(f'{full_name}_count{_labels(labels)} {count}')
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                full_name = f'{self.prefix}_{name}'
+                lines.append(f'# HELP {full_name} {help_text}')
+                lines.append(f'# TYPE {full_name} {metric_type}')
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f'{full_name}{_labels(labels)} {_number(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+    def _header(self, lines: List[str], full_name: str, name: str, metric_type: str):
+        if name in self._help:
+            lines.append(f'# HELP {full_name} {self._help[name]}')
+        lines.append(f'# TYPE {full_name} {metric_type}')
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels: Dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Process-wide registry used by the models and the API
+metrics = Metrics(enabled=os.getenv('METRICS_ENABLED', '1') == '1')
+metrics.describe('analyze_stage_seconds', 'Time spent in each analyze pipeline stage')
+metrics.describe('analyze_requests_total', 'Analyze requests by mode and detected domain')
+metrics.describe('analyze_errors_total', 'Failed analyze requests by mode, domain and status')
+metrics.describe('analyze_request_seconds', 'End-to-end analyze latency by mode')
+
+
+def record_analyze(mode: str, payload: Dict, status: int, seconds: float):
+    """Count one /api/analyze request and observe its latency"""
+    if not metrics.enabled:
+        return
+    # Unknown modes are served as NLP; keeps label values bounded
+    mode = mode if mode in ('ai', 'hybrid', 'ml') else 'nlp'
+    domain = payload.get('domain', 'unknown') if isinstance(payload, dict) else 'unknown'
+    metrics.inc('analyze_requests_total', mode=mode, domain=domain)
+    if status >= 400:
+        metrics.inc('analyze_errors_total', mode=mode, domain=domain, status=status)
+    metrics.observe('analyze_request_seconds', seconds, mode=mode)
@@ -0,0 +1,133 @@
+"""
+Micro-Batching Module
+Gathers concurrent single-prompt rewrite calls for a few milliseconds and
+sends each group as one batched Gemini request
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Callable, Dict, List
+
+from utils.metrics import metrics
+
+
+class MicroBatcher:
+    def __init__(self, request_batch: Callable[[List[str], str], List[Dict]],
+                 max_wait: float = 0.005, max_batch: int = 20, max_concurrency: int = 10):
+        """
+        request_batch: sends prompts of one domain together and returns one
+            result per prompt, in order (GeminiClient.request_rewrites)
+        max_wait: seconds the first call of a batch waits for others
+        max_batch: calls gathered at most before the batch is sent
+        max_concurrency: batches sent at once
+        """
+        self.request_batch = request_batch
+        self.max_wait = max_wait
+        self.max_batch = max(1, max_batch)
+        self.max_concurrency = max_concurrency
+        self.stats = {'calls': 0, 'batches': 0, 'largest_batch': 0, 'abandoned': 0}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self):
+        """Start the collector thread, again in a forked child that lost it"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix='gemini-batch')
+            threading.Thread(target=self._collect, args=(self._queue, self._executor),
+                             name='gemini-micro-batcher', daemon=True).start()
+
+    def submit(self, prompt: str, domain: str = 'general', timeout: float = None) -> Dict[str, any]:
+        """
+        Queue a prompt and block until its batch has been answered
+        Raises concurrent.futures.TimeoutError after timeout seconds; a
+        prompt whose batch has not been sent by then is left out of it
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((prompt, domain, future))
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            # Too late to cancel once the batch is on its way
+            if not future.cancel() and future.done():
+                return future.result()
+            raise
+
+    def close(self):
+        """Stop the collector; calls already queued are still answered"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._pid = None
+            self._queue.put(None)
+
+    def get_stats(self) -> Dict[str, any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['average_batch'] = round(stats['calls'] / stats['batches'], 2) if stats['batches'] else 0.0
+        return stats
+
+    def _collect(self, calls: queue.Queue, executor: ThreadPoolExecutor):
+        while True:
+            first = calls.get()
+            if first is None:
+                break
+
+            # Gather whatever else arrives within max_wait of the first call
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    call = calls.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if call is None:
+                    stop = True
+                    break
+                batch.append(call)
+
+            # One request per domain, since the instruction depends on it
+            by_domain = {}
+            for call in batch:
+                by_domain.setdefault(call[1], []).append(call)
+            for domain, domain_calls in by_domain.items():
+                executor.submit(self._dispatch, domain, domain_calls)
+            if stop:
+                break
+        executor.shutdown(wait=False)
+
+    def _dispatch(self, domain: str, calls: List):
+        # Drop calls whose caller gave up while the batch waited to be sent
+        live = [call for call in calls if call[2].set_running_or_notify_cancel()]
+        with self._lock:
+            self.stats['abandoned'] += len(calls) - len(live)
+        if len(live) < len(calls):
+            metrics.inc('gemini_micro_batch_abandoned_total', len(calls) - len(live))
+        calls = live
+        if not calls:
+            return
+
+        with self._lock:
+            self.stats['calls'] += len(calls)
+            self.stats['batches'] += 1
+            self.stats['largest_batch'] = max(self.stats['largest_batch'], len(calls))
+        metrics.inc('gemini_micro_batches_total')
+        metrics.inc('gemini_micro_batch_calls_total', len(calls))
+
+        try:
+            results = self.request_batch([prompt for prompt, _, _ in calls], domain)
+        except Exception as e:
+            results = [{'success': False, 'error': f'Unexpected error: {str(e)}'}] * len(calls)
+        for (_, _, future), result in zip(calls, results):
+            future.set_result(result)
@@ -0,0 +1,65 @@
+"""
+Model Registry
+Builds the API's models on first use (or all at once in a warm-up hook)
+and records how long each one took to load
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        # Re-entrant: a factory may fetch the models it depends on
+        self._lock = threading.RLock()
+        self.load_times = {}
+
+    def register(self, name: str, factory: Callable[[], object]):
+        """Register a zero-argument factory that builds a model"""
+        self._factories[name] = factory
+
+    def get(self, name: str):
+        """Return a model, building it on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self.load_times[name] = round(time.perf_counter() - start, 4)
+            return self._instances[name]
+
+    def replace(self, name: str, instance):
+        """
+        Swap in a new instance of a model; callers that already fetched
+        the old one keep using it
+        """
+        with self._lock:
+            self._instances[name] = instance
+
+    def warm_up(self, names: List[str] = None) -> float:
+        """
+        Build all (or the given) models now
+        Returns the time taken in seconds
+        """
+        start = time.perf_counter()
+        for name in names or list(self._factories):
+            self.get(name)
+        return time.perf_counter() - start
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def status(self) -> Dict[str, any]:
+        return {
+            name: {
+                'loaded': name in self._instances,
+                'load_seconds': self.load_times.get(name)
+            }
+            for name in self._factories
+        }
@@ -0,0 +1,86 @@
+"""
+NLTK Resource Management
+Checks for locally installed NLTK data without touching the network;
+downloading is an explicit, opt-in step
+"""
+
+import os
+import sys
+from typing import Dict, List
+
+# Resource name -> path inside nltk_data
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'averaged_perceptron_tagger': 'taggers/averaged_perceptron_tagger'
+}
+
+
+def _nltk_data_paths() -> List[str]:
+    """The directories nltk.data searches by default, in the same order"""
+    paths = [path for path in os.environ.get('NLTK_DATA', '').split(os.pathsep) if path]
+    paths.append(os.path.expanduser('~/nltk_data'))
+    if sys.platform.startswith('win'):
+        paths += [
+            os.path.join(sys.prefix, 'nltk_data'),
+            os.path.join(sys.prefix, 'share', 'nltk_data'),
+            os.path.join(sys.prefix, 'lib', 'nltk_data'),
+            os.path.join(os.environ.get('APPDATA', 'C:\\'), 'nltk_data'),
+            r'C:\nltk_data', r'D:\nltk_data', r'E:\nltk_data'
+        ]
+    else:
+        paths += [
+            os.path.join(sys.prefix, 'nltk_data'),
+            os.path.join(sys.prefix, 'share', 'nltk_data'),
+            os.path.join(sys.prefix, 'lib', 'nltk_data'),
+            '/usr/share/nltk_data',
+            '/usr/local/share/nltk_data',
+            '/usr/lib/nltk_data',
+            '/usr/local/lib/nltk_data'
+        ]
+    return paths
+
+
+def check_nltk_resources() -> Dict[str, bool]:
+    """
+    Report which NLTK resources are installed locally
+    Only local files are checked; NLTK itself is not imported unless some
+    other module already did (importing it takes over a second)
+    """
+    nltk = sys.modules.get('nltk')
+    status = {}
+    for name, path in NLTK_RESOURCES.items():
+        if nltk is not None:
+            try:
+                nltk.data.find(path)
+                status[name] = True
+            except LookupError:
+                status[name] = False
+        else:
+            status[name] = any(
+                os.path.exists(os.path.join(root, path)) or os.path.exists(os.path.join(root, path + '.zip'))
+                for root in _nltk_data_paths()
+            )
+    return status
+
+
+def download_nltk_resources(names: List[str] = None) -> Dict[str, bool]:
+    """
+    Download missing NLTK resources
+    Returns the resource status after downloading
+    """
+    import nltk
+    import ssl
+
+    # Fix SSL certificate issue for NLTK downloads
+    try:
+        _create_unverified_https_context = ssl._create_unverified_context
+    except AttributeError:
+        pass
+    else:
+        ssl._create_default_https_context = _create_unverified_https_context
+
+    status = check_nltk_resources()
+    for name in names or list(NLTK_RESOURCES):
+        if not status.get(name):
+            nltk.download(name, quiet=True)
+    return check_nltk_resources()
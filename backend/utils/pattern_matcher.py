@@ -0,0 +1,105 @@
+"""
+Pattern Matcher Module
+Compiles a lexicon of literal terms into a single regex that finds every
+(possibly overlapping) occurrence of every term in one pass over the text
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+_REGEX_METACHARS = set('.^$*+?{}[]\\|()')
+
+
+def literal_prefix(pattern: str) -> str:
+    """Return the literal text every match of a regex must start with"""
+    prefix = []
+    for char in pattern:
+        if char in _REGEX_METACHARS:
+            # A quantifier makes the preceding literal optional
+            if char in '?*{' and prefix:
+                prefix.pop()
+            break
+        prefix.append(char)
+    return ''.join(prefix)
+
+
+def is_word_char(char: str) -> bool:
+    # Same definition of a word character as the re module's \w
+    return char.isalnum() or char == '_'
+
+
+def is_word_boundary(text: str, start: int, end: int) -> bool:
+    """Equivalent of wrapping the span text[start:end] in \\b...\\b"""
+    if start > 0 and is_word_char(text[start - 1]):
+        return False
+    if end < len(text) and is_word_char(text[end]):
+        return False
+    return True
+
+
+def trie_pattern(terms: Iterable[str]) -> str:
+    """
+    Build a prefix-factored regex alternation for a set of literal terms
+    (e.g. 'all', 'always' -> 'al(?:l|ways)'), so the regex engine walks a
+    trie instead of trying every term at every position
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def to_regex(node: Dict) -> str:
+        terminal = '' in node
+        branches = [
+            re.escape(char) + to_regex(child)
+            for char, child in sorted(node.items())
+            if char != ''
+        ]
+        if not branches:
+            return ''
+
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            # Greedy optional: the longer continuation is tried first
+            if len(branches) == 1 and len(body) > 1:
+                body = '(?:' + body + ')'
+            return body + '?'
+        return body
+
+    return to_regex(trie)
+
+
+class PatternMatcher:
+    def __init__(self, terms: Iterable[str]):
+        self.terms = sorted(set(term for term in terms if term), key=len, reverse=True)
+
+        # Every term that can start at the same position as a longer term
+        # is a prefix of it, so one lookahead hit yields all of them
+        self._prefixes = {
+            term: [other for other in self.terms if term.startswith(other)]
+            for term in self.terms
+        }
+
+        if self.terms:
+            self._regex = re.compile('(?=(' + trie_pattern(self.terms) + '))')
+        else:
+            self._regex = None
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (position, term) for every occurrence of every term, in order
+        of position (longest term first at the same position)
+        """
+        if self._regex is None:
+            return
+        prefixes = self._prefixes
+        for match in self._regex.finditer(text):
+            start = match.start()
+            for term in prefixes[match.group(1)]:
+                yield start, term
+
+    def findall(self, text: str) -> List[Tuple[int, str]]:
+        """Return all (position, term) occurrences as a list"""
+        return list(self.finditer(text))
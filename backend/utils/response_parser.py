@@ -0,0 +1,367 @@
+"""
+Gemini Response Parser
+Extracts and validates the JSON analysis in Gemini's output, either from
+a complete reply or field by field as a streamed reply arrives
+"""
+
+import json
+import re
+import threading
+from typing import Dict, List, Tuple
+
+from utils.metrics import metrics
+
+BIAS_TYPES = [
+    'subjective_language', 'loaded_terms', 'absolutist_language',
+    'confirmation_bias', 'leading_questions', 'presumptive_language'
+]
+
+# responseSchema for structured output (the OpenAPI subset Gemini accepts);
+# rewritten_prompt comes early so streamed replies deliver it first
+REWRITE_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'original_prompt': {'type': 'STRING'},
+        'rewritten_prompt': {'type': 'STRING'},
+        'biases_found': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'type': {'type': 'STRING', 'enum': BIAS_TYPES},
+                    'example': {'type': 'STRING'}
+                },
+                'required': ['type', 'example']
+            }
+        },
+        'changes_made': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+        'bias_score': {'type': 'INTEGER', 'minimum': 0, 'maximum': 100},
+        'explanation': {'type': 'STRING'}
+    },
+    'required': ['original_prompt', 'rewritten_prompt', 'biases_found', 'changes_made',
+                 'bias_score', 'explanation'],
+    'propertyOrdering': ['original_prompt', 'rewritten_prompt', 'bias_score', 'biases_found',
+                         'changes_made', 'explanation']
+}
+
+# The same, for a batched reply: one entry per numbered prompt
+BATCH_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'results': {
+            'type': 'ARRAY',
+            'items': dict(
+                REWRITE_SCHEMA,
+                properties=dict(REWRITE_SCHEMA['properties'], index={'type': 'INTEGER'}),
+                required=['index'] + REWRITE_SCHEMA['required'],
+                propertyOrdering=['index'] + REWRITE_SCHEMA['propertyOrdering']
+            )
+        }
+    },
+    'required': ['results']
+}
+
+REQUIRED_FIELDS = ('rewritten_prompt',)
+
+# Why a reply could not be used
+PARSE_FAILURE_KINDS = ['empty', 'no_candidates', 'no_json', 'truncated', 'invalid_json',
+                       'not_object', 'missing_field', 'invalid_field']
+
+# '{' positions tried before giving up on prose full of braces
+MAX_OBJECT_STARTS = 16
+
+
+class ResponseParseError(ValueError):
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+def _string(name, value):
+    if not isinstance(value, str):
+        raise ResponseParseError('invalid_field', f'{name} must be a string')
+    return value
+
+
+def _bias_score(name, value):
+    if isinstance(value, str):
+        try:
+            value = float(value.strip().rstrip('%'))
+        except ValueError:
+            raise ResponseParseError('invalid_field', f'{name} must be a number') from None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+        raise ResponseParseError('invalid_field', f'{name} must be a number')
+    return min(100, max(0, int(round(value))))
+
+
+def _bias_list(name, value):
+    if not isinstance(value, list):
+        raise ResponseParseError('invalid_field', f'{name} must be a list')
+    # Entries without a type can't be placed in a category; skip them
+    return [
+        {'type': bias['type'], 'example': str(bias.get('example', ''))}
+        for bias in value
+        if isinstance(bias, dict) and isinstance(bias.get('type'), str)
+    ]
+
+
+def _string_list(name, value):
+    if not isinstance(value, list):
+        raise ResponseParseError('invalid_field', f'{name} must be a list')
+    return [item if isinstance(item, str) else json.dumps(item) for item in value if item is not None]
+
+
+FIELD_VALIDATORS = {
+    'original_prompt': _string,
+    'rewritten_prompt': _string,
+    'biases_found': _bias_list,
+    'changes_made': _string_list,
+    'bias_score': _bias_score,
+    'explanation': _string
+}
+
+
+def validate_field(name: str, value):
+    """Check and normalize one field of an analysis; unknown fields pass through"""
+    validator = FIELD_VALIDATORS.get(name)
+    return validator(name, value) if validator else value
+
+
+def validate_rewrite(data) -> Dict[str, any]:
+    """Check and normalize a decoded analysis object"""
+    if not isinstance(data, dict):
+        raise ResponseParseError('not_object', 'Gemini response is not a JSON object')
+    for name in REQUIRED_FIELDS:
+        if name not in data:
+            raise ResponseParseError('missing_field', f'Gemini response has no {name}')
+    return {name: validate_field(name, value) for name, value in data.items()}
+
+
+_decoder = json.JSONDecoder()
+_STRUCTURE = re.compile(r'[{}\[\]",]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+def extract_json(text: str):
+    """
+    Decode the first JSON object in model output
+    The object is decoded from its opening brace to its own closing brace,
+    so markdown fences, prose and stray braces around it are ignored
+    """
+    if not text or not text.strip():
+        raise ResponseParseError('empty', 'Gemini returned no output')
+
+    start = text.find('{')
+    if start < 0:
+        raise ResponseParseError('no_json', 'No JSON object in Gemini response')
+    for _ in range(MAX_OBJECT_STARTS):
+        try:
+            return _decoder.raw_decode(text, start)[0]
+        except ValueError:
+            pass
+        # Not JSON: skip past the braces (prose like "{placeholder}")
+        end = _object_end(text, start)
+        if end < 0:
+            if _looks_cut_off(text):
+                raise ResponseParseError('truncated', 'Gemini response was cut off')
+            break
+        start = text.find('{', end)
+        if start < 0:
+            break
+    raise ResponseParseError('invalid_json', 'Invalid JSON in Gemini response')
+
+
+def _object_end(text: str, start: int) -> int:
+    """Position after the brace closing the one at start, or -1 if it is never closed"""
+    depth = 0
+    position = start
+    in_string = False
+    while True:
+        if in_string:
+            match = _STRING_SPECIAL.search(text, position)
+            if match is None:
+                return -1
+            in_string = match.group() == '\\'
+            position = match.end() + in_string
+            continue
+        match = _STRUCTURE.search(text, position)
+        if match is None:
+            return -1
+        position = match.end()
+        char = match.group()
+        if char == '"':
+            in_string = True
+        elif char in '{[':
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+            if not depth:
+                return position
+
+
+def _looks_cut_off(text: str) -> bool:
+    """An unclosed object is taken as cut off unless the text still ends in a brace"""
+    tail = text.rstrip()
+    if tail.endswith('```'):
+        tail = tail[:-3].rstrip()
+    return not tail.endswith('}')
+
+
+def parse_rewrite(text: str) -> Dict[str, any]:
+    """The validated analysis in a complete reply; raises ResponseParseError"""
+    return validate_rewrite(extract_json(text))
+
+
+class IncrementalParser:
+    """
+    Parses a JSON object from text that arrives in pieces
+    feed() returns the top-level fields each piece completes, validated as
+    they arrive, so a bad field can end a streamed reply early. Text
+    before the object (prose, a markdown fence) and after it is ignored.
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self.complete = False
+        # Each piece is scanned once; only the text of the field being read
+        # is kept, so feeding a reply costs time linear in its length
+        self._item_parts = []
+        self._tail = ''
+        self._depth = 0
+        self._in_string = False
+        self._escape_pending = False
+        self._rejected = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, any]]:
+        # Enough of the end of the reply to tell whether it was cut off
+        self._tail = (self._tail + chunk).rstrip()[-64:]
+        completed = []
+        position = 0
+        # Where the current field starts in this piece, if it starts here
+        item_start = 0
+        if self._escape_pending and chunk:
+            # The character escaped at the end of the previous piece
+            self._escape_pending = False
+            position = 1
+        while not self.complete:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(chunk, position)
+                if match is None:
+                    break
+                if match.group() == '\\':
+                    if match.end() == len(chunk):
+                        # The escaped character is in the next piece
+                        self._escape_pending = True
+                        break
+                    position = match.end() + 1
+                    continue
+                self._in_string = False
+                position = match.end()
+                continue
+
+            match = _STRUCTURE.search(chunk, position)
+            if match is None:
+                break
+            char = match.group()
+            position = match.end()
+
+            if not self._depth:
+                # Outside the object only a '{' that may open it matters
+                if char == '{':
+                    self._depth = 1
+                    self._item_parts = []
+                    item_start = position
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if not self._depth:
+                    fields = self._close_item(self._item_text(chunk, item_start, match.start()), closing=True)
+                    if fields is not None:
+                        completed.extend(fields)
+                        self.complete = True
+            elif char == ',' and self._depth == 1:
+                fields = self._close_item(self._item_text(chunk, item_start, match.start()), closing=False)
+                if fields is not None:
+                    completed.extend(fields)
+                    item_start = position
+        if self._depth and not self.complete:
+            self._item_parts.append(chunk[item_start:])
+        return completed
+
+    def _item_text(self, chunk: str, start: int, end: int) -> str:
+        """The text of the field that ends at end in chunk"""
+        item = ''.join(self._item_parts) + chunk[start:end]
+        self._item_parts = []
+        return item
+
+    def _close_item(self, text: str, closing: bool):
+        """
+        Decode the text of a field; returns the fields it holds, or None
+        when the braces turned out not to open a JSON object
+        """
+        item = text.strip()
+        if not item:
+            if self.fields or not closing:
+                # A trailing or doubled comma
+                raise ResponseParseError('invalid_json', 'Invalid JSON in Gemini response')
+            return []
+        try:
+            decoded = json.loads('{' + item + '}')
+        except ValueError:
+            if self.fields:
+                raise ResponseParseError('invalid_json', 'Invalid JSON in Gemini response') from None
+            # Braces in prose before the object, like "{placeholder}"
+            self._depth = 0
+            self._rejected = True
+            return None
+        fields = []
+        for name, value in decoded.items():
+            value = validate_field(name, value)
+            self.fields[name] = value
+            fields.append((name, value))
+        return fields
+
+    def result(self) -> Dict[str, any]:
+        """The validated analysis once the whole reply has been fed"""
+        if self.complete:
+            return validate_rewrite(self.fields)
+        if self._depth:
+            if _looks_cut_off(self._tail):
+                raise ResponseParseError('truncated', 'Gemini response was cut off')
+            raise ResponseParseError('invalid_json', 'Invalid JSON in Gemini response')
+        if not self._tail:
+            raise ResponseParseError('empty', 'Gemini returned no output')
+        if self._rejected:
+            raise ResponseParseError('invalid_json', 'Invalid JSON in Gemini response')
+        raise ResponseParseError('no_json', 'No JSON object in Gemini response')
+
+
+class ParseStats:
+    """Counts parsed replies and failures by kind, for the failure rate"""
+
+    def __init__(self):
+        self.parsed = 0
+        self.failures = dict.fromkeys(PARSE_FAILURE_KINDS, 0)
+        self._lock = threading.Lock()
+
+    def record(self, kind: str = None):
+        """Count a parsed reply, or a failure of the given kind"""
+        with self._lock:
+            if kind is None:
+                self.parsed += 1
+            else:
+                self.failures[kind] = self.failures.get(kind, 0) + 1
+        metrics.inc('gemini_responses_total', outcome=kind or 'ok')
+
+    def get_stats(self) -> Dict[str, any]:
+        with self._lock:
+            failed = sum(self.failures.values())
+            stats = {'parsed': self.parsed, 'failed': failed, 'failures': dict(self.failures)}
+        total = stats['parsed'] + failed
+        stats['failure_rate'] = round(failed / total, 4) if total else 0.0
+        return stats
@@ -0,0 +1,342 @@
+"""
+Result Cache Module
+Two-tier, content-addressed cache for expensive results (e.g. Gemini calls):
+an in-process LRU with TTL eviction in front of an SQLite file that is
+shared by every worker process on the host; plus a memory-only LRU capped
+by bytes for cheap-but-frequent results
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt for use in a cache key
+    Unicode form and whitespace are normalized; case is kept because the
+    rewritten prompt echoes the user's wording
+    """
+    return ' '.join(unicodedata.normalize('NFC', prompt).split())
+
+
+def make_key(*parts) -> str:
+    """Build a content-addressed key from the parts that determine a result"""
+    payload = json.dumps(parts, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path: Optional[str] = None, max_entries: int = 1024,
+                 ttl: float = 7 * 24 * 3600, clock: Callable[[], float] = time.time,
+                 max_disk_entries: int = 100000, purge_every: int = 1000):
+        """
+        path: SQLite file for the shared tier, or None for memory only
+        max_entries: size of the in-memory LRU tier
+        ttl: seconds an entry stays valid in either tier
+        max_disk_entries: cap on the shared tier; each write evicts the
+        oldest entries beyond it (0 for no cap)
+        purge_every: writes between purges of expired entries (0 never)
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self.purge_every = purge_every
+        self._clock = clock
+        self._writes = 0
+
+        # key -> (expires_at, value), least recently used first
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # SQLite connections can't be shared across threads or a fork
+        self._local = threading.local()
+
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'lru_evictions': 0,
+            'expired_evictions': 0,
+            'disk_evictions': 0,
+            'disk_errors': 0
+        }
+
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._connection()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        # WAL lets readers in other processes proceed while one process writes
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached value for a key, or None"""
+        now = self._clock()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+                self.stats['expired_evictions'] += 1
+
+        entry = self._disk_get(key, now)
+        if entry is None:
+            self._count('misses')
+            return None
+
+        # Keep the entry's own expiry, so promotion doesn't extend its life
+        value, expires_at = entry
+        self._count('disk_hits')
+        self._memory_set(key, value, expires_at)
+        return value
+
+    def set(self, key: str, value: Dict):
+        """Store a JSON-serializable value in both tiers"""
+        expires_at = self._clock() + self.ttl
+        self._memory_set(key, value, expires_at)
+        with self._lock:
+            self.stats['sets'] += 1
+            self._writes += 1
+            purge = self.purge_every and self._writes % self.purge_every == 0
+
+        connection = self._connection()
+        if connection is None:
+            return
+        try:
+            cursor = connection.execute(
+                'INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value, ensure_ascii=False), expires_at)
+            )
+            if self.max_disk_entries:
+                # Rowids grow with each insert, so the oldest entries are
+                # the lowest ones; a range delete keeps the cap cheap to hold
+                evicted = connection.execute(
+                    'DELETE FROM results WHERE rowid <= ?', (cursor.lastrowid - self.max_disk_entries,)
+                ).rowcount
+                if evicted:
+                    with self._lock:
+                        self.stats['disk_evictions'] += evicted
+        except sqlite3.Error:
+            # The memory tier still serves this process
+            self._count('disk_errors')
+
+        if purge:
+            self.purge_expired()
+
+    def _memory_set(self, key: str, value: Dict, expires_at: float):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.stats['lru_evictions'] += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[Dict, float]]:
+        """The stored value and its expiry time, or None"""
+        connection = self._connection()
+        if connection is None:
+            return None
+        try:
+            row = connection.execute(
+                'SELECT value, expires_at FROM results WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                connection.execute('DELETE FROM results WHERE key = ? AND expires_at <= ?', (key, now))
+                self._count('expired_evictions')
+                return None
+            return json.loads(row[0]), row[1]
+        except (sqlite3.Error, ValueError):
+            self._count('disk_errors')
+            return None
+
+    def values(self) -> Iterator[Dict]:
+        """Every unexpired value, read from the shared tier when there is one"""
+        now = self._clock()
+        connection = self._connection()
+        if connection is None:
+            with self._lock:
+                entries = [value for expires_at, value in self._memory.values() if expires_at > now]
+            yield from entries
+            return
+        try:
+            rows = connection.execute('SELECT value FROM results WHERE expires_at > ?', (now,)).fetchall()
+        except sqlite3.Error:
+            self._count('disk_errors')
+            return
+        for (value,) in rows:
+            yield json.loads(value)
+
+    def purge_expired(self) -> int:
+        """
+        Remove expired entries from both tiers
+        Returns the number of entries removed
+        """
+        now = self._clock()
+        removed = 0
+
+        with self._lock:
+            for key in [key for key, (expires_at, _) in self._memory.items() if expires_at <= now]:
+                del self._memory[key]
+                removed += 1
+
+        connection = self._connection()
+        if connection is not None:
+            try:
+                removed += connection.execute('DELETE FROM results WHERE expires_at <= ?', (now,)).rowcount
+            except sqlite3.Error:
+                self._count('disk_errors')
+
+        with self._lock:
+            self.stats['expired_evictions'] += removed
+        return removed
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        connection = self._connection()
+        if connection is not None:
+            connection.execute('DELETE FROM results')
+
+    def get_stats(self) -> Dict[str, any]:
+        """Counters for this process plus the current size of each tier"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+
+        hits = stats['memory_hits'] + stats['disk_hits']
+        lookups = hits + stats['misses']
+        stats['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['max_disk_entries'] = self.max_disk_entries
+        stats['ttl_seconds'] = self.ttl
+
+        connection = self._connection()
+        if connection is not None:
+            try:
+                stats['disk_entries'] = connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            except sqlite3.Error:
+                stats['disk_entries'] = None
+        return stats
+
+
+def deep_sizeof(value, _seen=None) -> int:
+    """Approximate memory footprint of a JSON-like value, in bytes"""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(key, _seen) + deep_sizeof(item, _seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(deep_sizeof(item, _seen) for item in value)
+    return size
+
+
+class SizedLRUCache:
+    """
+    In-memory LRU bounded by the total size of its values in bytes
+    (as measured by deep_sizeof) rather than by entry count
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024,
+                 sizer: Callable[[object], int] = deep_sizeof):
+        self.max_bytes = max_bytes
+        self._sizer = sizer
+        # key -> (size, value), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'rejected': 0
+        }
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def set(self, key, value):
+        size = self._sizer(value) + self._sizer(key)
+        with self._lock:
+            if size > self.max_bytes:
+                # A single oversized value would flush everything else
+                self.stats['rejected'] += 1
+                return
+
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[0]
+
+            self._entries[key] = (size, value)
+            self.current_bytes += size
+            self.stats['sets'] += 1
+
+            while self.current_bytes > self.max_bytes:
+                _, (evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get_stats(self) -> Dict[str, any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self.current_bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['max_bytes'] = self.max_bytes
+        return stats
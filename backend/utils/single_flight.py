@@ -0,0 +1,213 @@
+"""
+Single-Flight Module
+Coalesces concurrent calls for the same key so only one of them (the
+leader) does the work and the rest (followers) receive its result
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlightTimeout(TimeoutError):
+    """A follower gave up waiting for the leader's result"""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class _BaseSingleFlight:
+    def __init__(self, share_errors: bool = True, follower_timeout: float = None,
+                 on_timeout: str = 'raise',
+                 is_error: Callable[[Any], bool] = None):
+        """
+        share_errors: followers receive the leader's failure; if False they
+            retry instead (coalescing again among themselves)
+        follower_timeout: seconds a follower waits for the leader, or None
+        on_timeout: 'raise' SingleFlightTimeout, or 'call' to do the work
+            independently
+        is_error: treats a returned value as a failure (e.g. an error dict)
+        """
+        if on_timeout not in ('raise', 'call'):
+            raise ValueError("on_timeout must be 'raise' or 'call'")
+        self.share_errors = share_errors
+        self.follower_timeout = follower_timeout
+        self.on_timeout = on_timeout
+        self.is_error = is_error or (lambda result: False)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'calls': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'shared_errors': 0,
+            'retries': 0,
+            'timeouts': 0
+        }
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def _failed(self, flight) -> bool:
+        return flight.error is not None or self.is_error(flight.result)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = len(self._flights)
+        requests = stats['calls'] + stats['coalesced']
+        stats['coalesced_rate'] = round(stats['coalesced'] / requests, 4) if requests else 0.0
+        return stats
+
+
+class SingleFlight(_BaseSingleFlight):
+    """Thread-based single flight for synchronous callers"""
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run fn(*args, **kwargs), or wait for the identical in-flight call
+        Returns (result, shared) where shared is True for followers
+        """
+        return self._do(key, fn, args, kwargs, None)
+
+    def do_within(self, timeout: float, key: Hashable, fn: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        do(), for a caller with its own time limit: as a follower it waits
+        at most timeout seconds in total (or follower_timeout if shorter),
+        then raises SingleFlightTimeout whatever on_timeout says
+        """
+        return self._do(key, fn, args, kwargs, time.monotonic() + timeout)
+
+    def _do(self, key, fn, args, kwargs, expires_at):
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self.stats['calls'] += 1
+                else:
+                    flight.followers += 1
+
+            if leader:
+                return self._lead(key, flight, fn, args, kwargs), False
+
+            wait = self.follower_timeout
+            limited = False
+            if expires_at is not None:
+                remaining = max(0.0, expires_at - time.monotonic())
+                limited = wait is None or remaining < wait
+                if limited:
+                    wait = remaining
+            if not flight.done.wait(wait):
+                self._count('timeouts')
+                if limited:
+                    raise SingleFlightTimeout("Timed out waiting for in-flight call within the caller's time limit")
+                if self.on_timeout == 'call':
+                    return fn(*args, **kwargs), False
+                raise SingleFlightTimeout(f'Timed out after {self.follower_timeout}s waiting for in-flight call')
+
+            if self._failed(flight) and not self.share_errors:
+                self._count('retries')
+                continue
+
+            self._count('coalesced')
+            if flight.error is not None:
+                self._count('shared_errors')
+                raise flight.error
+            if self.is_error(flight.result):
+                self._count('shared_errors')
+            return flight.result, True
+
+    def _lead(self, key, flight, fn, args, kwargs):
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            if self._failed(flight):
+                self._count('errors')
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+class AsyncSingleFlight(_BaseSingleFlight):
+    """asyncio single flight; all callers must share one event loop"""
+
+    async def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Await fn(*args, **kwargs), or wait for the identical in-flight call
+        Returns (result, shared) where shared is True for followers
+        """
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                future = asyncio.get_running_loop().create_future()
+                self._flights[key] = future
+                self._count('calls')
+                return await self._lead(key, future, fn, args, kwargs), False
+
+            try:
+                # shield: a follower timing out must not cancel the leader
+                result = await asyncio.wait_for(asyncio.shield(flight), self.follower_timeout)
+            except asyncio.TimeoutError:
+                self._count('timeouts')
+                if self.on_timeout == 'call':
+                    return await fn(*args, **kwargs), False
+                raise SingleFlightTimeout(f'Timed out after {self.follower_timeout}s waiting for in-flight call')
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+                # The leader was cancelled; retry and elect a new one
+                self._count('retries')
+                continue
+            except Exception:
+                if not self.share_errors:
+                    self._count('retries')
+                    continue
+                self._count('coalesced')
+                self._count('shared_errors')
+                raise
+
+            if self.is_error(result) and not self.share_errors:
+                self._count('retries')
+                continue
+
+            self._count('coalesced')
+            if self.is_error(result):
+                self._count('shared_errors')
+            return result, True
+
+    async def _lead(self, key, future, fn, args, kwargs):
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self._count('errors')
+            future.set_exception(e)
+            # Followers retrieve it; avoid "exception never retrieved" noise
+            future.exception()
+            raise
+        else:
+            if self.is_error(result):
+                self._count('errors')
+            future.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
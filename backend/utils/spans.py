@@ -0,0 +1,28 @@
+"""
+Bias Spans
+The span type bias detection produces; kept free of third-party imports so
+the detector loads without the serialization dependencies of the result
+formats
+"""
+
+from typing import Dict
+
+
+class Span:
+    """One detected bias: a term and where it occurs in the text"""
+    __slots__ = ('term', 'position', 'length')
+
+    def __init__(self, term: str, position: int, length: int):
+        self.term = term
+        self.position = position
+        self.length = length
+
+    def as_dict(self) -> Dict[str, any]:
+        return {'term': self.term, 'position': self.position, 'length': self.length}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Span) and \
+            (self.term, self.position, self.length) == (other.term, other.position, other.length)
+
+    def __repr__(self) -> str:
+        return f'Span({self.term!r}, {self.position}, {self.length})'
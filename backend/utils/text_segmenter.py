@@ -0,0 +1,56 @@
+"""
+Text Segmenter
+Splits long documents into sentence spans in one linear pass, so each
+sentence can be analyzed on its own with bounded work
+"""
+
+import re
+from typing import List, Tuple
+
+# A sentence ends at terminal punctuation (plus any closing quotes or
+# brackets) followed by whitespace, or at a blank line
+_SENTENCE_END = re.compile(r'[.!?]+[\'")\]]*(?=\s)|\n[ \t]*\n')
+
+
+def segment_sentences(text: str, max_chars: int = 1000) -> List[Tuple[int, int]]:
+    """
+    Return (start, end) offsets of the sentences of text, in order and
+    without surrounding whitespace. Sentences longer than max_chars are
+    cut at the last space before the limit (or at the limit if there is
+    none), which bounds the work any one segment can cause.
+    """
+    return [(start, end) for start, end, _ in segment_range(text, 0, len(text), max_chars)]
+
+
+def segment_range(text: str, start: int, end: int, max_chars: int = 1000) -> List[Tuple[int, int, bool]]:
+    """
+    Segment only text[start:end], which must begin and end on sentence
+    boundaries, with offsets into the whole text
+    Returns (start, end, continued) triples; continued marks a piece cut
+    at max_chars whose sentence goes on in the next piece
+    """
+    spans = []
+    for match in _SENTENCE_END.finditer(text, start, end):
+        _add_segment(spans, text, start, match.end(), max_chars)
+        start = match.end()
+    _add_segment(spans, text, start, end, max_chars)
+    return spans
+
+
+def _add_segment(spans: List[Tuple[int, int, bool]], text: str, start: int, end: int, max_chars: int):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+
+    while end - start > max_chars:
+        cut = text.rfind(' ', start + 1, start + max_chars + 1)
+        if cut == -1:
+            cut = start + max_chars
+        spans.append((start, cut, True))
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+
+    if end > start:
+        spans.append((start, end, False))
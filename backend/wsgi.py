@@ -0,0 +1,30 @@
+"""
+Production WSGI Entry Point
+Builds every model at import, so a preloading server loads them once in
+its master process and forks workers that share them copy-on-write
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import gc
+import os
+import sys
+
+# Make backend packages importable regardless of the working directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Eager startup would also start the batch pool, whose worker processes
+# must not be inherited by forked server workers; warm up explicitly instead
+os.environ['STARTUP_MODE'] = 'lazy'
+
+from api.app import app, startup_stats, warm_up
+
+warm_up(batch_workers=False)
+startup_stats['mode'] = 'preload'
+
+# Move everything built so far out of the garbage collector's generations:
+# collections in the workers then never touch (and so never copy) the
+# memory pages holding the models
+gc.collect()
+gc.freeze()
@@ -2,7 +2,7 @@ import React, { useState } from 'react';
 import PromptInput from './components/PromptInput';
 import BiasDisplay from './components/BiasDisplay';
 import ResultDisplay from './components/ResultDisplay';
-import { analyzePrompt } from './services/api';
+import { analyzePromptStream } from './services/api';
 import './styles/App.css';
 
 function App() {
@@ -13,9 +13,15 @@ function App() {
   const handleAnalyze = async (prompt, mode) => {
     setLoading(true);
     setError(null);
+    setResult(null);
 
     try {
-      const data = await analyzePrompt(prompt, mode);
+      // Show the rule-based analysis while the AI analysis is still running
+      const data = await analyzePromptStream(prompt, mode, (event, payload) => {
+        if (event === 'nlp') {
+          setResult(payload);
+        }
+      });
       setResult(data);
     } catch (err) {
       setError(err.message || 'Failed to analyze prompt. Please try again.');
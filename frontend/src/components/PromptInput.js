@@ -36,6 +36,24 @@ function PromptInput({ onAnalyze, loading }) {
               🤖 AI Mode
               <span className="mode-desc">Gemini-powered analysis</span>
             </button>
+            <button
+              type="button"
+              className={`mode-button ${mode === 'hybrid' ? 'active' : ''}`}
+              onClick={() => setMode('hybrid')}
+              disabled={loading}
+            >
+              ⚡ Hybrid Mode
+              <span className="mode-desc">Gemini only for biased prompts</span>
+            </button>
+            <button
+              type="button"
+              className={`mode-button ${mode === 'ml' ? 'active' : ''}`}
+              onClick={() => setMode('ml')}
+              disabled={loading}
+            >
+              🧮 ML Mode
+              <span className="mode-desc">Local trained classifier</span>
+            </button>
           </div>
         </div>
 
@@ -16,6 +16,46 @@ export const analyzePrompt = async (prompt, mode = 'nlp') => {
   }
 };
 
+// Streams /api/analyze/stream, calling onEvent(event, data) for each
+// server-sent event; resolves with the final result
+export const analyzePromptStream = async (prompt, mode = 'nlp', onEvent = () => {}) => {
+  const response = await fetch(`${API_BASE_URL}/api/analyze/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ prompt, mode })
+  });
+  if (!response.ok || !response.body) {
+    const data = await response.json().catch(() => ({}));
+    throw new Error(data.error || 'Failed to analyze prompt');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = block.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] || 'null');
+
+      if (event === 'error') {
+        throw new Error(data?.error || 'Failed to analyze prompt');
+      }
+      if (event === 'result') {
+        return data;
+      }
+      onEvent(event, data);
+    }
+  }
+  throw new Error('Analysis stream ended unexpectedly');
+};
+
 export const detectBias = async (prompt) => {
   try {
     const response = await axios.post(`${API_BASE_URL}/api/detect`, {
@@ -28,3 +68,32 @@ export const detectBias = async (prompt) => {
     );
   }
 };
+
+// Incremental analysis for live editing: create a session once, then send
+// each edit as the replaced range [start, end) and its new text
+export const createSession = async (prompt) => {
+  try {
+    const response = await axios.post(`${API_BASE_URL}/api/sessions`, { prompt });
+    return response.data;
+  } catch (error) {
+    throw new Error(
+      error.response?.data?.error || 'Failed to start analysis session'
+    );
+  }
+};
+
+export const editSession = async (sessionId, start, end, text, version) => {
+  try {
+    const response = await axios.patch(`${API_BASE_URL}/api/sessions/${sessionId}`, {
+      start,
+      end,
+      text,
+      version
+    });
+    return response.data;
+  } catch (error) {
+    throw new Error(
+      error.response?.data?.error || 'Failed to update analysis session'
+    );
+  }
+};
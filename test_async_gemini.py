@@ -0,0 +1,266 @@
+"""
+Tests for AsyncGeminiClient and the ASGI analyze path, against the local
+mock Gemini server
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from benchmarks.mock_gemini import MockBehavior, start_server
+from utils.async_gemini_client import AsyncGeminiClient
+from utils.result_cache import ResultCache
+
+
+async def call_asgi(app, method, path, payload=None):
+    """Send one request through an ASGI app and return (status, json body)"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '', 'server': ('testserver', 80),
+        'client': ('127.0.0.1', 1234),
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    }
+    received = False
+    response = {'body': b''}
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            response['body'] += message.get('body', b'')
+
+    await app(scope, receive, send)
+    return response['status'], json.loads(response['body'])
+
+
+def test_async_client_matches_sync_parsing():
+    server, base_url = start_server()
+    try:
+        client = AsyncGeminiClient(api_key='test', base_url=base_url)
+
+        async def run():
+            result = await client.rewrite_prompt_objectively_async('Is this obviously true?', 'science')
+            await client.aclose()
+            return result
+
+        result = asyncio.run(run())
+        assert result['success']
+        assert result == client.rewrite_prompt_objectively('Is this obviously true?', 'science')
+    finally:
+        server.shutdown()
+
+
+def test_semaphore_caps_in_flight_calls():
+    server, base_url = start_server(latency=0.05)
+    try:
+        client = AsyncGeminiClient(api_key='test', base_url=base_url, max_concurrency=4)
+
+        async def run():
+            results = await asyncio.gather(*[
+                client.rewrite_prompt_objectively_async(f'prompt {i}') for i in range(20)
+            ])
+            await client.aclose()
+            return results
+
+        results = asyncio.run(run())
+        assert all(result['success'] for result in results)
+        assert server.stats['max_in_flight'] == 4
+    finally:
+        server.shutdown()
+
+
+def test_async_client_uses_cache():
+    server, base_url = start_server()
+    try:
+        client = AsyncGeminiClient(api_key='test', base_url=base_url, cache=ResultCache())
+
+        async def run():
+            first = await client.rewrite_prompt_objectively_async('same prompt')
+            second = await client.rewrite_prompt_objectively_async('same prompt')
+            await client.aclose()
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert not first['cached'] and second['cached']
+        assert server.stats['requests'] == 1
+    finally:
+        server.shutdown()
+
+
+def test_disk_cache_is_used_off_the_event_loop():
+    server, base_url = start_server()
+    directory = tempfile.mkdtemp()
+    try:
+        cache = ResultCache(path=os.path.join(directory, 'results.sqlite3'))
+        threads = []
+        for name in ('get', 'set'):
+            def traced(*args, _method=getattr(cache, name)):
+                threads.append(threading.current_thread())
+                return _method(*args)
+            setattr(cache, name, traced)
+        client = AsyncGeminiClient(api_key='test', base_url=base_url, cache=cache)
+
+        async def run():
+            first = await client.rewrite_prompt_objectively_async('same prompt')
+            streamed = [item async for item in client.stream_rewrite_async('same prompt')]
+            await client.aclose()
+            return first, streamed[-1][1]
+
+        first, second = asyncio.run(run())
+        assert not first['cached'] and second['cached']
+        # get, set, then the streamed call's get
+        assert len(threads) == 3 and threading.main_thread() not in threads
+    finally:
+        server.shutdown()
+        shutil.rmtree(directory)
+
+
+def test_async_failures_carry_the_sync_error_types():
+    server, base_url = start_server(behavior=MockBehavior(error_rate=1.0, error_statuses=[503]))
+    try:
+        client = AsyncGeminiClient(api_key='test', base_url=base_url)
+
+        async def run():
+            result = await client.rewrite_prompt_objectively_async('Is this obviously true?')
+            streamed = [item async for item in client.stream_rewrite_async('Is this obviously true?')]
+            await client.aclose()
+            return result, streamed[-1][1]
+
+        result, streamed = asyncio.run(run())
+        expected = client.rewrite_prompt_objectively('Is this obviously true?')['error_type']
+        assert result['error_type'] == streamed['error_type'] == expected == 'request'
+    finally:
+        server.shutdown()
+
+
+def test_asgi_serves_nlp_while_ai_requests_wait():
+    server, base_url = start_server(latency=0.5)
+    os.environ['STARTUP_MODE'] = 'lazy'
+    os.environ['GEMINI_BASE_URL'] = base_url
+    os.environ['GEMINI_CACHE_PATH'] = ''
+    try:
+        from api.asgi import app, registry
+
+        async def run():
+            ai_requests = [
+                asyncio.ensure_future(call_asgi(app, 'POST', '/api/analyze', {'prompt': f'Is {i} bad?', 'mode': 'ai'}))
+                for i in range(100)
+            ]
+            await asyncio.sleep(0.1)
+
+            start = time.perf_counter()
+            nlp = await call_asgi(app, 'POST', '/api/analyze', {'prompt': 'Obviously this is terrible'})
+            nlp_elapsed = time.perf_counter() - start
+
+            results = await asyncio.gather(*ai_requests)
+            await registry.get('async_gemini_client').aclose()
+            return nlp, nlp_elapsed, results
+
+        start = time.perf_counter()
+        (nlp_status, nlp_body), nlp_elapsed, ai_results = asyncio.run(run())
+        total = time.perf_counter() - start
+
+        assert nlp_status == 200 and nlp_body['mode'] == 'nlp'
+        assert nlp_elapsed < 0.5
+        assert all(status == 200 and body['mode'] == 'ai' for status, body in ai_results)
+        # 100 half-second calls overlap instead of running one after another
+        assert total < 5
+    finally:
+        server.shutdown()
+        for name in ('STARTUP_MODE', 'GEMINI_BASE_URL', 'GEMINI_CACHE_PATH'):
+            os.environ.pop(name, None)
+
+
+def test_ai_mode_detects_domain_off_the_event_loop():
+    server, base_url = start_server()
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        from api.asgi import analyze_ai, registry
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+
+    threads = []
+    detector = registry.get('domain_detector')
+
+    class RecordingDetector:
+        def detect_domain(self, prompt):
+            threads.append(threading.current_thread().name)
+            return detector.detect_domain(prompt)
+
+    previous = registry._instances.get('async_gemini_client')
+    registry._instances['domain_detector'] = RecordingDetector()
+    registry._instances['async_gemini_client'] = AsyncGeminiClient(api_key='test', base_url=base_url)
+    try:
+        async def run():
+            result = await analyze_ai('Is this vaccine obviously dangerous?')
+            await registry.get('async_gemini_client').aclose()
+            return result
+
+        payload, status = asyncio.run(run())
+    finally:
+        server.shutdown()
+        registry._instances['domain_detector'] = detector
+        if previous is None:
+            registry._instances.pop('async_gemini_client')
+        else:
+            registry._instances['async_gemini_client'] = previous
+
+    assert status == 200 and payload['mode'] == 'ai' and payload['domain'] == 'medical'
+    assert threads and threads[0].startswith('wsgi')
+
+
+def test_wsgi_requests_run_side_by_side_on_the_pool():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        from api.asgi import PooledWsgiToAsgi, wsgi_app
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+
+    # Every request waits for the others, so they must run at the same time
+    barrier = threading.Barrier(4, timeout=5)
+
+    def slow_app(environ, start_response):
+        barrier.wait()
+        start_response('201 Created', [('Content-Type', 'application/json')])
+        body = json.loads(environ['wsgi.input'].read())
+        yield b'{"thread": "%s", ' % threading.current_thread().name.encode()
+        yield b'"path": "%s", "echo": %d}' % (environ['PATH_INFO'].encode(), body['n'])
+
+    async def run():
+        app = PooledWsgiToAsgi(slow_app)
+        requests = [call_asgi(app, 'POST', f'/items/{i}', {'n': i}) for i in range(4)]
+        return await asyncio.gather(*requests), await call_asgi(wsgi_app, 'GET', '/api/health')
+
+    results, health = asyncio.run(run())
+    assert [status for status, _ in results] == [201] * 4
+    assert [(body['path'], body['echo']) for _, body in results] == [(f'/items/{i}', i) for i in range(4)]
+    assert all(body['thread'].startswith('wsgi') for _, body in results)
+    assert health[0] == 200 and health[1]['status'] == 'healthy'
+
+
+if __name__ == "__main__":
+    test_async_client_matches_sync_parsing()
+    test_semaphore_caps_in_flight_calls()
+    test_async_client_uses_cache()
+    test_disk_cache_is_used_off_the_event_loop()
+    test_async_failures_carry_the_sync_error_types()
+    test_asgi_serves_nlp_while_ai_requests_wait()
+    test_ai_mode_detects_domain_off_the_event_loop()
+    test_wsgi_requests_run_side_by_side_on_the_pool()
+    print("✅ Async Gemini tests passed")
@@ -0,0 +1,67 @@
+"""
+Tests for the batch processing pool: result order, per-item errors and
+recovery from a worker process that dies mid-batch
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from utils import batch_pool
+from utils.batch_pool import BatchPool
+
+PROMPTS = [f'Is option {i} obviously the best one?' for i in range(10)]
+
+
+def crash_on_marker(analyzer, task, prompt):
+    """run_task, except the worker process dies on the prompt 'crash'"""
+    if prompt == 'crash':
+        os._exit(1)
+    return original_run_task(analyzer, task, prompt)
+
+
+original_run_task = batch_pool.run_task
+
+
+def test_results_keep_order_and_item_errors():
+    pool = BatchPool(max_workers=2, chunk_size=3)
+    prompts = PROMPTS[:4] + ['', 42] + PROMPTS[4:]
+    try:
+        results = pool.map('detect', prompts)
+        unknown = pool.map('summarize', PROMPTS[:2])
+    finally:
+        pool.shutdown()
+
+    assert [result['index'] for result in results] == list(range(len(prompts)))
+    assert [result['success'] for result in results] == [True] * 4 + [False, False] + [True] * 6
+    assert results[4]['error'] == 'No prompt provided'
+    assert all(not result['success'] and result['error'] == 'Unknown task: summarize' for result in unknown)
+
+
+def test_dead_worker_fails_only_its_chunk():
+    # Workers are forked, so they run the patched task
+    batch_pool.run_task = crash_on_marker
+    pool = BatchPool(max_workers=2, chunk_size=2)
+    prompts = PROMPTS[:5] + ['crash'] + PROMPTS[5:]
+    try:
+        results = pool.map('detect', prompts)
+        after = pool.map('detect', PROMPTS[:4])
+        submitted = pool.submit_chunk('detect', PROMPTS[:2]).result()
+    finally:
+        batch_pool.run_task = original_run_task
+        pool.shutdown()
+
+    # 'crash' is in the chunk of items 4 and 5
+    assert [result['index'] for result in results] == list(range(len(prompts)))
+    assert [result['success'] for result in results] == [True] * 4 + [False, False] + [True] * 5
+    assert results[5]['error'].startswith('Worker failed')
+
+    # The broken pool was replaced and the next batches run normally
+    assert all(result['success'] for result in after + submitted)
+
+
+if __name__ == "__main__":
+    test_results_keep_order_and_item_errors()
+    test_dead_worker_fails_only_its_chunk()
+    print("✅ Batch pool tests passed")
@@ -0,0 +1,56 @@
+"""
+Tests for the NLP micro-benchmark helpers (corpus generation and the
+baseline comparison used to catch regressions)
+"""
+
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from benchmarks.bench_nlp import bias_vocabulary, compare, main, make_prompt
+from models.bias_detector import BiasDetector
+
+
+def test_prompts_have_requested_length_and_density():
+    biased = bias_vocabulary(BiasDetector())
+    rng = random.Random(7)
+
+    assert len(make_prompt(rng, 10, 0.0, biased).split()) == 10
+
+    prompt = make_prompt(rng, 5000, 0.2, ['obviously'])
+    density = prompt.lower().split().count('obviously') / 5000
+    assert 0.17 < density < 0.23
+
+
+def test_compare_flags_only_regressions_beyond_threshold():
+    def report(p50s):
+        return {'results': [
+            {'stage': 'detect_biases', 'words': words, 'density': 0.0, 'p50_us': p50}
+            for words, p50 in p50s.items()
+        ]}
+
+    baseline = report({10: 10.0, 100: 100.0, 1000: 1000.0})
+    current = report({10: 11.0, 100: 130.0, 1000: 500.0})
+
+    regressions = compare(baseline, current, threshold=0.15)
+    assert [(regression['words'], regression['change']) for regression in regressions] == [(100, 0.3)]
+
+
+def test_main_writes_results_and_compares(tmp_path):
+    output = str(tmp_path / 'results.json')
+    args = ['--lengths', '10', '--densities', '0.1', '--min-time', '0', '--min-calls', '3', '-o', output]
+    assert main(args) == 0
+    # Against itself nothing can regress by more than 1000%
+    assert main(args + ['--compare', output, '--threshold', '10']) == 0
+
+
+if __name__ == "__main__":
+    test_prompts_have_requested_length_and_density()
+    test_compare_flags_only_regressions_beyond_threshold()
+    with tempfile.TemporaryDirectory() as directory:
+        test_main_writes_results_and_compares(Path(directory))
+    print("✅ Benchmark helper tests passed")
@@ -0,0 +1,123 @@
+"""
+Tests for the ML-mode bias classifier: labelling from BiasDetector and
+cached Gemini analyses, training, memory-mapped artifacts and the API
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+
+from models.analysis import BIAS_TYPES
+from models.bias_classifier import (
+    BiasClassifier, ModelNotAvailable, gemini_labels, label_prompts, train_classifier
+)
+from train_classifier import synthetic_prompts
+from utils.result_cache import ResultCache
+
+FEATURES = {'n_features': 2 ** 16}
+
+
+def trained(count=800):
+    return train_classifier(synthetic_prompts(count, seed=3), features=FEATURES)
+
+
+def test_training_matches_detector_labels():
+    classifier = trained()
+    evaluation = classifier.info['evaluation']
+    assert classifier.info['samples'] + classifier.info['held_out'] == 800
+    assert evaluation['overall_recall'] > 0.9
+    assert evaluation['leading_questions']['recall'] > 0.9
+
+    prompts = ['Why is this obviously the worst policy ever?', 'What is the boiling point of water?']
+    probabilities = classifier.predict_proba(prompts)
+    assert probabilities.shape == (2, len(BIAS_TYPES))
+    results = classifier.analyze(prompts)
+    assert 'leading_questions' in results[0]['biases_predicted']
+    assert results[0]['bias_score'] > results[1]['bias_score']
+
+
+def test_cached_gemini_analyses_add_labels():
+    cache = ResultCache()
+    cache.set('a', {'success': True, 'data': {
+        'original_prompt': 'Is  the new policy a success?',
+        'biases_found': [{'type': 'leading_questions', 'example': 'success'}, {'type': 'unknown'}]
+    }})
+    cache.set('b', {'success': False, 'error': 'API request failed'})
+    labels = gemini_labels(cache)
+    assert labels == {'Is the new policy a success?': ['leading_questions']}
+
+    rows = label_prompts(['Is the new policy a success?', 'This is obviously wrong'], labels)
+    assert rows[0].tolist() == [name == 'leading_questions' for name in BIAS_TYPES]
+    assert rows[1][BIAS_TYPES.index('subjective_language')] or rows[1][BIAS_TYPES.index('absolutist_language')]
+
+    # Prompts only Gemini has seen are trained on too
+    classifier = train_classifier(synthetic_prompts(100, seed=1), labels, features=FEATURES)
+    assert classifier.info['gemini_labelled'] == 1
+    assert classifier.info['samples'] + classifier.info['held_out'] == 101
+
+
+def test_artifact_is_memory_mapped():
+    classifier = trained(400)
+    prompts = synthetic_prompts(50, seed=9)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bias_classifier.joblib')
+        classifier.save(path)
+        loaded = BiasClassifier.load(path)
+        assert isinstance(loaded.coef, np.memmap)
+        assert loaded.version == classifier.version
+        assert np.allclose(loaded.predict_proba(prompts), classifier.predict_proba(prompts), atol=1e-6)
+        assert (loaded.thresholds == classifier.thresholds).all()
+        del loaded
+
+        try:
+            BiasClassifier.load(os.path.join(directory, 'missing.joblib'))
+        except ModelNotAvailable:
+            pass
+        else:
+            raise AssertionError('expected ModelNotAvailable')
+
+
+def test_api_ml_mode():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        from api.app import app, registry
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+
+    previous = registry._instances.get('bias_classifier')
+    classifier = trained(400)
+    registry._instances['bias_classifier'] = classifier
+    prompts = ['Why is this obviously the worst policy ever?', '', 'What is the boiling point of water?']
+    try:
+        client = app.test_client()
+        response = client.post('/api/analyze', json={'prompt': prompts[0], 'mode': 'ml'})
+        batch = client.post('/api/analyze/batch', json={'prompts': prompts, 'mode': 'ml'})
+        registry._instances['bias_classifier'] = None
+        unavailable = client.post('/api/analyze', json={'prompt': prompts[0], 'mode': 'ml'})
+    finally:
+        if previous is None:
+            registry._instances.pop('bias_classifier')
+        else:
+            registry._instances['bias_classifier'] = previous
+
+    data = response.get_json()
+    assert response.status_code == 200 and data['mode'] == 'ml'
+    assert set(data['bias_probabilities']) == set(BIAS_TYPES) and data['model_version'] == classifier.version
+    assert 'nlp_bias_score' in data and data['rewritten_prompt'] and data['biases_detected']
+
+    results = batch.get_json()['results']
+    assert [result['success'] for result in results] == [True, False, True]
+    assert results[0]['bias_probabilities'] == data['bias_probabilities']
+    assert unavailable.status_code == 503
+
+
+if __name__ == "__main__":
+    test_training_matches_detector_labels()
+    test_cached_gemini_analyses_add_labels()
+    test_artifact_is_memory_mapped()
+    test_api_ml_mode()
+    print("✅ Bias classifier tests passed")
@@ -0,0 +1,181 @@
+"""
+Differential test for the single-pass BiasDetector matcher
+Compares detect_biases against the original per-term scanning implementation
+"""
+
+import os
+import random
+import re
+import subprocess
+import sys
+from collections import Counter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from nltk.tokenize import word_tokenize
+
+from models.bias_detector import BiasDetector
+
+CORPUS = [
+    "Why is climate change obviously fake?",
+    "Obviously, everyone knows that vaccines are amazing and never fail.",
+    "Prove that the moon landing was fake, fake, FAKE!",
+    "Explain why ghosts exist and show me why aliens are real",
+    "Isn't it true that all politicians are corrupt? Of course it is.",
+    "How does homeopathy work when did the flood happen",
+    "It is obvious that none of them care; no one ever does, clearly.",
+    "Tell me why astrology works. Surely every horoscope is accurate?",
+    "Show that the policy is a disaster and demonstrate that it failed",
+    "What is the boiling point of water at sea level?",
+    "The really tall wall is allowable, though everyone's fake-news claims are not.",
+    "Don't you think the senate is evil and idiotic and stupid and terrible?",
+    "Without a doubt this is the perfect, brilliant, genius plan",
+    "prove bigfoot exists. disprove nothing exists either",
+    "Naturally the evidence that we collected will support the idea and back up the claim",
+    "never never never NEVER always Always ALWAYS",
+    "why does the soul exist? why are the results so horrible?",
+    "",
+]
+
+FRAGMENTS = [
+    'obviously', 'clearly', 'everyone knows', 'it is obvious', 'always', 'never',
+    'terrible', 'awful', 'evil', 'fake', 'genius', 'all', 'every', 'none', 'no one',
+    'everyone', 'prove that', 'show that', 'evidence that', 'why is', "isn't it",
+    'show me why', 'exist', 'is real', 'works', 'happened', 'explain why',
+    'how does', 'work', 'when did', 'happen', 'prove', 'exists', 'show',
+    'the', 'data', 'people', 'really', 'wall', 'overall', '?', ',', '!',
+]
+
+
+def legacy_detect_biases(detector, text):
+    """The original detect_biases implementation, kept as the reference"""
+    biases = {
+        'subjective_language': [],
+        'loaded_terms': [],
+        'absolutist_language': [],
+        'confirmation_bias': [],
+        'leading_questions': [],
+        'presumptive_language': []
+    }
+
+    text_lower = text.lower()
+
+    for word in detector.subjective_words:
+        if word in text_lower:
+            start = text_lower.find(word)
+            biases['subjective_language'].append({'term': word, 'position': start, 'length': len(word)})
+
+    try:
+        tokens = word_tokenize(text_lower)
+    except LookupError:
+        # punkt is not installed; tokenize the text as a single sentence
+        tokens = word_tokenize(text_lower, preserve_line=True)
+    for token in tokens:
+        if token in detector.loaded_terms:
+            start = text_lower.find(token)
+            biases['loaded_terms'].append({'term': token, 'position': start, 'length': len(token)})
+
+    for pattern in detector.absolutist_patterns:
+        for match in re.finditer(pattern, text_lower):
+            biases['absolutist_language'].append({
+                'term': match.group(), 'position': match.start(), 'length': len(match.group())
+            })
+
+    for phrase in detector.confirmation_phrases:
+        if phrase in text_lower:
+            start = text_lower.find(phrase)
+            biases['confirmation_bias'].append({'term': phrase, 'position': start, 'length': len(phrase)})
+
+    if '?' in text and any(q in text_lower for q in ['why is', 'why are', "isn't it", "aren't they", "don't you think"]):
+        biases['leading_questions'].append({'term': 'Leading question detected', 'position': 0, 'length': len(text)})
+
+    for pattern in detector.presumption_patterns:
+        for match in re.finditer(pattern, text_lower):
+            biases['presumptive_language'].append({
+                'term': match.group(), 'position': match.start(), 'length': len(match.group())
+            })
+
+    return biases
+
+
+def _spans(spans):
+    return sorted((span['term'], span['position'], span['length']) for span in spans)
+
+
+def assert_equivalent(detector, text):
+    new = detector.detect_biases(text)
+    old = legacy_detect_biases(detector, text)
+
+    assert set(new) == set(old)
+
+    # Regex-driven categories report every match in both implementations
+    for category in ('absolutist_language', 'leading_questions', 'presumptive_language'):
+        assert _spans(new[category]) == _spans(old[category]), (category, text)
+
+    # Substring categories used to report only the first occurrence per term
+    for category in ('subjective_language', 'confirmation_bias'):
+        first_seen = {}
+        for span in new[category]:
+            first_seen.setdefault(span['term'], span['position'])
+        legacy = {span['term']: span['position'] for span in old[category]}
+        assert first_seen == legacy, (category, text)
+
+    # Loaded terms used to report one entry per token, all at the first position
+    assert Counter(span['term'] for span in new['loaded_terms']) == \
+        Counter(span['term'] for span in old['loaded_terms']), text
+    for span in new['loaded_terms']:
+        assert text.lower()[span['position']:span['position'] + span['length']] == span['term']
+
+
+def test_matches_legacy_on_corpus():
+    detector = BiasDetector()
+    for text in CORPUS:
+        assert_equivalent(detector, text)
+
+
+def test_matches_legacy_on_random_text():
+    detector = BiasDetector()
+    rng = random.Random(1234)
+    for _ in range(500):
+        words = rng.choices(FRAGMENTS, k=rng.randint(1, 30))
+        text = ' '.join(words)
+        if rng.random() < 0.5:
+            text = text.upper() if rng.random() < 0.5 else text.capitalize()
+        assert_equivalent(detector, text)
+
+
+def test_reports_every_occurrence():
+    detector = BiasDetector()
+    biases = detector.detect_biases("Obviously fake. Obviously, totally fake")
+    assert [s['position'] for s in biases['subjective_language']] == [0, 16]
+    assert [s['position'] for s in biases['loaded_terms']] == [10, 35]
+
+
+def test_same_shape_for_empty_text():
+    detector = BiasDetector()
+    assert detector.detect_biases('') == {
+        'subjective_language': [],
+        'loaded_terms': [],
+        'absolutist_language': [],
+        'confirmation_bias': [],
+        'leading_questions': [],
+        'presumptive_language': []
+    }
+
+
+def test_loads_without_serialization_dependencies():
+    backend = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+    output = subprocess.run(
+        [sys.executable, '-c', 'import sys, models.bias_detector; print("msgpack" in sys.modules)'],
+        cwd=backend, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == 'False'
+
+
+if __name__ == "__main__":
+    test_matches_legacy_on_corpus()
+    test_matches_legacy_on_random_text()
+    test_reports_every_occurrence()
+    test_same_shape_for_empty_text()
+    test_loads_without_serialization_dependencies()
+    print("✅ detect_biases matches the legacy implementation")
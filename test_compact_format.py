@@ -0,0 +1,110 @@
+"""
+Tests for the compact bulk result format: columnar bias spans with a
+shared term table, and MessagePack responses from the batch endpoints
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from models.bias_detector import BiasDetector
+from utils.compact_format import Span, TermTable, compact_biases, compact_results, expand_biases, unpack
+
+DETECTOR = BiasDetector()
+KINDS = list(DETECTOR.detect_biases(''))
+
+PROMPTS = [
+    'Obviously every politician is corrupt, right? Why is it so terrible?',
+    'Explain why ghosts exist. All of them are evil and terrible.',
+    'Summarize the quarterly report.',
+    'Prove that the fake moon landing happened. Everyone knows it.'
+]
+
+
+def test_spans_match_detect_biases():
+    for prompt in PROMPTS:
+        spans = DETECTOR.detect_spans(prompt)
+        assert all(isinstance(span, Span) for kind in spans for span in spans[kind])
+        assert {kind: [span.as_dict() for span in spans[kind]] for kind in spans} == DETECTOR.detect_biases(prompt)
+
+    span = Span('evil', 3, 4)
+    assert not hasattr(span, '__dict__')
+
+
+def test_compact_round_trip_with_shared_terms():
+    table = TermTable()
+    compacted = [compact_biases(DETECTOR.detect_biases(prompt), table) for prompt in PROMPTS]
+    terms = table.terms
+
+    for prompt, compact in zip(PROMPTS, compacted):
+        assert expand_biases(compact, terms, KINDS) == DETECTOR.detect_biases(prompt)
+        assert all(compact[kind]['term'] for kind in compact)
+    # The clean prompt carries no categories at all
+    assert compacted[2] == {}
+    # Repeated terms are stored once
+    assert len(terms) == len(set(terms))
+    assert terms.count('terrible') == 1
+
+    # Span objects compact the same way as dicts
+    assert compact_biases(DETECTOR.detect_spans(PROMPTS[0]), table) == compacted[0]
+
+
+def test_compact_results_keep_failures_and_inputs():
+    results = [{'biases_detected': DETECTOR.detect_biases(prompt), 'success': True} for prompt in PROMPTS[:2]]
+    results.append({'success': False, 'error': 'No prompt provided'})
+
+    compacted, terms = compact_results(results)
+    assert compacted[2] == results[2]
+    # The full results are not modified
+    assert set(results[0]['biases_detected']) == set(KINDS)
+    for original, compact in zip(results[:2], compacted):
+        assert expand_biases(compact['biases_detected'], terms, KINDS) == original['biases_detected']
+
+
+def test_batch_endpoints_negotiate_format():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        import api.app as api
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+    from utils.batch_pool import BatchPool
+
+    previous = api.batch_pool
+    api.batch_pool = BatchPool(max_workers=1)
+    try:
+        client = api.app.test_client()
+        full = client.post('/api/detect/batch', json={'prompts': PROMPTS}).get_json()
+
+        compact = client.post('/api/detect/batch', json={'prompts': PROMPTS, 'format': 'compact'}).get_json()
+        assert compact['format'] == 'compact' and compact['count'] == len(PROMPTS)
+        for full_result, compact_result in zip(full['results'], compact['results']):
+            expanded = expand_biases(compact_result['biases_detected'], compact['terms'], KINDS)
+            assert expanded == full_result['biases_detected']
+            assert compact_result['bias_score'] == full_result['bias_score']
+
+        response = client.post('/api/analyze/batch', json={'prompts': PROMPTS, 'format': 'compact'},
+                               headers={'Accept': 'application/msgpack'})
+        assert response.status_code == 200 and response.mimetype == 'application/msgpack'
+        packed = unpack(response.get_data())
+        assert packed['format'] == 'compact' and packed['succeeded'] == len(PROMPTS)
+        assert len(response.get_data()) < len(client.post('/api/analyze/batch', json={'prompts': PROMPTS}).get_data())
+
+        response = client.post('/api/detect/batch', json={'prompts': PROMPTS},
+                               headers={'Accept': 'application/x-msgpack;q=0.9, application/json;q=0.5'})
+        assert response.mimetype == 'application/x-msgpack' and unpack(response.get_data()) == full
+
+        assert client.post('/api/detect/batch', json={'prompts': PROMPTS},
+                           headers={'Accept': '*/*'}).mimetype == 'application/json'
+        assert client.post('/api/detect/batch', json={'prompts': PROMPTS, 'format': 'xml'}).status_code == 400
+    finally:
+        api.batch_pool.shutdown()
+        api.batch_pool = previous
+
+
+if __name__ == "__main__":
+    test_spans_match_detect_biases()
+    test_compact_round_trip_with_shared_terms()
+    test_compact_results_keep_failures_and_inputs()
+    test_batch_endpoints_negotiate_format()
+    print("✅ Compact format tests passed")
@@ -0,0 +1,197 @@
+"""
+Tests for request deadlines: latency budgets cut down to the Gemini call,
+hedged duplicate requests and the NLP fallback in AI mode
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from benchmarks.mock_gemini import MockBehavior, start_server
+from utils.async_gemini_client import AsyncGeminiClient
+from utils.deadline import Deadline, LatencyTracker
+from utils.gemini_client import GeminiClient
+from utils.single_flight import SingleFlight
+
+
+class FirstCallSlow(MockBehavior):
+    """The first call takes `slow` seconds, every later one answers at once"""
+
+    def __init__(self, slow: float):
+        super().__init__()
+        self.slow = slow
+        self.calls = 0
+
+    def sample_latency(self) -> float:
+        with self._lock:
+            self.calls += 1
+            return self.slow if self.calls == 1 else 0.0
+
+
+def test_deadline_and_latency_tracker():
+    now = [100.0]
+    deadline = Deadline(0.5, clock=lambda: now[0])
+    assert deadline.remaining() == 0.5 and not deadline.expired()
+    assert deadline.limit(30.0) == 0.5 and deadline.limit(0.2) == 0.2
+    now[0] += 0.6
+    assert deadline.expired() and deadline.remaining() == 0.0
+    assert Deadline.from_ms(0) is None and Deadline.from_ms(None) is None
+    assert Deadline.from_ms(250).budget == 0.25
+
+    tracker = LatencyTracker(percentile=0.9, window=100, min_samples=10)
+    for i in range(9):
+        tracker.record(i / 100)
+    assert tracker.quantile() is None
+    for i in range(9, 200):
+        tracker.record(i / 100)
+    # Only the last 100 samples (1.00 .. 1.99) count
+    assert tracker.quantile() == 1.9
+
+
+def test_deadline_bounds_slow_calls():
+    server, base_url = start_server(latency=0.5)
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url)
+        start = time.perf_counter()
+        result = client.rewrite_prompt_objectively('Is this obviously true?', deadline=Deadline(0.1))
+        elapsed = time.perf_counter() - start
+
+        assert not result['success'] and result['error_type'] == 'deadline'
+        assert elapsed < 0.3
+
+        # Nothing is sent once the budget is spent
+        requests_before = server.stats['requests']
+        result = client.rewrite_prompt_objectively('Another prompt?', deadline=Deadline(0))
+        assert result['error_type'] == 'deadline' and server.stats['requests'] == requests_before
+    finally:
+        server.shutdown()
+
+
+def coalesced_calls(budgets, latency=0.5):
+    """Concurrent calls for one prompt, started in order; returns [(result, seconds)]"""
+    server, base_url = start_server(latency=latency)
+    client = GeminiClient(api_key='test', base_url=base_url, single_flight=SingleFlight())
+    results = [None] * len(budgets)
+
+    def call(i):
+        start = time.perf_counter()
+        deadline = Deadline(budgets[i]) if budgets[i] else None
+        result = client.rewrite_prompt_objectively('Is this obviously true?', deadline=deadline)
+        results[i] = (result, time.perf_counter() - start)
+
+    try:
+        threads = []
+        for i in range(len(budgets)):
+            threads.append(threading.Thread(target=call, args=(i,)))
+            threads[-1].start()
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join()
+    finally:
+        server.shutdown()
+    return results, server.stats['requests']
+
+
+def test_coalesced_calls_keep_their_own_deadlines():
+    # A short budget joining a leader without one stops waiting on time
+    results, _ = coalesced_calls([None, 0.1])
+    (leader, _), (follower, elapsed) = results
+    assert leader['success']
+    assert follower['error_type'] == 'deadline' and elapsed < 0.3
+
+    # A leader running out of its budget doesn't fail a follower with time left
+    results, requests = coalesced_calls([0.1, None])
+    (leader, _), (follower, _) = results
+    assert leader['error_type'] == 'deadline'
+    assert follower['success'] and not follower['coalesced'] and requests == 2
+
+
+def test_slow_calls_are_hedged():
+    server, base_url = start_server(behavior=FirstCallSlow(slow=1.0))
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url, hedge_percentile=0.95)
+        for _ in range(20):
+            client.latency.record(0.02)
+
+        start = time.perf_counter()
+        result = client.rewrite_prompt_objectively('Is this obviously true?')
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    # The duplicate sent after ~20ms answered long before the first call
+    assert result['success'] and elapsed < 0.5
+    assert server.stats['requests'] == 2
+
+    # Without enough recent latencies there is no delay to hedge after
+    client = GeminiClient(api_key='test', hedge_percentile=0.95)
+    assert client.latency.quantile() is None
+
+
+def test_api_falls_back_to_nlp_within_budget():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        from api.app import app, registry
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+
+    server, base_url = start_server(latency=1.0)
+    previous = registry._instances.get('gemini_client')
+    registry._instances['gemini_client'] = GeminiClient(api_key='test', base_url=base_url)
+    prompt = 'Is this vaccine obviously dangerous?'
+    try:
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post('/api/analyze', json={'prompt': prompt, 'mode': 'ai', 'budget_ms': 150})
+        elapsed = time.perf_counter() - start
+        strict = client.post('/api/analyze', json={'prompt': prompt, 'mode': 'ai', 'budget_ms': 50,
+                                                   'fallback': False})
+        invalid = client.post('/api/analyze', json={'prompt': prompt, 'mode': 'ai', 'budget_ms': 'soon'})
+    finally:
+        server.shutdown()
+        if previous is None:
+            registry._instances.pop('gemini_client')
+        else:
+            registry._instances['gemini_client'] = previous
+
+    data = response.get_json()
+    assert response.status_code == 200 and elapsed < 0.8
+    assert data['fallback'] and data['fallback_reason'] == 'deadline' and data['answered_by'] == 'nlp'
+    assert data['mode'] == 'ai' and data['original_prompt'] == prompt and data['rewritten_prompt']
+
+    assert strict.status_code == 500 and strict.get_json()['error'].startswith('Deadline exceeded')
+    assert invalid.status_code == 400
+
+
+def test_async_client_keeps_the_deadline():
+    server, base_url = start_server(latency=0.5)
+    try:
+        client = AsyncGeminiClient(api_key='test', base_url=base_url)
+
+        async def run():
+            start = time.perf_counter()
+            result = await client.rewrite_prompt_objectively_async('Is this obviously true?',
+                                                                   deadline=Deadline(0.1))
+            elapsed = time.perf_counter() - start
+            await client.aclose()
+            return result, elapsed
+
+        result, elapsed = asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    assert result['error_type'] == 'deadline' and elapsed < 0.3
+
+
+if __name__ == "__main__":
+    test_deadline_and_latency_tracker()
+    test_deadline_bounds_slow_calls()
+    test_coalesced_calls_keep_their_own_deadlines()
+    test_slow_calls_are_hedged()
+    test_api_falls_back_to_nlp_within_budget()
+    test_async_client_keeps_the_deadline()
+    print("✅ Deadline tests passed")
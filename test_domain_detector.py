@@ -0,0 +1,107 @@
+"""
+Tests for batch domain classification
+Compares DomainDetector.detect_domains against the original per-keyword loop
+"""
+
+import os
+import random
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from utils.domain_detector import DomainDetector
+
+CORPUS = [
+    "Why is climate change obviously fake?",
+    "Did the president veto the immigration bill passed by congress?",
+    "What do clinical trials say about this vaccine and its side effects?",
+    "Is the WHO right about the covid pandemic?",
+    "Who won the election, and what does peer-reviewed research say about voting?",
+    "Explain the big bang and black hole physics to a biology student",
+    "What is a good recipe for banana bread?",
+    "The white house and the supreme court disagree on healthcare policy",
+    "DNA and genes in a laboratory study of cancer patients",
+    "",
+    "law lawyer lawful outlaw",
+    "peer\nreviewed studies on\nglobal warming",
+]
+
+FRAGMENTS = [
+    'government', 'election', 'vote', 'voting', 'law', 'policy', 'rights', 'trump', 'biden',
+    'white house', 'supreme court', 'left-wing', 'research', 'study', 'climate', 'data',
+    'peer-reviewed', 'peer reviewed', 'climate change', 'black hole', 'dna', 'gene', 'doctor',
+    'vaccine', 'health', 'healthcare', 'side effects', 'covid', 'who', 'fda', 'clinical trial',
+    'clinical', 'trial', 'the', 'and', 'peer', 'reviewed', '\n', '.', '?',
+]
+
+
+def legacy_detect_domain(detector, text):
+    """The original detect_domain implementation, kept as the reference"""
+    text_lower = text.lower()
+    scores = {'political': 0, 'science': 0, 'medical': 0, 'general': 0}
+
+    for domain, data in detector.domain_keywords.items():
+        for keyword in data['keywords']:
+            if keyword in text_lower:
+                scores[domain] += 1
+        for pattern in data['patterns']:
+            matches = re.findall(pattern, text_lower, re.IGNORECASE)
+            scores[domain] += len(matches) * 2
+
+    max_score = max(scores.values())
+    if max_score == 0:
+        detected_domain = 'general'
+        confidence = 'high'
+    else:
+        detected_domain = max(scores, key=scores.get)
+        sorted_scores = sorted(scores.values(), reverse=True)
+        score_diff = sorted_scores[0] - sorted_scores[1]
+        if score_diff >= 3:
+            confidence = 'high'
+        elif score_diff >= 1:
+            confidence = 'medium'
+        else:
+            confidence = 'low'
+
+    return {'domain': detected_domain, 'confidence': confidence, 'scores': scores}
+
+
+def test_batch_matches_legacy_on_corpus():
+    detector = DomainDetector()
+    expected = [legacy_detect_domain(detector, text) for text in CORPUS]
+    assert detector.detect_domains(CORPUS) == expected
+
+
+def test_batch_matches_legacy_on_random_text():
+    detector = DomainDetector()
+    rng = random.Random(99)
+    texts = [
+        ''.join(word + rng.choice([' ', ' ', '']) for word in rng.choices(FRAGMENTS, k=rng.randint(0, 20)))
+        for _ in range(2000)
+    ]
+    expected = [legacy_detect_domain(detector, text) for text in texts]
+    assert detector.detect_domains(texts, batch_size=256) == expected
+
+
+def test_single_prompt_matches_legacy():
+    detector = DomainDetector()
+    for text in CORPUS:
+        assert detector.detect_domain(text) == legacy_detect_domain(detector, text)
+
+
+def test_cross_prompt_matches_are_not_counted():
+    detector = DomainDetector()
+    detector.domain_keywords['science']['patterns'].append(r'\bpeer\s+reviewed\b')
+    detector._build_index()
+    texts = ["a peer", "reviewed paper", "peer  reviewed"]
+    expected = [legacy_detect_domain(detector, text) for text in texts]
+    assert detector.detect_domains(texts) == expected
+
+
+if __name__ == "__main__":
+    test_batch_matches_legacy_on_corpus()
+    test_batch_matches_legacy_on_random_text()
+    test_single_prompt_matches_legacy()
+    test_cross_prompt_matches_are_not_counted()
+    print("✅ detect_domains matches the legacy implementation")
@@ -0,0 +1,207 @@
+"""
+Tests for incremental analysis sessions: each edit re-analyzes only the
+sentences it touched and matches a full re-analysis of the new text
+"""
+
+import os
+import random
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from models.bias_detector import BiasDetector
+from models.edit_session import EditSession, EditSessionStore, VersionConflict
+from models.prompt_rewriter import PromptRewriter
+
+DETECTOR = BiasDetector()
+REWRITER = PromptRewriter()
+
+PIECES = [
+    'the', 'obviously', 'report.', 'is', 'terrible!', 'why is it so bad?', 'explain why ghosts exist.',
+    'all', 'every', '\n\n', 'never', 'data', 'x' * 45
+]
+
+
+def session_state(session: EditSession):
+    snapshot = session.snapshot()
+    snapshot['changes_made'] = set(snapshot['changes_made'])
+    del snapshot['version']
+    return [(s.start, s.end, s.continued) for s in session.sentences], snapshot
+
+
+def test_random_edits_match_full_reanalysis():
+    rng = random.Random(5)
+    text = ' '.join(rng.choice(PIECES) for _ in range(200))
+    session = EditSession(text, DETECTOR, REWRITER, max_sentence_chars=40)
+
+    for _ in range(500):
+        start = rng.randint(0, len(session.text))
+        end = min(len(session.text), start + rng.randint(0, 12))
+        replacement = rng.choice([' '.join(rng.sample(PIECES, rng.randint(0, 3))), '.', ' ', '\n\n', 'x', '? '])
+        session.apply(start, end, replacement)
+        fresh = EditSession(session.text, DETECTOR, REWRITER, max_sentence_chars=40)
+        assert session_state(session) == session_state(fresh)
+
+
+def test_edit_returns_only_the_replaced_range():
+    text = 'The report was fine. ' * 50 + 'Obviously it failed. ' + 'The data is here. ' * 50
+    session = EditSession(text, DETECTOR, REWRITER)
+    position = text.index('it failed')
+
+    result = session.apply(position + 3, position + 9, 'was terrible')
+    assert result['version'] == 1
+    replaced = result['replaced']
+    assert replaced['start'] <= position < position + 3 + len('was terrible') <= replaced['end']
+    assert replaced['end'] - replaced['old_end'] == result['delta'] == len('was terrible') - 6
+    # The edited sentence plus at most one neighbour each side
+    assert result['sentences_analyzed'] == 1
+    assert len(result['rewritten_sentences']) <= 3
+
+    loaded = result['biases_detected']['loaded_terms']
+    assert [(span['term'], session.text[span['position']:span['position'] + span['length']]) for span in loaded] \
+        == [('terrible', 'terrible')]
+    assert result['bias_score'] == session.snapshot()['bias_score'] > 0
+
+
+def test_version_conflicts_and_invalid_edits():
+    session = EditSession('Obviously fine.', DETECTOR, REWRITER)
+    session.apply(0, 0, 'Now ', base_version=0)
+    for args in [(0, 0, 'x', 0), (5, 2, 'x', None), (0, 999, 'x', None), (0, 0, None, None)]:
+        try:
+            session.apply(*args)
+        except (VersionConflict, ValueError):
+            continue
+        raise AssertionError(f'{args} should have been rejected')
+
+
+def test_store_expires_and_evicts_sessions():
+    store = EditSessionStore(DETECTOR, REWRITER, max_sessions=2, ttl=60)
+    first, _ = store.create('One.')
+    second, _ = store.create('Two.')
+    store.create('Three.')
+    assert store.get(first) is None and store.get(second) is not None
+    assert store.apply('missing', 0, 0, 'x') is None
+
+    store.ttl = -1
+    assert store.get(second) is None
+    assert store.get_stats()['evicted'] == 1 and store.get_stats()['expired'] == 1
+
+
+def test_state_round_trip():
+    session = EditSession('Obviously the report failed. ' * 5 + 'Why is it so bad?', DETECTOR, REWRITER)
+    session.apply(0, 9, 'Clearly')
+    restored = EditSession.from_state(session.to_state(), DETECTOR, REWRITER)
+    assert restored.version == session.version == 1
+    assert session_state(restored) == session_state(session)
+
+
+def test_workers_share_sessions_through_the_file():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sessions.sqlite3')
+        # Two stores on one file stand in for two worker processes
+        first = EditSessionStore(DETECTOR, REWRITER, path=path)
+        second = EditSessionStore(DETECTOR, REWRITER, path=path)
+
+        session_id, _ = first.create('The report was fine.')
+        assert second.get(session_id).text == 'The report was fine.'
+        second.apply(session_id, 15, 19, 'terrible', base_version=0)
+
+        # The first store rereads the session the second one edited
+        assert first.get(session_id).snapshot() == second.get(session_id).snapshot()
+        try:
+            first.apply(session_id, 0, 0, 'x', base_version=0)
+        except VersionConflict:
+            pass
+        else:
+            raise AssertionError('expected VersionConflict')
+        result = first.apply(session_id, 0, 3, 'This', base_version=1)
+        assert result['version'] == 2 and second.get(session_id).text == 'This report was terrible.'
+        # Each store replayed the other's edit instead of rereading the session
+        assert first.get_stats()['replayed'] == second.get_stats()['replayed'] == 1
+        assert first.get_stats()['loaded'] == 0 and second.get_stats()['sessions'] == 1
+
+        assert second.delete(session_id)
+        assert first.get(session_id) is None and first.apply(session_id, 0, 0, 'x') is None
+
+        expiring, _ = first.create('Old.')
+        second.ttl = -1
+        assert second.get(expiring) is None and first.get(expiring) is None
+
+
+def test_shared_edits_are_rows_folded_into_snapshots():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sessions.sqlite3')
+        first = EditSessionStore(DETECTOR, REWRITER, path=path, snapshot_every=5)
+        second = EditSessionStore(DETECTOR, REWRITER, path=path, snapshot_every=5)
+        session_id, session = first.create('The report was fine. ' * 3)
+
+        # Two stores edit the same version at once: the later writer replays
+        # the other edit and retries, or reports the conflict given a base version
+        stale = second.get(session_id)
+        first.apply(session_id, 0, 3, 'One')
+        connection = second._connection()
+        try:
+            second._apply_shared(connection, session_id, stale, 0, 0, 'x', base_version=0)
+        except VersionConflict:
+            pass
+        else:
+            raise AssertionError('expected VersionConflict')
+        stale = EditSession('The report was fine. ' * 3, DETECTOR, REWRITER)
+        second._apply_shared(connection, session_id, stale, 0, 0, 'Obviously ')
+        assert first.get(session_id).text == second.get(session_id).text
+        assert first.get(session_id).text.startswith('Obviously One report')
+        assert second.get_stats()['conflicts'] == 2
+
+        for i in range(6):
+            first.apply(session_id, 0, 0, f'{i} ')
+        rows = first._connection().execute('SELECT COUNT(*) FROM edits').fetchone()[0]
+        assert first.get_stats()['snapshots'] == 1 and rows == 8 - 5
+
+        # A store new to the session reads the snapshot and replays what came after
+        third = EditSessionStore(DETECTOR, REWRITER, path=path)
+        fresh = EditSession(first.get(session_id).text, DETECTOR, REWRITER)
+        assert session_state(third.get(session_id)) == session_state(fresh)
+        assert third.get_stats()['loaded'] == 1 and third.get_stats()['replayed'] == 3
+
+        # A longer text is written out only after as many edits as it has sentences
+        long_id, _ = first.create('The report was fine. ' * 20)
+        for i in range(10):
+            first.apply(long_id, 0, 0, f'{i} ')
+        assert first.get_stats()['snapshots'] == 1
+
+
+def test_session_endpoints():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        from api.app import app
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+    client = app.test_client()
+
+    created = client.post('/api/sessions', json={'prompt': 'The report was fine.'})
+    assert created.status_code == 201
+    session_id = created.get_json()['session_id']
+    assert created.get_json()['bias_score'] == 0
+
+    edited = client.patch(f'/api/sessions/{session_id}', json={'start': 15, 'end': 19, 'text': 'terrible', 'version': 0})
+    assert edited.status_code == 200 and edited.get_json()['bias_score'] > 0
+    assert client.patch(f'/api/sessions/{session_id}', json={'start': 0, 'end': 0, 'text': 'x', 'version': 0}).status_code == 409
+    assert client.patch(f'/api/sessions/{session_id}', json={'start': 'a', 'end': 0, 'text': 'x'}).status_code == 400
+
+    current = client.get(f'/api/sessions/{session_id}').get_json()
+    assert current['text'] == 'The report was terrible.' and current['version'] == 1
+    assert client.delete(f'/api/sessions/{session_id}').status_code == 204
+    assert client.get(f'/api/sessions/{session_id}').status_code == 404
+
+
+if __name__ == "__main__":
+    test_random_edits_match_full_reanalysis()
+    test_edit_returns_only_the_replaced_range()
+    test_version_conflicts_and_invalid_edits()
+    test_store_expires_and_evicts_sessions()
+    test_state_round_trip()
+    test_workers_share_sessions_through_the_file()
+    test_shared_edits_are_rows_folded_into_snapshots()
+    test_session_endpoints()
+    print("✅ Edit session tests passed")
@@ -0,0 +1,237 @@
+"""
+Tests for batched Gemini requests: several prompts per generateContent
+call, per-item validation and retries, adaptive batch sizes and
+micro-batching of concurrent calls
+"""
+
+import json
+import os
+import sys
+import threading
+from concurrent.futures import TimeoutError
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from benchmarks.mock_gemini import MockBehavior, start_server
+from utils.gemini_client import GeminiClient
+from utils.micro_batcher import MicroBatcher
+from utils.result_cache import ResultCache
+
+PROMPTS = [f'Is option {i} obviously the best one?' for i in range(12)]
+
+
+def test_prompts_share_one_request():
+    server, base_url = start_server()
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url)
+        results = client.request_rewrites(PROMPTS, 'general')
+    finally:
+        server.shutdown()
+
+    assert server.stats['requests'] == 1 and server.stats['batch_items'] == len(PROMPTS)
+    assert all(result['success'] for result in results)
+    assert [result['data']['original_prompt'] for result in results] == PROMPTS
+    assert 'index' not in results[0]['data']
+
+
+def test_only_failed_items_are_retried():
+    server, base_url = start_server(behavior=MockBehavior(item_drop_rate=0.3, seed=7))
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url)
+        results = client.request_rewrites(PROMPTS * 2, 'general', max_retries=5)
+    finally:
+        server.shutdown()
+
+    assert all(result['success'] for result in results)
+    assert [result['data']['original_prompt'] for result in results] == PROMPTS * 2
+    assert server.stats['requests'] > 1
+    # Retries resend the dropped prompts, not whole batches
+    assert server.stats['batch_items'] < 2 * len(PROMPTS) * 2
+
+
+def test_only_transient_failures_are_retried():
+    for status, requests_sent in ((503, 3), (429, 3), (400, 1)):
+        server, base_url = start_server(behavior=MockBehavior(error_rate=1.0, error_statuses=[status]))
+        try:
+            client = GeminiClient(api_key='test', base_url=base_url)
+            results = client.request_rewrites(PROMPTS[:4], 'general', max_retries=2)
+        finally:
+            server.shutdown()
+        assert all(result['error_type'] == 'request' and result['status_code'] == status for result in results)
+        assert server.stats['requests'] == requests_sent
+
+    # A blocked batch is a parse failure, counted once per prompt and not resent
+    server, base_url = start_server()
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url)
+        blocked = json.dumps({'candidates': [], 'promptFeedback': {'blockReason': 'OTHER'}}).encode()
+        session_post = client.session.post
+
+        def post(*args, **kwargs):
+            response = session_post(*args, **kwargs)
+            response._content = blocked
+            return response
+
+        client.session.post = post
+        results = client.request_rewrites(PROMPTS[:4], 'general', max_retries=2)
+    finally:
+        server.shutdown()
+    assert all(result['error_type'] == 'parse' and 'blocked: OTHER' in result['error'] for result in results)
+    assert client.parse_stats.get_stats()['failures']['no_candidates'] == 4
+    assert server.stats['requests'] == 1
+
+
+def test_reply_items_are_validated_and_truncated_replies_salvaged():
+    client = GeminiClient(api_key='test', batch_max_items=8)
+    items = [
+        {'index': 0, 'rewritten_prompt': 'first'},
+        {'index': 0, 'rewritten_prompt': 'duplicate'},
+        {'index': 2, 'bias_score': 10},
+        {'index': 9, 'rewritten_prompt': 'out of range'},
+        {'index': 1, 'rewritten_prompt': 'second'}
+    ]
+    text = '```json\n{"results": [' + ', '.join(json.dumps(item) for item in items)
+    reply = {'candidates': [{'content': {'parts': [{'text': text + ', {"index": 3, "rewri'}]},
+                             'finishReason': 'MAX_TOKENS'}]}
+
+    results, truncated = client._parse_batch_result(reply, 4)
+    assert truncated
+    assert results[0]['data'] == {'rewritten_prompt': 'first'}
+    assert results[1]['data']['rewritten_prompt'] == 'second'
+    assert not results[2]['success'] and 'Invalid' in results[2]['error']
+    assert not results[3]['success'] and 'Missing' in results[3]['error']
+
+    # Truncation halves the item limit; full batches grow it back
+    client._adapt_batch_size(8, truncated)
+    assert client.batch_items == 4
+    client._adapt_batch_size(4, False)
+    assert client.batch_items == 5
+
+    complete = {'candidates': [{'content': {'parts': [{'text': text + ']}'}]}, 'finishReason': 'STOP'}]}
+    assert not client._parse_batch_result(complete, 3)[1]
+
+
+def test_batches_respect_token_limits():
+    client = GeminiClient(api_key='test', batch_max_items=50, batch_max_output_tokens=2000)
+    batches = client._pack_batches(PROMPTS, 'general')
+    assert [i for batch in batches for i in batch] == list(range(len(PROMPTS)))
+    assert len(batches) > 1 and all(len(batch) <= 4 for batch in batches)
+
+    # A prompt over the limit on its own still gets sent, alone
+    huge = 'word ' * 4000
+    assert client._pack_batches(['short', huge, 'short'], 'general') == [[0], [1], [2]]
+
+    client.batch_items = 2
+    assert max(len(batch) for batch in client._pack_batches(PROMPTS, 'general')) == 2
+
+
+def test_batch_rewrites_use_the_cache_and_send_repeats_once():
+    server, base_url = start_server()
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url, cache=ResultCache())
+        first = client.rewrite_prompts_batch(PROMPTS[:3] + PROMPTS[:1], 'science')
+        assert server.stats['batch_items'] == 3
+        assert [result['coalesced'] for result in first] == [False, False, False, True]
+
+        second = client.rewrite_prompts_batch(PROMPTS[:4], 'science')
+        assert [result['cached'] for result in second] == [True, True, True, False]
+        assert server.stats['requests'] == 2
+        # Batched results serve later single-prompt calls too
+        assert client.rewrite_prompt_objectively(PROMPTS[1], 'science')['cached']
+    finally:
+        server.shutdown()
+
+
+def test_micro_batcher_groups_concurrent_calls():
+    server, base_url = start_server(latency=0.05)
+    client = GeminiClient(api_key='test', base_url=base_url, micro_batch_wait=0.05)
+    results = [None] * 8
+    try:
+        def call(i):
+            results[i] = client.rewrite_prompt_objectively(PROMPTS[i], 'general')
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(len(results))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        client.close()
+        server.shutdown()
+
+    assert [result['data']['original_prompt'] for result in results] == PROMPTS[:8]
+    assert server.stats['requests'] < len(results)
+    assert client.micro_batcher.get_stats()['calls'] == len(results)
+
+
+def test_micro_batcher_drops_abandoned_calls():
+    sent = []
+    started, release = threading.Event(), threading.Event()
+
+    def request_batch(prompts, domain):
+        sent.append(list(prompts))
+        started.set()
+        release.wait(2)
+        return [{'success': True, 'data': prompt} for prompt in prompts]
+
+    # With one batch in flight at a time the second waits behind the first
+    batcher = MicroBatcher(request_batch, max_wait=0.001, max_concurrency=1)
+    first = threading.Thread(target=batcher.submit, args=('first',))
+    first.start()
+    started.wait(2)
+    try:
+        batcher.submit('expired', timeout=0.05)
+    except TimeoutError:
+        pass
+    else:
+        raise AssertionError('expected TimeoutError')
+    release.set()
+    first.join()
+
+    assert batcher.submit('after') == {'success': True, 'data': 'after'}
+    batcher.close()
+    assert sent == [['first'], ['after']]
+    assert batcher.get_stats()['abandoned'] == 1
+
+
+def test_api_batch_ai_mode():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        from api.app import app, registry
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+
+    server, base_url = start_server()
+    previous = registry._instances.get('gemini_client')
+    registry._instances['gemini_client'] = GeminiClient(api_key='test', base_url=base_url)
+    prompts = ['Is this vaccine obviously dangerous?', 'Why is the senator always lying?', '', PROMPTS[0]]
+    try:
+        response = app.test_client().post('/api/analyze/batch', json={'prompts': prompts, 'mode': 'ai'})
+        data = response.get_json()
+    finally:
+        server.shutdown()
+        if previous is None:
+            registry._instances.pop('gemini_client')
+        else:
+            registry._instances['gemini_client'] = previous
+
+    assert response.status_code == 200
+    assert data['succeeded'] == 3 and data['failed'] == 1
+    assert [result.get('original_prompt') for result in data['results']] == prompts[:2] + [None, prompts[3]]
+    assert data['results'][0]['mode'] == 'ai' and data['results'][0]['domain'] == 'medical'
+    assert [result['index'] for result in data['results']] == list(range(len(prompts)))
+    # One request per detected domain
+    assert server.stats['requests'] == len({result['domain'] for result in data['results'] if result['success']})
+
+
+if __name__ == "__main__":
+    test_prompts_share_one_request()
+    test_only_failed_items_are_retried()
+    test_only_transient_failures_are_retried()
+    test_reply_items_are_validated_and_truncated_replies_salvaged()
+    test_batches_respect_token_limits()
+    test_batch_rewrites_use_the_cache_and_send_repeats_once()
+    test_micro_batcher_groups_concurrent_calls()
+    test_micro_batcher_drops_abandoned_calls()
+    test_api_batch_ai_mode()
+    print("✅ Gemini batching tests passed")
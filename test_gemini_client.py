@@ -0,0 +1,81 @@
+"""
+Tests for GeminiClient against the local mock Gemini server
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from benchmarks.mock_gemini import start_server
+from utils.gemini_client import GeminiClient
+
+
+def test_rewrite_parses_mock_response():
+    server, base_url = start_server()
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url)
+        result = client.rewrite_prompt_objectively('Is this obviously true?', 'science')
+        assert result['success']
+        assert result['data']['rewritten_prompt']
+        assert result['data']['bias_score'] == 40
+    finally:
+        server.shutdown()
+
+
+def test_session_reuses_connections():
+    server, base_url = start_server()
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url)
+        for i in range(5):
+            assert client.rewrite_prompt_objectively(f'prompt {i}')['success']
+        assert server.stats['requests'] == 5
+        assert server.stats['connections'] == 1
+    finally:
+        server.shutdown()
+
+
+def test_timeouts_and_pool_size_are_configurable():
+    client = GeminiClient(api_key='test', pool_size=3, connect_timeout=1.5, read_timeout=12)
+    assert client.timeout == (1.5, 12)
+    assert client.session.get_adapter('https://example.com')._pool_maxsize == 3
+
+
+def test_connection_errors_are_reported():
+    server, base_url = start_server()
+    server.shutdown()
+    server.server_close()
+
+    client = GeminiClient(api_key='test', base_url=base_url, connect_timeout=0.5)
+    result = client.rewrite_prompt_objectively('prompt')
+    assert not result['success']
+    assert result['error'].startswith('API request failed')
+
+
+def test_waiting_for_a_pooled_connection_times_out():
+    server, base_url = start_server(latency=0.5)
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url, pool_size=1, connect_timeout=0.1)
+        with ThreadPoolExecutor(2) as executor:
+            first = executor.submit(client.rewrite_prompt_objectively, 'first')
+            time.sleep(0.05)
+            started = time.perf_counter()
+            second = client.rewrite_prompt_objectively('second')
+            waited = time.perf_counter() - started
+        assert first.result()['success']
+        assert not second['success'] and second['error_type'] == 'request'
+        assert 'No free connection' in second['error'] and waited < 0.3
+        assert server.stats['requests'] == 1
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_rewrite_parses_mock_response()
+    test_session_reuses_connections()
+    test_timeouts_and_pool_size_are_configurable()
+    test_connection_errors_are_reported()
+    test_waiting_for_a_pooled_connection_times_out()
+    print("✅ GeminiClient tests passed")
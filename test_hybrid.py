@@ -0,0 +1,103 @@
+"""
+Tests for hybrid mode: the NLP pre-screen answers unbiased prompts and
+only biased-looking ones are escalated to Gemini
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from benchmarks.mock_gemini import MockBehavior, start_server
+from models.analysis import HybridRouter, NLPAnalyzer
+from utils.gemini_client import GeminiClient
+
+NEUTRAL = 'What is the boiling point of water at sea level?'
+BIASED = 'Obviously every politician is corrupt, right?'
+
+
+def test_screen_escalates_only_at_or_above_threshold():
+    router = HybridRouter(NLPAnalyzer(), threshold=10)
+
+    nlp_response, escalate = router.screen(NEUTRAL)
+    assert nlp_response['bias_score'] == 0 and not escalate
+    nlp_response, escalate = router.screen(BIASED)
+    assert nlp_response['bias_score'] >= 10 and escalate
+
+    stats = router.get_stats()
+    assert stats['requests'] == 2 and stats['escalated'] == 1
+    assert stats['escalation_rate'] == 0.5
+    assert stats['score_distribution']['0'] == 1
+
+
+def test_response_reports_which_path_answered():
+    router = HybridRouter(NLPAnalyzer())
+    server, base_url = start_server()
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url)
+
+        nlp_response, _ = router.screen(NEUTRAL)
+        local = router.respond(NEUTRAL, nlp_response)
+        assert local['mode'] == 'hybrid' and local['answered_by'] == 'nlp' and not local['escalated']
+        # The memoized NLP response is not modified
+        assert nlp_response['mode'] == 'nlp'
+
+        nlp_response, _ = router.screen(BIASED)
+        escalated = router.respond(BIASED, nlp_response, client.rewrite_prompt_objectively(BIASED))
+        assert escalated['answered_by'] == 'ai' and escalated['escalated']
+        assert escalated['nlp_bias_score'] == nlp_response['bias_score']
+        assert escalated['domain'] == nlp_response['domain']
+    finally:
+        server.shutdown()
+
+
+def test_failed_escalation_falls_back_to_nlp_answer():
+    router = HybridRouter(NLPAnalyzer())
+    server, base_url = start_server(behavior=MockBehavior(error_rate=1.0, error_statuses=[503]))
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url)
+        nlp_response, _ = router.screen(BIASED)
+        response = router.respond(BIASED, nlp_response, client.rewrite_prompt_objectively(BIASED))
+    finally:
+        server.shutdown()
+
+    assert response['answered_by'] == 'nlp' and response['escalated']
+    assert '503' in response['escalation_error']
+    assert response['rewritten_prompt'] == nlp_response['rewritten_prompt']
+    assert router.get_stats()['escalation_failures'] == 1
+
+
+def test_api_hybrid_mode_skips_gemini_for_unbiased_prompts():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        from api.app import app, registry
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+
+    server, base_url = start_server()
+    previous = registry._instances.get('gemini_client')
+    registry._instances['gemini_client'] = GeminiClient(api_key='test', base_url=base_url)
+    try:
+        client = app.test_client()
+        neutral = client.post('/api/analyze', json={'prompt': NEUTRAL, 'mode': 'hybrid'}).get_json()
+        biased = client.post('/api/analyze', json={'prompt': BIASED, 'mode': 'hybrid'}).get_json()
+        stats = client.get('/api/hybrid/stats').get_json()
+    finally:
+        server.shutdown()
+        if previous is None:
+            registry._instances.pop('gemini_client')
+        else:
+            registry._instances['gemini_client'] = previous
+
+    assert neutral['answered_by'] == 'nlp'
+    assert biased['answered_by'] == 'ai'
+    assert server.stats['requests'] == 1
+    assert stats['requests'] >= 2 and stats['escalated'] >= 1
+
+
+if __name__ == "__main__":
+    test_screen_escalates_only_at_or_above_threshold()
+    test_response_reports_which_path_answered()
+    test_failed_escalation_falls_back_to_nlp_answer()
+    test_api_hybrid_mode_skips_gemini_for_unbiased_prompts()
+    print("✅ Hybrid mode tests passed")
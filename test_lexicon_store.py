@@ -0,0 +1,145 @@
+"""
+Tests for the published lexicon file: compiling and validating lexicons,
+atomic publishing, and hot-swapping new versions into a running app
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from models.analysis import NLPAnalyzer
+from utils.lexicon_store import (
+    LexiconError, LexiconStore, build_components, export_lexicon, publish_lexicon, read_lexicon
+)
+
+
+def default_source():
+    return {type(component).__name__: export_lexicon(component) for component in build_components().values()}
+
+
+def test_published_defaults_match_built_in_lexicon():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'lexicon.json')
+        document = publish_lexicon(path, default_source())
+        assert document['version'] == 1 and read_lexicon(path) == document
+
+        components = LexiconStore(path).load()
+        # Same word lists, so the same fingerprint as the hard-coded defaults
+        assert NLPAnalyzer(**components).fingerprint == NLPAnalyzer().fingerprint
+
+        # A partial source keeps the defaults for everything it leaves out
+        document = publish_lexicon(path, {'BiasDetector': {'loaded_terms': ['dreadful']}})
+        assert document['version'] == 2
+        assert document['lexicons']['PromptRewriter'] == default_source()['PromptRewriter']
+        assert document['lexicons']['BiasDetector']['loaded_terms'] == ['dreadful']
+
+
+def test_invalid_lexicons_are_not_published():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'lexicon.json')
+        publish_lexicon(path, default_source())
+        for source in [
+            {'BiasDetector': {'presumption_patterns': ['(unclosed']}},
+            {'BiasDetector': {'not_a_field': []}},
+            {'SpellChecker': {}}
+        ]:
+            try:
+                publish_lexicon(path, source)
+            except LexiconError:
+                pass
+            else:
+                raise AssertionError(f'{source} should have been rejected')
+        assert read_lexicon(path)['version'] == 1
+        assert os.listdir(directory) == ['lexicon.json']
+
+        # A file edited by hand fails its checksum
+        with open(path, encoding='utf-8') as f:
+            document = json.load(f)
+        document['lexicons']['BiasDetector']['loaded_terms'].append('sneaky')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f)
+        try:
+            read_lexicon(path)
+        except LexiconError:
+            pass
+        else:
+            raise AssertionError('expected a checksum failure')
+
+
+def test_store_picks_up_new_versions_and_skips_broken_ones():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'lexicon.json')
+        publish_lexicon(path, default_source())
+        store = LexiconStore(path, check_interval=0)
+        old = store.load()
+        assert store.check() is None
+
+        publish_lexicon(path, {'BiasDetector': {'loaded_terms': ['dreadful']}})
+        new = store.check()
+        assert store.version == 2 and store.get_stats()['reloads'] == 1
+        assert new['bias_detector'].detect_biases('A dreadful idea')['loaded_terms']
+        # Components already handed out are unchanged
+        assert not old['bias_detector'].detect_biases('A dreadful idea')['loaded_terms']
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{not json')
+        assert store.check() is None and store.check() is None
+        assert store.version == 2 and store.get_stats()['reload_failures'] == 1
+
+
+def test_app_swaps_lexicon_without_restart():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        import api.app as api
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+
+    registry = api.registry
+    instances = dict(registry._instances)
+    factories = dict(registry._factories)
+    client = api.app.test_client()
+    prompt = {'prompt': 'A dreadful plan.'}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'lexicon.json')
+        publish_lexicon(path, default_source())
+        api.lexicon_store = LexiconStore(path, check_interval=0)
+        registry.register('lexicon', api._create_lexicon)
+        try:
+            registry.get('lexicon')
+            router = registry.get('hybrid_router')
+            sessions = registry.get('edit_sessions')
+            assert client.post('/api/detect', json=prompt).get_json()['bias_score'] == 0
+
+            publish_lexicon(path, {'BiasDetector': {'loaded_terms': ['dreadful']},
+                                   'PromptRewriter': {'neutral_replacements': {'dreadful': 'weak'}}})
+            detected = client.post('/api/detect', json=prompt).get_json()
+            assert [span['term'] for span in detected['biases_detected']['loaded_terms']] == ['dreadful']
+            assert client.post('/api/analyze', json=prompt).get_json()['rewritten_prompt'] == 'A weak plan.'
+
+            assert router.nlp_analyzer is registry.get('nlp_analyzer')
+            assert sessions.bias_detector is registry.get('bias_detector')
+            status = client.get('/api/lexicon').get_json()
+            assert status['version'] == 2 and status['reloads'] == 1
+            assert status['fingerprint'] == registry.get('nlp_analyzer').fingerprint
+        finally:
+            api.lexicon_store = None
+            registry._instances.clear()
+            registry._instances.update(instances)
+            registry._factories.clear()
+            registry._factories.update(factories)
+            if 'hybrid_router' in instances:
+                instances['hybrid_router'].nlp_analyzer = instances['nlp_analyzer']
+            if 'edit_sessions' in instances:
+                instances['edit_sessions'].set_models(instances['bias_detector'], instances['prompt_rewriter'])
+
+
+if __name__ == "__main__":
+    test_published_defaults_match_built_in_lexicon()
+    test_invalid_lexicons_are_not_published()
+    test_store_picks_up_new_versions_and_skips_broken_ones()
+    test_app_swaps_lexicon_without_restart()
+    print("✅ Lexicon store tests passed")
@@ -0,0 +1,72 @@
+"""
+Tests for the mock Gemini failure injection and the load-test harness
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from benchmarks.load_test import launch, load_prompts, run_load
+from benchmarks.mock_gemini import MALFORMED_KINDS, MockBehavior, malformed_response, start_server
+from utils.gemini_client import GeminiClient
+
+
+def test_behavior_rates_and_latency_distributions():
+    behavior = MockBehavior(error_rate=0.1, malformed_rate=0.2, seed=3)
+    outcomes = [behavior.sample_outcome()[0] for _ in range(10000)]
+    assert 0.08 < outcomes.count('error') / 10000 < 0.12
+    assert 0.18 < outcomes.count('malformed') / 10000 < 0.22
+
+    for dist in ('fixed', 'uniform', 'normal', 'lognormal', 'exponential'):
+        behavior = MockBehavior(latency=0.1, latency_dist=dist, latency_spread=0.05, seed=3)
+        samples = [behavior.sample_latency() for _ in range(4000)]
+        assert min(samples) >= 0
+        assert 0.09 < sum(samples) / len(samples) < 0.11, dist
+
+
+def test_client_reports_every_malformed_kind_as_failure():
+    client = GeminiClient(api_key='test')
+    for kind in MALFORMED_KINDS:
+        response = malformed_response(kind, '{"rewritten_prompt": "x", "bias_score": 10}')
+        try:
+            result = client._parse_result(response)
+        except (KeyError, IndexError, ValueError):
+            continue
+        assert not result['success'], kind
+
+
+def test_injected_errors_reach_the_client():
+    server, base_url = start_server(behavior=MockBehavior(error_rate=1.0, error_statuses=[503]))
+    try:
+        result = GeminiClient(api_key='test', base_url=base_url).rewrite_prompt_objectively('prompt')
+        assert not result['success'] and '503' in result['error']
+        assert server.stats['error'] == 1
+    finally:
+        server.shutdown()
+
+
+def test_load_run_against_launched_api():
+    processes, url, _ = launch('flask', ['--error-rate', '1.0'], no_cache=True)
+    try:
+        summary = asyncio.run(run_load(url, load_prompts(distinct=20, words=10), mode='both',
+                                       concurrency=4, requests=40))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    modes = summary['modes']
+    assert modes['nlp']['ok'] == modes['nlp']['requests']
+    assert modes['ai']['ok'] == 0
+    assert sum(modes['ai']['errors'].values()) == modes['ai']['requests']
+    assert modes['nlp']['requests'] + modes['ai']['requests'] == 40
+
+
+if __name__ == "__main__":
+    test_behavior_rates_and_latency_distributions()
+    test_client_reports_every_malformed_kind_as_failure()
+    test_injected_errors_reach_the_client()
+    test_load_run_against_launched_api()
+    print("✅ Load harness tests passed")
@@ -0,0 +1,129 @@
+"""
+Tests for long-document analysis: sentence segmentation, global span
+offsets, size/time limits and linear scaling on adversarial inputs
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from models.analysis import AnalysisTimeout, NLPAnalyzer
+from utils.text_segmenter import segment_sentences
+
+# Inputs that make the lazy presumption/question groups rescan the rest
+# of the text from every occurrence of their prefix
+ADVERSARIAL_UNITS = [
+    'explain why the thing ',
+    'why is it so ',
+    'show me why it ',
+    'Obviously all terrible. Why is this bad? '
+]
+
+
+def test_segments_are_trimmed_ordered_and_bounded():
+    text = '  First one. Second?  "Third!" Fourth\n\nFifth ' + 'word ' * 100 + 'x' * 300
+    spans = segment_sentences(text, max_chars=120)
+
+    assert [text[start:end] for start, end in spans[:4]] == ['First one.', 'Second?', '"Third!"', 'Fourth']
+    # The over-long sentence is cut at a space, the unbroken word at the limit
+    assert text[spans[4][0]:spans[4][1]].startswith('Fifth word') and text[spans[4][1]] == ' '
+    assert [text[start:end] for start, end in spans[-3:]] == ['x' * 120, 'x' * 120, 'x' * 60]
+    assert all(end - start <= 120 for start, end in spans)
+    assert all(not text[start].isspace() and not text[end - 1].isspace() for start, end in spans)
+    assert all(a_end <= b_start for (_, a_end), (b_start, _) in zip(spans, spans[1:]))
+    # Nothing but whitespace is left out
+    covered = set()
+    for start, end in spans:
+        covered.update(range(start, end))
+    assert all(text[i].isspace() for i in range(len(text)) if i not in covered)
+
+
+def test_long_document_spans_use_global_offsets():
+    analyzer = NLPAnalyzer(long_document_chars=100)
+    sentence = 'The report was fine. Obviously every politician is corrupt. Explain why ghosts exist. '
+    prompt = sentence * 20
+    lowered = prompt.lower()
+
+    result = analyzer.analyze(prompt)
+    biases = result['biases_detected']
+    assert len(biases['loaded_terms']) == 20
+    assert len(biases['presumptive_language']) == 20
+    for kind, spans in biases.items():
+        if kind == 'leading_questions':
+            continue
+        for span in spans:
+            assert lowered[span['position']:span['position'] + span['length']] == span['term'], kind
+
+    assert 'obviously' not in result['rewritten_prompt'].lower()
+    assert 'What evidence exists for ghosts' in result['rewritten_prompt']
+    # Changes are listed once each, not once per sentence
+    assert len(result['changes_made']) == len(set(result['changes_made']))
+    assert analyzer.detect(prompt)['biases_detected'] == biases
+
+
+def test_short_prompts_keep_whole_text_analysis():
+    prompt = 'Explain why ghosts. They exist?'
+    whole = NLPAnalyzer().analyze(prompt)
+    assert whole['biases_detected']['presumptive_language']
+
+
+def test_time_limit_raises():
+    analyzer = NLPAnalyzer(long_document_chars=100, time_limit=0.0)
+    try:
+        analyzer.analyze('Obviously this is terrible. ' * 100)
+    except AnalysisTimeout:
+        pass
+    else:
+        raise AssertionError('expected AnalysisTimeout')
+
+
+def _best_time(fn, text, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_runtime_grows_linearly_on_adversarial_inputs():
+    analyzer = NLPAnalyzer()
+    for unit in ADVERSARIAL_UNITS:
+        small = unit * (40000 // len(unit))
+        large = unit * (160000 // len(unit))
+        ratio = _best_time(analyzer.analyze, large) / _best_time(analyzer.analyze, small)
+        # 4x the input: ~4x the time when linear, ~16x when quadratic
+        assert ratio < 7, (unit, ratio)
+
+
+def test_api_rejects_oversized_prompts():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        import api.app as api
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+
+    previous = api.MAX_PROMPT_CHARS
+    api.MAX_PROMPT_CHARS = 50
+    try:
+        client = api.app.test_client()
+        long_prompt = 'x' * 51
+        assert client.post('/api/analyze', json={'prompt': long_prompt}).status_code == 413
+        assert client.post('/api/detect', json={'prompt': long_prompt}).status_code == 413
+        assert client.post('/api/analyze/stream', json={'prompt': long_prompt}).status_code == 413
+        assert client.post('/api/analyze/batch', json={'prompts': ['ok', long_prompt]}).status_code == 413
+        assert client.post('/api/analyze', json={'prompt': 'x' * 50}).status_code == 200
+    finally:
+        api.MAX_PROMPT_CHARS = previous
+
+
+if __name__ == "__main__":
+    test_segments_are_trimmed_ordered_and_bounded()
+    test_long_document_spans_use_global_offsets()
+    test_short_prompts_keep_whole_text_analysis()
+    test_time_limit_raises()
+    test_runtime_grows_linearly_on_adversarial_inputs()
+    test_api_rejects_oversized_prompts()
+    print("✅ Long-document tests passed")
@@ -0,0 +1,98 @@
+"""
+Tests for the per-stage timers, the Prometheus export and the
+X-Debug-Timing breakdown on /api/analyze
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from benchmarks.mock_gemini import start_server
+from utils.gemini_client import GeminiClient
+from utils.metrics import _NULL_TIMER, Metrics, metrics
+
+
+def test_render_counters_and_histograms():
+    registry = Metrics(prefix='test')
+    registry.describe('requests_total', 'Requests')
+    registry.inc('requests_total', mode='nlp', domain='general')
+    registry.inc('requests_total', mode='nlp', domain='general')
+    registry.observe('latency_seconds', 0.003, mode='ai')
+    registry.observe('latency_seconds', 20.0, mode='ai')
+
+    text = registry.render()
+    assert '# HELP test_requests_total Requests' in text
+    assert '# TYPE test_requests_total counter' in text
+    assert 'test_requests_total{domain="general",mode="nlp"} 2' in text
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert 'test_latency_seconds_bucket{mode="ai",le="0.0025"} 0' in text
+    assert 'test_latency_seconds_bucket{mode="ai",le="0.005"} 1' in text
+    assert 'test_latency_seconds_bucket{mode="ai",le="30.0"} 2' in text
+    assert 'test_latency_seconds_bucket{mode="ai",le="+Inf"} 2' in text
+    assert 'test_latency_seconds_count{mode="ai"} 2' in text
+
+
+def test_disabled_metrics_record_nothing():
+    registry = Metrics(enabled=False)
+    assert registry.stage('bias_detection') is _NULL_TIMER
+    registry.inc('requests_total', mode='nlp')
+    with registry.stage('bias_detection'):
+        pass
+    assert registry.render() == '\n'
+
+    # A requested breakdown is still collected
+    token = registry.start_request_timing()
+    with registry.stage('bias_detection'):
+        pass
+    assert list(registry.finish_request_timing(token)) == ['bias_detection']
+    assert registry.render() == '\n'
+
+
+def test_gemini_network_and_parse_stages_are_timed():
+    server, base_url = start_server(latency=0.05)
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url)
+        token = metrics.start_request_timing()
+        assert client.rewrite_prompt_objectively('Is this bad?')['success']
+        stages = metrics.finish_request_timing(token)
+    finally:
+        server.shutdown()
+
+    assert set(stages) == {'gemini_request', 'gemini_parse'}
+    assert stages['gemini_request'] >= 50
+
+
+def test_debug_header_returns_breakdown_without_touching_cache():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        from api.app import app
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+    client = app.test_client()
+    prompt = {'prompt': 'Obviously every politician is corrupt, right?'}
+
+    plain = client.post('/api/analyze', json=prompt).get_json()
+    assert 'timing' not in plain
+
+    timed = client.post('/api/analyze', json=prompt, headers={'X-Debug-Timing': '1'}).get_json()
+    assert timed['timing']['total_ms'] > 0
+    assert set(timed['timing']['stages_ms']) <= {'domain_detection', 'bias_detection', 'rewrite', 'alternatives'}
+
+    # The memoized response stays free of per-request timing
+    assert 'timing' not in client.post('/api/analyze', json=prompt).get_json()
+
+    client.post('/api/analyze', json={})
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'prompt_analyzer_analyze_requests_total{domain="political",mode="nlp"}' in text
+    assert 'prompt_analyzer_analyze_errors_total{domain="unknown",mode="nlp",status="400"}' in text
+    assert 'prompt_analyzer_analyze_request_seconds_bucket{mode="nlp",le="+Inf"}' in text
+    assert 'prompt_analyzer_cache_stat{cache="nlp",stat="hits"}' in text
+
+
+if __name__ == "__main__":
+    test_render_counters_and_histograms()
+    test_disabled_metrics_record_nothing()
+    test_gemini_network_and_parse_stages_are_timed()
+    test_debug_header_returns_breakdown_without_touching_cache()
+    print("✅ Metrics tests passed")
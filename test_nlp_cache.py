@@ -0,0 +1,83 @@
+"""
+Tests for the memoized NLP analysis and the byte-capped LRU behind it
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from models.analysis import NLPAnalyzer
+from utils.result_cache import SizedLRUCache, deep_sizeof
+
+
+def test_sized_lru_is_capped_by_bytes():
+    value = {'text': 'x' * 1000}
+    entry_size = deep_sizeof(value) + deep_sizeof('key-0')
+    cache = SizedLRUCache(max_bytes=entry_size * 3)
+
+    for i in range(10):
+        cache.set(f'key-{i}', {'text': 'x' * 1000})
+
+    stats = cache.get_stats()
+    assert stats['entries'] == 3
+    assert stats['bytes'] <= cache.max_bytes
+    assert stats['evictions'] == 7
+    assert cache.get('key-0') is None
+    assert cache.get('key-9') is not None
+
+
+def test_sized_lru_keeps_recently_used_entries():
+    cache = SizedLRUCache(max_bytes=deep_sizeof({'v': 'a' * 100}) * 2 + 200)
+    cache.set('a', {'v': 'a' * 100})
+    cache.set('b', {'v': 'b' * 100})
+    cache.get('a')
+    cache.set('c', {'v': 'c' * 100})
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+
+
+def test_sized_lru_rejects_values_larger_than_the_cap():
+    cache = SizedLRUCache(max_bytes=500)
+    cache.set('small', 'x')
+    cache.set('huge', 'x' * 10000)
+    assert cache.get('small') == 'x'
+    assert cache.get('huge') is None
+    assert cache.get_stats()['rejected'] == 1
+
+
+def test_cached_analysis_matches_uncached():
+    cached = NLPAnalyzer(cache=SizedLRUCache())
+    uncached = NLPAnalyzer()
+    prompts = ['Why is the senate obviously corrupt?', 'What is photosynthesis?', '']
+
+    for _ in range(2):
+        for prompt in prompts:
+            assert cached.analyze(prompt) == uncached.analyze(prompt)
+
+    stats = cached.cache.get_stats()
+    assert stats['hits'] == 3 and stats['misses'] == 3
+
+
+def test_lexicon_change_invalidates_cached_results():
+    analyzer = NLPAnalyzer(cache=SizedLRUCache())
+    prompt = 'This plan is mediocre'
+    before = analyzer.analyze(prompt)
+    fingerprint = analyzer.fingerprint
+
+    analyzer.bias_detector.loaded_terms.add('mediocre')
+    analyzer.bias_detector._compile_matcher()
+    assert analyzer.refresh_fingerprint() != fingerprint
+
+    after = analyzer.analyze(prompt)
+    assert after['biases_detected']['loaded_terms']
+    assert not before['biases_detected']['loaded_terms']
+
+
+if __name__ == "__main__":
+    test_sized_lru_is_capped_by_bytes()
+    test_sized_lru_keeps_recently_used_entries()
+    test_sized_lru_rejects_values_larger_than_the_cap()
+    test_cached_analysis_matches_uncached()
+    test_lexicon_change_invalidates_cached_results()
+    print("✅ NLP cache tests passed")
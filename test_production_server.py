@@ -0,0 +1,101 @@
+"""
+Tests for the production Gunicorn setup: models preloaded in the master,
+forked workers sharing them, and rolling restarts that drop no requests
+"""
+
+import asyncio
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from benchmarks.bench_scaling import _children, server_memory
+from benchmarks.load_test import launch, load_prompts, run_load
+
+
+def get_json(url: str, method: str = 'GET', body=None):
+    data = None if body is None else json.dumps(body).encode('utf-8')
+    request = urllib.request.Request(url, data=data, method=method, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)
+
+
+def wait_for_workers(master_pid: int, count: int, replacing=frozenset(), timeout: float = 15):
+    """The master's worker pids once it has count workers, none of them in replacing"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        workers = set(_children(master_pid))
+        if len(workers) == count and not workers & replacing:
+            return workers
+        time.sleep(0.1)
+    raise AssertionError(f'expected {count} new workers, have {_children(master_pid)}')
+
+
+def test_preloaded_workers_survive_rolling_restart():
+    # Without keep-alive, as behind a proxy: an old worker closing an idle
+    # kept-alive connection races the client's next request on it
+    os.environ['GUNICORN_KEEPALIVE'] = '0'
+    try:
+        processes, url, _ = launch('gunicorn', [], no_cache=True, workers=2)
+    finally:
+        os.environ.pop('GUNICORN_KEEPALIVE', None)
+    master = processes[0]
+    try:
+        health = get_json(url + '/api/health')
+        assert health['startup']['mode'] == 'preload'
+        assert all(model['loaded'] for model in health['startup']['models'].values())
+
+        workers = wait_for_workers(master.pid, 2)
+        memory = server_memory(master.pid)
+        # Most of each worker's memory is the master's, shared copy-on-write
+        assert memory['worker_shared_kb'] > memory['worker_private_kb']
+
+        async def load_through_restart():
+            load = asyncio.ensure_future(run_load(url, load_prompts(distinct=50, words=10),
+                                                  concurrency=4, duration=4))
+            await asyncio.sleep(1)
+            master.send_signal(signal.SIGHUP)
+            return await load
+
+        summary = asyncio.run(load_through_restart())
+        stats = summary['modes']['nlp']
+        assert stats['requests'] > 0 and stats['ok'] == stats['requests'], stats['errors']
+
+        wait_for_workers(master.pid, 2, replacing=workers)
+        assert get_json(url + '/api/health')['startup']['mode'] == 'preload'
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def test_edit_sessions_are_served_by_any_worker():
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['EDIT_SESSION_PATH'] = os.path.join(directory, 'sessions.sqlite3')
+        try:
+            processes, url, _ = launch('gunicorn', [], no_cache=True, workers=3)
+        finally:
+            os.environ.pop('EDIT_SESSION_PATH', None)
+        try:
+            session = get_json(url + '/api/sessions', 'POST', {'prompt': 'The report'})
+            session_url = f"{url}/api/sessions/{session['session_id']}"
+            # Each request opens a new connection, which any worker may accept
+            for version in range(30):
+                edited = get_json(session_url, 'PATCH', {'start': 10, 'end': 10, 'text': '!', 'version': version})
+                assert edited['version'] == version + 1
+            assert get_json(session_url)['text'] == 'The report' + '!' * 30
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    test_preloaded_workers_survive_rolling_restart()
+    test_edit_sessions_are_served_by_any_worker()
+    print("✅ Production server tests passed")
@@ -0,0 +1,140 @@
+"""
+Equivalence tests for the precompiled PromptRewriter engine
+Compares rewrite_prompt against the original pattern-by-pattern implementation
+"""
+
+import os
+import random
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from models.bias_detector import BiasDetector
+from models.prompt_rewriter import PromptRewriter
+
+CORPUS = [
+    "Why is climate change obviously fake?",
+    "Isn't it true that all politicians are corrupt?",
+    "Don't you think the senate is evil?",
+    "Prove that vaccines are perfect and never fail",
+    "Show me why ghosts exist",
+    "Explain why astrology works, clearly",
+    "Everyone knows the economy is a disaster. Of course it is.",
+    "Why is the new policy so bad?",
+    "Why does the soul exist",
+    "prove bigfoot exists",
+    "show that every study agrees and none disagree",
+    "Nevertheless, the fakest evidence is always imperfect",
+    "OBVIOUSLY the AWFUL plan is TERRIBLE",
+    "The evil-doers were undoubtedly stupid; the idiotic plan was catastrophic!",
+    "fakevil obvclearlyiously evobviouslyil",
+    "everyone clearlyknows of clearly course",
+    "Surely, definitely, certainly — it's amazing and brilliant.",
+    "Ünïcödé text is obviously fine, ſurely",
+    "   lots   of    whitespace   always   ",
+    "",
+    "What is the boiling point of water?",
+]
+
+FRAGMENTS = [
+    'obviously', 'clearly', 'everyone knows', 'everyone', 'knows', 'of course', 'of', 'course',
+    'undoubtedly', 'certainly', 'always', 'never', 'definitely', 'surely', 'terrible',
+    'awful', 'horrible', 'amazing', 'perfect', 'disgusting', 'brilliant', 'stupid',
+    'idiotic', 'catastrophic', 'disaster', 'evil', 'corrupt', 'fake', 'all', 'every',
+    'none', 'why is', 'so bad', "isn't it true that", "don't you think", 'prove that',
+    'show that', 'show me why', 'exists', 'is real', 'works', 'happened', 'explain why',
+    'tell me why', 'why does', 'exist', 'prove', 'show', 'the', 'data', 'ly', 'e', 'd',
+    'ev', 'il', 'ne', 'ver', '?', ',', '.', '-', "'",
+]
+
+
+def legacy_rewrite_prompt(rewriter, text, biases):
+    """The original rewrite_prompt implementation, kept as the reference"""
+    rewritten = text
+    changes_made = []
+
+    for term, replacement in rewriter.neutral_replacements.items():
+        if term.lower() in rewritten.lower():
+            pattern = re.compile(re.escape(term), re.IGNORECASE)
+            if replacement:
+                rewritten = pattern.sub(replacement, rewritten)
+                changes_made.append(f"Replaced '{term}' with '{replacement}'")
+            else:
+                rewritten = pattern.sub('', rewritten)
+                changes_made.append(f"Removed '{term}'")
+
+    for pattern, replacement in rewriter.presumption_patterns:
+        match = re.search(pattern, rewritten, re.IGNORECASE)
+        if match:
+            rewritten = re.sub(pattern, replacement, rewritten, flags=re.IGNORECASE)
+            changes_made.append(f"Removed presumption about unproven facts")
+            break
+
+    for pattern, replacement in rewriter.question_patterns:
+        match = re.search(pattern, rewritten, re.IGNORECASE)
+        if match:
+            rewritten = re.sub(pattern, replacement, rewritten, flags=re.IGNORECASE)
+            changes_made.append(f"Reformulated question structure")
+
+    rewritten = re.sub(r'\ball\b', 'many', rewritten, flags=re.IGNORECASE)
+    rewritten = re.sub(r'\bevery\b', 'most', rewritten, flags=re.IGNORECASE)
+    rewritten = re.sub(r'\bnone\b', 'few', rewritten, flags=re.IGNORECASE)
+
+    if 'leading_questions' in biases and biases['leading_questions']:
+        rewritten = re.sub(r"^(isn't it|aren't they|don't you think)\s+(that\s+)?",
+                           "what information exists about ", rewritten, flags=re.IGNORECASE)
+        rewritten = re.sub(r"why (is|are) (.+?) (so )?(bad|good|terrible|great)\??",
+                           r"what are the characteristics of \2?", rewritten, flags=re.IGNORECASE)
+        changes_made.append("Converted leading question to neutral query")
+
+    rewritten = re.sub(r'\s+', ' ', rewritten).strip()
+    if rewritten:
+        rewritten = rewritten[0].upper() + rewritten[1:]
+
+    return {'original': text, 'rewritten': rewritten, 'changes': changes_made}
+
+
+def assert_equivalent(rewriter, detector, text):
+    biases = detector.detect_biases(text)
+    assert rewriter.rewrite_prompt(text, biases) == legacy_rewrite_prompt(rewriter, text, biases), text
+
+
+def test_matches_legacy_on_corpus():
+    rewriter = PromptRewriter()
+    detector = BiasDetector()
+    for text in CORPUS:
+        assert_equivalent(rewriter, detector, text)
+
+
+def test_matches_legacy_on_random_text():
+    rewriter = PromptRewriter()
+    detector = BiasDetector()
+    rng = random.Random(4321)
+    for _ in range(3000):
+        words = rng.choices(FRAGMENTS, k=rng.randint(1, 25))
+        # Mix spaced and glued fragments so terms also collide inside words
+        text = ''.join(word + rng.choice([' ', ' ', ' ', '']) for word in words)
+        if rng.random() < 0.3:
+            text = ''.join(c.upper() if rng.random() < 0.5 else c for c in text)
+        assert_equivalent(rewriter, detector, text)
+
+
+def test_single_pass_is_used_for_current_lexicon():
+    assert PromptRewriter()._single_pass_safe
+
+
+def test_unsafe_lexicon_falls_back_to_sequential():
+    rewriter = PromptRewriter()
+    rewriter.neutral_replacements['appears'] = 'seems'  # 'undoubtedly' -> 'it appears'
+    rewriter._compile_patterns()
+    assert not rewriter._single_pass_safe
+    assert rewriter.rewrite_prompt('undoubtedly true', {})['rewritten'] == 'It seems true'
+
+
+if __name__ == "__main__":
+    test_matches_legacy_on_corpus()
+    test_matches_legacy_on_random_text()
+    test_single_pass_is_used_for_current_lexicon()
+    test_unsafe_lexicon_falls_back_to_sequential()
+    print("✅ rewrite_prompt matches the legacy implementation")
@@ -0,0 +1,171 @@
+"""
+Tests for parsing Gemini replies: the recorded corpus of messy responses,
+incremental parsing of streamed replies, structured-output requests and
+the parse-failure rate
+"""
+
+import json
+import os
+import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from benchmarks.bench_response_parser import load_corpus
+from benchmarks.mock_gemini import MockBehavior, gemini_response, start_server
+from utils.gemini_client import GeminiClient
+from utils.response_parser import (
+    BATCH_SCHEMA, REWRITE_SCHEMA, IncrementalParser, ResponseParseError, parse_rewrite
+)
+
+
+def outcome(parse, text):
+    try:
+        return 'ok', parse(text)
+    except ResponseParseError as e:
+        return e.kind, None
+
+
+def streamed(text, rng):
+    parser = IncrementalParser()
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 40)
+        parser.feed(text[position:position + size])
+        position += size
+    return parser.result()
+
+
+def test_recorded_responses():
+    corpus = load_corpus()
+    rng = random.Random(5)
+    for entry in corpus:
+        kind, data = outcome(parse_rewrite, entry['text'])
+        assert kind == entry['expect'], (entry['name'], kind)
+        if kind == 'ok':
+            for field in ('rewritten_prompt', 'bias_score', 'changes_made', 'biases_found'):
+                if field in entry:
+                    assert data[field] == entry[field], (entry['name'], field, data[field])
+
+        # Streamed in random pieces, the same outcome and the same analysis
+        for _ in range(3):
+            assert outcome(lambda text: streamed(text, rng), entry['text']) == (kind, data), entry['name']
+    assert {entry['expect'] for entry in corpus} >= {'ok', 'empty', 'no_json', 'truncated', 'invalid_json',
+                                                    'missing_field', 'invalid_field'}
+
+
+def test_fields_arrive_as_they_complete():
+    parser = IncrementalParser()
+    assert parser.feed('```json\n{"rewritten_prompt": "What evid') == []
+    assert parser.feed('ence exists?", "bias_score": "4') == [('rewritten_prompt', 'What evidence exists?')]
+    assert parser.feed('0", "changes_made": ["a\\"') == [('bias_score', 40)]
+    assert parser.feed('b"]}\n```\n}') == [('changes_made', ['a"b'])]
+    assert parser.complete and parser.result()['changes_made'] == ['a"b']
+
+    # An invalid field fails as soon as it is complete
+    parser = IncrementalParser()
+    try:
+        parser.feed('{"rewritten_prompt": null, "bias_score": 10')
+    except ResponseParseError as e:
+        assert e.kind == 'invalid_field'
+    else:
+        raise AssertionError('expected an invalid field')
+
+
+def test_one_character_pieces_and_no_retained_text():
+    reply = '```json\n' + json.dumps({
+        'original_prompt': 'Is "x" \\ obviously y?', 'rewritten_prompt': 'Is x y? ' * 2000, 'bias_score': 40,
+        'changes_made': ['Removed "obviously"'], 'biases_found': [], 'explanation': 'Leading {question}'
+    }) + '\n```'
+    parser = IncrementalParser()
+    fields = [field for char in reply for field in parser.feed(char)]
+    assert parser.result() == parse_rewrite(reply)
+    assert [name for name, _ in fields] == list(parse_rewrite(reply))
+
+    # Completed fields are not kept as text, only the one being read
+    parser = IncrementalParser()
+    parser.feed('{"rewritten_prompt": "' + 'long ' * 20000)
+    parser.feed('", "bias_score": 4')
+    assert ''.join(parser._item_parts) == ' "bias_score": 4'
+
+
+def test_failures_are_reported_and_counted():
+    client = GeminiClient(api_key='test')
+    assert client._parse_result(gemini_response('{"rewritten_prompt": "x"}\n}'))['success']
+
+    result = client._parse_result(gemini_response('{"rewritten_prompt": "cut o'))
+    assert not result['success'] and result['error_type'] == 'parse'
+    assert result['error'] == 'Could not parse Gemini response: Gemini response was cut off'
+
+    blocked = client._parse_result({'candidates': [], 'promptFeedback': {'blockReason': 'SAFETY'}})
+    assert 'SAFETY' in blocked['error']
+
+    stats = client.parse_stats.get_stats()
+    assert stats['parsed'] == 1 and stats['failed'] == 2
+    assert stats['failures']['truncated'] == 1 and stats['failures']['no_candidates'] == 1
+    assert stats['failure_rate'] == round(2 / 3, 4)
+
+
+def test_structured_output_requests():
+    client = GeminiClient(api_key='test')
+    config = client._build_request('prompt', 'general')['generationConfig']
+    assert config['responseMimeType'] == 'application/json' and config['responseSchema'] == REWRITE_SCHEMA
+    batch_config = client._build_batch_request(['a', 'b'], 'general')['generationConfig']
+    assert batch_config['responseSchema'] == BATCH_SCHEMA and batch_config['maxOutputTokens'] == 8192
+    items = BATCH_SCHEMA['properties']['results']['items']
+    assert 'index' in items['required'] and 'index' not in REWRITE_SCHEMA['properties']
+
+    config = GeminiClient(api_key='test', structured_output=False)._build_request('prompt', 'general')
+    assert 'responseSchema' not in config['generationConfig']
+
+
+def test_stream_yields_validated_fields():
+    server, base_url = start_server()
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url)
+        events = list(client.stream_rewrite('Is this obviously true?'))
+    finally:
+        server.shutdown()
+
+    fields = dict(payload for event, payload in events if event == 'field')
+    assert fields['bias_score'] == 40 and fields['rewritten_prompt']
+    event, result = events[-1]
+    assert event == 'result' and result['success'] and result['data'] == fields
+
+
+def test_api_reports_parse_failures_as_bad_gateway():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        from api.app import app, registry
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+
+    server, base_url = start_server(behavior=MockBehavior(malformed_rate=1.0, seed=1))
+    previous = registry._instances.get('gemini_client')
+    registry._instances['gemini_client'] = GeminiClient(api_key='test', base_url=base_url)
+    try:
+        client = app.test_client()
+        response = client.post('/api/analyze', json={'prompt': 'Is this obviously true?', 'mode': 'ai',
+                                                     'fallback': False})
+        metrics_text = client.get('/metrics').get_data(as_text=True)
+    finally:
+        server.shutdown()
+        if previous is None:
+            registry._instances.pop('gemini_client')
+        else:
+            registry._instances['gemini_client'] = previous
+
+    assert response.status_code == 502
+    assert response.get_json()['error'].startswith('Could not parse Gemini response')
+    assert 'gemini_parse_stat{client="gemini_client",stat="failure_rate"} 1' in metrics_text
+
+
+if __name__ == "__main__":
+    test_recorded_responses()
+    test_fields_arrive_as_they_complete()
+    test_one_character_pieces_and_no_retained_text()
+    test_failures_are_reported_and_counted()
+    test_structured_output_requests()
+    test_stream_yields_validated_fields()
+    test_api_reports_parse_failures_as_bad_gateway()
+    print("✅ Response parser tests passed")
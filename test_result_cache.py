@@ -0,0 +1,159 @@
+"""
+Tests for the two-tier result cache and its use by GeminiClient
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from utils.gemini_client import GeminiClient
+from utils.result_cache import ResultCache, make_key, normalize_prompt
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_entries=2)
+    cache.set('a', {'v': 1})
+    cache.set('b', {'v': 2})
+    cache.get('a')
+    cache.set('c', {'v': 3})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'v': 1}
+    assert cache.get('c') == {'v': 3}
+    stats = cache.get_stats()
+    assert stats['lru_evictions'] == 1
+    assert stats['memory_hits'] == 3
+    assert stats['misses'] == 1
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = ResultCache(ttl=60, clock=clock)
+    cache.set('a', {'v': 1})
+    clock.now += 59
+    assert cache.get('a') == {'v': 1}
+    clock.now += 2
+    assert cache.get('a') is None
+    assert cache.get_stats()['expired_evictions'] == 1
+
+
+def test_disk_tier_is_shared_between_instances():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'cache.sqlite3')
+        writer = ResultCache(path=path)
+        writer.set('a', {'v': [1, 'é']})
+
+        reader = ResultCache(path=path)
+        assert reader.get('a') == {'v': [1, 'é']}
+        assert reader.get('a') == {'v': [1, 'é']}
+        stats = reader.get_stats()
+        assert stats['disk_hits'] == 1
+        assert stats['memory_hits'] == 1
+        assert stats['disk_entries'] == 1
+
+
+def test_disk_tier_expiry_and_purge():
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'cache.sqlite3')
+        ResultCache(path=path, ttl=10, clock=clock).set('a', {'v': 1})
+        clock.now += 11
+        reader = ResultCache(path=path, ttl=10, clock=clock)
+        assert reader.get('a') is None
+        assert reader.purge_expired() == 0
+        assert reader.get_stats()['disk_entries'] == 0
+
+
+def test_disk_tier_is_capped_and_purged_as_it_is_written():
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'cache.sqlite3')
+        cache = ResultCache(path=path, max_entries=0, ttl=10, clock=clock,
+                            max_disk_entries=3, purge_every=5)
+        for key in 'abcd':
+            cache.set(key, {'v': key})
+        stats = cache.get_stats()
+        assert stats['disk_entries'] == 3 and stats['disk_evictions'] == 1
+        # The oldest entry went first
+        assert cache.get('a') is None and cache.get('b') == {'v': 'b'}
+
+        # The fifth write evicts 'b' for the cap and purges what expired before it
+        clock.now += 11
+        cache.set('e', {'v': 'e'})
+        stats = cache.get_stats()
+        assert stats['disk_entries'] == 1 and stats['disk_evictions'] == 2
+        assert stats['expired_evictions'] == 2
+
+
+def test_disk_hit_keeps_its_expiry_in_memory():
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'cache.sqlite3')
+        ResultCache(path=path, ttl=10, clock=clock).set('a', {'v': 1})
+        clock.now += 8
+        reader = ResultCache(path=path, ttl=10, clock=clock)
+        assert reader.get('a') == {'v': 1}
+        # Served from memory now, but still gone 10s after it was written
+        clock.now += 3
+        assert reader.get('a') is None
+        assert reader.get_stats()['disk_hits'] == 1
+
+
+def test_key_normalizes_whitespace_only():
+    assert normalize_prompt('  Is  this\n biased? ') == 'Is this biased?'
+    assert make_key(normalize_prompt('a  b'), 'general') == make_key(normalize_prompt('a b'), 'general')
+    assert make_key('a b', 'general') != make_key('A b', 'general')
+    assert make_key('a b', 'general') != make_key('a b', 'political')
+
+
+def test_gemini_client_serves_repeats_from_cache():
+    client = GeminiClient(api_key='test', cache=ResultCache())
+    calls = []
+
+    def fake_request(prompt, domain):
+        calls.append((prompt, domain))
+        return {'success': True, 'data': {'rewritten_prompt': prompt.strip()}, 'raw_response': '{}'}
+
+    client._request_rewrite = fake_request
+
+    first = client.rewrite_prompt_objectively('Why is it bad?', 'general')
+    second = client.rewrite_prompt_objectively('Why  is it bad? ', 'general')
+    other_domain = client.rewrite_prompt_objectively('Why is it bad?', 'political')
+
+    assert not first['cached']
+    assert second['cached']
+    assert second['data'] == first['data']
+    assert not other_domain['cached']
+    assert len(calls) == 2
+
+
+def test_gemini_client_does_not_cache_failures():
+    client = GeminiClient(api_key='test', cache=ResultCache())
+    client._request_rewrite = lambda prompt, domain: {'success': False, 'error': 'API request failed'}
+
+    client.rewrite_prompt_objectively('prompt')
+    assert not client.rewrite_prompt_objectively('prompt')['cached']
+    assert client.cache.get_stats()['sets'] == 0
+
+
+if __name__ == "__main__":
+    test_lru_eviction()
+    test_ttl_expiry()
+    test_disk_tier_is_shared_between_instances()
+    test_disk_tier_expiry_and_purge()
+    test_disk_tier_is_capped_and_purged_as_it_is_written()
+    test_disk_hit_keeps_its_expiry_in_memory()
+    test_key_normalizes_whitespace_only()
+    test_gemini_client_serves_repeats_from_cache()
+    test_gemini_client_does_not_cache_failures()
+    print("✅ Result cache tests passed")
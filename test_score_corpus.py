@@ -0,0 +1,91 @@
+"""
+Tests for the corpus scoring CLI: JSONL and CSV input, ordered and
+unordered output, and resuming an interrupted run
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from score_corpus import completed_records, main
+from utils.corpus_pipeline import read_csv, read_jsonl
+
+PROMPTS = [f'Is option {i} obviously the best one?' for i in range(40)]
+
+
+def test_readers():
+    jsonl = io.StringIO('{"prompt": "One?", "id": 7}\n\n"Two?"\nnot json\n{"text": "Three?"}\n')
+    records = list(read_jsonl(jsonl))
+    assert records[0] == {'index': 0, 'prompt': 'One?', 'id': 7}
+    assert records[1] == {'index': 2, 'prompt': 'Two?'}
+    assert records[2]['index'] == 3 and records[2]['error'].startswith('Invalid JSON')
+    assert records[3] == {'index': 4, 'prompt': None}
+
+    rows = 'id,text\na,One?\nb,Two?\nc,Three?\n'
+    records = list(read_csv(io.StringIO(rows), field='text'))
+    assert records == [{'index': 0, 'prompt': 'One?', 'id': 'a'}, {'index': 1, 'prompt': 'Two?', 'id': 'b'},
+                       {'index': 2, 'prompt': 'Three?', 'id': 'c'}]
+    assert [record['index'] for record in read_csv(io.StringIO(rows), field='text', skip=2)] == [2]
+
+
+def score(directory, name, lines, *args):
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(''.join(line + '\n' for line in lines))
+    output = os.path.join(directory, 'scores.jsonl')
+    assert main([path, '-o', output, *args]) == 0
+    with open(output, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_ordered_and_unordered_output():
+    lines = [json.dumps({'prompt': prompt, 'id': i}) for i, prompt in enumerate(PROMPTS)]
+    with tempfile.TemporaryDirectory() as directory:
+        ordered = score(directory, 'prompts.jsonl', lines, '--workers', '2', '--chunk-size', '3')
+        os.remove(os.path.join(directory, 'scores.jsonl'))
+        unordered = score(directory, 'prompts.jsonl', lines, '--workers', '2', '--chunk-size', '3', '--unordered')
+        os.remove(os.path.join(directory, 'scores.jsonl'))
+        serial = score(directory, 'prompts.csv', ['prompt,id'] + [f'"{p}",{i}' for i, p in enumerate(PROMPTS)],
+                       '--rewrite')
+
+    assert [record['index'] for record in ordered] == list(range(len(PROMPTS)))
+    assert sorted(unordered, key=lambda record: record['index']) == ordered
+    assert [record['prompt'] for record in serial] == PROMPTS and 'rewritten_prompt' in serial[0]
+    assert serial[0]['bias_score'] == ordered[0]['bias_score'] > 0
+
+
+def test_resume_skips_what_was_written():
+    lines = [json.dumps(prompt) for prompt in PROMPTS]
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'scores.jsonl')
+        full = score(directory, 'prompts.jsonl', lines)
+
+        # An unordered run stopped mid-write: a gap after index 2 and a torn last line
+        with open(output, 'w', encoding='utf-8') as f:
+            for index in (1, 0, 2, 6, 5):
+                f.write(json.dumps(full[index]) + '\n')
+            f.write(json.dumps(full[9])[:20])
+        assert completed_records(output) == (3, {5, 6})
+
+        resumed = score(directory, 'prompts.jsonl', lines, '--workers', '2', '--chunk-size', '4',
+                        '--unordered', '--resume')
+        assert sorted(record['index'] for record in resumed) == list(range(len(PROMPTS)))
+        assert sorted(resumed, key=lambda record: record['index']) == full
+
+        # Skipping a count of records assumes ordered output
+        for args in (['--skip', '3', '--unordered'], ['--resume'], ['-o', output, '--resume', '--skip', '3']):
+            with pytest.raises(SystemExit):
+                main([os.path.join(directory, 'prompts.jsonl'), *args])
+
+
+if __name__ == "__main__":
+    test_readers()
+    test_ordered_and_unordered_output()
+    test_resume_skips_what_was_written()
+    print("✅ Corpus scoring tests passed")
@@ -0,0 +1,207 @@
+"""
+Tests for single-flight request coalescing
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from benchmarks.mock_gemini import start_server
+from utils.async_gemini_client import AsyncGeminiClient
+from utils.gemini_client import GeminiClient, is_failed_result
+from utils.single_flight import AsyncSingleFlight, SingleFlight, SingleFlightTimeout
+
+
+def run_concurrently(fn, count):
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = [executor.submit(fn) for _ in range(count)]
+        return [future.result() for future in futures]
+
+
+def slow_call(calls, delay=0.2, result='value'):
+    def call():
+        calls.append(1)
+        time.sleep(delay)
+        return result
+    return call
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    fn = slow_call(calls)
+
+    results = run_concurrently(lambda: flight.do('key', fn), 8)
+
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ['value'] * 8
+    assert sum(shared for _, shared in results) == 7
+    stats = flight.get_stats()
+    assert stats['calls'] == 1 and stats['coalesced'] == 7 and stats['in_flight'] == 0
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    calls = []
+    fn = slow_call(calls, delay=0.05)
+    counter = iter(range(100))
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            key = next(counter)
+        return flight.do(key, fn)
+
+    run_concurrently(call, 4)
+    assert len(calls) == 4
+
+
+def test_shared_errors_reach_followers():
+    flight = SingleFlight(share_errors=True)
+    calls = []
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.2)
+        raise RuntimeError('upstream down')
+
+    def call():
+        try:
+            flight.do('key', failing)
+        except RuntimeError as e:
+            return str(e)
+
+    assert run_concurrently(call, 5) == ['upstream down'] * 5
+    assert len(calls) == 1
+    assert flight.get_stats()['shared_errors'] == 4
+
+
+def test_unshared_errors_make_followers_retry():
+    flight = SingleFlight(share_errors=False, is_error=is_failed_result)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'success': len(calls) > 1}
+
+    results = run_concurrently(lambda: flight.do('key', flaky)[0], 5)
+
+    # The leader fails once; the followers coalesce again on the retry
+    assert len(calls) == 2
+    assert sum(result['success'] for result in results) == 4
+    assert flight.get_stats()['retries'] == 4
+
+
+def test_follower_timeout_raises_or_calls():
+    for on_timeout in ('raise', 'call'):
+        flight = SingleFlight(follower_timeout=0.05, on_timeout=on_timeout)
+        calls = []
+        fn = slow_call(calls, delay=0.3)
+
+        leader = threading.Thread(target=flight.do, args=('key', fn))
+        leader.start()
+        time.sleep(0.02)
+        if on_timeout == 'raise':
+            with pytest.raises(SingleFlightTimeout):
+                flight.do('key', fn)
+            assert len(calls) == 1
+        else:
+            assert flight.do('key', fn) == ('value', False)
+            assert len(calls) == 2
+        leader.join()
+        assert flight.get_stats()['timeouts'] == 1
+
+
+def test_async_calls_share_one_execution():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return 'value'
+
+    async def run():
+        return await asyncio.gather(*[flight.do('key', fetch) for _ in range(50)])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert sum(shared for _, shared in results) == 49
+    assert flight.get_stats()['coalesced'] == 49
+
+
+def test_async_errors_and_timeouts():
+    flight = AsyncSingleFlight(follower_timeout=0.05)
+
+    async def failing():
+        await asyncio.sleep(0.02)
+        raise RuntimeError('upstream down')
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return 'value'
+
+    async def run():
+        errors = await asyncio.gather(*[flight.do('a', failing) for _ in range(3)], return_exceptions=True)
+        timeouts = await asyncio.gather(*[flight.do('b', slow) for _ in range(3)], return_exceptions=True)
+        return errors, timeouts
+
+    errors, timeouts = asyncio.run(run())
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert timeouts[0] == ('value', False)
+    assert all(isinstance(timeout, SingleFlightTimeout) for timeout in timeouts[1:])
+
+
+def test_gemini_client_coalesces_identical_prompts():
+    server, base_url = start_server(latency=0.2)
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url,
+                              single_flight=SingleFlight(is_error=is_failed_result))
+        results = run_concurrently(lambda: client.rewrite_prompt_objectively('Viral prompt', 'general'), 10)
+
+        assert server.stats['requests'] == 1
+        assert all(result['success'] for result in results)
+        assert sum(result['coalesced'] for result in results) == 9
+    finally:
+        server.shutdown()
+
+
+def test_async_gemini_client_coalesces_identical_prompts():
+    server, base_url = start_server(latency=0.2)
+    try:
+        client = AsyncGeminiClient(api_key='test', base_url=base_url,
+                                   single_flight=AsyncSingleFlight(is_error=is_failed_result))
+
+        async def run():
+            results = await asyncio.gather(*[
+                client.rewrite_prompt_objectively_async('Viral prompt') for _ in range(20)
+            ])
+            await client.aclose()
+            return results
+
+        results = asyncio.run(run())
+        assert server.stats['requests'] == 1
+        assert sum(result['coalesced'] for result in results) == 19
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_concurrent_calls_share_one_execution()
+    test_different_keys_do_not_coalesce()
+    test_shared_errors_reach_followers()
+    test_unshared_errors_make_followers_retry()
+    test_follower_timeout_raises_or_calls()
+    test_async_calls_share_one_execution()
+    test_async_errors_and_timeouts()
+    test_gemini_client_coalesces_identical_prompts()
+    test_async_gemini_client_coalesces_identical_prompts()
+    print("✅ Single flight tests passed")
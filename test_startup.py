@@ -0,0 +1,104 @@
+"""
+Tests for model start-up: lazy and eager modes, building each model once
+under concurrent requests, and the load timings /api/health reports
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from utils.model_registry import ModelRegistry
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+# Imports the app in a fresh interpreter and reports what start-up built
+REPORT_STARTUP = """
+import json
+from api.app import registry, startup_stats
+print(json.dumps({'models': registry.status(), 'instances': sorted(registry._instances),
+                  'startup': startup_stats}))
+"""
+
+
+def import_app(mode: str):
+    env = dict(os.environ, STARTUP_MODE=mode, BATCH_WORKERS='1', GEMINI_CACHE_PATH='')
+    output = subprocess.run([sys.executable, '-c', REPORT_STARTUP], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, timeout=120, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def test_lazy_mode_builds_nothing_at_import():
+    report = import_app('lazy')
+    assert report['instances'] == []
+    assert not any(model['loaded'] for model in report['models'].values())
+    assert report['startup']['mode'] == 'lazy' and report['startup']['warm_up_seconds'] is None
+
+
+def test_eager_mode_warms_every_model():
+    report = import_app('eager')
+    assert set(report['instances']) == set(report['models'])
+    assert all(model['loaded'] and model['load_seconds'] is not None for model in report['models'].values())
+    assert report['startup']['warm_up_seconds'] > 0 and report['startup']['nltk_resources'] is not None
+
+
+def test_concurrent_gets_build_each_model_once():
+    registry = ModelRegistry()
+    builds = []
+
+    def slow_factory():
+        builds.append(threading.current_thread().name)
+        time.sleep(0.05)
+        return object()
+
+    registry.register('model', slow_factory)
+    registry.register('dependent', lambda: (registry.get('model'), object()))
+    start = threading.Barrier(16)
+    results = []
+
+    def fetch():
+        start.wait()
+        results.append((registry.get('model'), registry.get('dependent')))
+
+    threads = [threading.Thread(target=fetch) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len({id(model) for model, _ in results}) == 1 and len({id(dependent) for _, dependent in results}) == 1
+    assert results[0][1][0] is results[0][0]
+    assert registry.load_times['model'] >= 0.05 and registry.status()['dependent']['loaded']
+
+
+def test_health_reports_load_timing():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        from api.app import app, registry
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+
+    registry.get('bias_detector')
+    client = app.test_client()
+    client.get('/api/health')
+    # Time to first request is recorded once that response is ready
+    response = client.get('/api/health')
+    startup = response.get_json()['startup']
+    assert response.status_code == 200 and startup['import_seconds'] > 0
+    assert startup['models']['bias_detector']['loaded']
+    assert startup['models']['bias_detector']['load_seconds'] == registry.load_times['bias_detector']
+    assert set(startup['models']) == set(registry.status())
+    assert startup['time_to_first_request_seconds'] is not None
+
+
+if __name__ == "__main__":
+    test_lazy_mode_builds_nothing_at_import()
+    test_eager_mode_warms_every_model()
+    test_concurrent_gets_build_each_model_once()
+    test_health_reports_load_timing()
+    print("✅ Startup tests passed")
@@ -0,0 +1,213 @@
+"""
+Tests for the streaming analyze endpoint: progressive NLP results and
+Gemini's streamed output, on the Flask and ASGI servers
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from benchmarks.mock_gemini import start_server
+from models.analysis import NLPAnalyzer
+from utils.async_gemini_client import AsyncGeminiClient
+from utils.deadline import Deadline
+from utils.gemini_client import GeminiClient
+from utils.result_cache import ResultCache, SizedLRUCache
+
+BIASED = 'Obviously every politician is corrupt, right?'
+
+
+def parse_events(text: str):
+    """[(event, data), ...] from a text/event-stream body"""
+    events = []
+    for block in text.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def load_app():
+    os.environ['STARTUP_MODE'] = 'lazy'
+    try:
+        from api.asgi import app as asgi_app, registry
+        from api.app import app
+    finally:
+        os.environ.pop('STARTUP_MODE', None)
+    return app, asgi_app, registry
+
+
+def test_stream_rewrite_matches_blocking_call():
+    server, base_url = start_server(latency=0.05)
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url, cache=ResultCache())
+        events = list(client.stream_rewrite(BIASED))
+        partials = [payload for event, payload in events if event == 'partial']
+        event, result = events[-1]
+
+        assert len(partials) > 1 and event == 'result'
+        assert result['success'] and not result['cached']
+        assert result['raw_response'] == ''.join(partials)
+        assert result['data'] == GeminiClient(api_key='test', base_url=base_url).rewrite_prompt_objectively(BIASED)['data']
+
+        # The streamed result was cached
+        assert list(client.stream_rewrite(BIASED)) == [('result', dict(result, cached=True))]
+    finally:
+        server.shutdown()
+
+
+def test_stream_rewrite_stops_at_the_deadline():
+    # The chunks arrive steadily, so only the deadline ends the read early
+    server, base_url = start_server(latency=1.0)
+    try:
+        client = GeminiClient(api_key='test', base_url=base_url, cache=ResultCache())
+        started = time.perf_counter()
+        event, result = list(client.stream_rewrite(BIASED, deadline=Deadline(0.3)))[-1]
+        assert time.perf_counter() - started < 0.6
+        assert event == 'result' and not result['success'] and result['error_type'] == 'deadline'
+        assert client.cache.get(client.cache_key(BIASED)) is None
+
+        async def run():
+            async_client = AsyncGeminiClient(api_key='test', base_url=base_url)
+            try:
+                events = [item async for item in async_client.stream_rewrite_async(BIASED, deadline=Deadline(0.3))]
+            finally:
+                await async_client.aclose()
+            return events[-1]
+
+        started = time.perf_counter()
+        event, result = asyncio.run(run())
+        assert time.perf_counter() - started < 0.6
+        assert event == 'result' and result['error_type'] == 'deadline'
+    finally:
+        server.shutdown()
+
+
+def test_progressive_analysis_shares_the_cache():
+    analyzer = NLPAnalyzer(cache=SizedLRUCache())
+    events = list(analyzer.analyze_progressively(BIASED))
+    assert [event for event, _ in events] == ['domain', 'nlp']
+    assert events[0][1]['domain'] == events[1][1]['domain']
+    assert analyzer.analyze(BIASED) is events[1][1]
+    assert list(analyzer.analyze_progressively(BIASED))[1][1] is events[1][1]
+
+
+def test_flask_stream_emits_domain_nlp_then_result():
+    app, _, registry = load_app()
+    client = app.test_client()
+
+    response = client.post('/api/analyze/stream', json={'prompt': BIASED})
+    assert response.mimetype == 'text/event-stream'
+    events = parse_events(response.get_data(as_text=True))
+    assert [event for event, _ in events] == ['domain', 'nlp', 'result']
+    assert events[-1][1] == client.post('/api/analyze', json={'prompt': BIASED}).get_json()
+
+    server, base_url = start_server()
+    previous = registry._instances.get('gemini_client')
+    registry._instances['gemini_client'] = GeminiClient(api_key='test', base_url=base_url)
+    try:
+        response = client.post('/api/analyze/stream', json={'prompt': BIASED, 'mode': 'ai'})
+        events = parse_events(response.get_data(as_text=True))
+    finally:
+        server.shutdown()
+        if previous is None:
+            registry._instances.pop('gemini_client')
+        else:
+            registry._instances['gemini_client'] = previous
+
+    names = [event for event, _ in events]
+    assert names[:2] == ['domain', 'nlp'] and names[-1] == 'result'
+    assert names.count('ai_partial') > 1
+    assert events[-1][1]['mode'] == 'ai'
+    assert ''.join(data['text'] for event, data in events if event == 'ai_partial').startswith('{')
+
+
+def test_flask_stream_applies_budget_and_fallback():
+    app, _, registry = load_app()
+    client = app.test_client()
+    assert client.post('/api/analyze/stream', json={'prompt': BIASED, 'mode': 'ai', 'budget_ms': -1}).status_code == 400
+
+    server, base_url = start_server(latency=1.0)
+    previous = registry._instances.get('gemini_client')
+    registry._instances['gemini_client'] = GeminiClient(api_key='test', base_url=base_url)
+    try:
+        response = client.post('/api/analyze/stream', json={'prompt': BIASED, 'mode': 'ai', 'budget_ms': 200})
+        fallback = parse_events(response.get_data(as_text=True))[-1]
+        response = client.post('/api/analyze/stream',
+                               json={'prompt': BIASED, 'mode': 'ai', 'budget_ms': 200, 'fallback': False})
+        failure = parse_events(response.get_data(as_text=True))[-1]
+    finally:
+        server.shutdown()
+        if previous is None:
+            registry._instances.pop('gemini_client')
+        else:
+            registry._instances['gemini_client'] = previous
+
+    # The same answers /api/analyze gives when the budget runs out
+    assert fallback[0] == 'result'
+    assert fallback[1]['fallback'] and fallback[1]['answered_by'] == 'nlp'
+    assert fallback[1]['fallback_reason'] == 'deadline'
+    assert failure[0] == 'error'
+
+
+def test_asgi_streams_ai_mode_natively():
+    _, asgi_app, registry = load_app()
+    server, base_url = start_server(latency=0.2)
+    previous = registry._instances.get('async_gemini_client')
+
+    async def run():
+        registry._instances['async_gemini_client'] = AsyncGeminiClient(api_key='test', base_url=base_url)
+        body = json.dumps({'prompt': BIASED, 'mode': 'ai'}).encode()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'POST', 'scheme': 'http', 'path': '/api/analyze/stream',
+            'raw_path': b'/api/analyze/stream', 'query_string': b'', 'root_path': '',
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+            'headers': [(b'content-type', b'application/json')]
+        }
+        messages = []
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            messages.append((asyncio.get_running_loop().time(), message))
+
+        await asgi_app(scope, receive, send)
+        await registry.get('async_gemini_client').aclose()
+        return messages
+
+    try:
+        messages = asyncio.run(run())
+    finally:
+        server.shutdown()
+        if previous is None:
+            registry._instances.pop('async_gemini_client')
+        else:
+            registry._instances['async_gemini_client'] = previous
+
+    assert (b'content-type', b'text/event-stream') in messages[0][1]['headers']
+    chunks = [(at, message['body'].decode()) for at, message in messages[1:]]
+    events = parse_events(''.join(body for _, body in chunks))
+    assert [event for event, _ in events][:2] == ['domain', 'nlp']
+    assert events[-1][0] == 'result' and events[-1][1]['mode'] == 'ai'
+    # The NLP analysis was sent well before Gemini finished
+    assert chunks[-1][0] - chunks[1][0] > 0.15
+
+
+if __name__ == "__main__":
+    test_stream_rewrite_matches_blocking_call()
+    test_stream_rewrite_stops_at_the_deadline()
+    test_progressive_analysis_shares_the_cache()
+    test_flask_stream_emits_domain_nlp_then_result()
+    test_flask_stream_applies_budget_and_fallback()
+    test_asgi_streams_ai_mode_natively()
+    print("✅ Streaming tests passed")